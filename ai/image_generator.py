@@ -3,7 +3,11 @@
 """
 import os
 import base64
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from typing import Optional
+from config import IMAGE_GEN_CONCURRENCY, IMAGE_GEN_TIMEOUT
+from utils.rate_limiter import rate_limit
 
 
 class ImageGenerator:
@@ -87,6 +91,7 @@ class ImageGenerator:
             enhanced_prompt = f"{prompt}, aspect ratio {aspect_ratio}, high quality, detailed"
             
             # Генерация
+            rate_limit('gemini')
             response = client.models.generate_content(
                 model="models/nano-banana-pro-preview",
                 contents=enhanced_prompt,
@@ -234,4 +239,102 @@ def generate_image(prompt: str, aspect_ratio: str = "1:1") -> dict:
         }
 
 
+class ImageBatch:
+    """
+    Параллельная генерация набора изображений (обложка + изображения статьи)
+    
+    Запуск не блокирует вызывающий поток: пока изображения генерируются,
+    можно писать текст статьи. results() дожидается всех изображений
+    и возвращает их в порядке запросов. Срок всего набора отсчитывается
+    от запуска: timeout на каждую «волну» из max_workers изображений
+    (включая очередь и ожидание rate_limit). Изображения, не готовые
+    к сроку, считаются неудачными, ещё не начатые — отменяются.
+    """
+    
+    def __init__(self, requests, max_workers=None, timeout=None):
+        """
+        Args:
+            requests: список (prompt, aspect_ratio)
+            max_workers: одновременных запросов (по умолчанию IMAGE_GEN_CONCURRENCY)
+            timeout: таймаут на изображение, сек (по умолчанию IMAGE_GEN_TIMEOUT)
+        """
+        self.requests = list(requests)
+        self.timeout = IMAGE_GEN_TIMEOUT if timeout is None else timeout
+        self._results = None
+        
+        workers = max(1, min(max_workers or IMAGE_GEN_CONCURRENCY, len(self.requests)))
+        waves = -(-len(self.requests) // workers)
+        self._deadline = time.monotonic() + self.timeout * waves
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-gen")
+        self._futures = [
+            executor.submit(generate_image, prompt, aspect_ratio)
+            for prompt, aspect_ratio in self.requests
+        ]
+        # Потоки завершатся сами после последнего задания
+        executor.shutdown(wait=False)
+    
+    def cancel(self):
+        """Отменить ещё не начатые изображения (например, текст статьи не сгенерировался)"""
+        for future in self._futures:
+            future.cancel()
+    
+    def results(self):
+        """
+        Дождаться всех изображений
+        
+        Returns:
+            list: dict результата generate_image для каждого запроса (по порядку)
+        """
+        if self._results is not None:
+            return self._results
+        
+        results = [None] * len(self._futures)
+        pending = set(range(len(self._futures)))
+        
+        while pending:
+            remaining = self._deadline - time.monotonic()
+            if remaining > 0:
+                wait([self._futures[index] for index in pending], timeout=remaining, return_when=FIRST_COMPLETED)
+            expired = time.monotonic() >= self._deadline
+            
+            for index in list(pending):
+                future = self._futures[index]
+                if future.done() and not future.cancelled():
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        results[index] = {'success': False, 'image_bytes': None, 'error': str(e)[:200]}
+                    pending.discard(index)
+                elif future.cancelled():
+                    results[index] = {'success': False, 'image_bytes': None, 'error': 'Генерация отменена'}
+                    pending.discard(index)
+                elif expired:
+                    # Не начатые отменяем, зависший запрос дорабатывает в фоне
+                    future.cancel()
+                    results[index] = {
+                        'success': False,
+                        'image_bytes': None,
+                        'error': f'Таймаут генерации ({int(self.timeout)} с)'
+                    }
+                    pending.discard(index)
+        
+        self._results = results
+        return results
+
+
+def generate_images(requests, max_workers=None, timeout=None) -> list:
+    """
+    Параллельная генерация нескольких изображений с ожиданием результата
+    
+    Args:
+        requests: список (prompt, aspect_ratio)
+        
+    Returns:
+        list: результаты generate_image в порядке запросов
+    """
+    if not requests:
+        return []
+    return ImageBatch(requests, max_workers=max_workers, timeout=timeout).results()
+
+
 print("✅ ai/image_generator.py загружен")
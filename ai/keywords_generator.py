@@ -3,6 +3,8 @@
 """
 import anthropic
 from config import ANTHROPIC_API_KEY
+from utils.rate_limiter import rate_limit
+from ai.prompt_cache import cached_system, record_usage, PROMPT_CACHING_HEADERS
 
 
 # Инициализация клиента
@@ -49,15 +51,17 @@ def generate_keywords(
             'error': '⚠️ Claude API не настроен. Добавьте ANTHROPIC_API_KEY в .env'
         }
     
-    # Профессиональный системный промпт (улучшенная версия 2.1)
-    system_prompt = f"""Ты профессиональный SEO-специалист. Собираешь семантическое ядро по всем правилам.
+    # Профессиональный системный промпт (улучшенная версия 2.1).
+    # Статичный — кэшируется (prompt caching); данные бизнеса и количество
+    # фраз передаются только в пользовательском промпте
+    system_prompt = """Ты профессиональный SEO-специалист. Собираешь семантическое ядро по всем правилам.
 
 КРИТИЧЕСКИ ВАЖНЫЕ ПРАВИЛА:
 
 1. ГЕНЕРИРУЙ ТОЛЬКО РЕАЛЬНЫЕ ПОИСКОВЫЕ ЗАПРОСЫ
    - Люди реально ищут эти фразы в Яндекс/Google
    - Никакой отсебятины и фантазий!
-   - Если товар "{products_services}" - пиши про него, а не про другие товары
+   - Пиши про товар/услугу из ДАННЫХ О БИЗНЕСЕ, а не про другие товары
 
 2. СТРУКТУРА СЯ (СТРОГО СОБЛЮДАЙ ПРОПОРЦИИ):
 
@@ -133,7 +137,7 @@ def generate_keywords(
    - Каждая фраза на отдельной строке
    - БЕЗ нумерации, БЕЗ маркеров, БЕЗ пояснений
    - Только чистые ключевые фразы
-   - РОВНО {quantity} фраз"""
+   - РОВНО столько фраз, сколько указано в задании"""
     
     # Пользовательский промпт (улучшенный с long-tail и сравнениями)
     user_prompt = f"""Сгенерируй семантическое ядро из РОВНО {quantity} ключевых фраз.
@@ -239,10 +243,12 @@ D) Базовые (~{int(quantity * 0.03)} шт):
     
     try:
         # Запрос к Claude
+        rate_limit('anthropic')
         response = client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=12000,  # Увеличено для генерации до 200 фраз
-            system=system_prompt,
+            system=cached_system(system_prompt),
+            extra_headers=PROMPT_CACHING_HEADERS,
             messages=[
                 {
                     "role": "user",
@@ -251,19 +257,7 @@ D) Базовые (~{int(quantity * 0.03)} шт):
             ]
         )
         
-        # Логируем затраты
-        try:
-            if hasattr(response, 'usage') and response.usage:
-                from utils.api_cost_tracker import log_claude_usage
-                log_claude_usage(
-                    user_id=0,
-                    input_tokens=response.usage.input_tokens,
-                    output_tokens=response.usage.output_tokens,
-                    model="claude-sonnet-4-20250514",
-                    operation_type='keywords_generation'
-                )
-        except Exception as e:
-            print(f"⚠️ Ошибка логирования затрат: {e}")
+        record_usage('keywords_generation', response)
         
         # Извлекаем текст ответа
         if response and response.content:
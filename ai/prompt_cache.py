@@ -0,0 +1,131 @@
+"""
+Кэширование префикса промпта Claude (prompt caching) и учёт кэшированных токенов
+
+Большие статичные инструкции передаются первым блоком system с пометкой
+cache_control — Anthropic кэширует префикс запроса до этой пометки, и следующие
+вызовы с тем же префиксом оплачивают его как cache read (~10% цены входных
+токенов). Всё, что меняется от запроса к запросу, идёт ПОСЛЕ кэшируемого блока
+(в сообщении пользователя), иначе префикс не совпадёт.
+
+Префикс короче минимального размера (1024 токена для Sonnet) не кэшируется —
+запрос выполняется как обычно, без ошибки.
+"""
+import threading
+
+# Заголовок бета-функции для SDK, где prompt caching ещё не включён по умолчанию
+PROMPT_CACHING_HEADERS = {"anthropic-beta": "prompt-caching-2024-07-31"}
+
+
+def cached_system(static_text, dynamic_text=None):
+    """
+    Параметр system: статичный блок с cache_control (+ необязательный
+    изменяемый блок после него, который в кэш не попадает)
+    """
+    blocks = [{
+        "type": "text",
+        "text": static_text,
+        "cache_control": {"type": "ephemeral"}
+    }]
+    if dynamic_text:
+        blocks.append({"type": "text", "text": dynamic_text})
+    return blocks
+
+
+# ─────────────────────────────────────────────────────────────
+# Учёт токенов по операциям
+# ─────────────────────────────────────────────────────────────
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record_usage(operation, message, user_id=0):
+    """
+    Записать usage ответа Claude: входные токены без кэша, прочитанные
+    из кэша и записанные в кэш, выходные токены. Вызов также уходит
+    в журнал затрат (utils.api_cost_tracker).
+
+    Returns:
+        dict: токены этого вызова (пустой dict если usage нет)
+    """
+    usage = getattr(message, 'usage', None)
+    if not usage:
+        return {}
+
+    call = {
+        'input_tokens': getattr(usage, 'input_tokens', 0) or 0,
+        'cache_read_input_tokens': getattr(usage, 'cache_read_input_tokens', 0) or 0,
+        'cache_creation_input_tokens': getattr(usage, 'cache_creation_input_tokens', 0) or 0,
+        'output_tokens': getattr(usage, 'output_tokens', 0) or 0,
+    }
+
+    with _stats_lock:
+        op = _stats.setdefault(operation, {
+            'calls': 0,
+            'cache_hits': 0,
+            'input_tokens': 0,
+            'cache_read_input_tokens': 0,
+            'cache_creation_input_tokens': 0,
+            'output_tokens': 0,
+        })
+        op['calls'] += 1
+        if call['cache_read_input_tokens']:
+            op['cache_hits'] += 1
+        for field, value in call.items():
+            op[field] += value
+
+    print(
+        f"🧠 [{operation}] вход: {call['input_tokens']} без кэша, "
+        f"{call['cache_read_input_tokens']} из кэша, "
+        f"{call['cache_creation_input_tokens']} записано в кэш; "
+        f"выход: {call['output_tokens']}"
+    )
+
+    try:
+        from utils.api_cost_tracker import log_claude_usage
+        log_claude_usage(
+            user_id=user_id,
+            input_tokens=call['input_tokens'],
+            output_tokens=call['output_tokens'],
+            model=getattr(message, 'model', '') or '',
+            operation_type=operation,
+            cache_read_tokens=call['cache_read_input_tokens'],
+            cache_write_tokens=call['cache_creation_input_tokens'],
+        )
+    except Exception as e:
+        print(f"⚠️ Ошибка логирования затрат: {e}")
+    return call
+
+
+def get_prompt_cache_stats():
+    """Накопленная статистика с момента запуска: {operation: {...}}"""
+    with _stats_lock:
+        stats = {operation: dict(values) for operation, values in _stats.items()}
+
+    for values in stats.values():
+        total_input = (
+            values['input_tokens']
+            + values['cache_read_input_tokens']
+            + values['cache_creation_input_tokens']
+        )
+        values['cached_ratio'] = (
+            values['cache_read_input_tokens'] / total_input if total_input else 0.0
+        )
+    return stats
+
+
+def format_prompt_cache_stats():
+    """Блок для админ-статистики (пустая строка если вызовов не было)"""
+    stats = get_prompt_cache_stats()
+    if not stats:
+        return ""
+
+    lines = ["\n🧠 <b>Кэш промптов Claude:</b>"]
+    for operation, values in sorted(stats.items()):
+        lines.append(
+            f"• {operation}: {values['calls']} выз., попаданий {values['cache_hits']}, "
+            f"из кэша {values['cache_read_input_tokens']:,} / "
+            f"без кэша {values['input_tokens']:,} ток. "
+            f"({values['cached_ratio']:.0%})"
+        )
+    return "\n".join(lines) + "\n"
@@ -3,6 +3,8 @@
 """
 import anthropic
 from config import ANTHROPIC_API_KEY
+from utils.rate_limiter import rate_limit
+from ai.prompt_cache import record_usage
 
 
 # Инициализация клиента
@@ -95,26 +97,14 @@ def generate_product_description(
 Напиши описание объёмом ~{word_count} слов в стиле "{tone_desc}"."""
     
     try:
+        rate_limit('anthropic')
         response = client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=2000,
             system=system_prompt,
             messages=[{"role": "user", "content": user_prompt}]
         )
-        
-        # Логируем затраты
-        try:
-            if hasattr(response, 'usage') and response.usage:
-                from utils.api_cost_tracker import log_claude_usage
-                log_claude_usage(
-                    user_id=0,
-                    input_tokens=response.usage.input_tokens,
-                    output_tokens=response.usage.output_tokens,
-                    model="claude-sonnet-4-20250514",
-                    operation_type='text_generation'
-                )
-        except:
-            pass
+        record_usage('product_description', response)
         
         if response and response.content:
             text = response.content[0].text.strip()
@@ -190,12 +180,14 @@ H1: [текст заголовка H1]"""
 Создай meta-теги в указанном формате."""
     
     try:
+        rate_limit('anthropic')
         response = client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=500,
             system=system_prompt,
             messages=[{"role": "user", "content": user_prompt}]
         )
+        record_usage('meta_tags', response)
         
         if response and response.content:
             text = response.content[0].text.strip()
@@ -304,12 +296,14 @@ def generate_social_post(
 Создай вовлекающий пост."""
     
     try:
+        rate_limit('anthropic')
         response = client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=1500,
             system=system_prompt,
             messages=[{"role": "user", "content": user_prompt}]
         )
+        record_usage('social_post', response)
         
         if response and response.content:
             post_text = response.content[0].text.strip()
@@ -416,12 +410,14 @@ def generate_pinterest_description(
 Создай описание."""
     
     try:
+        rate_limit('anthropic')
         response = client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=500,
             system=system_prompt,
             messages=[{"role": "user", "content": user_prompt}]
         )
+        record_usage('pinterest_description', response)
         
         if response and response.content:
             description = response.content[0].text.strip()
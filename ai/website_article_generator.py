@@ -3,10 +3,23 @@
 Генератор SEO-статей для сайтов с продвинутыми промптами
 Включает: Yoast SEO оптимизацию, Schema.org, адаптацию под цвета сайта
 """
+import re
+import time
 import anthropic
 from config import ANTHROPIC_API_KEY
+from utils.rate_limiter import rate_limit
+from ai.prompt_cache import cached_system, record_usage, PROMPT_CACHING_HEADERS
 from datetime import datetime
 
+# Сколько раз продолжать статью, упёршуюся в max_tokens
+MAX_CONTINUATIONS = 2
+
+# Частота вызова on_progress, сек (ограничение Telegram на редактирование сообщений)
+PROGRESS_INTERVAL = 3.0
+
+# Минимум H2-разделов, чтобы отдать оборванную статью вместо ошибки
+PARTIAL_MIN_SECTIONS = 2
+
 
 # Инициализация клиента
 client = None
@@ -92,7 +105,8 @@ def generate_website_article(
     min_words=1500,
     max_words=2500,
     h2_list=None,
-    author_data=None
+    author_data=None,
+    on_progress=None
 ):
     """
     Генерирует SEO-статью для сайта с полной оптимизацией
@@ -113,6 +127,8 @@ def generate_website_article(
         max_words: Максимум слов
         h2_list: Список подзаголовков H2 (или None для автогенерации)
         author_data: dict с данными автора {'id': int, 'name': str, 'avatar_url': str, 'bio': str}
+        on_progress: callback(dict) с реальным прогрессом потоковой генерации:
+            {'tokens': int, 'words': int, 'sections': int, 'target_words': int}
         
     Returns:
         dict: {
@@ -121,7 +137,8 @@ def generate_website_article(
             'seo_title': 'SEO заголовок',
             'meta_description': 'Мета описание',
             'word_count': 1234,
-            'error': 'текст ошибки' (если success=False)
+            'partial': True (если генерация оборвалась, а статья обрезана по последнему блоку),
+            'error': 'текст ошибки' (если success=False или partial)
         }
     """
     
@@ -552,15 +569,306 @@ def generate_website_article(
 - Это гарантирует видимость на ЛЮБОМ фоне WordPress темы
 """
     
-    # Промпт для Claude
-    system_prompt = """Ты — профессиональный SEO-копирайтер с опытом в E-E-A-T и AEO оптимизации.
+    # Промпт для Claude: статичные инструкции идут кэшируемым префиксом (system),
+    # данные этого запроса — в сообщении пользователя после него
+    instructions = _build_article_instructions(
+        colors, author_data, company_city, company_address, company_phone, company_email
+    )
+    placeholder_values = {
+        '%ТЕМА%': keyword,
+        '%КОМПАНИЯ%': company_name,
+        '%ГОРОД%': company_city,
+        '%АДРЕС%': company_address,
+        '%ТЕЛЕФОН%': company_phone,
+        '%EMAIL%': company_email,
+        '%АВТОР%': author_data.get('name', '') if author_data else '',
+        '%ГОД%': str(current_year),
+        '%МИН_СЛОВ%': str(min_words),
+        '%МАКС_СЛОВ%': str(max_words),
+    }
+    placeholders_section = "\n".join(
+        f"{mark} = {value}" for mark, value in placeholder_values.items() if value
+    )
+    
+    user_prompt = f"""═══════════════════════════════════════════════════════════════
+📋 ИСХОДНЫЕ ДАННЫЕ
+═══════════════════════════════════════════════════════════════
+ТЕМА: "{keyword}"
+КАТЕГОРИЯ: {category_name}
+ОБЪЁМ: {min_words}-{max_words} слов
+ГОД: {current_year}
+
+ЗНАЧЕНИЯ МЕТОК (подставляй вместо %...% из инструкций):
+{placeholders_section}
+
+{style_section}
+
+{company_section}
+
+{author_section}
+
+{reviews_section}
+
+{links_section}
+
+{colors_info}
+
+{h2_structure}
+
+{f'═══════════════════════════════════════════════════════════════\\n📋 КОНТЕКСТ КАТЕГОРИИ\\n═══════════════════════════════════════════════════════════════\\n' + category_description + '\\n' if category_description else ''}
+═══════════════════════════════════════════════════════════════
+
+НАЧИНАЙ ГЕНЕРАЦИЮ ИДЕАЛЬНОЙ СТАТЬИ:"""
+    
+    # Логирование для проверки
+    print("\n" + "="*80)
+    print("📝 \033[96mПРОМПТ ДЛЯ ГЕНЕРАЦИИ ТЕКСТА (CLAUDE)\033[0m")
+    print("="*80)
+    print("\n\033[93m1. ОСНОВНЫЕ ПАРАМЕТРЫ:\033[0m")
+    print(f"   • Ключевое слово: \033[92m{keyword}\033[0m")
+    print(f"   • Категория: \033[92m{category_name}\033[0m")
+    if category_description:
+        if len(category_description) > 200:
+            print(f"   • Описание категории: {category_description[:200]}...")
+            print(f"     (полное описание: {len(category_description)} символов)")
+        else:
+            print(f"   • Описание категории: {category_description}")
+    else:
+        print(f"   • Описание категории: нет")
+    print(f"   • Количество слов: \033[92m{min_words}-{max_words}\033[0m")
+    print(f"   • Стиль текста: \033[92m{text_style}\033[0m")
+    print(f"   • HTML стиль: \033[92m{html_style}\033[0m")
+    
+    print("\n\033[93m2. ДАННЫЕ КОМПАНИИ:\033[0m")
+    if company_data:
+        name = company_data.get('name') or company_data.get('company_name') or company_data.get('title')
+        city = company_data.get('city', '')
+        address = company_data.get('address', '')
+        phone = company_data.get('phone', '')
+        email = company_data.get('email', '')
+        
+        print(f"   • Название: {name if name else '\033[91mНЕ ЗАПОЛНЕНО\033[0m'}")
+        print(f"   • Город: {city if city else 'не указан'}")
+        print(f"   • Адрес: {address if address else 'не указан'}")
+        print(f"   • Телефон: {phone if phone else 'не указан'}")
+        print(f"   • Email: {email if email else 'не указан'}")
+    else:
+        print("   • Данные компании отсутствуют")
+    
+    print("\n\033[93m3. ПРАЙС-ЛИСТ:\033[0m")
+    if prices:
+        print(f"   • Количество позиций: \033[92m{len(prices)}\033[0m")
+        for i, price in enumerate(prices[:3], 1):
+            # Проверяем разные варианты структуры данных (включая русские ключи)
+            if isinstance(price, dict):
+                name = (price.get('name') or price.get('title') or price.get('service') or 
+                       price.get('наименование') or price.get('товар') or price.get('продукт'))
+                price_value = (price.get('price') or price.get('cost') or price.get('value') or 
+                              price.get('цена') or price.get('стоимость'))
+                
+                if not name:
+                    name = '\033[91mБЕЗ НАЗВАНИЯ\033[0m'
+                if not price_value:
+                    price_value = '\033[91mЦЕНА НЕ УКАЗАНА\033[0m'
+                
+                print(f"   {i}. {name}: {price_value}")
+                # Показываем структуру первого элемента для отладки
+                if i == 1:
+                    print(f"      \033[90m[Структура: {list(price.keys())}]\033[0m")
+            else:
+                print(f"   {i}. \033[91mНекорректный формат данных: {type(price)}\033[0m")
+        if len(prices) > 3:
+            print(f"   ... и еще {len(prices) - 3} позиций")
+    else:
+        print("   • \033[91mПрайс-лист отсутствует\033[0m")
+    
+    print("\n\033[93m4. ОТЗЫВЫ:\033[0m")
+    if reviews:
+        print(f"   • Количество отзывов: \033[92m{len(reviews)}\033[0m")
+        for i, review in enumerate(reviews[:2], 1):
+            print(f"   {i}. Автор: {review.get('author', 'Аноним')}, Рейтинг: {review.get('rating', '?')}/5")
+            print(f"      Текст: {review.get('text', '')[:80]}...")
+        if len(reviews) > 2:
+            print(f"   ... и еще {len(reviews) - 2} отзывов")
+    else:
+        print("   • Отзывы отсутствуют")
+    
+    print("\n\033[93m5. ВНЕШНИЕ ССЫЛКИ:\033[0m")
+    if external_links:
+        print(f"   • Количество ссылок: \033[92m{len(external_links)}\033[0m")
+        for i, link in enumerate(external_links[:3], 1):
+            print(f"   {i}. {link.get('title', 'Без названия')}")
+            print(f"      URL: {link.get('url', 'нет')}")
+    else:
+        print("   • Внешние ссылки отсутствуют")
+    
+    print("\n\033[93m6. ВНУТРЕННИЕ ССЫЛКИ:\033[0m")
+    if internal_links:
+        print(f"   • Количество ссылок: \033[92m{len(internal_links)}\033[0m")
+        for i, link in enumerate(internal_links[:3], 1):
+            priority = link.get('priority', 'нет')
+            priority_color = '\033[91m' if priority == 'high' else '\033[93m' if priority == 'medium' else '\033[92m'
+            print(f"   {i}. [{priority_color}{priority}\033[0m] {link.get('title', 'Без названия')[:60]}")
+            print(f"      URL: {link.get('url', 'нет')}")
+        if len(internal_links) > 3:
+            print(f"   ... и еще {len(internal_links) - 3} ссылок")
+    else:
+        print("   • Внутренние ссылки отсутствуют")
+    
+    print("\n\033[93m7. ЦВЕТА САЙТА:\033[0m")
+    if site_colors:
+        print(f"   • Фон: {colors['bg']}")
+        print(f"   • Текст: {colors['text']}")
+        print(f"   • Акцент: {colors['accent']}")
+        print(f"   • Тёмная тема: {'Да' if colors['is_dark_theme'] else 'Нет'}")
+    else:
+        print("   • Используются цвета по умолчанию")
+    
+    print("\n\033[93m8. H2 ЗАГОЛОВКИ:\033[0m")
+    if h2_list:
+        print(f"   • Количество H2: \033[92m{len(h2_list)}\033[0m")
+        for i, h2 in enumerate(h2_list, 1):
+            print(f"   {i}. {h2}")
+    else:
+        print("   • Генерируются автоматически")
+    
+    print("\n" + "="*80)
+    print("\033[96mОТПРАВКА ЗАПРОСА В CLAUDE API...\033[0m")
+    print("="*80 + "\n")
+    
+    # Увеличенный таймаут для больших запросов
+    max_retries = 3
+    retry_delay = 10  # секунды (увеличено с 2 до 10)
+    
+    # Уже полученный текст: при обрыве потока или лимите max_tokens
+    # генерация продолжается с этого места, а не начинается заново
+    parts = []
+    continuations = 0
+    attempt = 0
+    stop_reason = None
+    error_msg = None
+    
+    while True:
+        try:
+            print(f"🔄 Попытка {attempt + 1}/{max_retries}...")
+            
+            stop_reason = _stream_article(
+                instructions, user_prompt, parts,
+                on_progress=on_progress, target_words=max_words
+            )
+            
+            # Проверяем причину остановки
+            if stop_reason == 'max_tokens':
+                if continuations < MAX_CONTINUATIONS:
+                    continuations += 1
+                    print(f"⚠️  Достигнут лимит max_tokens — продолжаю статью ({continuations}/{MAX_CONTINUATIONS})")
+                    continue
+                print("⚠️  ВНИМАНИЕ! Статья обрезана - достигнут лимит max_tokens")
+                print("    Рекомендация: увеличьте max_tokens или сократите промпт")
+            elif stop_reason == 'end_turn':
+                print("✅ Статья завершена корректно (end_turn)")
+            elif stop_reason:
+                print(f"ℹ️  Причина остановки: {stop_reason}")
+            
+            if ''.join(parts).strip():
+                print("✅ Ответ получен успешно!")
+                return _parse_article_response(
+                    _fill_placeholders(''.join(parts), placeholder_values), keyword, company_name, company_city, company_phone
+                )
+            
+            # Если ответ пустой - пробуем еще раз
+            error_msg = 'Claude вернул пустой ответ после всех попыток'
+            if attempt < max_retries - 1:
+                print(f"⚠️ Пустой ответ, повтор через {retry_delay} сек...")
+                time.sleep(retry_delay)
+                retry_delay *= 2  # Экспоненциальная задержка
+                attempt += 1
+                continue
+            break
+                
+        except Exception as e:
+            error_msg = str(e)
+            received = len(''.join(parts))
+            if received:
+                print(f"⚠️ Поток прерван после {received} символов: {error_msg[:100]}")
+            
+            # Проверяем специфичные ошибки
+            if _is_retryable_error(e):
+                print(f"⚠️ Временная ошибка API (перегрузка / таймаут / обрыв соединения)")
+                if attempt < max_retries - 1:
+                    print(f"   Повтор через {retry_delay} сек{' (продолжение с места обрыва)' if received else ''}...")
+                    time.sleep(retry_delay)
+                    retry_delay *= 2
+                    attempt += 1
+                    continue
+                elif '520' in error_msg or 'Cloudflare' in error_msg:
+                    error_msg = "API Anthropic временно недоступен (ошибка 520). Попробуйте через несколько минут."
+                elif 'timeout' in error_msg.lower():
+                    error_msg = "Превышено время ожидания ответа от API. Попробуйте уменьшить размер статьи."
+            
+            # Последняя попытка или другая ошибка
+            error_msg = f'Ошибка Claude AI: {error_msg[:200]}'
+            break
+    
+    # Генерация не завершилась, но большая часть статьи уже написана — отдаём её
+    partial_html = _fill_placeholders(_trim_partial_article(''.join(parts)), placeholder_values)
+    if partial_html.lower().count('<h2') >= PARTIAL_MIN_SECTIONS:
+        print(f"⚠️ Возвращаю частичную статью ({len(partial_html.split())} слов): {error_msg}")
+        result = _parse_article_response(partial_html, keyword, company_name, company_city, company_phone)
+        result['partial'] = True
+        result['error'] = error_msg
+        return result
+    
+    return {
+        'success': False,
+        'html': '',
+        'seo_title': '',
+        'meta_description': '',
+        'error': error_msg
+    }
+
+
+# Роль модели — начало кэшируемого префикса
+ARTICLE_SYSTEM_PROMPT = """Ты — профессиональный SEO-копирайтер с опытом в E-E-A-T и AEO оптимизации.
 Твоя задача — писать статьи, которые:
 1. Ранжируются в Google и Яндекс (SEO)
 2. Попадают в голосовые ответы и AI-ассистенты (AEO)
 3. Получают Featured Snippets (избранные сниппеты)
 4. Конвертируют читателей в клиентов"""
+
+
+def _build_article_instructions(colors, author_data, company_city, company_address,
+                                company_phone, company_email):
+    """
+    Статичная часть промпта статьи — кэшируемый префикс (prompt caching).
+    
+    Тема, данные компании, имя автора, год и объём заменены метками %...%,
+    их значения передаются в блоке ИСХОДНЫХ ДАННЫХ. Текст зависит только от
+    цвета акцента и от того, какие поля компании/автора заполнены, поэтому
+    совпадает у всех статей одного сайта и читается из кэша.
+    """
+    keyword = '%ТЕМА%'
+    company_name = '%КОМПАНИЯ%'
+    company_city = '%ГОРОД%' if company_city else ''
+    company_address = '%АДРЕС%' if company_address else ''
+    company_phone = '%ТЕЛЕФОН%' if company_phone else ''
+    company_email = '%EMAIL%' if company_email else ''
+    author_data = {'name': '%АВТОР%'} if author_data else None
+    current_year = '%ГОД%'
+    min_words, max_words = '%МИН_СЛОВ%', '%МАКС_СЛОВ%'
     
-    user_prompt = f"""Напиши ИДЕАЛЬНУЮ статью для Google, Yoast SEO и AEO (Answer Engine Optimization).
+    return f"""{ARTICLE_SYSTEM_PROMPT}
+
+═══════════════════════════════════════════════════════════════
+🔖 МЕТКИ В ИНСТРУКЦИЯХ
+═══════════════════════════════════════════════════════════════
+Метки вида %ТЕМА% заменяй значениями из блока "ЗНАЧЕНИЯ МЕТОК" в сообщении пользователя:
+%ТЕМА% — тема статьи (ключевая фраза), %КОМПАНИЯ% — название компании,
+%ГОРОД%, %АДРЕС%, %ТЕЛЕФОН%, %EMAIL% — контакты компании, %АВТОР% — имя автора,
+%ГОД% — текущий год, %МИН_СЛОВ%-%МАКС_СЛОВ% — объём статьи в словах.
+⚠️ В готовой статье НЕ ДОЛЖНО остаться ни одной метки %...%!
+
+Напиши ИДЕАЛЬНУЮ статью для Google, Yoast SEO и AEO (Answer Engine Optimization).
 
 ═══════════════════════════════════════════════════════════════
 🎯 AEO ОПТИМИЗАЦИЯ (Answer Engine Optimization)
@@ -758,29 +1066,6 @@ META_DESC: {keyword}{f' в {company_city}' if company_city else ''} — проф
 ❌ Отсутствие краткого резюме после H1
 ❌ Отсутствие SEO_TITLE или META_DESC
 
-═══════════════════════════════════════════════════════════════
-📋 ИСХОДНЫЕ ДАННЫЕ
-═══════════════════════════════════════════════════════════════
-ТЕМА: "{keyword}"
-КАТЕГОРИЯ: {category_name}
-ОБЪЁМ: {min_words}-{max_words} слов
-ГОД: {current_year}
-
-{style_section}
-
-{company_section}
-
-{author_section}
-
-{reviews_section}
-
-{links_section}
-
-{colors_info}
-
-{h2_structure}
-
-{f'═══════════════════════════════════════════════════════════════\\n📋 КОНТЕКСТ КАТЕГОРИИ\\n═══════════════════════════════════════════════════════════════\\n' + category_description + '\\n' if category_description else ''}
 ═══════════════════════════════════════════════════════════════
 🎯 ИДЕАЛЬНАЯ СТРУКТУРА СТАТЬИ
 ═══════════════════════════════════════════════════════════════
@@ -1373,258 +1658,152 @@ YOAST SEO:
 Если места не хватает - сократи вступление или описания,
 но ЗАКЛЮЧЕНИЕ И АВТОР должны быть ПОЛНОСТЬЮ написаны!
 
-═══════════════════════════════════════════════════════════════
+═══════════════════════════════════════════════════════════════"""
 
-НАЧИНАЙ ГЕНЕРАЦИЮ ИДЕАЛЬНОЙ СТАТЬИ:"""
+
+def _is_retryable_error(error):
+    """Перегрузка API, таймаут или обрыв соединения — имеет смысл повторить"""
+    if isinstance(error, (anthropic.APIConnectionError, anthropic.InternalServerError, anthropic.RateLimitError)):
+        return True
+    message = str(error)
+    return (
+        '520' in message or 'Cloudflare' in message
+        or 'overloaded' in message.lower() or 'timeout' in message.lower()
+    )
+
+
+def _stream_article(instructions, user_prompt, parts, on_progress=None, target_words=None):
+    """
+    Один потоковый запрос к Claude. Текст дописывается в parts по мере
+    поступления, поэтому при исключении полученная часть не теряется.
+    Если parts не пуст, он передаётся как начало ответа ассистента —
+    Claude продолжает статью с места остановки.
     
-    # Логирование для проверки
-    print("\n" + "="*80)
-    print("📝 \033[96mПРОМПТ ДЛЯ ГЕНЕРАЦИИ ТЕКСТА (CLAUDE)\033[0m")
-    print("="*80)
-    print("\n\033[93m1. ОСНОВНЫЕ ПАРАМЕТРЫ:\033[0m")
-    print(f"   • Ключевое слово: \033[92m{keyword}\033[0m")
-    print(f"   • Категория: \033[92m{category_name}\033[0m")
-    if category_description:
-        if len(category_description) > 200:
-            print(f"   • Описание категории: {category_description[:200]}...")
-            print(f"     (полное описание: {len(category_description)} символов)")
-        else:
-            print(f"   • Описание категории: {category_description}")
-    else:
-        print(f"   • Описание категории: нет")
-    print(f"   • Количество слов: \033[92m{min_words}-{max_words}\033[0m")
-    print(f"   • Стиль текста: \033[92m{text_style}\033[0m")
-    print(f"   • HTML стиль: \033[92m{html_style}\033[0m")
+    Статичные инструкции передаются кэшируемым блоком system: повторы и
+    продолжения (и следующие статьи того же сайта) читают их из кэша.
     
-    print("\n\033[93m2. ДАННЫЕ КОМПАНИИ:\033[0m")
-    if company_data:
-        name = company_data.get('name') or company_data.get('company_name') or company_data.get('title')
-        city = company_data.get('city', '')
-        address = company_data.get('address', '')
-        phone = company_data.get('phone', '')
-        email = company_data.get('email', '')
-        
-        print(f"   • Название: {name if name else '\033[91mНЕ ЗАПОЛНЕНО\033[0m'}")
-        print(f"   • Город: {city if city else 'не указан'}")
-        print(f"   • Адрес: {address if address else 'не указан'}")
-        print(f"   • Телефон: {phone if phone else 'не указан'}")
-        print(f"   • Email: {email if email else 'не указан'}")
-    else:
-        print("   • Данные компании отсутствуют")
+    Returns:
+        str: stop_reason ('end_turn', 'max_tokens', ...)
+    """
+    messages = [{"role": "user", "content": user_prompt}]
+    if parts:
+        # Начало ответа не может заканчиваться пробелами
+        prefix = ''.join(parts).rstrip()
+        parts[:] = [prefix]
+        messages.append({"role": "assistant", "content": prefix})
     
-    print("\n\033[93m3. ПРАЙС-ЛИСТ:\033[0m")
-    if prices:
-        print(f"   • Количество позиций: \033[92m{len(prices)}\033[0m")
-        for i, price in enumerate(prices[:3], 1):
-            # Проверяем разные варианты структуры данных (включая русские ключи)
-            if isinstance(price, dict):
-                name = (price.get('name') or price.get('title') or price.get('service') or 
-                       price.get('наименование') or price.get('товар') or price.get('продукт'))
-                price_value = (price.get('price') or price.get('cost') or price.get('value') or 
-                              price.get('цена') or price.get('стоимость'))
-                
-                if not name:
-                    name = '\033[91mБЕЗ НАЗВАНИЯ\033[0m'
-                if not price_value:
-                    price_value = '\033[91mЦЕНА НЕ УКАЗАНА\033[0m'
-                
-                print(f"   {i}. {name}: {price_value}")
-                # Показываем структуру первого элемента для отладки
-                if i == 1:
-                    print(f"      \033[90m[Структура: {list(price.keys())}]\033[0m")
-            else:
-                print(f"   {i}. \033[91mНекорректный формат данных: {type(price)}\033[0m")
-        if len(prices) > 3:
-            print(f"   ... и еще {len(prices) - 3} позиций")
-    else:
-        print("   • \033[91mПрайс-лист отсутствует\033[0m")
+    deltas = 0
+    last_report = 0.0
     
-    print("\n\033[93m4. ОТЗЫВЫ:\033[0m")
-    if reviews:
-        print(f"   • Количество отзывов: \033[92m{len(reviews)}\033[0m")
-        for i, review in enumerate(reviews[:2], 1):
-            print(f"   {i}. Автор: {review.get('author', 'Аноним')}, Рейтинг: {review.get('rating', '?')}/5")
-            print(f"      Текст: {review.get('text', '')[:80]}...")
-        if len(reviews) > 2:
-            print(f"   ... и еще {len(reviews) - 2} отзывов")
-    else:
-        print("   • Отзывы отсутствуют")
+    rate_limit('anthropic')
+    with client.messages.stream(
+        model="claude-sonnet-4-20250514",
+        max_tokens=16384,  # Максимум для Claude Sonnet 4
+        system=cached_system(instructions),
+        messages=messages,
+        extra_headers=PROMPT_CACHING_HEADERS,
+        timeout=300.0  # Таймаут до 300 секунд (5 минут)
+    ) as stream:
+        for event in stream:
+            if event.type != 'content_block_delta' or not getattr(event.delta, 'text', None):
+                continue
+            parts.append(event.delta.text)
+            deltas += 1
+            
+            if on_progress and time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                _report_progress(on_progress, parts, deltas, target_words)
+        
+        message = stream.get_final_message()
     
-    print("\n\033[93m5. ВНЕШНИЕ ССЫЛКИ:\033[0m")
-    if external_links:
-        print(f"   • Количество ссылок: \033[92m{len(external_links)}\033[0m")
-        for i, link in enumerate(external_links[:3], 1):
-            print(f"   {i}. {link.get('title', 'Без названия')}")
-            print(f"      URL: {link.get('url', 'нет')}")
-    else:
-        print("   • Внешние ссылки отсутствуют")
+    record_usage('website_article', message)
+    if on_progress:
+        _report_progress(on_progress, parts, message.usage.output_tokens, target_words)
+    print(f"📊 Получено токенов: {message.usage.output_tokens}, причина остановки: {message.stop_reason}")
+    return message.stop_reason
+
+
+def _report_progress(on_progress, parts, tokens, target_words):
+    """Передать прогресс генерации в callback (ошибки callback не прерывают генерацию)"""
+    text = ''.join(parts)
+    try:
+        on_progress({
+            # Во время потока — число текстовых фрагментов (≈ токенов), в конце — точное значение
+            'tokens': tokens,
+            'words': len(re.sub(r'<[^>]+>', ' ', text).split()),
+            'sections': text.lower().count('<h2'),
+            'target_words': target_words,
+        })
+    except Exception as e:
+        print(f"⚠️ Ошибка обновления прогресса: {e}")
+
+
+def _fill_placeholders(article_html, placeholder_values):
+    """Подставить значения меток %...%, которые модель оставила в тексте"""
+    for mark, value in placeholder_values.items():
+        article_html = article_html.replace(mark, value)
+    return article_html
+
+
+def _trim_partial_article(article_html):
+    """Обрезать оборванную статью по последнему закрытому блоку"""
+    cut = max(article_html.rfind(tag) + len(tag) if tag in article_html else -1
+              for tag in ('</p>', '</ul>', '</ol>', '</table>', '</div>', '</blockquote>'))
+    return article_html[:cut].strip() if cut > 0 else article_html.strip()
+
+
+def _parse_article_response(article_html, keyword, company_name, company_city, company_phone):
+    """Извлечь SEO_TITLE / META_DESC из ответа Claude и собрать результат"""
+    article_html = article_html.strip()
     
-    print("\n\033[93m6. ВНУТРЕННИЕ ССЫЛКИ:\033[0m")
-    if internal_links:
-        print(f"   • Количество ссылок: \033[92m{len(internal_links)}\033[0m")
-        for i, link in enumerate(internal_links[:3], 1):
-            priority = link.get('priority', 'нет')
-            priority_color = '\033[91m' if priority == 'high' else '\033[93m' if priority == 'medium' else '\033[92m'
-            print(f"   {i}. [{priority_color}{priority}\033[0m] {link.get('title', 'Без названия')[:60]}")
-            print(f"      URL: {link.get('url', 'нет')}")
-        if len(internal_links) > 3:
-            print(f"   ... и еще {len(internal_links) - 3} ссылок")
-    else:
-        print("   • Внутренние ссылки отсутствуют")
+    # Извлекаем SEO_TITLE и META_DESC
+    seo_title = ""
+    meta_desc = ""
     
-    print("\n\033[93m7. ЦВЕТА САЙТА:\033[0m")
-    if site_colors:
-        print(f"   • Фон: {colors['bg']}")
-        print(f"   • Текст: {colors['text']}")
-        print(f"   • Акцент: {colors['accent']}")
-        print(f"   • Тёмная тема: {'Да' if colors['is_dark_theme'] else 'Нет'}")
-    else:
-        print("   • Используются цвета по умолчанию")
+    # Ищем SEO_TITLE
+    title_match = re.search(r'SEO_TITLE:\s*(.+?)(?:\n|$)', article_html, re.IGNORECASE)
+    if title_match:
+        seo_title = title_match.group(1).strip()
+        # Удаляем из HTML
+        article_html = re.sub(r'SEO_TITLE:\s*.+?(?:\n|$)', '', article_html, flags=re.IGNORECASE)
     
-    print("\n\033[93m8. H2 ЗАГОЛОВКИ:\033[0m")
-    if h2_list:
-        print(f"   • Количество H2: \033[92m{len(h2_list)}\033[0m")
-        for i, h2 in enumerate(h2_list, 1):
-            print(f"   {i}. {h2}")
-    else:
-        print("   • Генерируются автоматически")
+    # ФОЛЛБЭК: если SEO_TITLE пустой, генерируем из keyword
+    if not seo_title:
+        company_name_short = company_name[:30] if company_name else "Наша компания"
+        if company_city:
+            seo_title = f"{keyword} в {company_city} | {company_name_short}"
+        else:
+            seo_title = f"{keyword} — виды, цены | {company_name_short}"
+        print(f"⚠️ SEO_TITLE не найден в ответе, создан автоматически: {seo_title}")
     
-    print("\n" + "="*80)
-    print("\033[96mОТПРАВКА ЗАПРОСА В CLAUDE API...\033[0m")
-    print("="*80 + "\n")
+    # Ищем META_DESC
+    desc_match = re.search(r'META_DESC:\s*(.+?)(?:\n|$)', article_html, re.IGNORECASE)
+    if desc_match:
+        meta_desc = desc_match.group(1).strip()
+        # Удаляем из HTML
+        article_html = re.sub(r'META_DESC:\s*.+?(?:\n|$)', '', article_html, flags=re.IGNORECASE)
     
-    # Увеличенный таймаут для больших запросов
-    max_retries = 3
-    retry_delay = 10  # секунды (увеличено с 2 до 10)
+    # ФОЛЛБЭК: если META_DESC пустой, генерируем из keyword
+    if not meta_desc:
+        meta_desc = f"{keyword} — профессиональная установка и монтаж"
+        if company_city:
+            meta_desc += f" в {company_city}"
+        if company_phone:
+            meta_desc += f". ☎ {company_phone}"
+        else:
+            meta_desc += ". Бесплатная консультация"
+        print(f"⚠️ META_DESC не найден в ответе, создан автоматически: {meta_desc}")
     
-    for attempt in range(max_retries):
-        try:
-            print(f"🔄 Попытка {attempt + 1}/{max_retries}...")
-            
-            response = client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=16384,  # Максимум для Claude Sonnet 4
-                system=system_prompt,
-                messages=[{"role": "user", "content": user_prompt}],
-                timeout=300.0  # Увеличенный таймаут до 300 секунд (5 минут)
-            )
-            
-            if response and response.content:
-                print("✅ Ответ получен успешно!")
-                
-                # Проверяем причину остановки
-                stop_reason = getattr(response, 'stop_reason', None)
-                if stop_reason == 'max_tokens':
-                    print("⚠️  ВНИМАНИЕ! Статья обрезана - достигнут лимит max_tokens")
-                    print("    Рекомендация: увеличьте max_tokens или сократите промпт")
-                elif stop_reason == 'end_turn':
-                    print("✅ Статья завершена корректно (end_turn)")
-                elif stop_reason:
-                    print(f"ℹ️  Причина остановки: {stop_reason}")
-                
-                article_html = response.content[0].text.strip()
-                
-                # Извлекаем SEO_TITLE и META_DESC
-                seo_title = ""
-                meta_desc = ""
-                
-                import re
-                
-                # Ищем SEO_TITLE
-                title_match = re.search(r'SEO_TITLE:\s*(.+?)(?:\n|$)', article_html, re.IGNORECASE)
-                if title_match:
-                    seo_title = title_match.group(1).strip()
-                    # Удаляем из HTML
-                    article_html = re.sub(r'SEO_TITLE:\s*.+?(?:\n|$)', '', article_html, flags=re.IGNORECASE)
-                
-                # ФОЛЛБЭК: если SEO_TITLE пустой, генерируем из keyword
-                if not seo_title:
-                    company_name_short = company_name[:30] if company_name else "Наша компания"
-                    if company_city:
-                        seo_title = f"{keyword} в {company_city} | {company_name_short}"
-                    else:
-                        seo_title = f"{keyword} — виды, цены | {company_name_short}"
-                    print(f"⚠️ SEO_TITLE не найден в ответе, создан автоматически: {seo_title}")
-                
-                # Ищем META_DESC
-                desc_match = re.search(r'META_DESC:\s*(.+?)(?:\n|$)', article_html, re.IGNORECASE)
-                if desc_match:
-                    meta_desc = desc_match.group(1).strip()
-                    # Удаляем из HTML
-                    article_html = re.sub(r'META_DESC:\s*.+?(?:\n|$)', '', article_html, flags=re.IGNORECASE)
-                
-                # ФОЛЛБЭК: если META_DESC пустой, генерируем из keyword
-                if not meta_desc:
-                    meta_desc = f"{keyword} — профессиональная установка и монтаж"
-                    if company_city:
-                        meta_desc += f" в {company_city}"
-                    if company_phone:
-                        meta_desc += f". ☎ {company_phone}"
-                    else:
-                        meta_desc += ". Бесплатная консультация"
-                    print(f"⚠️ META_DESC не найден в ответе, создан автоматически: {meta_desc}")
-                
-                # Очищаем лишние пустые строки в конце
-                article_html = article_html.strip()
-                
-                return {
-                    'success': True,
-                    'html': article_html,
-                    'seo_title': seo_title,
-                    'meta_description': meta_desc,
-                    'word_count': len(article_html.split())
-                }
-            else:
-                # Если ответ пустой - пробуем еще раз
-                if attempt < max_retries - 1:
-                    print(f"⚠️ Пустой ответ, повтор через {retry_delay} сек...")
-                    import time
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Экспоненциальная задержка
-                    continue
-                else:
-                    return {
-                        'success': False,
-                        'html': '',
-                        'seo_title': '',
-                        'meta_description': '',
-                        'error': 'Claude вернул пустой ответ после всех попыток'
-                    }
-                
-        except Exception as e:
-            error_msg = str(e)
-            
-            # Проверяем специфичные ошибки
-            if '520' in error_msg or 'Cloudflare' in error_msg:
-                print(f"⚠️ Ошибка 520 (сервер перегружен)")
-                if attempt < max_retries - 1:
-                    print(f"   Повтор через {retry_delay} сек...")
-                    import time
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                else:
-                    error_msg = "API Anthropic временно недоступен (ошибка 520). Попробуйте через несколько минут."
-            
-            elif 'timeout' in error_msg.lower():
-                print(f"⚠️ Таймаут запроса")
-                if attempt < max_retries - 1:
-                    print(f"   Повтор через {retry_delay} сек...")
-                    import time
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                else:
-                    error_msg = "Превышено время ожидания ответа от API. Попробуйте уменьшить размер статьи."
-            
-            # Последняя попытка или другая ошибка
-            return {
-                'success': False,
-                'html': '',
-                'seo_title': '',
-                'meta_description': '',
-                'error': f'Ошибка Claude AI: {error_msg[:200]}'
-            }
+    # Очищаем лишние пустые строки в конце
+    article_html = article_html.strip()
+    
+    return {
+        'success': True,
+        'html': article_html,
+        'seo_title': seo_title,
+        'meta_description': meta_desc,
+        'word_count': len(article_html.split())
+    }
 
 
-print("✅ ai/website_article_generator.py загружен")
\ No newline at end of file
+print("✅ ai/website_article_generator.py загружен")
@@ -0,0 +1,259 @@
+"""
+Индексированный роутер callback query
+
+Вместо сотен фильтров func=lambda call: call.data.startswith(...), которые
+pyTelegramBotAPI проверяет по очереди для каждого нажатия, обработчики
+регистрируются по точному ключу (dict) или по префиксу (trie). Поиск — один
+проход по символам callback_data: O(длина строки), а не O(числа обработчиков).
+
+Порядок совпадает с прежним: если подходят несколько маршрутов, побеждает
+зарегистрированный раньше (как у TeleBot). Маршруты, которые из-за этого
+никогда не срабатывают, выводятся в лог при старте (get_shadowed_routes).
+
+Использование:
+    from callback_router import router
+
+    @router.prefix("wa_generate_")
+    def handle_website_article_generate(call):
+        ...
+
+    @router.exact("back_to_admin")
+    def back_to_admin(call):
+        ...
+"""
+import bisect
+import logging
+import threading
+import time
+from callback_tracker import track_callback
+from utils.state_store import flush_thread_states
+
+logger = logging.getLogger('callback_router')
+
+# Границы корзин гистограммы латентности, мс (последняя корзина — всё, что дольше)
+LATENCY_BUCKETS_MS = (5, 25, 100, 250, 1000, 5000, 30000)
+
+
+class Route:
+    """Маршрут: ключ, обработчик и гистограмма времени обработки"""
+
+    __slots__ = ('kind', 'key', 'handler', 'name', 'seq', 'calls', 'errors',
+                 'total_ms', 'max_ms', 'histogram')
+
+    def __init__(self, kind, key, handler, seq):
+        self.kind = kind
+        self.key = key
+        self.handler = handler
+        # functools.wraps в track_callback сохраняет модуль и имя обработчика
+        self.name = f"{handler.__module__}.{handler.__name__}"
+        self.seq = seq
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms, failed):
+        self.calls += 1
+        if failed:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+
+class _TrieNode:
+    __slots__ = ('children', 'route')
+
+    def __init__(self):
+        self.children = {}
+        self.route = None
+
+
+class CallbackRouter:
+    """Точные ключи + trie префиксов; один обработчик TeleBot на все маршруты"""
+
+    def __init__(self):
+        self._exact = {}
+        self._root = _TrieNode()
+        self._routes = []
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.dispatched = 0
+        self.lookup_ns = 0
+
+    # ─────────────────────────────────────────────────────────────
+    # Регистрация
+    # ─────────────────────────────────────────────────────────────
+
+    def exact(self, *keys):
+        """Декоратор: callback_data == key (можно несколько ключей)"""
+        def decorator(func):
+            for key in keys:
+                self._add('exact', key, func)
+            return func
+        return decorator
+
+    def prefix(self, *prefixes):
+        """Декоратор: callback_data.startswith(prefix) (можно несколько префиксов)"""
+        def decorator(func):
+            for prefix in prefixes:
+                self._add('prefix', prefix, func)
+            return func
+        return decorator
+
+    def _add(self, kind, key, func):
+        with self._lock:
+            if kind == 'exact':
+                if key in self._exact:
+                    logger.warning(f"⚠️ Повторный маршрут '{key}' ({func.__name__}) — уже занят {self._exact[key].name}")
+                    return
+            else:
+                node = self._root
+                for char in key:
+                    node = node.children.setdefault(char, _TrieNode())
+                if node.route is not None:
+                    logger.warning(f"⚠️ Повторный префикс '{key}' ({func.__name__}) — уже занят {node.route.name}")
+                    return
+
+            # track_callback сохраняет общую статистику кнопок (callback_stats)
+            route = Route(kind, key, track_callback(key)(func), self._seq)
+            self._seq += 1
+            self._routes.append(route)
+            if kind == 'exact':
+                self._exact[key] = route
+            else:
+                node.route = route
+
+    # ─────────────────────────────────────────────────────────────
+    # Поиск и диспетчеризация
+    # ─────────────────────────────────────────────────────────────
+
+    def resolve(self, data):
+        """Маршрут для callback_data (None если не найден)"""
+        if not data:
+            return None
+        best = self._exact.get(data)
+        node = self._root
+        for char in data:
+            node = node.children.get(char)
+            if node is None:
+                break
+            route = node.route
+            if route is not None and (best is None or route.seq < best.seq):
+                best = route
+        return best
+
+    def match(self, call):
+        """Фильтр для TeleBot"""
+        started = time.perf_counter_ns()
+        found = self.resolve(call.data) is not None
+        self.lookup_ns += time.perf_counter_ns() - started
+        return found
+
+    def dispatch(self, call):
+        """Обработчик TeleBot: вызвать обработчик маршрута и записать время"""
+        route = self.resolve(call.data)
+        if route is None:
+            return
+        self.dispatched += 1
+        started = time.perf_counter()
+        failed = False
+        try:
+            return route.handler(call)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            route.observe((time.perf_counter() - started) * 1000, failed)
+            flush_thread_states()
+            from database.database import db
+            db.release_thread_connection()
+
+    def attach(self, bot):
+        """
+        Зарегистрировать роутер в TeleBot. Вызывается до импорта обработчиков,
+        чтобы индексированные маршруты проверялись раньше оставшихся фильтров-лямбд.
+        """
+        bot.callback_query_handler(func=self.match)(self.dispatch)
+
+    # ─────────────────────────────────────────────────────────────
+    # Статистика
+    # ─────────────────────────────────────────────────────────────
+
+    def get_shadowed_routes(self):
+        """
+        Маршруты, которые никогда не сработают: их ключ начинается с префикса,
+        зарегистрированного раньше. Returns: [(перекрытый, перекрывающий)]
+        """
+        shadowed = []
+        for route in self._routes:
+            if route.kind == 'exact':
+                winner = self.resolve(route.key)
+            else:
+                # Точный ключ перехватывает только одну строку, префикс — все
+                winner = route
+                node = self._root
+                for char in route.key:
+                    node = node.children[char]
+                    if node.route is not None and node.route.seq < winner.seq:
+                        winner = node.route
+            if winner is not route:
+                shadowed.append((route, winner))
+        return shadowed
+
+    def get_route_stats(self):
+        """Статистика маршрутов: вызовы, ошибки, среднее/максимум и гистограмма, мс"""
+        return {
+            'routes': len(self._routes),
+            'exact': len(self._exact),
+            'prefixes': len(self._routes) - len(self._exact),
+            'dispatched': self.dispatched,
+            'avg_lookup_us': self.lookup_ns / self.dispatched / 1000 if self.dispatched else 0.0,
+            'buckets_ms': LATENCY_BUCKETS_MS,
+            'by_route': {
+                f"{route.kind}:{route.key}": {
+                    'handler': route.name,
+                    'calls': route.calls,
+                    'errors': route.errors,
+                    'avg_ms': route.total_ms / route.calls if route.calls else 0.0,
+                    'max_ms': route.max_ms,
+                    'histogram': list(route.histogram),
+                }
+                for route in self._routes if route.calls
+            },
+        }
+
+    def print_report(self, limit=15):
+        """Отчёт по латентности маршрутов в консоль"""
+        stats = self.get_route_stats()
+        labels = [f"≤{b}" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+
+        print("\n" + "-"*80)
+        print(f"⏱ МАРШРУТЫ CALLBACK: {stats['routes']} (точных {stats['exact']}, префиксов {stats['prefixes']}), "
+              f"вызовов {stats['dispatched']}, поиск ~{stats['avg_lookup_us']:.1f} мкс")
+        print("-"*80)
+        print("Корзины, мс: " + " | ".join(labels))
+
+        top = sorted(stats['by_route'].items(), key=lambda item: item[1]['calls'], reverse=True)[:limit]
+        for key, data in top:
+            error_info = f", ❌ {data['errors']}" if data['errors'] else ""
+            print(f"{key}: {data['calls']} выз., ср. {data['avg_ms']:.0f} мс, макс. {data['max_ms']:.0f} мс{error_info}")
+            print(f"   {data['histogram']}")
+
+
+router = CallbackRouter()
+
+
+def log_shadowed_routes():
+    """Вывести перекрытые маршруты (вызывается после регистрации всех обработчиков)"""
+    shadowed = router.get_shadowed_routes()
+    for route, winner in shadowed:
+        logger.warning(
+            f"⚠️ Маршрут {route.kind}:'{route.key}' ({route.name}) никогда не сработает — "
+            f"его перехватывает {winner.kind}:'{winner.key}' ({winner.name})"
+        )
+    return shadowed
+
+
+print("✅ callback_router.py загружен")
@@ -197,7 +197,11 @@ def print_callback_report():
         print(f"✓ {name}")
         print(f"  Функция: {info['function']}")
         print(f"  Файл: {info['file']}:{info['line']}")
-    
+
+    # Латентность маршрутов индексированного роутера
+    from callback_router import router
+    router.print_report()
+
     print("\n" + "="*80)
 
 
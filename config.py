@@ -30,10 +30,165 @@ DB_PORT = os.getenv("DB_PORT")
 if DB_USER and DB_PASS and DB_HOST and DB_PORT and DB_NAME:
     encoded_pass = urllib.parse.quote_plus(DB_PASS)
     DATABASE_URL = f"postgresql://{DB_USER}:{encoded_pass}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+elif os.getenv("DATABASE_URL"):
+    # Готовая строка подключения (локальная БД, бенчмарки)
+    DATABASE_URL = os.getenv("DATABASE_URL")
 else:
     print("⚠️ ВНИМАНИЕ: Не все переменные БД заданы в .env")
     DATABASE_URL = None
 
+# --- Получение обновлений Telegram ---
+# polling — один процесс с long polling; webhook — telegram_webhook.py принимает
+# обновления в очередь telegram_updates, процессы main.py их обрабатывают
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "")  # https://host/telegram/webhook
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+# Потоков-обработчиков в одном процессе (разные чаты обрабатываются параллельно)
+TELEGRAM_UPDATE_WORKERS = int(os.getenv("TELEGRAM_UPDATE_WORKERS", "8"))
+# Аренда чата воркером; продлевается между пачками обновлений
+TELEGRAM_UPDATE_LEASE_SECONDS = int(os.getenv("TELEGRAM_UPDATE_LEASE_SECONDS", "300"))
+TELEGRAM_UPDATE_BATCH_SIZE = int(os.getenv("TELEGRAM_UPDATE_BATCH_SIZE", "20"))
+TELEGRAM_UPDATE_POLL_INTERVAL = float(os.getenv("TELEGRAM_UPDATE_POLL_INTERVAL", "0.5"))
+TELEGRAM_UPDATE_RETENTION_DAYS = int(os.getenv("TELEGRAM_UPDATE_RETENTION_DAYS", "3"))
+
+# --- Пул соединений с БД ---
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "15"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# --- Кэш сущностей (users / bots / categories) ---
+DB_CACHE_ENABLED = os.getenv("DB_CACHE_ENABLED", "1") not in ("0", "false", "False")
+DB_CACHE_TTL = float(os.getenv("DB_CACHE_TTL", "30"))
+DB_CACHE_MAX_SIZE = int(os.getenv("DB_CACHE_MAX_SIZE", "5000"))
+
+# --- Flask-серверы под gunicorn (gunicorn.conf.py) ---
+# Процессов-воркеров (Render задаёт WEB_CONCURRENCY) и потоков в каждом.
+# У каждого воркера свой пул: потоков должно быть не больше DB_POOL_MAX_SIZE
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", os.getenv("WEB_CONCURRENCY", "2")))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "60"))
+
+# --- Автопубликации: пул воркеров ---
+PUBLISH_WORKERS = int(os.getenv("PUBLISH_WORKERS", "4"))
+PUBLISH_PER_USER_LIMIT = int(os.getenv("PUBLISH_PER_USER_LIMIT", "2"))
+# Одновременных публикаций на тип платформы
+PUBLISH_PLATFORM_LIMITS = {
+    'website': int(os.getenv("PUBLISH_WEBSITE_LIMIT", "3")),
+    'telegram': int(os.getenv("PUBLISH_TELEGRAM_LIMIT", "4")),
+    'pinterest': int(os.getenv("PUBLISH_PINTEREST_LIMIT", "2")),
+    'vk': int(os.getenv("PUBLISH_VK_LIMIT", "2")),
+}
+
+# --- Автопубликации: очередь заданий (publication_jobs) ---
+# Аренда задания; продлевается, пока публикация выполняется
+PUBLISH_JOB_LEASE_SECONDS = int(os.getenv("PUBLISH_JOB_LEASE_SECONDS", "1800"))
+PUBLISH_JOB_MAX_ATTEMPTS = int(os.getenv("PUBLISH_JOB_MAX_ATTEMPTS", "5"))
+# Задержка повтора: base * 2^(попытка-1), не больше max
+PUBLISH_JOB_RETRY_BASE_DELAY = int(os.getenv("PUBLISH_JOB_RETRY_BASE_DELAY", "60"))
+PUBLISH_JOB_RETRY_MAX_DELAY = int(os.getenv("PUBLISH_JOB_RETRY_MAX_DELAY", "3600"))
+# Завершённые задания хранятся столько дней
+PUBLISH_JOB_RETENTION_DAYS = int(os.getenv("PUBLISH_JOB_RETENTION_DAYS", "14"))
+
+# --- Фоновые генерации из обработчиков бота (статьи, посты, отзывы, ключи) ---
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "6"))
+# Одновременно выполняемых генераций одного пользователя (остальные ждут в очереди)
+GENERATION_PER_USER_LIMIT = int(os.getenv("GENERATION_PER_USER_LIMIT", "1"))
+# Генераций пользователя в очереди и в работе, после которых новые не принимаются
+GENERATION_MAX_JOBS_PER_USER = int(os.getenv("GENERATION_MAX_JOBS_PER_USER", "3"))
+# Одновременных генераций на тип задачи
+GENERATION_KIND_LIMITS = {
+    'article': int(os.getenv("GENERATION_ARTICLE_LIMIT", "3")),
+}
+
+# --- Генерация изображений для статей ---
+# Одновременных запросов к Gemini на одну статью (обложка + изображения)
+IMAGE_GEN_CONCURRENCY = int(os.getenv("IMAGE_GEN_CONCURRENCY", "3"))
+# Таймаут на изображение, сек: срок набора — столько на каждые
+# IMAGE_GEN_CONCURRENCY изображений, отсчёт от запуска (с очередью)
+IMAGE_GEN_TIMEOUT = float(os.getenv("IMAGE_GEN_TIMEOUT", "90"))
+
+# --- WordPress: одновременных загрузок медиа на один сайт ---
+WP_UPLOAD_CONCURRENCY = int(os.getenv("WP_UPLOAD_CONCURRENCY", "4"))
+
+# --- Краулер сайтов (utils/site_crawler.py) ---
+# Одновременных запросов к одному сайту
+CRAWLER_CONCURRENCY = int(os.getenv("CRAWLER_CONCURRENCY", "6"))
+# Запросов в секунду к одному сайту (Crawl-delay из robots.txt может снизить)
+CRAWLER_RATE = float(os.getenv("CRAWLER_RATE", "10"))
+CRAWLER_REQUEST_TIMEOUT = float(os.getenv("CRAWLER_REQUEST_TIMEOUT", "10"))
+# Сколько URL брать из sitemap.xml для затравки очереди
+CRAWLER_SITEMAP_MAX_URLS = int(os.getenv("CRAWLER_SITEMAP_MAX_URLS", "2000"))
+# Цвета сайта из site_profiles считаются актуальными столько дней
+SITE_COLORS_MAX_AGE_DAYS = int(os.getenv("SITE_COLORS_MAX_AGE_DAYS", "7"))
+# Внутренних ссылок в статье (самые релевантные ключевому слову, BM25)
+ARTICLE_INTERNAL_LINKS_LIMIT = int(os.getenv("ARTICLE_INTERNAL_LINKS_LIMIT", "8"))
+# Индексов BM25 сайтов в памяти процесса
+SITE_INDEX_CACHE_SIZE = int(os.getenv("SITE_INDEX_CACHE_SIZE", "200"))
+
+# --- Журнал использования API (api_usage): запись пачками в фоне ---
+API_USAGE_FLUSH_INTERVAL = float(os.getenv("API_USAGE_FLUSH_INTERVAL", "10"))
+API_USAGE_BATCH_SIZE = int(os.getenv("API_USAGE_BATCH_SIZE", "200"))
+# Максимум записей в памяти, пока БД недоступна (старые отбрасываются)
+API_USAGE_MAX_BUFFER = int(os.getenv("API_USAGE_MAX_BUFFER", "10000"))
+# Детальные записи хранятся столько дней; дневные сводки — всегда
+API_USAGE_RETENTION_DAYS = int(os.getenv("API_USAGE_RETENTION_DAYS", "90"))
+
+# --- Состояния многошаговых диалогов (utils/state_store.py) ---
+# memory — только в процессе; postgres — таблица bot_state, общая для процессов
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+# Незавершённый диалог удаляется через столько секунд после последнего изменения
+STATE_DEFAULT_TTL = int(os.getenv("STATE_DEFAULT_TTL", str(6 * 3600)))
+STATE_MAX_SIZE = int(os.getenv("STATE_MAX_SIZE", "10000"))
+# postgres: как часто перечитывать ключ из БД и записывать изменённые значения
+STATE_SYNC_INTERVAL = float(os.getenv("STATE_SYNC_INTERVAL", "2"))
+# Удаление просроченных ключей из памяти и из bot_state
+STATE_SWEEP_INTERVAL = float(os.getenv("STATE_SWEEP_INTERVAL", "60"))
+
+# --- Рассылки из админки (utils/broadcast_engine.py) ---
+# Сообщений в секунду на процесс (глобальный лимит Telegram ~30/с)
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "20"))
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+# Получателей в пачке: после каждой пачки курсор и результаты пишутся в БД
+BROADCAST_CHUNK_SIZE = int(os.getenv("BROADCAST_CHUNK_SIZE", "100"))
+# Аренда рассылки процессом; истекла — рассылку продолжит другой процесс
+BROADCAST_LEASE_SECONDS = int(os.getenv("BROADCAST_LEASE_SECONDS", "300"))
+# Повторов отправки одному получателю после 429 Too Many Requests
+BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "3"))
+# Как часто обновлять сообщение с прогрессом у админа (сек)
+BROADCAST_STATUS_INTERVAL = float(os.getenv("BROADCAST_STATUS_INTERVAL", "5"))
+
+# --- Автоматические уведомления (utils/notification_engine.py) ---
+# Сообщений в секунду (отдельно от рассылок) и потоков отправки
+NOTIFICATION_RATE = float(os.getenv("NOTIFICATION_RATE", "10"))
+NOTIFICATION_WORKERS = int(os.getenv("NOTIFICATION_WORKERS", "4"))
+# Получателей, выбираемых из БД за один запрос
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "200"))
+# Пауза между уведомлениями одного типа одному пользователю (дней)
+NOTIFICATION_COOLDOWNS = {
+    'low_balance': int(os.getenv("NOTIFICATION_LOW_BALANCE_COOLDOWN", "1")),
+    'reactivation': int(os.getenv("NOTIFICATION_REACTIVATION_COOLDOWN", "30")),
+    'weekly_news': int(os.getenv("NOTIFICATION_WEEKLY_NEWS_COOLDOWN", "7")),
+}
+NOTIFICATION_LOW_BALANCE_THRESHOLD = int(os.getenv("NOTIFICATION_LOW_BALANCE_THRESHOLD", "100"))
+NOTIFICATION_INACTIVE_DAYS = int(os.getenv("NOTIFICATION_INACTIVE_DAYS", "7"))
+NOTIFICATION_LOG_RETENTION_DAYS = int(os.getenv("NOTIFICATION_LOG_RETENTION_DAYS", "180"))
+
+# --- Резервы токенов на время генераций (utils/token_ledger.py) ---
+# Резерв, не подтверждённый, не возвращённый и не продлевавшийся за это
+# время (процесс остановился во время генерации), возвращается пользователю.
+# Резервы живых генераций продлеваются раз в TOKEN_SWEEP_INTERVAL
+TOKEN_RESERVATION_TTL = int(os.getenv("TOKEN_RESERVATION_TTL", "3600"))
+TOKEN_SWEEP_INTERVAL = int(os.getenv("TOKEN_SWEEP_INTERVAL", "300"))
+
+# --- Лимиты частоты запросов к внешним API: (запросов в минуту, burst) ---
+PROVIDER_RATE_LIMITS = {
+    'anthropic': (int(os.getenv("ANTHROPIC_RPM", "50")), 5),
+    'gemini': (int(os.getenv("GEMINI_RPM", "20")), 3),
+    'wordpress': (int(os.getenv("WORDPRESS_RPM", "120")), 10),
+    'vk': (int(os.getenv("VK_RPM", "180")), 3),
+    'telegram': (int(os.getenv("TELEGRAM_RPM", "1200")), 30),
+}
+
 # ═══════════════════════════════════════════════════════════════
 # ТОКЕН-СИСТЕМА
 # ═══════════════════════════════════════════════════════════════
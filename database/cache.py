@@ -0,0 +1,129 @@
+"""
+Кэш сущностей БД (users / bots / categories) внутри процесса: TTL + LRU
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+class EntityCache:
+    """
+    Read-through кэш строк по ключу (таблица, id).
+
+    - TTL ограничивает устаревание данных, записанных другими процессами
+      (vk_webhook, oauth_server);
+    - LRU ограничивает память (max_size записей на все таблицы);
+    - get/put отдают копии, чтобы вызывающий код мог свободно менять dict.
+
+    Счётчики hits/misses и оценка сэкономленного времени БД доступны
+    через get_stats() — показываются в админке (мониторинг систем).
+    """
+
+    def __init__(self, ttl=30, max_size=5000, enabled=True):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.enabled = enabled
+
+        self._data = OrderedDict()  # (table, id) -> (expires_at, row)
+        self._lock = threading.Lock()
+        # Растёт при каждой инвалидации: строка, прочитанная до записи,
+        # не должна попасть в кэш после неё
+        self._epoch = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        # Суммарное время запросов-промахов, чтобы оценить экономию на попаданиях
+        self._miss_time = 0.0
+
+    @staticmethod
+    def _key(table, entity_id):
+        try:
+            entity_id = int(entity_id)
+        except (TypeError, ValueError):
+            pass
+        return (table, entity_id)
+
+    def get(self, table, entity_id):
+        """Вернуть копию строки или None (промах / истёк TTL)"""
+        if not self.enabled:
+            return None
+
+        key = self._key(table, entity_id)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, row = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(row)
+
+    def epoch(self):
+        """Метка для put(): берётся до запроса к БД"""
+        return self._epoch
+
+    def put(self, table, entity_id, row, load_time=0.0, epoch=None):
+        """
+        Положить строку в кэш (load_time — время запроса к БД, сек).
+        Если с момента epoch была инвалидация, строка могла устареть — пропускаем.
+        """
+        if not self.enabled or row is None:
+            return
+
+        key = self._key(table, entity_id)
+        row = copy.deepcopy(row)
+        with self._lock:
+            self._miss_time += load_time
+            if epoch is not None and epoch != self._epoch:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, row)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, table, entity_id=None):
+        """Сбросить одну запись или (entity_id=None) всю таблицу"""
+        with self._lock:
+            self._epoch += 1
+            if entity_id is not None:
+                if self._data.pop(self._key(table, entity_id), None) is not None:
+                    self.invalidations += 1
+                return
+            keys = [key for key in self._data if key[0] == table]
+            for key in keys:
+                del self._data[key]
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._data.clear()
+
+    def get_stats(self):
+        """Статистика кэша"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_load_ms = (self._miss_time / self.misses * 1000) if self.misses else 0.0
+            return {
+                'enabled': self.enabled,
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups * 100) if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+                'avg_load_ms': avg_load_ms,
+                # Оценка: каждое попадание экономит средний запрос-промах
+                'saved_seconds': self.hits * avg_load_ms / 1000,
+            }
@@ -12,184 +12,415 @@ except ImportError:
     PSYCOPG_VERSION = 2
 
 import json
+import re
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from config import DATABASE_URL, WELCOME_BONUS
+from config import (
+    DATABASE_URL, WELCOME_BONUS,
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT,
+    DB_CACHE_ENABLED, DB_CACHE_TTL, DB_CACHE_MAX_SIZE,
+    NOTIFICATION_LOW_BALANCE_THRESHOLD, NOTIFICATION_INACTIVE_DAYS,
+)
+from database.cache import EntityCache
+from database.pool import ConnectionPool, PoolTimeout
 from functools import wraps
 import time
 
 
+# Ошибки соединения: соединение выбрасывается пулом, запрос повторяется на новом
+RETRYABLE_DB_ERRORS = (psycopg.OperationalError, psycopg.InterfaceError)
+
+
+def _dict_cursor(conn):
+    """Курсор, возвращающий строки как dict (psycopg2 и psycopg3)"""
+    if PSYCOPG_VERSION == 3:
+        return conn.cursor(row_factory=dict_row)
+    return conn.cursor(cursor_factory=RealDictCursor)
+
+
+def _default_result(func_name):
+    """Значение по умолчанию при ошибке: None, False, [], {} или 0 в зависимости от контекста"""
+    if 'get_' in func_name and 'list' not in func_name:
+        return None
+    elif 'update' in func_name or 'delete' in func_name or 'create' in func_name:
+        return False
+    elif '_list' in func_name or 'get_user_bots' in func_name or 'get_bot_categories' in func_name:
+        return []
+    elif 'stats' in func_name:
+        return {}
+    elif 'count' in func_name:
+        return 0
+    return None
+
+
+# Колонки categories для проекций get_category(fields=...)
+CATEGORY_JSONB_FIELDS = ('keywords', 'media', 'prices', 'reviews', 'telegram_topics', 'platform_schedulers', 'settings')
+CATEGORY_COLUMNS = ('id', 'bot_id', 'name', 'description', 'created_at') + CATEGORY_JSONB_FIELDS
+
+# Фразы длиннее не импортируются (уникальный индекс по нормализованному тексту)
+KEYWORD_MAX_LENGTH = 500
+
+
+def _parse_category_jsonb(category):
+    """Парсим JSONB поля категории, если драйвер вернул их строками"""
+    jsonb_fields = ['keywords', 'media', 'prices', 'reviews', 'telegram_topics', 'platform_schedulers']
+    for field in jsonb_fields:
+        if field in category and isinstance(category[field], str):
+            try:
+                category[field] = json.loads(category[field])
+            except Exception as parse_error:
+                print(f"❌ Ошибка парсинга {field}: {parse_error}")
+                category[field] = [] if field in ['keywords', 'media', 'reviews', 'telegram_topics'] else {}
+
+
 def handle_db_errors(func):
-    """Декоратор для автоматической обработки ошибок БД"""
+    """
+    Декоратор для автоматической обработки ошибок БД
+
+    Каждый вызов берёт собственное соединение из пула. При ошибке соединения
+    пул выбрасывает сломанное соединение, а вызов повторяется с новым
+    (с нарастающей задержкой). Прочие ошибки откатывают транзакцию
+    и возвращают значение по умолчанию.
+    """
     @wraps(func)
     def wrapper(self, *args, **kwargs):
         max_retries = 3
-        retry_count = 0
-        
-        while retry_count < max_retries:
+
+        for attempt in range(1, max_retries + 1):
             try:
-                # Проверяем соединение перед выполнением запроса
-                if not self._check_connection_alive():
-                    print(f"⚠️ Соединение потеряно, переподключаемся...")
-                    self._reconnect()
-                
-                result = func(self, *args, **kwargs)
-                return result
-            except (psycopg.OperationalError, psycopg.InterfaceError, psycopg.DatabaseError) as e:
-                # Ошибки подключения - пробуем переподключиться
-                error_msg = str(e)
-                print(f"⚠️ Ошибка соединения с БД в {func.__name__}: {error_msg}")
-                retry_count += 1
-                
-                if retry_count < max_retries:
-                    print(f"🔄 Попытка переподключения {retry_count}/{max_retries}...")
-                    try:
-                        self._reconnect()
-                        print("✅ Переподключение успешно")
-                        time.sleep(0.5)  # Небольшая задержка перед повтором
-                        continue  # Повторяем попытку
-                    except Exception as reconnect_error:
-                        print(f"❌ Ошибка переподключения: {reconnect_error}")
-                        if retry_count >= max_retries:
-                            break
-                else:
-                    print("❌ Превышено количество попыток переподключения")
-                    break
-                    
+                return func(self, *args, **kwargs)
+            except PoolTimeout as e:
+                # Пул исчерпан: повтор только дольше держит поток и усиливает перегрузку
+                print(f"❌ Нет свободного соединения для {func.__name__}: {e}")
+                return _default_result(func.__name__)
+            except RETRYABLE_DB_ERRORS as e:
+                print(f"⚠️ Ошибка соединения с БД в {func.__name__}: {e}")
+                if attempt < max_retries:
+                    print(f"🔄 Повтор с новым соединением из пула {attempt}/{max_retries}...")
+                    time.sleep(0.5 * attempt)
             except Exception as e:
-                # Другие ошибки - обрабатываем как обычно
-                try:
-                    if self.conn and not self.conn.closed:
-                        self.conn.rollback()
-                except:
-                    pass
-                    
                 print(f"❌ Ошибка БД в {func.__name__}: {e}")
-                
-                # Возвращаем None, False, [], {} или 0 в зависимости от контекста
-                if 'get_' in func.__name__ and 'list' not in func.__name__:
-                    return None
-                elif 'update' in func.__name__ or 'delete' in func.__name__ or 'create' in func.__name__:
-                    return False
-                elif '_list' in func.__name__ or 'get_user_bots' in func.__name__ or 'get_bot_categories' in func.__name__:
-                    return []
-                elif 'stats' in func.__name__:
-                    return {}
-                elif 'count' in func.__name__:
-                    return 0
-                else:
-                    return None
-        
+                return _default_result(func.__name__)
+
         # Если все попытки неудачны
         print(f"❌ Все попытки выполнения {func.__name__} неудачны")
-        if 'get_' in func.__name__ and 'list' not in func.__name__:
-            return None
-        elif 'update' in func.__name__ or 'delete' in func.__name__ or 'create' in func.__name__:
-            return False
-        elif '_list' in func.__name__ or 'get_user_bots' in func.__name__ or 'get_bot_categories' in func.__name__:
-            return []
-        elif 'stats' in func.__name__:
-            return {}
-        elif 'count' in func.__name__:
-            return 0
-        else:
-            return None
-            
+        return _default_result(func.__name__)
+
     return wrapper
 
 
+class _CopyTextReader:
+    """Файлоподобный поток строк для COPY ... FROM STDIN (psycopg2 copy_expert)"""
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self._buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += _copy_text_escape(line) + '\n'
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def _copy_text_escape(value):
+    """Экранирование значения для текстового формата COPY"""
+    return (value.replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+# Прямые записи в кэшируемые таблицы через db.cursor
+_CACHED_WRITE_RE = re.compile(
+    r'^\s*(?:UPDATE|DELETE\s+FROM|INSERT\s+INTO)\s+(users|bots|categories)\b',
+    re.IGNORECASE
+)
+_WHERE_ID_RE = re.compile(
+    r'\bWHERE\s+id\s*=\s*%s\s*(?:RETURNING\b[^;]*)?;?\s*$',
+    re.IGNORECASE
+)
+
+
+class _InvalidatingCursor:
+    """
+    Обёртка над курсором потока: после UPDATE/DELETE/INSERT в users, bots
+    или categories сбрасывает кэш. Для запросов вида "... WHERE id = %s"
+    сбрасывается одна запись (id — последний параметр), иначе вся таблица.
+
+    Сброшенные записи запоминаются в pending и сбрасываются ещё раз после
+    commit (_CommitInvalidatingConnection): параллельный get_user между
+    записью и commit мог снова закэшировать старую строку.
+    """
+
+    def __init__(self, cursor, cache, pending=None):
+        self._cursor = cursor
+        self._cache = cache
+        self._pending = pending
+
+    def execute(self, query, params=None, *args, **kwargs):
+        result = self._cursor.execute(query, params, *args, **kwargs)
+        self._invalidate(query, [params])
+        return result
+
+    def executemany(self, query, params_seq, *args, **kwargs):
+        params_seq = list(params_seq)
+        result = self._cursor.executemany(query, params_seq, *args, **kwargs)
+        self._invalidate(query, params_seq)
+        return result
+
+    def _invalidate(self, query, params_seq):
+        text = query if isinstance(query, str) else str(query)
+        match = _CACHED_WRITE_RE.match(text)
+        if not match:
+            return
+        table = match.group(1).lower()
+        if _WHERE_ID_RE.search(text) and all(isinstance(p, (list, tuple)) and p for p in params_seq):
+            keys = [(table, params[-1]) for params in params_seq]
+        else:
+            keys = [(table, None)]
+        for key in keys:
+            self._cache.invalidate(*key)
+        if self._pending is not None:
+            self._pending.update(keys)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _CommitInvalidatingConnection:
+    """Соединение потока (db.conn): после commit повторно сбрасывает кэш записанных строк"""
+
+    def __init__(self, conn, cache, pending):
+        self._conn = conn
+        self._cache = cache
+        self._pending = pending
+
+    def commit(self):
+        self._conn.commit()
+        self._flush_pending()
+
+    def rollback(self):
+        self._conn.rollback()
+        self._flush_pending()
+
+    def _flush_pending(self):
+        pending = list(self._pending)
+        self._pending.clear()
+        for table, entity_id in pending:
+            self._cache.invalidate(table, entity_id)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _ThreadConnection:
+    """
+    Соединение из пула, закреплённое за потоком.
+
+    Нужно для кода, который напрямую использует db.cursor / db.conn
+    (handlers, планировщики). Соединение возвращается в пул при завершении
+    потока или при вызове Database.release_thread_connection() — воркеры,
+    планировщики и роутер callback'ов вызывают его после каждого задания.
+    """
+
+    def __init__(self, pool, cache):
+        self.pool = pool
+        self.cache = cache
+        self.pending = set()
+        self._attach(pool.getconn())
+        self.last_used = time.time()
+
+    def _attach(self, conn):
+        self.conn = conn
+        self.proxy = _CommitInvalidatingConnection(conn, self.cache, self.pending)
+        self.cursor = _InvalidatingCursor(_dict_cursor(conn), self.cache, self.pending)
+
+    def ensure_alive(self):
+        """Переподключение, если соединение закрыто или долго простаивало"""
+        alive = self.pool.is_usable(self.conn)
+        if alive and time.time() - self.last_used > self.pool.check_idle:
+            try:
+                self.cursor.execute("SELECT 1")
+                self.proxy.commit()
+            except Exception as e:
+                print(f"⚠️ Проверка соединения: {e}")
+                alive = False
+
+        if not alive:
+            print("⚠️ Соединение потока потеряно, берём новое из пула...")
+            self.release()
+            self._attach(self.pool.getconn())
+
+        self.last_used = time.time()
+
+    def release(self):
+        conn, self.conn = self.conn, None
+        if conn is None:
+            return
+        try:
+            self.cursor.close()
+        except Exception:
+            pass
+        self.pool.putconn(conn)
+        # Незакоммиченное пул откатил — сбрасываем то, что успели закэшировать
+        self.proxy._flush_pending()
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass
+
+
 class Database:
-    def __init__(self):
-        """Инициализация подключения к БД с keepalive и SSL для Neon.tech"""
+    def __init__(self, dsn=None, min_size=None, max_size=None):
+        """Инициализация пула соединений к БД (Neon.tech)"""
         try:
-            # Подключение (без autocommit в параметрах для совместимости с psycopg2)
-            self.conn = psycopg.connect(DATABASE_URL)
-            
-            # Устанавливаем autocommit после подключения
-            self.conn.autocommit = False
-            
-            # Создаем cursor в зависимости от версии psycopg
-            if PSYCOPG_VERSION == 3:
-                self.cursor = self.conn.cursor(row_factory=dict_row)
-            else:
-                self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-            
-            self._last_used = time.time()
-            print("✅ База данных подключена (Neon.tech с SSL и keepalive)")
+            self.pool = ConnectionPool(
+                dsn or DATABASE_URL,
+                min_size=DB_POOL_MIN_SIZE if min_size is None else min_size,
+                max_size=DB_POOL_MAX_SIZE if max_size is None else max_size,
+                timeout=DB_POOL_TIMEOUT,
+            )
+            self.cache = EntityCache(
+                ttl=DB_CACHE_TTL,
+                max_size=DB_CACHE_MAX_SIZE,
+                enabled=DB_CACHE_ENABLED,
+            )
+            self._local = threading.local()
+            print(f"✅ База данных подключена (пул до {self.pool.max_size} соединений)")
         except Exception as e:
             print(f"❌ Ошибка подключения к БД: {e}")
             raise
-    
+
+    @contextmanager
+    def _cursor(self):
+        """
+        Курсор на отдельном соединении из пула.
+        Commit при успешном выходе, rollback при исключении.
+        """
+        with self.pool.connection() as conn:
+            cursor = _dict_cursor(conn)
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    # ─────────────────────────────────────────────────────────────
+    # Совместимость: db.conn / db.cursor для прямых SQL-запросов
+    # ─────────────────────────────────────────────────────────────
+
+    def _thread_connection(self):
+        holder = getattr(self._local, 'holder', None)
+        if holder is None or holder.conn is None:
+            holder = _ThreadConnection(self.pool, self.cache)
+            self._local.holder = holder
+        else:
+            holder.ensure_alive()
+        return holder
+
+    @property
+    def conn(self):
+        """Соединение, закреплённое за текущим потоком"""
+        return self._thread_connection().proxy
+
+    @property
+    def cursor(self):
+        """Курсор соединения, закреплённого за текущим потоком"""
+        return self._thread_connection().cursor
+
+    def release_thread_connection(self):
+        """
+        Вернуть закреплённое за потоком соединение в пул.
+
+        Долгоживущие потоки (воркеры, планировщики, роутер callback'ов)
+        вызывают после каждого задания — иначе каждый держит соединение
+        всю жизнь и пулу не хватает max_size соединений. Не бросает
+        исключений: вызывается из блоков finally.
+        """
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            return
+        self._local.holder = None
+        try:
+            holder.release()
+        except Exception as e:
+            print(f"⚠️ Ошибка возврата соединения в пул: {e}")
+
     def _check_connection_alive(self):
         """Проверка состояния соединения"""
         try:
-            # Проверяем что объекты существуют
-            if not hasattr(self, 'conn') or self.conn is None:
-                return False
-            
-            if not hasattr(self, 'cursor') or self.cursor is None:
-                return False
-            
-            # Если соединение закрыто
-            if self.conn.closed:
-                return False
-            
-            # Если прошло больше 5 минут с последнего использования, проверяем
-            if time.time() - self._last_used > 300:
-                self.cursor.execute("SELECT 1")
-                self.conn.commit()
-            
-            self._last_used = time.time()
+            self._thread_connection()
             return True
         except Exception as e:
             print(f"⚠️ Проверка соединения: {e}")
             return False
-    
-    def _reconnect(self):
-        """Переподключение к БД"""
-        try:
-            # Закрываем старое соединение
-            if hasattr(self, 'cursor') and self.cursor:
-                try:
-                    self.cursor.close()
-                except:
-                    pass
-            if hasattr(self, 'conn') and self.conn:
-                try:
-                    self.conn.close()
-                except:
-                    pass
-        except:
-            pass
-        
-        # Создаем новое подключение (без autocommit в параметрах)
-        self.conn = psycopg.connect(DATABASE_URL)
-        self.conn.autocommit = False
-        
-        # Создаем cursor в зависимости от версии psycopg
-        if PSYCOPG_VERSION == 3:
-            self.cursor = self.conn.cursor(row_factory=dict_row)
-        else:
-            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-        
-        self._last_used = time.time()
-        print("✅ Переподключение к БД выполнено")
-    
+
     def check_connection(self):
         """Публичный метод проверки соединения (для совместимости)"""
         return self._check_connection_alive()
-    
+
     def reconnect(self):
         """Публичный метод переподключения (для совместимости)"""
-        self._reconnect()
-    
+        holder = getattr(self._local, 'holder', None)
+        if holder is not None and holder.conn is not None:
+            try:
+                holder.conn.close()
+            except Exception:
+                pass
+        self.release_thread_connection()
+        self._thread_connection()
+        print("✅ Переподключение к БД выполнено")
+
+    def get_pool_stats(self):
+        """Статистика пула соединений"""
+        return self.pool.get_stats()
+
+    def get_cache_stats(self):
+        """Статистика кэша сущностей (попадания / промахи / экономия)"""
+        return self.cache.get_stats()
+
+    def invalidate(self, table, entity_id=None):
+        """Сбросить кэш записи (или всей таблицы) после записи в обход Database"""
+        self.cache.invalidate(table, entity_id)
+
+    def _cached_fetch(self, table, entity_id, query, prepare=None):
+        """Read-through: кэш -> SELECT по id -> prepare(row) -> кэш"""
+        row = self.cache.get(table, entity_id)
+        if row is not None:
+            return row
+
+        epoch = self.cache.epoch()
+        started = time.perf_counter()
+        with self._cursor() as cursor:
+            cursor.execute(query, (entity_id,))
+            row = cursor.fetchone()
+
+        if row is not None:
+            row = dict(row)
+            if prepare:
+                prepare(row)
+            self.cache.put(table, entity_id, row, time.perf_counter() - started, epoch=epoch)
+        return row
+
+    def close(self):
+        """Закрыть пул соединений"""
+        self.release_thread_connection()
+        self.pool.close()
+
     def __del__(self):
-        """Закрытие подключения при удалении объекта"""
+        """Закрытие пула при удалении объекта"""
         try:
-            if hasattr(self, 'cursor') and self.cursor:
-                self.cursor.close()
-            if hasattr(self, 'conn') and self.conn:
-                self.conn.close()
-        except:
+            self.pool.close()
+        except Exception:
             pass
     
     # ═══════════════════════════════════════════════════════════════
@@ -199,19 +430,7 @@ class Database:
     @handle_db_errors
     def get_user(self, user_id):
         """Получить пользователя по ID"""
-        try:
-            self.cursor.execute(
-                "SELECT * FROM users WHERE id = %s",
-                (user_id,)
-            )
-            return self.cursor.fetchone()
-        except Exception as e:
-            print(f"❌ Ошибка БД в get_user: {e}")
-            try:
-                self.conn.rollback()
-            except:
-                pass
-            return None
+        return self._cached_fetch('users', user_id, "SELECT * FROM users WHERE id = %s")
     
     @handle_db_errors
     def add_user(self, user_id, username=None, first_name=None):
@@ -219,82 +438,81 @@ class Database:
         # Проверяем, новый ли это пользователь
         is_new_user = False
         try:
-            self.cursor.execute("SELECT id FROM users WHERE id = %s", (user_id,))
-            existing = self.cursor.fetchone()
+            with self._cursor() as cursor:
+                cursor.execute("SELECT id FROM users WHERE id = %s", (user_id,))
+                existing = cursor.fetchone()
             is_new_user = (existing is None)
+        except RETRYABLE_DB_ERRORS:
+            raise
         except:
             pass
         
         # Пробуем сначала схему с полем balance (новая)
         try:
-            self.cursor.execute(
-                """
-                INSERT INTO users (id, username, first_name, balance)
-                VALUES (%s, %s, %s, %s)
-                ON CONFLICT (id) DO UPDATE SET
-                    username = EXCLUDED.username,
-                    first_name = EXCLUDED.first_name,
-                    balance = CASE 
-                        WHEN users.balance IS NULL OR users.balance = 0 THEN %s
-                        ELSE users.balance
-                    END
-                RETURNING balance
-                """,
-                (user_id, username, first_name, WELCOME_BONUS, WELCOME_BONUS)
-            )
-            result = self.cursor.fetchone()
-            self.conn.commit()
+            with self._cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO users (id, username, first_name, balance)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (id) DO UPDATE SET
+                        username = EXCLUDED.username,
+                        first_name = EXCLUDED.first_name,
+                        balance = CASE 
+                            WHEN users.balance IS NULL OR users.balance = 0 THEN %s
+                            ELSE users.balance
+                        END
+                    RETURNING balance
+                    """,
+                    (user_id, username, first_name, WELCOME_BONUS, WELCOME_BONUS)
+                )
+                result = cursor.fetchone()
             
             if result:
                 print(f"✅ add_user: пользователь {user_id} - balance: {result.get('balance', 0)}")
             
-            # Отправляем приветственное сообщение только новым пользователям
-            if is_new_user:
-                try:
-                    from handlers.auto_notifications import send_welcome_notification
-                    send_welcome_notification(user_id, username)
-                except Exception as e:
-                    print(f"⚠️ Не удалось отправить приветствие пользователю {user_id}: {e}")
-            
-            return True
-            
+        except RETRYABLE_DB_ERRORS:
+            raise
         except Exception as e:
             print(f"⚠️ Не удалось использовать поле balance, пробуем tokens: {e}")
             # Если не получилось, пробуем старую схему с tokens
             try:
-                self.cursor.execute(
-                    """
-                    INSERT INTO users (id, username, first_name, tokens, created_at)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ON CONFLICT (id) DO UPDATE SET
-                        username = EXCLUDED.username,
-                        first_name = EXCLUDED.first_name,
-                        tokens = CASE 
-                            WHEN users.tokens IS NULL OR users.tokens = 0 THEN %s
-                            ELSE users.tokens
-                        END
-                    RETURNING tokens
-                    """,
-                    (user_id, username, first_name, WELCOME_BONUS, datetime.now(), WELCOME_BONUS)
-                )
-                result = self.cursor.fetchone()
-                self.conn.commit()
+                with self._cursor() as cursor:
+                    cursor.execute(
+                        """
+                        INSERT INTO users (id, username, first_name, tokens, created_at)
+                        VALUES (%s, %s, %s, %s, %s)
+                        ON CONFLICT (id) DO UPDATE SET
+                            username = EXCLUDED.username,
+                            first_name = EXCLUDED.first_name,
+                            tokens = CASE 
+                                WHEN users.tokens IS NULL OR users.tokens = 0 THEN %s
+                                ELSE users.tokens
+                            END
+                        RETURNING tokens
+                        """,
+                        (user_id, username, first_name, WELCOME_BONUS, datetime.now(), WELCOME_BONUS)
+                    )
+                    result = cursor.fetchone()
                 
                 if result:
                     print(f"✅ add_user: пользователь {user_id} - tokens: {result.get('tokens', 0)}")
-                
-                # Отправляем приветственное сообщение только новым пользователям
-                if is_new_user:
-                    try:
-                        from handlers.auto_notifications import send_welcome_notification
-                        send_welcome_notification(user_id, username)
-                    except Exception as e:
-                        print(f"⚠️ Не удалось отправить приветствие пользователю {user_id}: {e}")
-                
-                return True
+            except RETRYABLE_DB_ERRORS:
+                raise
             except Exception as e2:
                 print(f"❌ Ошибка add_user: {e2}")
                 return False
+        
+        self.cache.invalidate('users', user_id)
+        
+        # Отправляем приветственное сообщение только новым пользователям
+        if is_new_user:
+            try:
+                from handlers.auto_notifications import send_welcome_notification
+                send_welcome_notification(user_id, username)
+            except Exception as e:
+                print(f"⚠️ Не удалось отправить приветствие пользователю {user_id}: {e}")
+        
+        return True
     
     @handle_db_errors
     def update_user(self, user_id, updates):
@@ -309,19 +527,18 @@ class Database:
         Returns:
             bool: True если успешно
         """
-        import json
-        
-        for field, value in updates.items():
-            # Если значение - dict или list, конвертируем в JSON
-            if isinstance(value, (dict, list)):
-                value = json.dumps(value)
-            
-            self.cursor.execute(
-                f"UPDATE users SET {field} = %s WHERE id = %s",
-                (value, user_id)
-            )
+        with self._cursor() as cursor:
+            for field, value in updates.items():
+                # Если значение - dict или list, конвертируем в JSON
+                if isinstance(value, (dict, list)):
+                    value = json.dumps(value)
+                
+                cursor.execute(
+                    f"UPDATE users SET {field} = %s WHERE id = %s",
+                    (value, user_id)
+                )
         
-        self.conn.commit()
+        self.cache.invalidate('users', user_id)
         return True
     
     def get_user_tokens(self, user_id):
@@ -353,18 +570,19 @@ class Database:
                 # Устанавливаем приветственный бонус
                 # Пробуем оба поля
                 try:
-                    self.cursor.execute(
-                        "UPDATE users SET balance = %s WHERE id = %s",
-                        (WELCOME_BONUS, user_id)
-                    )
-                    self.conn.commit()
+                    with self._cursor() as cursor:
+                        cursor.execute(
+                            "UPDATE users SET balance = %s WHERE id = %s",
+                            (WELCOME_BONUS, user_id)
+                        )
                 except:
                     # Если balance не существует, пробуем tokens
-                    self.cursor.execute(
-                        "UPDATE users SET tokens = %s WHERE id = %s",
-                        (WELCOME_BONUS, user_id)
-                    )
-                    self.conn.commit()
+                    with self._cursor() as cursor:
+                        cursor.execute(
+                            "UPDATE users SET tokens = %s WHERE id = %s",
+                            (WELCOME_BONUS, user_id)
+                        )
+                self.cache.invalidate('users', user_id)
                 return WELCOME_BONUS
             
             print(f"✅ get_user_tokens: пользователь {user_id} имеет {balance} токенов")
@@ -376,33 +594,208 @@ class Database:
             traceback.print_exc()
             return 0
     
+    def _balance_column(self):
+        """Колонка баланса: balance (новая схема) или tokens (старая), определяется один раз"""
+        column = getattr(self, '_balance_column_name', None)
+        if column is None:
+            with self._cursor() as cursor:
+                cursor.execute("""
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'users' AND column_name = 'balance'
+                """)
+                column = 'balance' if cursor.fetchone() else 'tokens'
+            self._balance_column_name = column
+        return column
+
     @handle_db_errors
     def update_tokens(self, user_id, amount):
-        """Обновить баланс токенов (может быть отрицательным для списания)"""
-        # Пробуем обновить balance (новая схема)
-        try:
-            self.cursor.execute(
-                "UPDATE users SET balance = balance + %s WHERE id = %s",
+        """
+        Изменить баланс токенов без проверки остатка (пополнения, бонусы)
+
+        Списания за генерации — charge_tokens: атомарно и с записью в token_expenses
+        """
+        column = self._balance_column()
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"UPDATE users SET {column} = {column} + %s WHERE id = %s",
                 (amount, user_id)
             )
-            self.conn.commit()
-            print(f"✅ update_tokens: обновлен balance на {amount} для {user_id}")
-            return True
-        except Exception as e:
-            # Если не получилось (поля balance нет), пробуем tokens (старая схема)
-            print(f"⚠️ Не удалось обновить balance, пробуем tokens: {e}")
-            try:
-                self.cursor.execute(
-                    "UPDATE users SET tokens = tokens + %s WHERE id = %s",
-                    (amount, user_id)
+            updated = cursor.rowcount > 0
+        self.cache.invalidate('users', user_id)
+        print(f"✅ update_tokens: обновлен {column} на {amount} для {user_id}")
+        return updated
+
+    # ═══════════════════════════════════════════════════════════════
+    # СПИСАНИЯ ТОКЕНОВ (token_expenses)
+    # ═══════════════════════════════════════════════════════════════
+
+    @handle_db_errors
+    def charge_tokens(self, user_id, amount, action, bot_id=None, category_id=None, reserve=False):
+        """
+        Списать amount токенов и записать операцию в token_expenses — один запрос
+
+        UPDATE баланса выполняется только при достаточном остатке, запись в
+        журнал — в той же транзакции, поэтому параллельные списания не уводят
+        баланс в минус. reserve=True — резерв на время генерации
+        (status='reserved'): подтверждается update_token_reservation_committed
+        или возвращается refund_tokens.
+
+        Returns:
+            dict: {'balance': остаток, 'expense_id': id}
+            None: недостаточно токенов (или ошибка БД)
+        """
+        column = self._balance_column()
+        with self._cursor() as cursor:
+            cursor.execute(f"""
+                WITH charged AS (
+                    UPDATE users SET {column} = {column} - %s
+                    WHERE id = %s AND {column} >= %s
+                    RETURNING {column} AS balance
+                ),
+                expense AS (
+                    INSERT INTO token_expenses (user_id, amount, action, bot_id, category_id, status)
+                    SELECT %s, %s, %s, %s, %s, %s FROM charged
+                    RETURNING id
                 )
-                self.conn.commit()
-                print(f"✅ update_tokens: обновлен tokens на {amount} для {user_id}")
-                return True
-            except Exception as e2:
-                print(f"❌ Не удалось обновить ни balance, ни tokens: {e2}")
-                return False
-    
+                SELECT charged.balance, expense.id AS expense_id
+                FROM charged, expense
+            """, (
+                amount, user_id, amount,
+                user_id, amount, action, bot_id, category_id, 'reserved' if reserve else 'committed'
+            ))
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+        self.cache.invalidate('users', user_id)
+        return dict(row)
+
+    @handle_db_errors
+    def refund_tokens(self, expense_id, user_id=None):
+        """
+        Вернуть токены операции expense_id (резерва или списания)
+
+        Повторный возврат ничего не делает: статус меняется на refunded
+        в том же запросе, что и баланс. user_id — проверка владельца.
+
+        Returns:
+            int: баланс после возврата или None (уже возвращено / не найдено)
+        """
+        column = self._balance_column()
+        with self._cursor() as cursor:
+            cursor.execute(f"""
+                WITH refunded AS (
+                    UPDATE token_expenses
+                    SET status = 'refunded', updated_at = NOW()
+                    WHERE id = %s AND status IN ('reserved', 'committed')
+                        AND (%s::BIGINT IS NULL OR user_id = %s)
+                    RETURNING user_id, amount
+                )
+                UPDATE users SET {column} = {column} + refunded.amount
+                FROM refunded
+                WHERE users.id = refunded.user_id
+                RETURNING users.id AS user_id, users.{column} AS balance
+            """, (expense_id, user_id, user_id))
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+        self.cache.invalidate('users', row['user_id'])
+        return row['balance']
+
+    @handle_db_errors
+    def update_token_reservation_committed(self, expense_id):
+        """
+        Подтвердить резерв: токены остаются списанными
+
+        Returns:
+            dict: {'committed': подтверждён сейчас, 'status': текущий статус
+                  операции (None — записи нет)}
+            False: ошибка БД
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                WITH committed AS (
+                    UPDATE token_expenses
+                    SET status = 'committed', updated_at = NOW()
+                    WHERE id = %s AND status = 'reserved'
+                    RETURNING status
+                )
+                SELECT
+                    EXISTS (SELECT 1 FROM committed) AS committed,
+                    COALESCE(
+                        (SELECT status FROM committed),
+                        (SELECT status FROM token_expenses WHERE id = %s)
+                    ) AS status
+            """, (expense_id, expense_id))
+            return cursor.fetchone()
+
+    @handle_db_errors
+    def update_token_reservations_heartbeat(self, expense_ids):
+        """
+        Отметить резервы живыми (генерация ещё в очереди или идёт), чтобы
+        refund_stale_token_reservations их не вернул.
+
+        Returns:
+            list: id резервов, которые всё ещё в статусе reserved
+        """
+        if not expense_ids:
+            return []
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE token_expenses
+                SET updated_at = NOW()
+                WHERE id = ANY(%s) AND status = 'reserved'
+                RETURNING id
+            """, (list(expense_ids),))
+            return [row['id'] for row in cursor.fetchall()]
+
+    @handle_db_errors
+    def get_token_reservation(self, user_id, action, category_id=None):
+        """Последний неподтверждённый резерв пользователя на действие"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT id, user_id, amount, action, bot_id, category_id, created_at
+                FROM token_expenses
+                WHERE user_id = %s AND action = %s AND status = 'reserved'
+                    AND category_id IS NOT DISTINCT FROM %s
+                ORDER BY id DESC
+                LIMIT 1
+            """, (user_id, action, category_id))
+            return cursor.fetchone()
+
+    @handle_db_errors
+    def refund_stale_token_reservations(self, max_age_seconds):
+        """
+        Вернуть резервы, не обновлявшиеся дольше max_age_seconds (процесс
+        остановился во время генерации). Живые резервы процесс отмечает
+        через update_token_reservations_heartbeat.
+        Returns: количество пользователей, которым вернули токены
+        """
+        column = self._balance_column()
+        with self._cursor() as cursor:
+            cursor.execute(f"""
+                WITH refunded AS (
+                    UPDATE token_expenses
+                    SET status = 'refunded', updated_at = NOW()
+                    WHERE status = 'reserved'
+                        AND COALESCE(updated_at, created_at) < NOW() - %s * INTERVAL '1 second'
+                    RETURNING user_id, amount
+                ),
+                totals AS (
+                    SELECT user_id, SUM(amount) AS amount FROM refunded GROUP BY user_id
+                )
+                UPDATE users SET {column} = {column} + totals.amount
+                FROM totals
+                WHERE users.id = totals.user_id
+                RETURNING users.id
+            """, (max_age_seconds,))
+            user_ids = [row['id'] for row in cursor.fetchall()]
+
+        for user_id in user_ids:
+            self.cache.invalidate('users', user_id)
+        return len(user_ids)
+
     # ═══════════════════════════════════════════════════════════════
     # БОТЫ (ПРОЕКТЫ)
     # ═══════════════════════════════════════════════════════════════
@@ -410,83 +803,130 @@ class Database:
     @handle_db_errors
     def create_bot(self, user_id, name):
         """Создать нового бота"""
-        self.cursor.execute(
-            """
-            INSERT INTO bots (user_id, name, company_data, created_at)
-            VALUES (%s, %s, %s, %s)
-            RETURNING id
-            """,
-            (user_id, name, json.dumps({}), datetime.now())
-        )
-        bot_id = self.cursor.fetchone()['id']
-        self.conn.commit()
+        with self._cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO bots (user_id, name, company_data, created_at)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id
+                """,
+                (user_id, name, json.dumps({}), datetime.now())
+            )
+            bot_id = cursor.fetchone()['id']
         return bot_id
     
     @handle_db_errors
     def get_bot(self, bot_id):
         """Получить бота по ID"""
-        try:
-            # Создаём новый курсор с RealDictCursor для возврата dict
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute(
-                "SELECT * FROM bots WHERE id = %s",
-                (bot_id,)
-            )
-            result = cursor.fetchone()
-            cursor.close()
-            return result
-        except Exception as e:
-            print(f"❌ Ошибка БД в get_bot: {e}")
-            try:
-                self.conn.rollback()
-            except:
-                pass
-            # Пытаемся переподключиться
-            try:
-                self.reconnect()
-            except:
-                pass
-            return None
+        return self._cached_fetch('bots', bot_id, "SELECT * FROM bots WHERE id = %s")
     
     @handle_db_errors
     def get_user_bots(self, user_id):
         """Получить всех ботов пользователя"""
-        # Создаём новый курсор с RealDictCursor для возврата dict вместо tuple
-        cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute(
-            "SELECT * FROM bots WHERE user_id = %s ORDER BY created_at DESC",
-            (user_id,)
-        )
-        result = cursor.fetchall()
-        cursor.close()
-        return result
-    
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT * FROM bots WHERE user_id = %s ORDER BY created_at DESC",
+                (user_id,)
+            )
+            return cursor.fetchall()
+
+    @handle_db_errors
+    def get_user_project_tree_list(self, user_id):
+        """
+        Боты пользователя со сводкой по категориям — один запрос
+
+        Размеры JSONB-полей и число ключевых фраз считаются в БД, сами
+        фразы / media / prices / reviews не передаются. Для экранов списка и статистики проектов.
+
+        Returns:
+            list: боты (id, name, created_at, connected_platforms,
+                  categories_count, keywords_count, media_count) с полем
+                  categories — [{id, name, keywords_count, media_count,
+                  prices_count, reviews_count, has_description,
+                  scheduled_platforms}] в порядке создания
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT b.id, b.name, b.created_at, b.connected_platforms,
+                    COALESCE(t.categories_count, 0) AS categories_count,
+                    COALESCE(t.keywords_count, 0) AS keywords_count,
+                    COALESCE(t.media_count, 0) AS media_count,
+                    COALESCE(t.categories, '[]'::json) AS categories
+                FROM bots b
+                LEFT JOIN LATERAL (
+                    SELECT COUNT(*) AS categories_count,
+                        SUM(s.keywords_count)::integer AS keywords_count,
+                        SUM(s.media_count)::integer AS media_count,
+                        json_agg(json_build_object(
+                            'id', s.id,
+                            'name', s.name,
+                            'keywords_count', s.keywords_count,
+                            'media_count', s.media_count,
+                            'prices_count', s.prices_count,
+                            'reviews_count', s.reviews_count,
+                            'has_description', s.has_description,
+                            'scheduled_platforms', s.scheduled_platforms
+                        ) ORDER BY s.created_at) AS categories
+                    FROM (
+                        SELECT c.id, c.name, c.created_at,
+                            (SELECT COUNT(*) FROM category_keywords ck
+                                WHERE ck.category_id = c.id)::integer AS keywords_count,
+                            CASE WHEN jsonb_typeof(c.media) = 'array'
+                                    THEN jsonb_array_length(c.media)
+                                WHEN jsonb_typeof(c.media -> 'items') = 'array'
+                                    THEN jsonb_array_length(c.media -> 'items')
+                                ELSE 0 END AS media_count,
+                            CASE WHEN jsonb_typeof(c.reviews) = 'array'
+                                THEN jsonb_array_length(c.reviews) ELSE 0 END AS reviews_count,
+                            CASE WHEN jsonb_typeof(c.prices) = 'object'
+                                THEN (SELECT COUNT(*) FROM jsonb_object_keys(c.prices))::integer
+                                ELSE 0 END AS prices_count,
+                            COALESCE(c.description, '') <> '' AS has_description,
+                            ARRAY(
+                                SELECT DISTINCT ps.platform_type
+                                FROM platform_schedules ps
+                                WHERE ps.category_id = c.id AND ps.enabled
+                                ORDER BY ps.platform_type
+                            ) AS scheduled_platforms
+                        FROM categories c
+                        WHERE c.bot_id = b.id
+                    ) s
+                ) t ON TRUE
+                WHERE b.user_id = %s
+                ORDER BY b.created_at DESC
+            """, (user_id,))
+            return cursor.fetchall()
+
     @handle_db_errors
     def update_bot(self, bot_id, name=None, company_data=None, connected_platforms=None):
         """Обновить данные бота"""
-        if name:
-            self.cursor.execute(
-                "UPDATE bots SET name = %s WHERE id = %s",
-                (name, bot_id)
-            )
-        if company_data:
-            self.cursor.execute(
-                "UPDATE bots SET company_data = %s WHERE id = %s",
-                (json.dumps(company_data), bot_id)
-            )
-        if connected_platforms is not None:
-            self.cursor.execute(
-                "UPDATE bots SET connected_platforms = %s WHERE id = %s",
-                (json.dumps(connected_platforms), bot_id)
-            )
-        self.conn.commit()
+        with self._cursor() as cursor:
+            if name:
+                cursor.execute(
+                    "UPDATE bots SET name = %s WHERE id = %s",
+                    (name, bot_id)
+                )
+            if company_data:
+                cursor.execute(
+                    "UPDATE bots SET company_data = %s WHERE id = %s",
+                    (json.dumps(company_data), bot_id)
+                )
+            if connected_platforms is not None:
+                cursor.execute(
+                    "UPDATE bots SET connected_platforms = %s WHERE id = %s",
+                    (json.dumps(connected_platforms), bot_id)
+                )
+        self.cache.invalidate('bots', bot_id)
         return True
     
     @handle_db_errors
     def delete_bot(self, bot_id):
         """Удалить бота"""
-        self.cursor.execute("DELETE FROM bots WHERE id = %s", (bot_id,))
-        self.conn.commit()
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM bots WHERE id = %s", (bot_id,))
+        self.cache.invalidate('bots', bot_id)
+        # Категории бота удаляются каскадно
+        self.cache.invalidate('categories')
         return True
     
     # ═══════════════════════════════════════════════════════════════
@@ -496,86 +936,1398 @@ class Database:
     @handle_db_errors
     def create_category(self, bot_id, name, description=''):
         """Создать категорию"""
-        self.cursor.execute(
-            """
-            INSERT INTO categories (bot_id, name, description, created_at)
-            VALUES (%s, %s, %s, %s)
-            RETURNING id
-            """,
-            (bot_id, name, description, datetime.now())
-        )
-        cat_id = self.cursor.fetchone()['id']
-        self.conn.commit()
+        with self._cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO categories (bot_id, name, description, created_at)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id
+                """,
+                (bot_id, name, description, datetime.now())
+            )
+            cat_id = cursor.fetchone()['id']
         return cat_id
     
     @handle_db_errors
-    def get_category(self, category_id):
-        """Получить категорию по ID"""
-        try:
-            self.cursor.execute(
+    def get_category(self, category_id, fields=None):
+        """
+        Получить категорию по ID
+
+        fields — список колонок (проекция): читаются только они, без
+        тяжёлых JSONB, которые не нужны вызывающему. Если полная строка
+        уже в кэше, проекция берётся из неё. Неизвестные колонки пропускаются.
+        """
+        if not fields:
+            return self._cached_fetch(
+                'categories', category_id,
                 "SELECT * FROM categories WHERE id = %s",
+                prepare=_parse_category_jsonb
+            )
+
+        columns = ['id'] + [field for field in fields if field in CATEGORY_COLUMNS and field != 'id']
+        cached = self.cache.get('categories', category_id)
+        if cached is not None:
+            return {column: cached.get(column) for column in columns}
+
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"SELECT {', '.join(columns)} FROM categories WHERE id = %s",
                 (category_id,)
             )
-            category = self.cursor.fetchone()
-            
-            if category:
-                # Парсим JSONB поля если они строки
-                jsonb_fields = ['keywords', 'media', 'prices', 'reviews', 'telegram_topics', 'platform_schedulers']
-                for field in jsonb_fields:
-                    if field in category and isinstance(category[field], str):
-                        if field == 'telegram_topics':
-                            print(f"📊 DEBUG get_category: telegram_topics до парсинга = {category[field][:200]}")
-                        try:
-                            category[field] = json.loads(category[field])
-                            if field == 'telegram_topics':
-                                print(f"📊 DEBUG get_category: telegram_topics после парсинга = {category[field]}")
-                        except Exception as parse_error:
-                            print(f"❌ Ошибка парсинга {field}: {parse_error}")
-                            category[field] = [] if field in ['keywords', 'media', 'reviews', 'telegram_topics'] else {}
-            
-            return category
-        except Exception as e:
-            print(f"❌ Ошибка БД в get_category: {e}")
-            try:
-                self.conn.rollback()
-            except:
-                pass
-            return None
+            row = cursor.fetchone()
+        if row is not None:
+            row = dict(row)
+            _parse_category_jsonb(row)
+        return row
     
     @handle_db_errors
     def get_bot_categories(self, bot_id):
         """Получить все категории бота"""
-        self.cursor.execute(
-            "SELECT * FROM categories WHERE bot_id = %s ORDER BY created_at",
-            (bot_id,)
-        )
-        return self.cursor.fetchall()
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT * FROM categories WHERE bot_id = %s ORDER BY created_at",
+                (bot_id,)
+            )
+            return cursor.fetchall()
     
     @handle_db_errors
     def update_category(self, category_id, **kwargs):
         """Обновить категорию"""
         allowed_fields = ['name', 'description', 'keywords', 'media', 'prices', 'reviews', 'telegram_topics', 'platform_schedulers']
         
-        for field, value in kwargs.items():
-            if field in allowed_fields:
-                if field in ['keywords', 'media', 'prices', 'reviews', 'telegram_topics', 'platform_schedulers']:
-                    value = json.dumps(value)
-                
-                self.cursor.execute(
-                    f"UPDATE categories SET {field} = %s WHERE id = %s",
-                    (value, category_id)
-                )
+        with self._cursor() as cursor:
+            for field, value in kwargs.items():
+                if field in allowed_fields:
+                    if field in ['keywords', 'media', 'prices', 'reviews', 'telegram_topics', 'platform_schedulers']:
+                        value = json.dumps(value)
+                    
+                    cursor.execute(
+                        f"UPDATE categories SET {field} = %s WHERE id = %s",
+                        (value, category_id)
+                    )
         
-        self.conn.commit()
+        self.cache.invalidate('categories', category_id)
         return True
     
+    # Частичные изменения JSONB-полей: вычисляются в БД, без чтения
+    # документа целиком и без потери параллельных изменений.
+    # media бывает списком файлов или словарём {'items': [...],
+    # 'survey_state': ..., 'survey_answers': ...} — учитываются оба вида.
+
+    @handle_db_errors
+    def update_category_json_append(self, category_id, field, items, unique=False):
+        """
+        Добавить элементы в конец JSONB-массива (keywords, media, reviews, ...)
+
+        Для словаря добавляет в его 'items'. unique=True пропускает элементы,
+        которые уже есть в массиве, и дубликаты внутри items.
+
+        Returns:
+            dict: {'length': длина массива после изменения, 'added': добавлено}
+                  или False (ошибка, нет категории)
+        """
+        if field not in CATEGORY_JSONB_FIELDS:
+            return False
+
+        current = f"""(CASE jsonb_typeof(categories.{field})
+            WHEN 'array' THEN categories.{field}
+            WHEN 'object' THEN COALESCE(categories.{field}->'items', '[]'::jsonb)
+            ELSE '[]'::jsonb END)"""
+        if unique:
+            added = f"""(SELECT COALESCE(jsonb_agg(d.value ORDER BY d.ord), '[]'::jsonb)
+                FROM (
+                    SELECT DISTINCT ON (e.value) e.value, e.ord
+                    FROM jsonb_array_elements(v.items) WITH ORDINALITY AS e(value, ord)
+                    ORDER BY e.value, e.ord
+                ) d
+                WHERE NOT {current} @> jsonb_build_array(d.value))"""
+        else:
+            added = "v.items"
+
+        with self._cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE categories
+                SET {field} = CASE WHEN jsonb_typeof({field}) = 'object'
+                    THEN jsonb_set({field}, '{{items}}', {current} || {added})
+                    ELSE {current} || {added} END
+                FROM (SELECT %s::jsonb AS items) v,
+                    (SELECT {current} AS items FROM categories WHERE id = %s) old
+                WHERE categories.id = %s
+                RETURNING jsonb_array_length({current}) AS length,
+                    jsonb_array_length({current}) - jsonb_array_length(old.items) AS added
+            """, (json.dumps(list(items), ensure_ascii=False), category_id, category_id))
+            row = cursor.fetchone()
+
+        self.cache.invalidate('categories', category_id)
+        return dict(row) if row else False
+
+    @handle_db_errors
+    def update_category_json_patch(self, category_id, field, changes=None, remove=()):
+        """
+        Изменить ключи JSONB-словаря: changes сливаются (||), ключи remove удаляются
+
+        Список (старый формат media) превращается в {'items': список}.
+        """
+        if field not in CATEGORY_JSONB_FIELDS:
+            return False
+
+        with self._cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE categories
+                SET {field} = ((CASE jsonb_typeof({field})
+                    WHEN 'object' THEN {field}
+                    WHEN 'array' THEN jsonb_build_object('items', {field})
+                    ELSE '{{}}'::jsonb END) || %s::jsonb) - %s::text[]
+                WHERE id = %s
+            """, (json.dumps(changes or {}, ensure_ascii=False), list(remove), category_id))
+            updated = cursor.rowcount > 0
+
+        self.cache.invalidate('categories', category_id)
+        return updated
+
+    @handle_db_errors
+    def update_category_json_set(self, category_id, field, path, value):
+        """
+        Записать значение по пути внутри JSONB-поля (jsonb_set), например
+        path=['survey_state', 'answers', 'q3'] — один ответ опроса.
+        Недостающие промежуточные словари создаются, список (старый
+        формат media) превращается в {'items': список}.
+        """
+        if field not in CATEGORY_JSONB_FIELDS or not path:
+            return False
+
+        with self._cursor() as cursor:
+            # jsonb_set не создаёт вложенные уровни — дополняем их по пути
+            base = f"""(CASE jsonb_typeof({field})
+                WHEN 'object' THEN {field}
+                WHEN 'array' THEN jsonb_build_object('items', {field})
+                ELSE '{{}}'::jsonb END)"""
+            expression = base
+            params = []
+            for depth in range(1, len(path)):
+                expression = (
+                    f"jsonb_set({expression}, %s::text[], "
+                    f"COALESCE({base} #> %s::text[], '{{}}'::jsonb))"
+                )
+                params += [list(path[:depth]), list(path[:depth])]
+            cursor.execute(f"""
+                UPDATE categories
+                SET {field} = jsonb_set({expression}, %s::text[], %s::jsonb)
+                WHERE id = %s
+            """, (*params, list(path), json.dumps(value, ensure_ascii=False), category_id))
+            updated = cursor.rowcount > 0
+
+        self.cache.invalidate('categories', category_id)
+        return updated
+
     @handle_db_errors
     def delete_category(self, category_id):
         """Удалить категорию"""
-        self.cursor.execute("DELETE FROM categories WHERE id = %s", (category_id,))
-        self.conn.commit()
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM categories WHERE id = %s", (category_id,))
+        self.cache.invalidate('categories', category_id)
         return True
     
+    # ═══════════════════════════════════════════════════════════════
+    # КЛЮЧЕВЫЕ ФРАЗЫ (category_keywords)
+    # ═══════════════════════════════════════════════════════════════
+    
+    @handle_db_errors
+    def get_category_keywords_count(self, category_id):
+        """Количество ключевых фраз категории"""
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) AS count FROM category_keywords WHERE category_id = %s",
+                (category_id,)
+            )
+            return cursor.fetchone()['count']
+    
+    @handle_db_errors
+    def get_category_keywords_list(self, category_id, limit=None, offset=0):
+        """Ключевые фразы категории в порядке добавления (limit=None — все)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT keyword FROM category_keywords
+                WHERE category_id = %s
+                ORDER BY id
+                LIMIT %s OFFSET %s
+            """, (category_id, limit, offset))
+            return [row['keyword'] for row in cursor.fetchall()]
+    
+    @handle_db_errors
+    def create_category_keywords(self, category_id, keywords):
+        """
+        Добавить фразы в конец списка, дубликаты (и уже сохранённые) пропускаются
+
+        Returns:
+            dict: {'added', 'total'} или False при ошибке
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO category_keywords (category_id, keyword)
+                SELECT %s, btrim(k.keyword)
+                FROM unnest(%s::text[]) WITH ORDINALITY AS k(keyword, n)
+                WHERE char_length(btrim(k.keyword)) BETWEEN 1 AND %s
+                ORDER BY k.n
+                ON CONFLICT (category_id, keyword_norm) DO NOTHING
+            """, (category_id, list(keywords), KEYWORD_MAX_LENGTH))
+            added = cursor.rowcount
+            cursor.execute(
+                "SELECT COUNT(*) AS count FROM category_keywords WHERE category_id = %s",
+                (category_id,)
+            )
+            return {'added': added, 'total': cursor.fetchone()['count']}
+    
+    @handle_db_errors
+    def create_category_keywords_from_file(self, category_id, path):
+        """
+        Импорт фраз из файла (сотни тысяч строк) — по фразе на строку, UTF-8
+
+        Файл читается построчно и передаётся через COPY во временную таблицу;
+        перенос в category_keywords с дедупликацией — один INSERT ... ON
+        CONFLICT DO NOTHING, весь импорт — одна транзакция. Файл открывается
+        заново при каждой попытке: повтор после ошибки соединения передаёт
+        его целиком. Фразы длиннее KEYWORD_MAX_LENGTH пропускаются.
+
+        Returns:
+            dict: {'received', 'added', 'too_long', 'total'} или False при ошибке
+        """
+        with self._cursor() as cursor, open(path, encoding='utf-8') as source:
+            cursor.execute("""
+                CREATE TEMP TABLE keyword_import (
+                    n BIGSERIAL,
+                    keyword TEXT
+                ) ON COMMIT DROP
+            """)
+            lines = (line.rstrip('\n') for line in source)
+            copy_sql = "COPY keyword_import (keyword) FROM STDIN"
+            if PSYCOPG_VERSION == 3:
+                with cursor.copy(copy_sql) as copy:
+                    for line in lines:
+                        copy.write_row((line,))
+            else:
+                cursor.copy_expert(copy_sql, _CopyTextReader(lines))
+            received = cursor.rowcount
+
+            cursor.execute("""
+                SELECT COUNT(*) AS too_long FROM keyword_import
+                WHERE char_length(btrim(keyword)) > %s
+            """, (KEYWORD_MAX_LENGTH,))
+            too_long = cursor.fetchone()['too_long']
+
+            cursor.execute("""
+                INSERT INTO category_keywords (category_id, keyword)
+                SELECT %s, btrim(keyword)
+                FROM keyword_import
+                WHERE char_length(btrim(keyword)) BETWEEN 1 AND %s
+                ORDER BY n
+                ON CONFLICT (category_id, keyword_norm) DO NOTHING
+            """, (category_id, KEYWORD_MAX_LENGTH))
+            added = cursor.rowcount
+            cursor.execute(
+                "SELECT COUNT(*) AS count FROM category_keywords WHERE category_id = %s",
+                (category_id,)
+            )
+            return {'received': received, 'added': added, 'too_long': too_long,
+                    'total': cursor.fetchone()['count']}
+    
+    @handle_db_errors
+    def pick_category_keyword(self, category_id):
+        """
+        Фраза для темы статьи: давно не использованная (сначала ни разу)
+
+        Выбор и отметка использования — один запрос; параллельные
+        генерации получают разные фразы (SKIP LOCKED).
+
+        Returns:
+            dict: {'keyword', 'usage_count'} или None (фраз нет)
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE category_keywords k
+                SET usage_count = k.usage_count + 1,
+                    last_used_at = NOW()
+                FROM (
+                    SELECT id FROM category_keywords
+                    WHERE category_id = %s
+                    ORDER BY last_used_at NULLS FIRST, id
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                ) lru
+                WHERE k.id = lru.id
+                RETURNING k.keyword, k.usage_count
+            """, (category_id,))
+            return cursor.fetchone()
+    
+    @handle_db_errors
+    def delete_category_keywords(self, category_id):
+        """Удалить все ключевые фразы категории"""
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM category_keywords WHERE category_id = %s", (category_id,))
+        return True
+    
+    # ═══════════════════════════════════════════════════════════════
+    # РАСПИСАНИЯ ПУБЛИКАЦИЙ (platform_schedules)
+    # ═══════════════════════════════════════════════════════════════
+    
+    @handle_db_errors
+    def get_enabled_platform_schedules(self):
+        """Все включённые расписания (None при ошибке — не путать с пустым списком)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT id, category_id, platform_type, platform_id,
+                       schedule_days, schedule_times, posts_per_day, last_post_time
+                FROM platform_schedules
+                WHERE enabled = TRUE
+            """)
+            return cursor.fetchall()
+    
+    @handle_db_errors
+    def get_platform_schedule(self, category_id, platform_type, platform_id):
+        """Одно расписание по ключу (category_id, platform_type, platform_id)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT id, category_id, platform_type, platform_id, enabled,
+                       schedule_days, schedule_times, posts_per_day, last_post_time
+                FROM platform_schedules
+                WHERE category_id = %s AND platform_type = %s AND platform_id = %s
+            """, (category_id, platform_type, platform_id))
+            return cursor.fetchone()
+    
+    @handle_db_errors
+    def update_schedule_last_post_time(self, category_id, platform_type, platform_id, post_time):
+        """Отметить время публикации по расписанию (база для догона пропусков)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE platform_schedules
+                SET last_post_time = %s
+                WHERE category_id = %s AND platform_type = %s AND platform_id = %s
+            """, (post_time, category_id, platform_type, platform_id))
+        return True
+
+    # ═══════════════════════════════════════════════════════════════
+    # ОЧЕРЕДЬ ПУБЛИКАЦИЙ (publication_jobs)
+    # ═══════════════════════════════════════════════════════════════
+
+    @handle_db_errors
+    def enqueue_publication_job(self, schedule_id, category_id, bot_id, user_id,
+                                platform_type, platform_id, slot_time, max_attempts=5):
+        """
+        Поставить слот расписания в очередь.
+        Returns: id задания или None, если слот уже в очереди (UNIQUE schedule_id, slot_time)
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO publication_jobs
+                    (schedule_id, category_id, bot_id, user_id, platform_type, platform_id,
+                     slot_time, max_attempts)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (schedule_id, slot_time) DO NOTHING
+                RETURNING id
+            """, (schedule_id, category_id, bot_id, user_id, platform_type, str(platform_id),
+                  slot_time, max_attempts))
+            result = cursor.fetchone()
+        return result['id'] if result else None
+
+    @handle_db_errors
+    def claim_publication_jobs(self, worker_id, limit, lease_seconds):
+        """
+        Арендовать до limit готовых заданий (pending с наступившим run_after
+        или running с истёкшей арендой). FOR UPDATE SKIP LOCKED — несколько
+        процессов бота не получат одно и то же задание.
+        """
+        if limit <= 0:
+            return []
+
+        with self._cursor() as cursor:
+            # Аренда истекла на последней попытке — повторять больше нельзя
+            cursor.execute("""
+                UPDATE publication_jobs
+                SET status = 'failed',
+                    last_error = 'Аренда истекла: процесс не завершил публикацию',
+                    locked_by = NULL, lease_expires_at = NULL,
+                    finished_at = NOW(), updated_at = NOW()
+                WHERE status = 'running'
+                    AND lease_expires_at < NOW()
+                    AND attempts >= max_attempts
+                RETURNING id
+            """)
+            expired = [row['id'] for row in cursor.fetchall()]
+            if expired:
+                self._log_failed_publication_jobs(cursor, expired)
+
+            cursor.execute("""
+                UPDATE publication_jobs
+                SET status = 'running',
+                    attempts = attempts + 1,
+                    locked_by = %s,
+                    lease_expires_at = NOW() + %s * INTERVAL '1 second',
+                    updated_at = NOW()
+                WHERE id IN (
+                    SELECT id FROM publication_jobs
+                    WHERE ((status = 'pending' AND run_after <= NOW())
+                        OR (status = 'running' AND lease_expires_at < NOW()))
+                        AND attempts < max_attempts
+                    ORDER BY run_after
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING *
+            """, (worker_id, lease_seconds, limit))
+            return cursor.fetchall()
+
+    @handle_db_errors
+    def extend_publication_job_leases(self, job_ids, worker_id, lease_seconds):
+        """Продлить аренду выполняющихся заданий этого процесса"""
+        if not job_ids:
+            return 0
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE publication_jobs
+                SET lease_expires_at = NOW() + %s * INTERVAL '1 second', updated_at = NOW()
+                WHERE id = ANY(%s) AND locked_by = %s AND status = 'running'
+            """, (lease_seconds, list(job_ids), worker_id))
+            return cursor.rowcount
+
+    @handle_db_errors
+    def complete_publication_job(self, job, post_url=None, tokens_spent=0):
+        """
+        Задание выполнено: статус done и запись в publication_logs одной транзакцией.
+        Returns: False, если аренду уже перехватил другой процесс
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE publication_jobs
+                SET status = 'done', last_error = NULL,
+                    locked_by = NULL, lease_expires_at = NULL,
+                    finished_at = NOW(), updated_at = NOW()
+                WHERE id = %s AND locked_by = %s AND attempts = %s AND status = 'running'
+                RETURNING id
+            """, (job['id'], job['locked_by'], job['attempts']))
+            if not cursor.fetchone():
+                return False
+
+            cursor.execute("""
+                INSERT INTO publication_logs
+                    (category_id, bot_id, platform_type, platform_id, status, tokens_spent, post_url)
+                SELECT category_id, bot_id, platform_type, platform_id, 'success', %s, %s
+                FROM publication_jobs
+                WHERE id = %s AND bot_id IS NOT NULL
+            """, (tokens_spent or 0, post_url, job['id']))
+        return True
+
+    @handle_db_errors
+    def fail_publication_job(self, job, error, retry=True, base_delay=60, max_delay=3600):
+        """
+        Неудачная попытка: повтор с экспоненциальной задержкой
+        (base_delay * 2^(attempts-1), не больше max_delay) или окончательный
+        статус failed с записью в publication_logs.
+        Returns: новый статус ('pending' / 'failed') или None, если аренда потеряна
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE publication_jobs
+                SET status = CASE WHEN %s AND attempts < max_attempts THEN 'pending' ELSE 'failed' END,
+                    run_after = NOW() + LEAST(%s, %s * POWER(2, attempts - 1)) * INTERVAL '1 second',
+                    last_error = %s,
+                    locked_by = NULL, lease_expires_at = NULL,
+                    finished_at = CASE WHEN %s AND attempts < max_attempts THEN NULL ELSE NOW() END,
+                    updated_at = NOW()
+                WHERE id = %s AND locked_by = %s AND attempts = %s AND status = 'running'
+                RETURNING status
+            """, (bool(retry), max_delay, base_delay, str(error)[:2000], bool(retry),
+                  job['id'], job['locked_by'], job['attempts']))
+            result = cursor.fetchone()
+            if not result:
+                return None
+            if result['status'] == 'failed':
+                self._log_failed_publication_jobs(cursor, [job['id']])
+        return result['status']
+
+    @staticmethod
+    def _log_failed_publication_jobs(cursor, job_ids):
+        """Записать окончательно неудачные задания в publication_logs"""
+        cursor.execute("""
+            INSERT INTO publication_logs
+                (category_id, bot_id, platform_type, platform_id, status, error_message)
+            SELECT category_id, bot_id, platform_type, platform_id, 'error', last_error
+            FROM publication_jobs
+            WHERE id = ANY(%s) AND bot_id IS NOT NULL
+        """, (list(job_ids),))
+
+    @handle_db_errors
+    def get_publication_queue_stats(self):
+        """Состояние очереди публикаций (для админки)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT
+                    COUNT(*) FILTER (WHERE status = 'pending') AS pending,
+                    COUNT(*) FILTER (WHERE status = 'pending' AND run_after <= NOW()) AS ready,
+                    COUNT(*) FILTER (WHERE status = 'pending' AND attempts > 0) AS retrying,
+                    COUNT(*) FILTER (WHERE status = 'running') AS running,
+                    COUNT(*) FILTER (WHERE status = 'done' AND finished_at >= NOW() - INTERVAL '1 day') AS done_24h,
+                    COUNT(*) FILTER (WHERE status = 'failed' AND finished_at >= NOW() - INTERVAL '1 day') AS failed_24h,
+                    EXTRACT(EPOCH FROM NOW() - MIN(run_after) FILTER (
+                        WHERE status = 'pending' AND run_after <= NOW()
+                    )) AS oldest_ready_seconds
+                FROM publication_jobs
+            """)
+            return cursor.fetchone()
+
+    @handle_db_errors
+    def delete_finished_publication_jobs(self, days=14):
+        """Удалить завершённые задания старше days дней (результаты остаются в publication_logs)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                DELETE FROM publication_jobs
+                WHERE status IN ('done', 'failed')
+                    AND finished_at < NOW() - %s * INTERVAL '1 day'
+            """, (days,))
+            return cursor.rowcount
+
+    # ═══════════════════════════════════════════════════════════════
+    # ОЧЕРЕДЬ ОБНОВЛЕНИЙ TELEGRAM (telegram_updates, режим webhook)
+    # ═══════════════════════════════════════════════════════════════
+
+    @handle_db_errors
+    def create_telegram_update(self, update_id, chat_id, payload):
+        """Поставить обновление в очередь (повторная доставка игнорируется)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO telegram_updates (update_id, chat_id, payload)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (update_id) DO NOTHING
+            """, (update_id, chat_id, payload))
+        return True
+
+    @handle_db_errors
+    def claim_telegram_chat(self, worker_id, lease_seconds):
+        """
+        Арендовать чат с самым старым ожидающим обновлением, который сейчас
+        не арендован другим воркером. Кандидат выбирается с FOR UPDATE SKIP
+        LOCKED: параллельные воркеры берут следующие обновления, а не ждут
+        одно и то же. Upsert с условием на истёкшую аренду атомарен: два
+        воркера не получат один чат.
+        Returns: chat_id или None (нет свободных чатов / проиграли гонку)
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                WITH candidate AS (
+                    SELECT u.chat_id
+                    FROM telegram_updates u
+                    WHERE u.status = 'queued'
+                        AND NOT EXISTS (
+                            SELECT 1 FROM telegram_chat_leases l
+                            WHERE l.chat_id = u.chat_id AND l.lease_expires_at > NOW()
+                        )
+                    ORDER BY u.update_id
+                    LIMIT 1
+                    FOR UPDATE OF u SKIP LOCKED
+                )
+                INSERT INTO telegram_chat_leases (chat_id, locked_by, lease_expires_at)
+                SELECT chat_id, %s, NOW() + %s * INTERVAL '1 second'
+                FROM candidate
+                ON CONFLICT (chat_id) DO UPDATE SET
+                    locked_by = EXCLUDED.locked_by,
+                    lease_expires_at = EXCLUDED.lease_expires_at
+                WHERE telegram_chat_leases.lease_expires_at <= NOW()
+                RETURNING chat_id
+            """, (worker_id, lease_seconds))
+            result = cursor.fetchone()
+        return result['chat_id'] if result else None
+
+    @handle_db_errors
+    def update_telegram_chat_lease(self, chat_id, worker_id, lease_seconds):
+        """Продлить аренду чата. Returns: False, если аренду перехватил другой воркер"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE telegram_chat_leases
+                SET lease_expires_at = NOW() + %s * INTERVAL '1 second'
+                WHERE chat_id = %s AND locked_by = %s
+            """, (lease_seconds, chat_id, worker_id))
+            return cursor.rowcount > 0
+
+    @handle_db_errors
+    def delete_telegram_chat_lease(self, chat_id, worker_id):
+        """Освободить чат"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                DELETE FROM telegram_chat_leases
+                WHERE chat_id = %s AND locked_by = %s
+            """, (chat_id, worker_id))
+        return True
+
+    @handle_db_errors
+    def get_queued_telegram_updates(self, chat_id, limit):
+        """Ожидающие обновления чата в порядке update_id"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT update_id, payload
+                FROM telegram_updates
+                WHERE chat_id = %s AND status = 'queued'
+                ORDER BY update_id
+                LIMIT %s
+            """, (chat_id, limit))
+            return cursor.fetchall()
+
+    @handle_db_errors
+    def update_telegram_update_status(self, update_id, status, worker_id, error=None):
+        """Отметить обновление обработанным (done) или упавшим (failed)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE telegram_updates
+                SET status = %s, error = %s, processed_by = %s, processed_at = NOW()
+                WHERE update_id = %s
+            """, (status, str(error)[:2000] if error else None, worker_id, update_id))
+        return True
+
+    @handle_db_errors
+    def get_telegram_update_queue_stats(self):
+        """Состояние очереди обновлений (для админки)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT
+                    COUNT(*) FILTER (WHERE status = 'queued') AS queued,
+                    COUNT(DISTINCT chat_id) FILTER (WHERE status = 'queued') AS queued_chats,
+                    COUNT(*) FILTER (WHERE status = 'done' AND processed_at >= NOW() - INTERVAL '1 hour') AS done_1h,
+                    COUNT(*) FILTER (WHERE status = 'failed' AND processed_at >= NOW() - INTERVAL '1 day') AS failed_24h,
+                    EXTRACT(EPOCH FROM NOW() - MIN(received_at) FILTER (WHERE status = 'queued')) AS oldest_queued_seconds,
+                    (SELECT COUNT(*) FROM telegram_chat_leases WHERE lease_expires_at > NOW()) AS leased_chats
+                FROM telegram_updates
+            """)
+            return cursor.fetchone()
+
+    @handle_db_errors
+    def delete_processed_telegram_updates(self, days=3):
+        """Удалить обработанные обновления старше days дней"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                DELETE FROM telegram_updates
+                WHERE status IN ('done', 'failed')
+                    AND processed_at < NOW() - %s * INTERVAL '1 day'
+            """, (days,))
+            return cursor.rowcount
+
+    # ═══════════════════════════════════════════════════════════════
+    # РАССЫЛКИ (broadcasts / broadcast_recipients)
+    # ═══════════════════════════════════════════════════════════════
+
+    # Условия аудитории рассылки (u — таблица users)
+    _BROADCAST_AUDIENCES = {
+        'all': "TRUE",
+        '7d': "u.last_activity >= NOW() - INTERVAL '7 days'",
+        'paid': "u.tokens > 1500",  # Купили токены
+    }
+
+    def _broadcast_audience_sql(self, audience):
+        condition = self._BROADCAST_AUDIENCES.get(audience)
+        if condition is None:
+            raise ValueError(f"Неизвестная аудитория рассылки: {audience}")
+        return f"NOT COALESCE(u.is_blocked, FALSE) AND {condition}"
+
+    @handle_db_errors
+    def count_broadcast_audience(self, audience):
+        """Количество получателей рассылки (без заблокировавших бота)"""
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) AS total FROM users u WHERE {self._broadcast_audience_sql(audience)}"
+            )
+            return cursor.fetchone()['total']
+
+    @handle_db_errors
+    def create_broadcast(self, admin_id, audience, source_chat_id, source_message_id,
+                         worker_id, lease_seconds):
+        """
+        Создать рассылку и снимок получателей одной транзакцией.
+        Аренда сразу принадлежит создавшему процессу.
+        Returns: строка broadcasts
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO broadcasts
+                    (admin_id, audience, source_chat_id, source_message_id,
+                     locked_by, lease_expires_at)
+                VALUES (%s, %s, %s, %s, %s, NOW() + %s * INTERVAL '1 second')
+                RETURNING id
+            """, (admin_id, audience, source_chat_id, source_message_id, worker_id, lease_seconds))
+            broadcast_id = cursor.fetchone()['id']
+
+            cursor.execute(f"""
+                INSERT INTO broadcast_recipients (broadcast_id, user_id)
+                SELECT %s, u.id FROM users u
+                WHERE {self._broadcast_audience_sql(audience)}
+            """, (broadcast_id,))
+
+            cursor.execute("""
+                UPDATE broadcasts SET total = %s WHERE id = %s
+                RETURNING *
+            """, (cursor.rowcount, broadcast_id))
+            return cursor.fetchone()
+
+    @handle_db_errors
+    def get_broadcast(self, broadcast_id):
+        """Рассылка по ID"""
+        with self._cursor() as cursor:
+            cursor.execute("SELECT * FROM broadcasts WHERE id = %s", (broadcast_id,))
+            return cursor.fetchone()
+
+    @handle_db_errors
+    def claim_broadcasts(self, worker_id, lease_seconds):
+        """Арендовать незавершённые рассылки, чей процесс пропал (аренда истекла)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE broadcasts
+                SET locked_by = %s,
+                    lease_expires_at = NOW() + %s * INTERVAL '1 second',
+                    updated_at = NOW()
+                WHERE id IN (
+                    SELECT id FROM broadcasts
+                    WHERE status = 'running'
+                        AND (lease_expires_at IS NULL OR lease_expires_at < NOW())
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING *
+            """, (worker_id, lease_seconds))
+            return cursor.fetchall()
+
+    @handle_db_errors
+    def get_broadcast_recipients_list(self, broadcast_id, after_user_id, limit):
+        """Следующие получатели после курсора (по возрастанию user_id)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT user_id FROM broadcast_recipients
+                WHERE broadcast_id = %s AND user_id > %s AND status = 'pending'
+                ORDER BY user_id
+                LIMIT %s
+            """, (broadcast_id, after_user_id, limit))
+            return [row['user_id'] for row in cursor.fetchall()]
+
+    @handle_db_errors
+    def update_broadcast_progress(self, broadcast_id, worker_id, lease_seconds, cursor_user_id, results):
+        """
+        Записать результаты пачки одной транзакцией: статусы получателей,
+        счётчики и курсор рассылки, флаг is_blocked у заблокировавших бота.
+        Аренда продлевается.
+
+        results: список (user_id, status, error), status — sent / failed / blocked
+        Returns: строка broadcasts или None, если аренду перехватил другой процесс
+        """
+        counts = {'sent': 0, 'failed': 0, 'blocked': 0}
+        for user_id, status, error in results:
+            counts[status] += 1
+        blocked = [user_id for user_id, status, error in results if status == 'blocked']
+
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE broadcasts
+                SET sent = sent + %s, failed = failed + %s, blocked = blocked + %s,
+                    cursor_user_id = %s,
+                    lease_expires_at = NOW() + %s * INTERVAL '1 second',
+                    updated_at = NOW()
+                WHERE id = %s AND locked_by = %s
+                RETURNING *
+            """, (counts['sent'], counts['failed'], counts['blocked'], cursor_user_id,
+                  lease_seconds, broadcast_id, worker_id))
+            broadcast = cursor.fetchone()
+            if not broadcast:
+                return None
+
+            if results:
+                cursor.execute(
+                    """
+                    UPDATE broadcast_recipients r
+                    SET status = v.status, error = v.error
+                    FROM (VALUES """ + ", ".join(["(%s::BIGINT, %s, %s)"] * len(results)) + """)
+                        AS v(user_id, status, error)
+                    WHERE r.broadcast_id = %s AND r.user_id = v.user_id
+                    """,
+                    [value for user_id, status, error in results
+                     for value in (user_id, status, (error or None) and str(error)[:500])] + [broadcast_id]
+                )
+
+            if blocked:
+                cursor.execute("""
+                    UPDATE users SET is_blocked = TRUE, blocked_at = NOW()
+                    WHERE id = ANY(%s)
+                """, (blocked,))
+
+        for user_id in blocked:
+            self.cache.invalidate('users', user_id)
+        return broadcast
+
+    @handle_db_errors
+    def update_broadcast_status_message(self, broadcast_id, chat_id, message_id):
+        """Сообщение админу, в котором показывается прогресс"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE broadcasts SET status_chat_id = %s, status_message_id = %s
+                WHERE id = %s
+            """, (chat_id, message_id, broadcast_id))
+        return True
+
+    @handle_db_errors
+    def update_broadcast_finished(self, broadcast_id, worker_id, status='done'):
+        """Завершить рассылку (done / cancelled) и снять аренду"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE broadcasts
+                SET status = CASE WHEN status = 'cancelled' THEN status ELSE %s END,
+                    locked_by = NULL, lease_expires_at = NULL,
+                    finished_at = COALESCE(finished_at, NOW()), updated_at = NOW()
+                WHERE id = %s AND locked_by = %s
+                RETURNING *
+            """, (status, broadcast_id, worker_id))
+            return cursor.fetchone()
+
+    @handle_db_errors
+    def update_broadcast_cancelled(self, broadcast_id):
+        """Отменить рассылку (процесс-исполнитель остановится на следующей пачке)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE broadcasts
+                SET status = 'cancelled', finished_at = NOW(), updated_at = NOW()
+                WHERE id = %s AND status = 'running'
+            """, (broadcast_id,))
+            return cursor.rowcount > 0
+
+    @handle_db_errors
+    def update_user_unblocked(self, user_id):
+        """Пользователь снова пишет боту — вернуть его в рассылки"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE users SET is_blocked = FALSE, blocked_at = NULL
+                WHERE id = %s AND is_blocked
+            """, (user_id,))
+        self.cache.invalidate('users', user_id)
+        return True
+
+    # ═══════════════════════════════════════════════════════════════
+    # АВТОУВЕДОМЛЕНИЯ (notification_log)
+    # ═══════════════════════════════════════════════════════════════
+
+    # Кому положено уведомление: (доп. колонки, условие, параметры условия);
+    # {balance} — колонка баланса (u.balance или u.tokens), u — таблица users
+    _NOTIFICATION_AUDIENCES = {
+        'low_balance': (
+            "{balance} AS balance",
+            "{balance} > 0 AND {balance} < %s",
+            (NOTIFICATION_LOW_BALANCE_THRESHOLD,)
+        ),
+        'reactivation': (
+            "EXTRACT(DAY FROM NOW() - COALESCE(u.last_activity, u.created_at))::integer AS days_inactive",
+            "COALESCE(u.last_activity, u.created_at) < NOW() - %s * INTERVAL '1 day'",
+            (NOTIFICATION_INACTIVE_DAYS,)
+        ),
+        'weekly_news': ("NULL AS payload", "TRUE", ()),
+    }
+
+    @handle_db_errors
+    def claim_notification_recipients(self, notification_type, cooldown_days, after_user_id, limit):
+        """
+        Выбрать следующих получателей уведомления одним запросом и записать
+        их в notification_log со статусом pending.
+
+        Не выбираются: заблокировавшие бота и получившие уведомление этого
+        типа за последние cooldown_days дней (anti-join по журналу).
+
+        Returns:
+            list: [{'log_id', 'user_id', ...доп. колонки типа}] по возрастанию
+            user_id — все просмотренные получатели; log_id None, если запись
+            pending уже создал параллельный запуск (курсор всё равно сдвигается)
+        """
+        columns, condition, params = self._NOTIFICATION_AUDIENCES[notification_type]
+        balance = f"u.{self._balance_column()}"
+        with self._cursor() as cursor:
+            cursor.execute(f"""
+                WITH eligible AS (
+                    SELECT u.id AS user_id, {columns.format(balance=balance)}
+                    FROM users u
+                    WHERE u.id > %s
+                        AND NOT COALESCE(u.is_blocked, FALSE)
+                        AND {condition.format(balance=balance)}
+                        AND NOT EXISTS (
+                            SELECT 1 FROM notification_log l
+                            WHERE l.user_id = u.id
+                                AND l.notification_type = %s
+                                AND l.status IN ('pending', 'sent', 'blocked')
+                                AND l.created_at > NOW() - %s * INTERVAL '1 day'
+                        )
+                    ORDER BY u.id
+                    LIMIT %s
+                ),
+                reserved AS (
+                    INSERT INTO notification_log (user_id, notification_type)
+                    SELECT user_id, %s FROM eligible
+                    ON CONFLICT (user_id, notification_type) WHERE status = 'pending' DO NOTHING
+                    RETURNING id, user_id
+                )
+                SELECT reserved.id AS log_id, eligible.*
+                FROM eligible LEFT JOIN reserved USING (user_id)
+                ORDER BY eligible.user_id
+            """, (after_user_id, *params, notification_type, cooldown_days, limit, notification_type))
+            return cursor.fetchall()
+
+    @handle_db_errors
+    def update_notification_results(self, results):
+        """
+        Записать результаты отправки пачкой и пометить заблокировавших бота.
+
+        results: список (log_id, user_id, status, error), status — sent / failed / blocked
+        """
+        if not results:
+            return True
+        blocked = [user_id for log_id, user_id, status, error in results if status == 'blocked']
+
+        with self._cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE notification_log l
+                SET status = v.status, error = v.error,
+                    sent_at = CASE WHEN v.status = 'sent' THEN NOW() END
+                FROM (VALUES """ + ", ".join(["(%s::BIGINT, %s, %s)"] * len(results)) + """)
+                    AS v(id, status, error)
+                WHERE l.id = v.id
+                """,
+                [value for log_id, user_id, status, error in results
+                 for value in (log_id, status, (error or None) and str(error)[:500])]
+            )
+
+            if blocked:
+                cursor.execute("""
+                    UPDATE users SET is_blocked = TRUE, blocked_at = NOW()
+                    WHERE id = ANY(%s)
+                """, (blocked,))
+
+        for user_id in blocked:
+            self.cache.invalidate('users', user_id)
+        return True
+
+    @handle_db_errors
+    def update_stale_notifications(self, max_age_seconds=3600):
+        """
+        Записи pending, которые процесс не успел отправить (рестарт),
+        помечаются failed — получатель будет выбран снова
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE notification_log
+                SET status = 'failed', error = 'Отправка прервана'
+                WHERE status = 'pending' AND created_at < NOW() - %s * INTERVAL '1 second'
+            """, (max_age_seconds,))
+            return cursor.rowcount
+
+    @handle_db_errors
+    def delete_old_notification_log(self, days=180):
+        """Удалить записи журнала уведомлений старше days дней"""
+        with self._cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM notification_log WHERE created_at < NOW() - %s * INTERVAL '1 day'",
+                (days,)
+            )
+            return cursor.rowcount
+
+    # ═══════════════════════════════════════════════════════════════
+    # ИСПОЛЬЗОВАНИЕ API (api_usage / api_usage_daily)
+    # ═══════════════════════════════════════════════════════════════
+
+    _API_USAGE_FIELDS = (
+        'input_tokens', 'output_tokens', 'cache_read_tokens', 'cache_write_tokens', 'cost_usd'
+    )
+
+    @handle_db_errors
+    def create_api_usage_batch(self, records):
+        """
+        Записать пачку вызовов API одним INSERT и обновить дневные сводки
+        в той же транзакции.
+
+        records: список dict (created_at, user_id, service, model, operation,
+        input_tokens, output_tokens, cache_read_tokens, cache_write_tokens, cost_usd)
+        """
+        if not records:
+            return True
+
+        rollups = {}
+        for record in records:
+            key = (record['created_at'].date(), record['service'],
+                   record.get('model') or '', record.get('operation') or '')
+            totals = rollups.setdefault(key, dict.fromkeys(('calls',) + self._API_USAGE_FIELDS, 0))
+            totals['calls'] += 1
+            for field in self._API_USAGE_FIELDS:
+                totals[field] += record.get(field) or 0
+
+        with self._cursor() as cursor:
+            rows = [
+                (r['created_at'], r.get('user_id'), r['service'], r.get('model') or '',
+                 r.get('operation') or '', r.get('input_tokens') or 0, r.get('output_tokens') or 0,
+                 r.get('cache_read_tokens') or 0, r.get('cache_write_tokens') or 0,
+                 r.get('cost_usd') or 0)
+                for r in records
+            ]
+            cursor.execute(
+                """
+                INSERT INTO api_usage
+                    (created_at, user_id, service, model, operation, input_tokens, output_tokens,
+                     cache_read_tokens, cache_write_tokens, cost_usd)
+                VALUES """ + ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(rows)),
+                [value for row in rows for value in row]
+            )
+
+            daily = [
+                (day, service, model, operation, t['calls'], t['input_tokens'], t['output_tokens'],
+                 t['cache_read_tokens'], t['cache_write_tokens'], t['cost_usd'])
+                for (day, service, model, operation), t in rollups.items()
+            ]
+            cursor.execute(
+                """
+                INSERT INTO api_usage_daily
+                    (day, service, model, operation, calls, input_tokens, output_tokens,
+                     cache_read_tokens, cache_write_tokens, cost_usd)
+                VALUES """ + ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(daily)) + """
+                ON CONFLICT (day, service, model, operation) DO UPDATE SET
+                    calls = api_usage_daily.calls + EXCLUDED.calls,
+                    input_tokens = api_usage_daily.input_tokens + EXCLUDED.input_tokens,
+                    output_tokens = api_usage_daily.output_tokens + EXCLUDED.output_tokens,
+                    cache_read_tokens = api_usage_daily.cache_read_tokens + EXCLUDED.cache_read_tokens,
+                    cache_write_tokens = api_usage_daily.cache_write_tokens + EXCLUDED.cache_write_tokens,
+                    cost_usd = api_usage_daily.cost_usd + EXCLUDED.cost_usd
+                """,
+                [value for row in daily for value in row]
+            )
+        return True
+
+    @handle_db_errors
+    def get_api_usage_totals(self, days=30):
+        """
+        Суммы по (service, model, operation) за последние days дней (включая
+        сегодня) — читаются только дневные сводки
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT service, model, operation,
+                       SUM(calls)::BIGINT AS calls,
+                       SUM(input_tokens)::BIGINT AS input_tokens,
+                       SUM(output_tokens)::BIGINT AS output_tokens,
+                       SUM(cache_read_tokens)::BIGINT AS cache_read_tokens,
+                       SUM(cache_write_tokens)::BIGINT AS cache_write_tokens,
+                       SUM(cost_usd)::FLOAT AS cost_usd
+                FROM api_usage_daily
+                WHERE day > CURRENT_DATE - %s
+                GROUP BY service, model, operation
+            """, (days,))
+            return cursor.fetchall()
+
+    @handle_db_errors
+    def delete_old_api_usage(self, days=90):
+        """Удалить детальные записи старше days дней (дневные сводки остаются)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                DELETE FROM api_usage
+                WHERE created_at < NOW() - %s * INTERVAL '1 day'
+            """, (days,))
+            return cursor.rowcount
+
+    # ═══════════════════════════════════════════════════════════════
+    # СОСТОЯНИЯ ДИАЛОГОВ (bot_state, UNLOGGED)
+    # ═══════════════════════════════════════════════════════════════
+
+    @handle_db_errors
+    def get_bot_state(self, namespace, key):
+        """
+        Непросроченное состояние: {'value': bytes, 'expires_at', 'updated_at'}
+
+        Если ключа нет — value=None; сам None возвращается только при ошибке
+        БД (отсутствие ключа и сбой не путаются).
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT value, expires_at, updated_at
+                FROM bot_state
+                WHERE namespace = %s AND key = %s AND expires_at > NOW()
+            """, (namespace, key))
+            row = cursor.fetchone()
+        if not row:
+            return {'value': None, 'expires_at': None, 'updated_at': None}
+        return {'value': bytes(row['value']), 'expires_at': row['expires_at'], 'updated_at': row['updated_at']}
+
+    @handle_db_errors
+    def update_bot_states(self, namespace, rows):
+        """
+        Записать пачку состояний
+
+        rows: список (key, value_bytes, expires_at, expected_updated_at).
+        expected_updated_at=None — безусловный upsert (state[key] = ...);
+        иначе compare-and-set: строка обновляется, только если её updated_at
+        не менялся с чтения (другой процесс не записал более новую версию).
+
+        Returns:
+            dict: {key: новый updated_at} записанных строк (ключей с конфликтом
+                  в нём нет) или False при ошибке
+        """
+        written = {}
+        upserts = [row for row in rows if row[3] is None]
+        checked = [row for row in rows if row[3] is not None]
+        with self._cursor() as cursor:
+            if upserts:
+                cursor.execute(
+                    """
+                    INSERT INTO bot_state (namespace, key, value, expires_at, updated_at)
+                    VALUES """ + ", ".join(["(%s, %s, %s, %s, clock_timestamp())"] * len(upserts)) + """
+                    ON CONFLICT (namespace, key) DO UPDATE SET
+                        value = EXCLUDED.value,
+                        expires_at = EXCLUDED.expires_at,
+                        updated_at = EXCLUDED.updated_at
+                    RETURNING key, updated_at
+                    """,
+                    [value for key, blob, expires_at, _ in upserts
+                     for value in (namespace, key, blob, expires_at)]
+                )
+                written.update((row['key'], row['updated_at']) for row in cursor.fetchall())
+            if checked:
+                cursor.execute(
+                    """
+                    UPDATE bot_state b
+                    SET value = v.value,
+                        expires_at = v.expires_at,
+                        updated_at = clock_timestamp()
+                    FROM (VALUES """ + ", ".join(["(%s, %s::bytea, %s::timestamp, %s::timestamp)"] * len(checked)) + """
+                    ) AS v(key, value, expires_at, expected)
+                    WHERE b.namespace = %s AND b.key = v.key AND b.updated_at = v.expected
+                    RETURNING b.key, b.updated_at
+                    """,
+                    [value for row in checked for value in row] + [namespace]
+                )
+                written.update((row['key'], row['updated_at']) for row in cursor.fetchall())
+        return written
+
+    @handle_db_errors
+    def delete_bot_state(self, namespace, key):
+        """Удалить состояние"""
+        with self._cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM bot_state WHERE namespace = %s AND key = %s",
+                (namespace, key)
+            )
+        return True
+
+    @handle_db_errors
+    def delete_expired_bot_states(self, namespace, max_size):
+        """
+        Удалить просроченные состояния и самые давние сверх max_size.
+        Returns: количество удалённых строк
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                DELETE FROM bot_state
+                WHERE namespace = %s AND expires_at <= NOW()
+            """, (namespace,))
+            deleted = cursor.rowcount
+            cursor.execute("""
+                DELETE FROM bot_state
+                WHERE namespace = %s AND key IN (
+                    SELECT key FROM bot_state
+                    WHERE namespace = %s
+                    ORDER BY updated_at DESC
+                    OFFSET %s
+                )
+            """, (namespace, namespace, max_size))
+            return deleted + cursor.rowcount
+
+    # ═══════════════════════════════════════════════════════════════
+    # ИНДЕКС САЙТОВ (site_pages / site_profiles)
+    # ═══════════════════════════════════════════════════════════════
+
+    @handle_db_errors
+    def get_site_pages_list(self, site_url):
+        """Все страницы сайта из индекса (для инкрементального обхода)"""
+        with self._cursor() as cursor:
+            cursor.execute("SELECT * FROM site_pages WHERE site_url = %s", (site_url,))
+            return cursor.fetchall()
+
+    @handle_db_errors
+    def get_site_links_list(self, site_url, limit=30):
+        """Страницы для внутренних ссылок: по приоритету, без главной"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT url, title, priority FROM site_pages
+                WHERE site_url = %s AND priority < 3
+                ORDER BY priority DESC, changed_at DESC
+                LIMIT %s
+            """, (site_url, limit))
+            return cursor.fetchall()
+
+    @handle_db_errors
+    def get_site_terms_list(self, site_url):
+        """Страницы с термами для индекса BM25 (без главной)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT url, title, priority, terms, doc_length FROM site_pages
+                WHERE site_url = %s AND priority < 3 AND terms IS NOT NULL
+            """, (site_url,))
+            return cursor.fetchall()
+
+    @handle_db_errors
+    def update_site_pages(self, site_url, pages):
+        """
+        Записать пачку страниц одним upsert.
+        changed_at меняется только если изменился хэш содержимого.
+
+        pages: список dict (url, title, priority, etag, last_modified,
+               sitemap_lastmod, content_hash, links, terms, doc_length)
+        """
+        if not pages:
+            return True
+        with self._cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO site_pages
+                    (site_url, url, title, priority, etag, last_modified,
+                     sitemap_lastmod, content_hash, links, terms, doc_length,
+                     fetched_at, changed_at)
+                VALUES """ + ", ".join(
+                    ["(%s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s::jsonb, %s, NOW(), NOW())"] * len(pages)
+                ) + """
+                ON CONFLICT (site_url, url) DO UPDATE SET
+                    title = EXCLUDED.title,
+                    priority = EXCLUDED.priority,
+                    etag = EXCLUDED.etag,
+                    last_modified = EXCLUDED.last_modified,
+                    sitemap_lastmod = EXCLUDED.sitemap_lastmod,
+                    content_hash = EXCLUDED.content_hash,
+                    links = EXCLUDED.links,
+                    terms = EXCLUDED.terms,
+                    doc_length = EXCLUDED.doc_length,
+                    fetched_at = NOW(),
+                    changed_at = CASE
+                        WHEN site_pages.content_hash IS DISTINCT FROM EXCLUDED.content_hash THEN NOW()
+                        ELSE site_pages.changed_at
+                    END
+                """,
+                [value for page in pages for value in (
+                    site_url, page['url'], page.get('title'), page.get('priority', 1),
+                    page.get('etag'), page.get('last_modified'), page.get('sitemap_lastmod'),
+                    page.get('content_hash'), json.dumps(page.get('links') or []),
+                    json.dumps(page['terms']) if page.get('terms') is not None else None,
+                    page.get('doc_length') or 0
+                )]
+            )
+        return True
+
+    @handle_db_errors
+    def delete_site_pages(self, site_url, urls):
+        """Удалить страницы, которых больше нет на сайте (404 / 410)"""
+        if not urls:
+            return True
+        with self._cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM site_pages WHERE site_url = %s AND url = ANY(%s)",
+                (site_url, list(urls))
+            )
+        return True
+
+    @handle_db_errors
+    def get_site_profile(self, site_url):
+        """Цвета сайта и время последнего обхода"""
+        with self._cursor() as cursor:
+            cursor.execute("SELECT * FROM site_profiles WHERE site_url = %s", (site_url,))
+            return cursor.fetchone()
+
+    @handle_db_errors
+    def update_site_profile(self, site_url, colors=None, pages_total=None):
+        """Записать цвета сайта и/или итог обхода (None — поле не меняется)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO site_profiles (site_url, colors, colors_detected_at, pages_total, crawled_at)
+                VALUES (%s, %s::jsonb,
+                        CASE WHEN %s::jsonb IS NOT NULL THEN NOW() END,
+                        COALESCE(%s, 0),
+                        CASE WHEN %s::integer IS NOT NULL THEN NOW() END)
+                ON CONFLICT (site_url) DO UPDATE SET
+                    colors = COALESCE(EXCLUDED.colors, site_profiles.colors),
+                    colors_detected_at = COALESCE(EXCLUDED.colors_detected_at, site_profiles.colors_detected_at),
+                    pages_total = CASE WHEN %s::integer IS NOT NULL THEN EXCLUDED.pages_total
+                                       ELSE site_profiles.pages_total END,
+                    crawled_at = COALESCE(EXCLUDED.crawled_at, site_profiles.crawled_at)
+            """, (
+                site_url,
+                json.dumps(colors) if colors else None,
+                json.dumps(colors) if colors else None,
+                pages_total, pages_total, pages_total
+            ))
+        return True
+
+    # ═══════════════════════════════════════════════════════════════
+    # ПОДКЛЮЧЕНИЯ ПЛОЩАДОК (platform_connections)
+    # ═══════════════════════════════════════════════════════════════
+    # Таблица синхронизируется с users.platform_connections триггерами
+    # (миграция 015): код, который пишет JSONB целиком, продолжает работать.
+
+    @handle_db_errors
+    def get_platform_connection(self, user_id, platform_type, external_id=None, position=None):
+        """
+        Подключение пользователя по внешнему ID (URL сайта, ID канала)
+        или по индексу в массиве platform_connections
+
+        Returns:
+            dict: строка platform_connections (settings — данные подключения) или None
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT * FROM platform_connections
+                WHERE user_id = %s AND type = %s
+                  AND (%s::text IS NULL OR external_id = platform_connection_key(%s, %s))
+                  AND (%s::integer IS NULL OR position = %s)
+                ORDER BY position
+                LIMIT 1
+            """, (
+                user_id, platform_type,
+                external_id, platform_type, external_id,
+                position, position
+            ))
+            return cursor.fetchone()
+
+    @handle_db_errors
+    def get_platform_connections_list(self, user_id, platform_type):
+        """Подключения пользователя одного типа в порядке массива JSONB"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT * FROM platform_connections
+                WHERE user_id = %s AND type = %s
+                ORDER BY position
+            """, (user_id, platform_type))
+            return cursor.fetchall()
+
+    @handle_db_errors
+    def get_platform_connection_owners_list(self, platform_type, external_id):
+        """Пользователи, у которых подключена площадка (проверка уникальности)"""
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT DISTINCT pc.user_id, u.username
+                FROM platform_connections pc
+                JOIN users u ON u.id = pc.user_id
+                WHERE pc.type = %s AND pc.external_id = platform_connection_key(%s, %s)
+            """, (platform_type, platform_type, str(external_id)))
+            return cursor.fetchall()
+
+    @handle_db_errors
+    def update_platform_connection(self, user_id, platform_type, position, changes):
+        """
+        Изменить поля одного подключения (settings || changes).
+        Элемент users.platform_connections обновляется триггером.
+
+        Returns:
+            bool: False, если подключения нет
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                UPDATE platform_connections
+                SET settings = settings || %s::jsonb
+                WHERE user_id = %s AND type = %s AND position = %s
+            """, (json.dumps(changes), user_id, platform_type, position))
+            updated = cursor.rowcount > 0
+
+        self.cache.invalidate('users', user_id)
+        return updated
+
     # ═══════════════════════════════════════════════════════════════
     # СТАТИСТИКА
     # ═══════════════════════════════════════════════════════════════
@@ -583,11 +2335,12 @@ class Database:
     @handle_db_errors
     def get_bot_stats(self):
         """Общая статистика по ботам"""
-        self.cursor.execute("SELECT COUNT(*) as users FROM users")
-        users = self.cursor.fetchone()['users']
-        
-        self.cursor.execute("SELECT COUNT(*) as projects FROM bots")
-        projects = self.cursor.fetchone()['projects']
+        with self._cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) as users FROM users")
+            users = cursor.fetchone()['users']
+            
+            cursor.execute("SELECT COUNT(*) as projects FROM bots")
+            projects = cursor.fetchone()['projects']
         
         return {
             'users': users,
@@ -618,15 +2371,17 @@ class Database:
     @handle_db_errors
     def get_free_users_count(self):
         """Количество бесплатных пользователей"""
-        self.cursor.execute("SELECT COUNT(*) as count FROM users WHERE balance <= 1500")
-        result = self.cursor.fetchone()
+        with self._cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) as count FROM users WHERE balance <= 1500")
+            result = cursor.fetchone()
         return result['count'] if result else 0
     
     @handle_db_errors
     def get_paid_users_count(self):
         """Количество платных пользователей"""
-        self.cursor.execute("SELECT COUNT(*) as count FROM users WHERE balance > 1500")
-        result = self.cursor.fetchone()
+        with self._cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) as count FROM users WHERE balance > 1500")
+            result = cursor.fetchone()
         return result['count'] if result else 0
     
     @handle_db_errors
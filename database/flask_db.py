@@ -0,0 +1,45 @@
+"""
+Доступ к БД из Flask-серверов (oauth_server, webhook_server, vk_webhook,
+telegram_webhook)
+
+Все серверы работают через общий пул глобального db вместо Database() —
+нового пула и TLS-подключения к Neon — на каждый запрос. Методы db
+(get_user, update_user, ...) сами берут соединение из пула на время
+запроса к БД. Соединение для прямых запросов (db.cursor / db.conn)
+берётся при первом обращении в HTTP-запросе и возвращается в пул
+(с откатом незавершённой транзакции) после ответа, поэтому потоки
+gunicorn не держат соединения между запросами.
+
+Использование:
+    app = Flask(__name__)
+    init_app(app)
+
+    @app.route('/callback')
+    def callback():
+        db = get_db()
+        user = db.get_user(user_id)
+"""
+from flask import g
+from database.database import db
+
+
+def init_app(app):
+    """Подключить общий пул к приложению: возврат соединения после каждого запроса"""
+    if app.extensions.get('flask_db'):
+        return
+
+    @app.teardown_appcontext
+    def release_db_connection(exception=None):
+        if g.pop('db_used', False):
+            db.release_thread_connection()
+
+    app.extensions['flask_db'] = db
+
+
+def get_db():
+    """Общий Database для текущего запроса"""
+    g.db_used = True
+    return db
+
+
+print("✅ database/flask_db.py загружен")
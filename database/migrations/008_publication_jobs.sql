@@ -0,0 +1,64 @@
+-- ═══════════════════════════════════════════════════════════════
+-- МИГРАЦИЯ: Очередь публикаций по расписанию
+-- Версия: 008
+-- Дата: 2026-10-18
+-- ═══════════════════════════════════════════════════════════════
+
+-- Задание = один слот одного расписания. Уникальный ключ (schedule_id, slot_time)
+-- не даёт нескольким процессам бота опубликовать один слот дважды.
+CREATE TABLE IF NOT EXISTS publication_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    schedule_id INTEGER NOT NULL REFERENCES platform_schedules(id) ON DELETE CASCADE,
+    category_id INTEGER NOT NULL,
+    bot_id INTEGER,
+    user_id BIGINT,
+    platform_type VARCHAR(50) NOT NULL,
+    platform_id VARCHAR(255) NOT NULL,
+    slot_time TIMESTAMP NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_by VARCHAR(255),
+    lease_expires_at TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP,
+    CONSTRAINT publication_jobs_slot_unique UNIQUE (schedule_id, slot_time),
+    CONSTRAINT publication_jobs_status_check
+        CHECK (status IN ('pending', 'running', 'done', 'failed'))
+);
+
+-- Выборка готовых к запуску заданий (claim)
+CREATE INDEX IF NOT EXISTS idx_publication_jobs_ready
+ON publication_jobs(run_after)
+WHERE status = 'pending';
+
+-- Поиск заданий с истёкшей арендой (процесс упал во время публикации)
+CREATE INDEX IF NOT EXISTS idx_publication_jobs_lease
+ON publication_jobs(lease_expires_at)
+WHERE status = 'running';
+
+CREATE INDEX IF NOT EXISTS idx_publication_jobs_finished
+ON publication_jobs(finished_at)
+WHERE status IN ('done', 'failed');
+
+-- Комментарии
+COMMENT ON TABLE publication_jobs IS 'Очередь публикаций по расписанию (аренда через FOR UPDATE SKIP LOCKED)';
+COMMENT ON COLUMN publication_jobs.slot_time IS 'Слот расписания, ради которого создано задание';
+COMMENT ON COLUMN publication_jobs.status IS 'Статус (pending, running, done, failed)';
+COMMENT ON COLUMN publication_jobs.attempts IS 'Количество взятых в работу попыток';
+COMMENT ON COLUMN publication_jobs.run_after IS 'Не запускать раньше (экспоненциальная задержка повторов)';
+COMMENT ON COLUMN publication_jobs.locked_by IS 'Процесс, арендовавший задание (host:pid)';
+COMMENT ON COLUMN publication_jobs.lease_expires_at IS 'Окончание аренды; после него задание может взять другой процесс';
+
+-- Логируем результат
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'publication_jobs') THEN
+        RAISE NOTICE '✅ Таблица publication_jobs создана успешно';
+    ELSE
+        RAISE NOTICE '❌ Ошибка создания таблицы publication_jobs';
+    END IF;
+END $$;
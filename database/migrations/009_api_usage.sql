@@ -0,0 +1,60 @@
+-- ═══════════════════════════════════════════════════════════════
+-- МИГРАЦИЯ: Журнал использования внешних API и дневные сводки
+-- Версия: 009
+-- Дата: 2026-10-18
+-- ═══════════════════════════════════════════════════════════════
+
+-- Каждый вызов API (пишется пачками из utils/api_cost_tracker.py)
+CREATE TABLE IF NOT EXISTS api_usage (
+    id BIGSERIAL PRIMARY KEY,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    user_id BIGINT,
+    service VARCHAR(50) NOT NULL,
+    model VARCHAR(100) NOT NULL DEFAULT '',
+    operation VARCHAR(100) NOT NULL DEFAULT '',
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_write_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd NUMERIC(12, 6) NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_api_usage_created
+ON api_usage(created_at);
+
+CREATE INDEX IF NOT EXISTS idx_api_usage_user
+ON api_usage(user_id, created_at)
+WHERE user_id IS NOT NULL AND user_id <> 0;
+
+-- Предагрегированные сводки: отчёт за N дней читает не больше N строк
+-- на комбинацию (service, model, operation), независимо от объёма вызовов
+CREATE TABLE IF NOT EXISTS api_usage_daily (
+    day DATE NOT NULL,
+    service VARCHAR(50) NOT NULL,
+    model VARCHAR(100) NOT NULL DEFAULT '',
+    operation VARCHAR(100) NOT NULL DEFAULT '',
+    calls INTEGER NOT NULL DEFAULT 0,
+    input_tokens BIGINT NOT NULL DEFAULT 0,
+    output_tokens BIGINT NOT NULL DEFAULT 0,
+    cache_read_tokens BIGINT NOT NULL DEFAULT 0,
+    cache_write_tokens BIGINT NOT NULL DEFAULT 0,
+    cost_usd NUMERIC(14, 6) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, service, model, operation)
+);
+
+-- Комментарии
+COMMENT ON TABLE api_usage IS 'Журнал вызовов внешних API (Claude, Gemini и др.)';
+COMMENT ON COLUMN api_usage.cache_read_tokens IS 'Входные токены, прочитанные из кэша промпта';
+COMMENT ON COLUMN api_usage.cache_write_tokens IS 'Входные токены, записанные в кэш промпта';
+COMMENT ON COLUMN api_usage.cost_usd IS 'Расчётная стоимость вызова, USD';
+COMMENT ON TABLE api_usage_daily IS 'Дневные сводки api_usage (обновляются при каждой записи пачки)';
+
+-- Логируем результат
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'api_usage_daily') THEN
+        RAISE NOTICE '✅ Таблицы api_usage и api_usage_daily созданы успешно';
+    ELSE
+        RAISE NOTICE '❌ Ошибка создания таблиц api_usage';
+    END IF;
+END $$;
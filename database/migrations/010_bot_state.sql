@@ -0,0 +1,38 @@
+-- ═══════════════════════════════════════════════════════════════
+-- МИГРАЦИЯ: Хранилище состояний многошаговых диалогов
+-- Версия: 010
+-- Дата: 2026-10-18
+-- ═══════════════════════════════════════════════════════════════
+
+-- UNLOGGED: без WAL, запись дешевле; при аварийном рестарте PostgreSQL
+-- таблица очищается — для незавершённых диалогов это допустимо
+CREATE UNLOGGED TABLE IF NOT EXISTS bot_state (
+    namespace VARCHAR(50) NOT NULL,
+    key TEXT NOT NULL,
+    value BYTEA NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (namespace, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_bot_state_expires
+ON bot_state(namespace, expires_at);
+
+CREATE INDEX IF NOT EXISTS idx_bot_state_updated
+ON bot_state(namespace, updated_at);
+
+-- Комментарии
+COMMENT ON TABLE bot_state IS 'Состояния диалогов бота (utils/state_store.py), общие для всех процессов';
+COMMENT ON COLUMN bot_state.namespace IS 'Имя хранилища: keywords, media_upload, admin_broadcast и т.д.';
+COMMENT ON COLUMN bot_state.key IS 'Ключ в JSON (user_id или строковый ключ)';
+COMMENT ON COLUMN bot_state.value IS 'Сериализованное состояние (pickle)';
+
+-- Логируем результат
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'bot_state') THEN
+        RAISE NOTICE '✅ Таблица bot_state создана успешно';
+    ELSE
+        RAISE NOTICE '❌ Ошибка создания таблицы bot_state';
+    END IF;
+END $$;
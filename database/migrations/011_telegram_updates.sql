@@ -0,0 +1,58 @@
+-- ═══════════════════════════════════════════════════════════════
+-- МИГРАЦИЯ: Очередь входящих обновлений Telegram (режим webhook)
+-- Версия: 011
+-- Дата: 2026-10-18
+-- ═══════════════════════════════════════════════════════════════
+
+-- Обновление, принятое webhook-сервером. update_id — ключ Telegram:
+-- повторная доставка того же обновления не создаёт дубль.
+CREATE TABLE IF NOT EXISTS telegram_updates (
+    update_id BIGINT PRIMARY KEY,
+    chat_id BIGINT NOT NULL,
+    payload TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    received_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP,
+    processed_by VARCHAR(255),
+    error TEXT,
+    CONSTRAINT telegram_updates_status_check
+        CHECK (status IN ('queued', 'done', 'failed'))
+);
+
+-- Самые старые ожидающие обновления (выбор следующего чата)
+CREATE INDEX IF NOT EXISTS idx_telegram_updates_queued
+ON telegram_updates(update_id)
+WHERE status = 'queued';
+
+-- Очередь одного чата в порядке update_id
+CREATE INDEX IF NOT EXISTS idx_telegram_updates_chat_queued
+ON telegram_updates(chat_id, update_id)
+WHERE status = 'queued';
+
+CREATE INDEX IF NOT EXISTS idx_telegram_updates_processed
+ON telegram_updates(processed_at)
+WHERE status IN ('done', 'failed');
+
+-- Аренда чата воркером: пока она действует, обновления этого чата
+-- обрабатывает только один воркер (сохраняется порядок внутри чата)
+CREATE UNLOGGED TABLE IF NOT EXISTS telegram_chat_leases (
+    chat_id BIGINT PRIMARY KEY,
+    locked_by VARCHAR(255) NOT NULL,
+    lease_expires_at TIMESTAMP NOT NULL
+);
+
+-- Комментарии
+COMMENT ON TABLE telegram_updates IS 'Очередь обновлений Telegram: webhook пишет, воркеры (BOT_MODE=webhook) обрабатывают';
+COMMENT ON COLUMN telegram_updates.chat_id IS 'Чат обновления (ключ упорядочивания)';
+COMMENT ON COLUMN telegram_updates.payload IS 'JSON обновления как его прислал Telegram';
+COMMENT ON TABLE telegram_chat_leases IS 'Аренда чатов воркерами очереди telegram_updates';
+
+-- Логируем результат
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'telegram_updates') THEN
+        RAISE NOTICE '✅ Таблицы telegram_updates и telegram_chat_leases созданы успешно';
+    ELSE
+        RAISE NOTICE '❌ Ошибка создания таблицы telegram_updates';
+    END IF;
+END $$;
@@ -0,0 +1,65 @@
+-- ═══════════════════════════════════════════════════════════════
+-- МИГРАЦИЯ: Рассылки с сохранённым курсором получателей
+-- Версия: 012
+-- Дата: 2026-10-18
+-- ═══════════════════════════════════════════════════════════════
+
+-- Рассылка: исходное сообщение, счётчики и курсор. После рестарта
+-- процесс с истёкшей арендой продолжает с cursor_user_id.
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id SERIAL PRIMARY KEY,
+    admin_id BIGINT NOT NULL,
+    audience VARCHAR(20) NOT NULL,
+    source_chat_id BIGINT NOT NULL,
+    source_message_id BIGINT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    total INTEGER NOT NULL DEFAULT 0,
+    sent INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    blocked INTEGER NOT NULL DEFAULT 0,
+    cursor_user_id BIGINT NOT NULL DEFAULT 0,
+    status_chat_id BIGINT,
+    status_message_id BIGINT,
+    locked_by VARCHAR(255),
+    lease_expires_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP,
+    CONSTRAINT broadcasts_status_check
+        CHECK (status IN ('running', 'done', 'cancelled'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_broadcasts_running
+ON broadcasts(lease_expires_at)
+WHERE status = 'running';
+
+-- Снимок аудитории на момент запуска; обход по user_id
+CREATE TABLE IF NOT EXISTS broadcast_recipients (
+    broadcast_id INTEGER NOT NULL REFERENCES broadcasts(id) ON DELETE CASCADE,
+    user_id BIGINT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    error TEXT,
+    PRIMARY KEY (broadcast_id, user_id)
+);
+
+-- Пользователи, заблокировавшие бота, исключаются из следующих рассылок
+-- (флаг снимается, когда пользователь снова пишет /start)
+ALTER TABLE users ADD COLUMN IF NOT EXISTS is_blocked BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS blocked_at TIMESTAMP;
+
+-- Комментарии
+COMMENT ON TABLE broadcasts IS 'Рассылки из админ-панели (utils/broadcast_engine.py)';
+COMMENT ON COLUMN broadcasts.cursor_user_id IS 'Последний user_id, результат которого записан в БД';
+COMMENT ON COLUMN broadcasts.blocked IS 'Получатели, заблокировавшие бота (403)';
+COMMENT ON TABLE broadcast_recipients IS 'Получатели рассылки и результат доставки (sent, failed, blocked)';
+COMMENT ON COLUMN users.is_blocked IS 'Пользователь заблокировал бота (по ответу Telegram при рассылке)';
+
+-- Логируем результат
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'broadcast_recipients') THEN
+        RAISE NOTICE '✅ Таблицы broadcasts и broadcast_recipients созданы успешно';
+    ELSE
+        RAISE NOTICE '❌ Ошибка создания таблиц рассылок';
+    END IF;
+END $$;
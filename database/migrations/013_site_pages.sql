@@ -0,0 +1,51 @@
+-- ═══════════════════════════════════════════════════════════════
+-- МИГРАЦИЯ: Индекс страниц сайтов (результаты краулера)
+-- Версия: 013
+-- Дата: 2026-10-18
+-- ═══════════════════════════════════════════════════════════════
+
+-- Страницы сайта, найденные краулером. Повторный обход проверяет только
+-- изменившиеся страницы: lastmod из sitemap, ETag / Last-Modified, хэш HTML.
+CREATE TABLE IF NOT EXISTS site_pages (
+    site_url TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT,
+    priority SMALLINT NOT NULL DEFAULT 1,
+    etag TEXT,
+    last_modified TEXT,
+    sitemap_lastmod TEXT,
+    content_hash VARCHAR(40),
+    links JSONB NOT NULL DEFAULT '[]'::jsonb,
+    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (site_url, url)
+);
+
+CREATE INDEX IF NOT EXISTS idx_site_pages_priority
+ON site_pages(site_url, priority DESC);
+
+-- Сводка по сайту: цвета оформления и время последнего обхода
+CREATE TABLE IF NOT EXISTS site_profiles (
+    site_url TEXT PRIMARY KEY,
+    colors JSONB,
+    colors_detected_at TIMESTAMP,
+    pages_total INTEGER NOT NULL DEFAULT 0,
+    crawled_at TIMESTAMP
+);
+
+-- Комментарии
+COMMENT ON TABLE site_pages IS 'Страницы сайтов для внутренней перелинковки (utils/site_index.py)';
+COMMENT ON COLUMN site_pages.site_url IS 'Нормализованный URL сайта (utils.site_index.site_key)';
+COMMENT ON COLUMN site_pages.links IS 'Внутренние ссылки страницы — для обхода без повторной загрузки';
+COMMENT ON COLUMN site_pages.content_hash IS 'SHA-1 HTML страницы при последней загрузке';
+COMMENT ON TABLE site_profiles IS 'Цвета сайта и статистика последнего обхода';
+
+-- Логируем результат
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'site_pages') THEN
+        RAISE NOTICE '✅ Таблицы site_pages и site_profiles созданы успешно';
+    ELSE
+        RAISE NOTICE '❌ Ошибка создания таблиц индекса сайтов';
+    END IF;
+END $$;
@@ -0,0 +1,27 @@
+-- ═══════════════════════════════════════════════════════════════
+-- МИГРАЦИЯ: Термы страниц сайта для подбора внутренних ссылок (BM25)
+-- Версия: 014
+-- Дата: 2026-10-18
+-- ═══════════════════════════════════════════════════════════════
+
+-- Взвешенные частоты основ слов страницы (title ×3, h1-h3 ×2, текст ×1);
+-- страницы без terms краулер при следующем обходе загружает заново
+ALTER TABLE site_pages ADD COLUMN IF NOT EXISTS terms JSONB;
+ALTER TABLE site_pages ADD COLUMN IF NOT EXISTS doc_length INTEGER NOT NULL DEFAULT 0;
+
+-- Комментарии
+COMMENT ON COLUMN site_pages.terms IS 'Основа слова → вес (utils/text_relevance.page_terms)';
+COMMENT ON COLUMN site_pages.doc_length IS 'Сумма весов terms (длина документа для BM25)';
+
+-- Логируем результат
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'site_pages' AND column_name = 'terms'
+    ) THEN
+        RAISE NOTICE '✅ Колонки terms и doc_length добавлены в site_pages';
+    ELSE
+        RAISE NOTICE '❌ Ошибка добавления колонок terms в site_pages';
+    END IF;
+END $$;
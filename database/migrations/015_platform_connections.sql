@@ -0,0 +1,188 @@
+-- ═══════════════════════════════════════════════════════════════
+-- МИГРАЦИЯ: Подключения площадок в отдельной таблице
+-- Версия: 015
+-- Дата: 2026-10-18
+-- ═══════════════════════════════════════════════════════════════
+
+-- Одна строка — одно подключение из users.platform_connections
+-- (websites, telegrams, pinterests, vks, instagrams). position — индекс
+-- элемента в массиве JSONB: по нему площадку адресуют callback_data и
+-- расписания (platform_schedules.platform_id).
+CREATE TABLE IF NOT EXISTS platform_connections (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    type VARCHAR(20) NOT NULL,
+    position INTEGER NOT NULL,
+    external_id TEXT,
+    status VARCHAR(20) NOT NULL DEFAULT 'active',
+    credentials_ref TEXT,
+    settings JSONB NOT NULL DEFAULT '{}'::jsonb,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT platform_connections_position_unique UNIQUE (user_id, type, position)
+);
+
+-- Поиск владельца площадки (уникальность Pinterest / VK, вебхуки)
+CREATE INDEX IF NOT EXISTS idx_platform_connections_external
+ON platform_connections(type, external_id);
+
+-- Поиск площадки пользователя по URL / ID канала
+CREATE INDEX IF NOT EXISTS idx_platform_connections_user_external
+ON platform_connections(user_id, type, external_id);
+
+-- ───────────────────────────────────────────────────────────────
+-- Внешний ID площадки
+-- ───────────────────────────────────────────────────────────────
+
+-- Нормализация идентификатора: сайты — без регистра и завершающего /,
+-- имена Pinterest / Instagram — без регистра
+CREATE OR REPLACE FUNCTION platform_connection_key(p_type TEXT, p_value TEXT)
+RETURNS TEXT LANGUAGE sql IMMUTABLE AS $$
+    SELECT NULLIF(CASE
+        WHEN p_type = 'websites' THEN lower(rtrim(btrim(p_value), '/'))
+        WHEN p_type IN ('pinterests', 'instagrams') THEN lower(btrim(p_value))
+        ELSE btrim(p_value)
+    END, '')
+$$;
+
+-- URL сайта, ID канала Telegram, имя Pinterest / Instagram,
+-- ID группы VK (отрицательный) или личной страницы VK
+CREATE OR REPLACE FUNCTION platform_connection_external_id(p_type TEXT, p_settings JSONB)
+RETURNS TEXT LANGUAGE sql IMMUTABLE AS $$
+    SELECT platform_connection_key(p_type, CASE p_type
+        WHEN 'websites' THEN p_settings->>'url'
+        WHEN 'telegrams' THEN COALESCE(p_settings->>'channel_id', p_settings->>'channel')
+        WHEN 'pinterests' THEN p_settings->>'username'
+        WHEN 'vks' THEN COALESCE(p_settings->>'group_id', p_settings->>'user_id', p_settings->>'id')
+        WHEN 'instagrams' THEN COALESCE(p_settings->>'username', p_settings->>'user_id')
+    END)
+$$;
+
+-- Где лежит секрет подключения. Пока все секреты хранятся в settings:
+-- 'settings:<ключ>'; NULL — подключение без учётных данных
+CREATE OR REPLACE FUNCTION platform_connection_credentials_ref(p_settings JSONB)
+RETURNS TEXT LANGUAGE sql IMMUTABLE AS $$
+    SELECT 'settings:' || key
+    FROM unnest(ARRAY['access_token', 'bot_token', 'token', 'password']) WITH ORDINALITY AS k(key, n)
+    WHERE COALESCE(p_settings->>key, '') <> ''
+    ORDER BY n
+    LIMIT 1
+$$;
+
+-- Элементы массивов платформ из users.platform_connections
+-- (служебные ключи вида _pinterest_oauth_state и одиночные объекты
+-- старого формата не переносятся)
+CREATE OR REPLACE FUNCTION platform_connection_items(p_connections JSONB)
+RETURNS TABLE(platform_type TEXT, item_index INTEGER, settings JSONB) LANGUAGE sql IMMUTABLE AS $$
+    SELECT platforms.key, (items.n - 1)::integer, items.value
+    FROM jsonb_each(CASE WHEN jsonb_typeof(p_connections) = 'object'
+                         THEN p_connections ELSE '{}'::jsonb END) AS platforms
+    CROSS JOIN LATERAL jsonb_array_elements(CASE WHEN jsonb_typeof(platforms.value) = 'array'
+                                                 THEN platforms.value ELSE '[]'::jsonb END)
+        WITH ORDINALITY AS items(value, n)
+    WHERE platforms.key IN ('websites', 'telegrams', 'pinterests', 'vks', 'instagrams')
+      AND jsonb_typeof(items.value) = 'object'
+$$;
+
+-- ───────────────────────────────────────────────────────────────
+-- Триггеры
+-- ───────────────────────────────────────────────────────────────
+
+-- Производные колонки всегда считаются из settings
+CREATE OR REPLACE FUNCTION platform_connections_derive() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.external_id := platform_connection_external_id(NEW.type, NEW.settings);
+    NEW.status := COALESCE(NULLIF(NEW.settings->>'status', ''), 'active');
+    NEW.credentials_ref := platform_connection_credentials_ref(NEW.settings);
+    NEW.updated_at := CURRENT_TIMESTAMP;
+    RETURN NEW;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_platform_connections_derive ON platform_connections;
+CREATE TRIGGER trg_platform_connections_derive
+BEFORE INSERT OR UPDATE ON platform_connections
+FOR EACH ROW EXECUTE FUNCTION platform_connections_derive();
+
+-- Код, который пишет users.platform_connections целиком, продолжает
+-- работать: изменённые элементы переносятся в таблицу, удалённые — удаляются
+CREATE OR REPLACE FUNCTION users_sync_platform_connections() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF pg_trigger_depth() > 1 THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'UPDATE' AND NEW.platform_connections IS NOT DISTINCT FROM OLD.platform_connections THEN
+        RETURN NULL;
+    END IF;
+
+    DELETE FROM platform_connections pc
+    WHERE pc.user_id = NEW.id
+      AND NOT EXISTS (
+          SELECT 1 FROM platform_connection_items(NEW.platform_connections) items
+          WHERE items.platform_type = pc.type AND items.item_index = pc.position
+      );
+
+    INSERT INTO platform_connections (user_id, type, position, settings)
+    SELECT NEW.id, items.platform_type, items.item_index, items.settings
+    FROM platform_connection_items(NEW.platform_connections) items
+    ON CONFLICT (user_id, type, position) DO UPDATE SET settings = EXCLUDED.settings
+    WHERE platform_connections.settings IS DISTINCT FROM EXCLUDED.settings;
+
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_users_sync_platform_connections ON users;
+CREATE TRIGGER trg_users_sync_platform_connections
+AFTER INSERT OR UPDATE OF platform_connections ON users
+FOR EACH ROW EXECUTE FUNCTION users_sync_platform_connections();
+
+-- Точечное изменение строки (db.update_platform_connection) отражается
+-- в JSONB пользователя для кода, который ещё читает users.platform_connections
+CREATE OR REPLACE FUNCTION platform_connections_sync_user() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF pg_trigger_depth() > 1 OR NEW.settings IS NOT DISTINCT FROM OLD.settings THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE users
+    SET platform_connections = jsonb_set(
+        platform_connections, ARRAY[NEW.type, NEW.position::text], NEW.settings, false
+    )
+    WHERE id = NEW.user_id;
+
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_platform_connections_sync_user ON platform_connections;
+CREATE TRIGGER trg_platform_connections_sync_user
+AFTER UPDATE ON platform_connections
+FOR EACH ROW EXECUTE FUNCTION platform_connections_sync_user();
+
+-- ───────────────────────────────────────────────────────────────
+-- Перенос существующих подключений
+-- ───────────────────────────────────────────────────────────────
+
+INSERT INTO platform_connections (user_id, type, position, settings)
+SELECT u.id, items.platform_type, items.item_index, items.settings
+FROM users u
+CROSS JOIN LATERAL platform_connection_items(u.platform_connections) items
+ON CONFLICT (user_id, type, position) DO UPDATE SET settings = EXCLUDED.settings;
+
+-- Комментарии
+COMMENT ON TABLE platform_connections IS 'Подключения площадок пользователей (синхронизируются с users.platform_connections)';
+COMMENT ON COLUMN platform_connections.type IS 'Ключ массива в users.platform_connections: websites, telegrams, pinterests, vks, instagrams';
+COMMENT ON COLUMN platform_connections.position IS 'Индекс элемента в массиве JSONB (platform_id в callback_data и расписаниях)';
+COMMENT ON COLUMN platform_connections.external_id IS 'Нормализованный ID площадки (platform_connection_key)';
+COMMENT ON COLUMN platform_connections.credentials_ref IS 'Где хранится секрет подключения, например settings:access_token';
+
+-- Логируем результат
+DO $$
+DECLARE
+    migrated INTEGER;
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'platform_connections') THEN
+        SELECT COUNT(*) INTO migrated FROM platform_connections;
+        RAISE NOTICE '✅ Таблица platform_connections создана, перенесено подключений: %', migrated;
+    ELSE
+        RAISE NOTICE '❌ Ошибка создания таблицы platform_connections';
+    END IF;
+END $$;
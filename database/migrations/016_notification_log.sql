@@ -0,0 +1,49 @@
+-- ═══════════════════════════════════════════════════════════════
+-- МИГРАЦИЯ: Журнал автоматических уведомлений
+-- Версия: 016
+-- Дата: 2026-10-18
+-- ═══════════════════════════════════════════════════════════════
+
+-- Каждое уведомление пользователю (low_balance, reactivation,
+-- weekly_news). Получатели выбираются одним запросом с anti-join по
+-- журналу: кто получил уведомление этого типа в пределах паузы
+-- (NOTIFICATION_COOLDOWNS), не выбирается снова. Строка создаётся
+-- со статусом pending до отправки, результат записывается пачкой.
+CREATE TABLE IF NOT EXISTS notification_log (
+    id BIGSERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    notification_type VARCHAR(30) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP,
+    CONSTRAINT notification_log_status_check
+        CHECK (status IN ('pending', 'sent', 'failed', 'blocked'))
+);
+
+-- Anti-join: последнее уведомление типа у пользователя
+CREATE INDEX IF NOT EXISTS idx_notification_log_user_type
+ON notification_log(user_id, notification_type, created_at DESC);
+
+-- Два процесса не выберут одного получателя одновременно
+CREATE UNIQUE INDEX IF NOT EXISTS idx_notification_log_pending
+ON notification_log(user_id, notification_type)
+WHERE status = 'pending';
+
+-- Очистка старых записей
+CREATE INDEX IF NOT EXISTS idx_notification_log_created
+ON notification_log(created_at);
+
+-- Комментарии
+COMMENT ON TABLE notification_log IS 'Автоматические уведомления пользователям (utils/notification_engine.py)';
+COMMENT ON COLUMN notification_log.status IS 'pending — выбран для отправки; sent, failed (повтор при следующем запуске), blocked';
+
+-- Логируем результат
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'notification_log') THEN
+        RAISE NOTICE '✅ Таблица notification_log создана успешно';
+    ELSE
+        RAISE NOTICE '❌ Ошибка создания таблицы notification_log';
+    END IF;
+END $$;
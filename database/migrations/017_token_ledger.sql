@@ -0,0 +1,59 @@
+-- ═══════════════════════════════════════════════════════════════
+-- МИГРАЦИЯ: Журнал списаний токенов с резервами и возвратами
+-- Версия: 017
+-- Дата: 2026-10-18
+-- ═══════════════════════════════════════════════════════════════
+
+-- token_expenses создавалась в двух вариантах: 003 (operation_type,
+-- description) и schema.sql (action, bot_id, category_id). Приводим
+-- к колонкам, которые пишет бот.
+ALTER TABLE token_expenses ADD COLUMN IF NOT EXISTS action VARCHAR(255);
+ALTER TABLE token_expenses ADD COLUMN IF NOT EXISTS bot_id INTEGER;
+ALTER TABLE token_expenses ADD COLUMN IF NOT EXISTS category_id INTEGER;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_name = 'token_expenses' AND column_name = 'operation_type') THEN
+        ALTER TABLE token_expenses ALTER COLUMN operation_type DROP NOT NULL;
+        UPDATE token_expenses SET action = operation_type WHERE action IS NULL;
+    END IF;
+END $$;
+
+-- Статус операции: списание сразу (committed) или резерв на время
+-- генерации (reserved), который подтверждается или возвращается (refunded)
+ALTER TABLE token_expenses ADD COLUMN IF NOT EXISTS status VARCHAR(20) NOT NULL DEFAULT 'committed';
+ALTER TABLE token_expenses ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'token_expenses_status_check') THEN
+        ALTER TABLE token_expenses ADD CONSTRAINT token_expenses_status_check
+            CHECK (status IN ('reserved', 'committed', 'refunded'));
+    END IF;
+END $$;
+
+-- Поиск резерва пользователя (выбор топика Telegram, отмена)
+CREATE INDEX IF NOT EXISTS idx_token_expenses_user_reserved
+ON token_expenses(user_id, action, category_id)
+WHERE status = 'reserved';
+
+-- Возврат брошенных резервов (процесс остановился во время генерации):
+-- updated_at резервов живых генераций периодически обновляется
+CREATE INDEX IF NOT EXISTS idx_token_expenses_reserved_seen
+ON token_expenses((COALESCE(updated_at, created_at)))
+WHERE status = 'reserved';
+
+-- Комментарии
+COMMENT ON COLUMN token_expenses.status IS 'committed — списано; reserved — резерв на время генерации; refunded — возвращено';
+
+-- Логируем результат
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_name = 'token_expenses' AND column_name = 'status') THEN
+        RAISE NOTICE '✅ Журнал token_expenses обновлён успешно';
+    ELSE
+        RAISE NOTICE '❌ Ошибка обновления token_expenses';
+    END IF;
+END $$;
@@ -0,0 +1,60 @@
+-- ═══════════════════════════════════════════════════════════════
+-- МИГРАЦИЯ: Ключевые фразы категорий в отдельной таблице
+-- Версия: 018
+-- Дата: 2026-10-18
+-- ═══════════════════════════════════════════════════════════════
+
+-- Одна строка — одна фраза. Дубликаты отсекает уникальный индекс по
+-- нормализованному тексту (регистр, пробелы по краям, повторные
+-- пробелы), порядок добавления — id. usage_count / last_used_at —
+-- сколько раз и когда фраза выбиралась темой статьи; следующей
+-- выбирается давно не использованная (Database.pick_category_keyword).
+CREATE TABLE IF NOT EXISTS category_keywords (
+    id BIGSERIAL PRIMARY KEY,
+    category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    keyword TEXT NOT NULL,
+    keyword_norm TEXT GENERATED ALWAYS AS (
+        lower(regexp_replace(btrim(keyword), '\s+', ' ', 'g'))
+    ) STORED,
+    usage_count INTEGER NOT NULL DEFAULT 0,
+    last_used_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Дедупликация (ON CONFLICT) и подсчёт фраз категории
+CREATE UNIQUE INDEX IF NOT EXISTS idx_category_keywords_norm
+ON category_keywords(category_id, keyword_norm);
+
+-- Выбор давно не использованной фразы
+CREATE INDEX IF NOT EXISTS idx_category_keywords_lru
+ON category_keywords(category_id, last_used_at NULLS FIRST, id);
+
+-- Переносим фразы из categories.keywords (JSONB-массив) в порядке массива
+INSERT INTO category_keywords (category_id, keyword)
+SELECT c.id, btrim(k.keyword)
+FROM categories c
+CROSS JOIN LATERAL jsonb_array_elements_text(c.keywords) WITH ORDINALITY AS k(keyword, n)
+WHERE jsonb_typeof(c.keywords) = 'array'
+    -- 500 = KEYWORD_MAX_LENGTH (database.py): длиннее не помещается в индекс
+    AND char_length(btrim(k.keyword)) BETWEEN 1 AND 500
+ORDER BY c.id, k.n
+ON CONFLICT (category_id, keyword_norm) DO NOTHING;
+
+-- Источник фраз — category_keywords; старый массив больше не ведётся
+UPDATE categories SET keywords = '[]'::jsonb
+WHERE jsonb_typeof(keywords) = 'array' AND keywords <> '[]'::jsonb;
+
+-- Комментарии
+COMMENT ON TABLE category_keywords IS 'Ключевые фразы категорий (вместо categories.keywords)';
+COMMENT ON COLUMN category_keywords.keyword_norm IS 'Нормализованный текст для дедупликации';
+COMMENT ON COLUMN category_keywords.last_used_at IS 'Последний выбор фразы темой статьи (NULL — не использовалась)';
+
+-- Логируем результат
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'category_keywords') THEN
+        RAISE NOTICE '✅ Таблица category_keywords создана успешно';
+    ELSE
+        RAISE NOTICE '❌ Ошибка создания таблицы category_keywords';
+    END IF;
+END $$;
@@ -0,0 +1,19 @@
+-- ═══════════════════════════════════════════════════════════════
+-- МИГРАЦИЯ: Состояния диалогов в JSON вместо pickle
+-- Версия: 019
+-- Дата: 2026-10-18
+-- ═══════════════════════════════════════════════════════════════
+
+-- utils/state_store.py больше не читает pickle: значение из таблицы
+-- не должно исполнять код. Старые записи удаляем — это незавершённые
+-- диалоги, пользователь начнёт действие заново
+DELETE FROM bot_state;
+
+-- Комментарии
+COMMENT ON COLUMN bot_state.value IS 'Состояние в JSON (UTF-8)';
+
+-- Логируем результат
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Таблица bot_state переведена на JSON';
+END $$;
@@ -0,0 +1,258 @@
+"""
+Потокобезопасный пул соединений PostgreSQL (psycopg3 / psycopg2)
+"""
+# Совместимость с psycopg2 (локально) и psycopg3 (Render.com)
+try:
+    import psycopg
+    PSYCOPG_VERSION = 3
+except ImportError:
+    import psycopg2 as psycopg
+    PSYCOPG_VERSION = 2
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeout(psycopg.OperationalError):
+    """Не удалось получить соединение из пула за отведённое время"""
+
+
+class ConnectionPool:
+    """
+    Ограниченный пул соединений.
+
+    Соединения создаются лениво до max_size, свободные хранятся в deque (LIFO,
+    чтобы «тёплые» соединения использовались чаще). Перед выдачей соединение,
+    простоявшее дольше check_idle секунд, проверяется через SELECT 1 —
+    Neon.tech закрывает неактивные соединения.
+    """
+
+    def __init__(self, dsn, min_size=1, max_size=10, timeout=30.0, check_idle=300):
+        self.dsn = dsn
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.timeout = timeout
+        self.check_idle = check_idle
+
+        self._idle = deque()  # (conn, last_used)
+        self._waiters = deque()
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.stats = {
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+        }
+
+        for _ in range(self.min_size):
+            self._idle.append((self._connect(), time.time()))
+            self._size += 1
+
+    # ─────────────────────────────────────────────────────────────
+    # Соединения
+    # ─────────────────────────────────────────────────────────────
+
+    def _connect(self):
+        """Создать новое соединение (без autocommit, как и раньше)"""
+        conn = psycopg.connect(self.dsn)
+        conn.autocommit = False
+        self.stats['connections_created'] += 1
+        return conn
+
+    @staticmethod
+    def is_usable(conn):
+        """Соединение не закрыто и не помечено как сломанное"""
+        if conn is None or conn.closed:
+            return False
+        return not getattr(conn, 'broken', False)
+
+    def _is_alive(self, conn, last_used):
+        """Проверка соединения перед выдачей"""
+        if not self.is_usable(conn):
+            return False
+        if time.time() - last_used <= self.check_idle:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def getconn(self, timeout=None):
+        """
+        Взять соединение из пула.
+
+        Ожидающие потоки обслуживаются по очереди (FIFO): освободившееся
+        соединение передаётся первому ожидающему напрямую.
+
+        Raises:
+            PoolTimeout: если все max_size соединений заняты дольше timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        waiter = None
+
+        with self._lock:
+            if self._closed:
+                raise psycopg.InterfaceError("Пул соединений закрыт")
+
+            if self._idle and not self._waiters:
+                conn, last_used = self._idle.pop()
+            elif self._size < self.max_size:
+                self._size += 1
+                conn, last_used = None, None
+            else:
+                self.stats['waits'] += 1
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+
+        if waiter is not None:
+            if not waiter.event.wait(timeout):
+                with self._lock:
+                    if not waiter.granted:
+                        self._waiters.remove(waiter)
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f"Нет свободных соединений в пуле за {timeout} с "
+                            f"(max_size={self.max_size})"
+                        )
+            if not waiter.granted:
+                raise psycopg.InterfaceError("Пул соединений закрыт")
+            # conn=None означает, что ожидающему передан слот под новое соединение
+            conn, last_used = waiter.conn, waiter.last_used
+
+        # Сетевые операции выполняем вне блокировки
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._release_slot()
+                raise
+        elif not self._is_alive(conn, last_used):
+            self._close_quietly(conn)
+            self.stats['connections_discarded'] += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                self._release_slot()
+                raise
+
+        self.stats['checkouts'] += 1
+        return conn
+
+    def putconn(self, conn):
+        """Вернуть соединение в пул (незавершённая транзакция откатывается)"""
+        if conn is None:
+            return
+
+        usable = self.is_usable(conn)
+        if usable:
+            try:
+                conn.rollback()
+            except Exception:
+                usable = False
+
+        if not usable or self._closed:
+            self._close_quietly(conn)
+            self.stats['connections_discarded'] += 1
+            self._release_slot()
+            return
+
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().grant(conn, time.time())
+            else:
+                self._idle.append((conn, time.time()))
+
+    def _release_slot(self):
+        """Освободить слот: первый ожидающий создаст новое соединение"""
+        with self._lock:
+            if self._waiters and not self._closed:
+                self._waiters.popleft().grant(None, None)
+            else:
+                self._size -= 1
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Контекстный менеджер: commit при успехе, rollback при ошибке,
+        соединение всегда возвращается в пул.
+        """
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+            if self.is_usable(conn):
+                conn.commit()
+        except Exception:
+            try:
+                if self.is_usable(conn):
+                    conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            self.putconn(conn)
+
+    # ─────────────────────────────────────────────────────────────
+    # Служебное
+    # ─────────────────────────────────────────────────────────────
+
+    def get_stats(self):
+        """Снимок состояния пула для мониторинга"""
+        with self._lock:
+            idle = len(self._idle)
+            size = self._size
+        return {
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+            'max_size': self.max_size,
+            **self.stats,
+        }
+
+    def close(self):
+        """Закрыть все свободные соединения; занятые закроются при возврате"""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            waiters = list(self._waiters)
+            self._waiters.clear()
+        for waiter in waiters:
+            waiter.event.set()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+
+class _Waiter:
+    """Поток, ожидающий соединение"""
+
+    __slots__ = ('event', 'granted', 'conn', 'last_used')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+        self.conn = None
+        self.last_used = None
+
+    def grant(self, conn, last_used):
+        self.granted = True
+        self.conn = conn
+        self.last_used = last_used
+        self.event.set()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Конфигурация gunicorn для Flask-серверов
+
+    gunicorn -c gunicorn.conf.py oauth_server:app
+    gunicorn -c gunicorn.conf.py vk_webhook:app
+    gunicorn -c gunicorn.conf.py telegram_webhook:app
+
+WEB_WORKERS процессов по WEB_THREADS потоков (gthread): OAuth-callback'и
+большую часть времени ждут Pinterest / VK API, поэтому потоки дешевле
+процессов. У каждого процесса свой пул соединений с БД
+(database/flask_db.py), всего к Neon до WEB_WORKERS × DB_POOL_MAX_SIZE
+соединений.
+"""
+import os
+from config import WEB_WORKERS, WEB_THREADS, WEB_TIMEOUT, DB_POOL_MAX_SIZE
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = WEB_WORKERS
+worker_class = 'gthread'
+threads = WEB_THREADS
+timeout = WEB_TIMEOUT
+graceful_timeout = 30
+keepalive = 5
+
+# Пул соединений создаётся при импорте database.database — в каждом
+# воркере после fork; с preload_app соединения мастера делили бы процессы
+preload_app = False
+
+# Перезапуск воркеров против утечек памяти
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = '-'
+errorlog = '-'
+
+if WEB_THREADS > DB_POOL_MAX_SIZE:
+    print(f"⚠️ WEB_THREADS={WEB_THREADS} больше DB_POOL_MAX_SIZE={DB_POOL_MAX_SIZE}: "
+          f"часть потоков будет ждать соединение из пула")
@@ -4,9 +4,12 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from config import ADMIN_ID
 from utils import escape_html
+from utils.state_store import StateStore
+from utils.broadcast_engine import get_broadcast_engine
 
 
 # --- ГЛАВНАЯ ПАНЕЛЬ (ОБНОВЛЕННАЯ) ---
@@ -142,7 +145,7 @@ def admin_panel(message):
 # ВСПОМОГАТЕЛЬНЫЕ ОБРАБОТЧИКИ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data == "back_to_admin")
+@router.exact("back_to_admin")
 def back_to_admin(call):
     """Возврат в главное меню админки"""
     bot.delete_message(call.message.chat.id, call.message.message_id)
@@ -155,7 +158,7 @@ def back_to_admin(call):
     admin_panel(fake_msg)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "admin_api_costs")
+@router.exact("admin_api_costs")
 def admin_api_costs(call):
     """Показать статистику затрат на API"""
     user_id = call.from_user.id
@@ -166,7 +169,8 @@ def admin_api_costs(call):
     
     try:
         from utils.api_cost_tracker import format_costs_report
-        text = format_costs_report(30)
+        from ai.prompt_cache import format_prompt_cache_stats
+        text = format_costs_report(30) + format_prompt_cache_stats()
     except Exception as e:
         text = f"💵 <b>ЗАТРАТЫ НА API</b>\n\n⚠️ Ошибка: {e}\n\n<i>Данные начнут собираться после следующих запросов к API.</i>"
     
@@ -191,7 +195,7 @@ def admin_api_costs(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("admin_api_costs_"))
+@router.prefix("admin_api_costs_")
 def admin_api_costs_period(call):
     """Показать затраты за выбранный период"""
     user_id = call.from_user.id
@@ -204,7 +208,8 @@ def admin_api_costs_period(call):
     
     try:
         from utils.api_cost_tracker import format_costs_report
-        text = format_costs_report(days)
+        from ai.prompt_cache import format_prompt_cache_stats
+        text = format_costs_report(days) + format_prompt_cache_stats()
     except Exception as e:
         text = f"💵 <b>ЗАТРАТЫ НА API ({days} дней)</b>\n\n⚠️ Ошибка: {e}"
     
@@ -234,7 +239,129 @@ print("✅ handlers/admin/admin_main.py загружен")
 # МОНИТОРИНГ СИСТЕМ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data == "admin_system_monitor")
+def format_db_pool_cache_stats(db_status):
+    """Строки мониторинга: пул соединений и кэш сущностей БД"""
+    pool = db_status.get('pool')
+    cache = db_status.get('cache')
+    lines = ""
+    
+    if pool:
+        lines += (
+            f"   └─ Пул: <code>{pool['in_use']}/{pool['size']}</code> занято "
+            f"(макс. {pool['max_size']}, ожиданий: {pool['waits']}, таймаутов: {pool['timeouts']})\n"
+        )
+    
+    if cache:
+        if cache['enabled']:
+            lines += (
+                f"   └─ Кэш: <code>{cache['hit_rate']:.1f}%</code> попаданий "
+                f"({cache['hits']} / {cache['misses']} промахов, записей: {cache['size']})\n"
+                f"   └─ Сэкономлено БД: <code>~{cache['saved_seconds']:.1f} с</code> "
+                f"(средний запрос {cache['avg_load_ms']:.0f} мс)\n"
+            )
+        else:
+            lines += "   └─ Кэш: выключен\n"
+    
+    return lines
+
+
+def format_publication_stats():
+    """Блок мониторинга: очередь и выполняющиеся автопубликации"""
+    try:
+        from handlers.auto_publish_scheduler import auto_publish_scheduler
+        stats = auto_publish_scheduler.get_stats()
+    except Exception:
+        return ""
+    
+    by_platform = ", ".join(f"{platform}: {count}" for platform, count in stats['in_flight_by_platform'].items())
+    next_fire = stats['next_fire'].strftime('%d.%m %H:%M') if stats['next_fire'] else '—'
+    
+    return (
+        "📅 <b>АВТОПУБЛИКАЦИИ:</b>\n"
+        f"{'✅' if stats['running'] else '⚪️'} Расписаний: <code>{stats['schedules']}</code>, ближайшее: {next_fire}\n"
+        f"   └─ Очередь: <code>{stats['queue_depth']}</code> (ждёт до {int(stats['oldest_wait_seconds'])} с)\n"
+        f"   └─ В работе: <code>{stats['in_flight']}/{stats['workers']}</code>{f' ({by_platform})' if by_platform else ''}\n"
+        f"   └─ Выполнено: {stats['completed']}, ошибок: {stats['failed']}\n"
+        f"   └─ Среднее ожидание: {stats['avg_wait_seconds']:.0f} с, публикация: {stats['avg_run_seconds']:.0f} с\n"
+        f"{format_publication_queue_stats()}\n"
+    )
+
+
+def format_generation_stats():
+    """Блок мониторинга: пул фоновых генераций из обработчиков бота"""
+    try:
+        from utils.generation_executor import generation_executor
+        stats = generation_executor.get_stats()
+    except Exception:
+        return ""
+    
+    by_kind = ", ".join(f"{kind}: {count}" for kind, count in stats['in_flight_by_platform'].items())
+    
+    return (
+        "🧵 <b>ГЕНЕРАЦИИ:</b>\n"
+        f"   └─ Очередь: <code>{stats['queue_depth']}</code> (ждёт до {int(stats['oldest_wait_seconds'])} с)\n"
+        f"   └─ В работе: <code>{stats['in_flight']}/{stats['workers']}</code>{f' ({by_kind})' if by_kind else ''}\n"
+        f"   └─ Выполнено: {stats['completed']}, ошибок: {stats['failed']}, отменено: {stats['cancelled']}\n"
+        f"   └─ Среднее ожидание: {stats['avg_wait_seconds']:.0f} с, генерация: {stats['avg_run_seconds']:.0f} с\n\n"
+    )
+
+
+def format_telegram_update_stats():
+    """Блок мониторинга: очередь обновлений Telegram (только в режиме webhook)"""
+    from config import BOT_MODE
+    if BOT_MODE != 'webhook':
+        return ""
+    
+    queue = db.get_telegram_update_queue_stats()
+    if not queue:
+        return ""
+    
+    return (
+        "📥 <b>ОЧЕРЕДЬ ОБНОВЛЕНИЙ (webhook):</b>\n"
+        f"   └─ Ожидают: <code>{queue['queued']}</code> в {queue['queued_chats']} чатах "
+        f"(старейшее {int(queue['oldest_queued_seconds'] or 0)} с)\n"
+        f"   └─ Чатов в обработке: {queue['leased_chats']}\n"
+        f"   └─ Обработано за час: {queue['done_1h']}, ошибок за сутки: {queue['failed_24h']}\n\n"
+    )
+
+
+def format_state_store_stats():
+    """Блок мониторинга: хранилища состояний диалогов"""
+    try:
+        from utils.state_store import get_state_store_stats
+        stores = [s for s in get_state_store_stats() if s['size'] or s['hits'] or s['misses']]
+    except Exception:
+        return ""
+    
+    if not stores:
+        return ""
+    
+    text = f"🗂 <b>СОСТОЯНИЯ ДИАЛОГОВ ({stores[0]['backend']}):</b>\n"
+    for stats in sorted(stores, key=lambda s: s['size'], reverse=True)[:6]:
+        text += (
+            f"   └─ {stats['namespace']}: <code>{stats['size']}/{stats['max_size']}</code>, "
+            f"попаданий {stats['hit_rate'] * 100:.0f}%, истекло {stats['expirations']}, вытеснено {stats['evictions']}\n"
+        )
+    return text + "\n"
+
+
+def format_publication_queue_stats():
+    """Строки мониторинга: очередь publication_jobs (общая для всех процессов)"""
+    queue = db.get_publication_queue_stats()
+    if not queue:
+        return ""
+    
+    oldest = int(queue['oldest_ready_seconds'] or 0)
+    return (
+        f"   └─ Задания: готовы <code>{queue['ready']}</code> (ждут до {oldest} с), "
+        f"отложены <code>{queue['pending'] - queue['ready']}</code>, "
+        f"в работе <code>{queue['running']}</code>\n"
+        f"   └─ За сутки: выполнено {queue['done_24h']}, ошибок {queue['failed_24h']}, "
+        f"ждут повтора {queue['retrying']}\n"
+    )
+
+
+@router.exact("admin_system_monitor")
 def admin_system_monitor(call):
     """Мониторинг систем"""
     user_id = call.from_user.id
@@ -287,7 +414,13 @@ def admin_system_monitor(call):
             "💾 <b>БАЗА ДАННЫХ:</b>\n"
             f"{status_emoji(db_status['status'])} PostgreSQL\n"
             f"   └─ Подключение: {db_status.get('message', 'Unknown')}\n"
-            f"   └─ Версия: <code>{db_status.get('version', 'N/A')}</code>\n\n"
+            f"   └─ Версия: <code>{db_status.get('version', 'N/A')}</code>\n"
+            f"{format_db_pool_cache_stats(db_status)}\n"
+            
+            f"{format_publication_stats()}"
+            f"{format_generation_stats()}"
+            f"{format_telegram_update_stats()}"
+            f"{format_state_store_stats()}"
             
             "✈️ <b>TELEGRAM API:</b>\n"
             f"{status_emoji(tg_status['status'])} Telegram Bot API\n"
@@ -329,10 +462,10 @@ def admin_system_monitor(call):
 # РАССЫЛКА СООБЩЕНИЙ
 # ═══════════════════════════════════════════════════════════════
 
-# Временное хранилище для рассылки
-admin_broadcast_data = {}
+# Временное хранилище для рассылки (исходное сообщение — только chat_id/message_id)
+admin_broadcast_data = StateStore('admin_broadcast', ttl=3600, max_size=100)
 
-@bot.callback_query_handler(func=lambda call: call.data == "admin_broadcast_menu")
+@router.exact("admin_broadcast_menu")
 def admin_broadcast_menu(call):
     """Меню рассылки"""
     user_id = call.from_user.id
@@ -390,7 +523,7 @@ def admin_broadcast_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("broadcast_"))
+@router.prefix("broadcast_")
 def admin_broadcast_start(call):
     """Начало рассылки"""
     user_id = call.from_user.id
@@ -450,36 +583,22 @@ def admin_broadcast_execute(message):
     
     broadcast_type = admin_broadcast_data[user_id]['type']
     
-    # Получаем список пользователей
-    try:
-        if broadcast_type == 'all':
-            db.cursor.execute("SELECT telegram_id FROM users")
-        elif broadcast_type == '7d':
-            db.cursor.execute("SELECT telegram_id FROM users WHERE last_activity >= NOW() - INTERVAL '7 days'")
-        elif broadcast_type == 'paid':
-            db.cursor.execute("SELECT telegram_id FROM users WHERE tokens > 1500")  # Купили токены
-        
-        users = [row[0] for row in db.cursor.fetchall()]
-    except Exception as e:
-        bot.send_message(message.chat.id, f"❌ Ошибка получения пользователей: {e}")
-        del admin_broadcast_data[user_id]
-        return
-    
-    # Убираем из ожидания
-    del admin_broadcast_data[user_id]
+    # Размер аудитории (получатели фиксируются при запуске рассылки)
+    total = db.count_broadcast_audience(broadcast_type)
     
     # Подтверждение
     text = (
         "⚠️ <b>ПОДТВЕРЖДЕНИЕ РАССЫЛКИ</b>\n"
         "━━━━━━━━━━━━━━━━━━━━\n\n"
-        f"📊 Будет отправлено: <code>{len(users)}</code> пользователям\n\n"
+        f"📊 Будет отправлено: <code>{total}</code> пользователям\n\n"
         "Подтвердите отправку:"
     )
     
     # Сохраняем данные для подтверждения
     admin_broadcast_data[user_id] = {
-        'users': users,
-        'message': message
+        'type': broadcast_type,
+        'source_chat_id': message.chat.id,
+        'source_message_id': message.message_id
     }
     
     markup = types.InlineKeyboardMarkup(row_width=2)
@@ -491,99 +610,64 @@ def admin_broadcast_execute(message):
     bot.send_message(message.chat.id, text, reply_markup=markup, parse_mode='HTML')
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "confirm_broadcast")
+@router.exact("confirm_broadcast")
 def admin_broadcast_confirm(call):
-    """Подтверждение и отправка рассылки"""
+    """Подтверждение и запуск рассылки в фоне"""
     user_id = call.from_user.id
     
     if str(user_id) != str(ADMIN_ID):
         bot.answer_callback_query(call.id, "⛔️ Доступ запрещен", show_alert=True)
         return
     
-    if user_id not in admin_broadcast_data:
+    broadcast = admin_broadcast_data.pop(user_id, None)
+    if not broadcast or 'source_message_id' not in broadcast:
         bot.answer_callback_query(call.id, "❌ Данные рассылки не найдены")
         return
     
-    users = admin_broadcast_data[user_id]['users']
-    source_message = admin_broadcast_data[user_id]['message']
-    
-    bot.answer_callback_query(call.id, f"📤 Начинаю рассылку {len(users)} пользователям...")
-    
     # Удаляем сообщение с подтверждением
     try:
         bot.delete_message(call.message.chat.id, call.message.message_id)
     except:
         pass
     
-    # Статусное сообщение
-    status_msg = bot.send_message(
-        call.message.chat.id,
-        f"📤 Рассылка: 0/{len(users)}"
+    # Отправка идёт в фоне: прогресс и итог — в статусном сообщении
+    started = get_broadcast_engine().start(
+        user_id,
+        broadcast['type'],
+        broadcast['source_chat_id'],
+        broadcast['source_message_id'],
+        call.message.chat.id
     )
     
-    # Рассылка
-    success = 0
-    failed = 0
-    
-    for idx, target_id in enumerate(users, 1):
-        try:
-            # Копируем сообщение
-            bot.copy_message(
-                target_id,
-                source_message.chat.id,
-                source_message.message_id
-            )
-            success += 1
-        except Exception as e:
-            failed += 1
-            print(f"Ошибка отправки {target_id}: {e}")
-        
-        # Обновляем статус каждые 10 сообщений
-        if idx % 10 == 0:
-            try:
-                bot.edit_message_text(
-                    f"📤 Рассылка: {idx}/{len(users)}\n✅ Успешно: {success}\n❌ Ошибок: {failed}",
-                    call.message.chat.id,
-                    status_msg.message_id
-                )
-            except:
-                pass
+    if not started:
+        bot.answer_callback_query(call.id, "❌ Не удалось создать рассылку", show_alert=True)
+        return
     
-    # Финальный отчет
-    text = (
-        "✅ <b>РАССЫЛКА ЗАВЕРШЕНА</b>\n"
-        "━━━━━━━━━━━━━━━━━━━━\n\n"
-        f"📊 Всего: <code>{len(users)}</code>\n"
-        f"✅ Успешно: <code>{success}</code>\n"
-        f"❌ Ошибок: <code>{failed}</code>"
-    )
+    bot.answer_callback_query(call.id, f"📤 Начинаю рассылку {started['total']} пользователям...")
+
+
+@router.prefix("bcast_cancel_")
+def admin_broadcast_cancel(call):
+    """Остановка рассылки"""
+    user_id = call.from_user.id
     
-    markup = types.InlineKeyboardMarkup()
-    markup.add(
-        types.InlineKeyboardButton("🔙 В админку", callback_data="back_to_admin")
-    )
+    if str(user_id) != str(ADMIN_ID):
+        bot.answer_callback_query(call.id, "⛔️ Доступ запрещен", show_alert=True)
+        return
     
-    try:
-        bot.edit_message_text(
-            text,
-            call.message.chat.id,
-            status_msg.message_id,
-            reply_markup=markup,
-            parse_mode='HTML'
-        )
-    except:
-        bot.send_message(call.message.chat.id, text, reply_markup=markup, parse_mode='HTML')
+    broadcast_id = int(call.data.split("_")[-1])
     
-    # Очищаем данные
-    if user_id in admin_broadcast_data:
-        del admin_broadcast_data[user_id]
+    if get_broadcast_engine().cancel(broadcast_id):
+        bot.answer_callback_query(call.id, "⏹ Рассылка остановится после текущей пачки")
+    else:
+        bot.answer_callback_query(call.id, "ℹ️ Рассылка уже завершена")
 
 
 # ═══════════════════════════════════════════════════════════════
 # НАСТРОЙКИ API
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data == "admin_api_settings")
+@router.exact("admin_api_settings")
 def admin_api_settings(call):
     """Настройки API ключей"""
     user_id = call.from_user.id
@@ -646,7 +730,7 @@ def admin_api_settings(call):
 # ПОСЕТИТЕЛИ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data == "admin_visitors")
+@router.exact("admin_visitors")
 def admin_visitors(call):
     """Статистика посетителей"""
     user_id = call.from_user.id
@@ -734,7 +818,7 @@ def admin_visitors(call):
 # УВЕДОМЛЕНИЯ (ПОЛНЫЙ ФУНКЦИОНАЛ)
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data == "admin_notification_settings")
+@router.exact("admin_notification_settings")
 def admin_notification_settings_callback(call):
     """Настройки уведомлений - callback обработчик"""
     user_id = call.from_user.id
@@ -812,7 +896,7 @@ def admin_notification_settings_callback(call):
 # СБОР ЛОГОВ ОШИБОК
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data == "admin_error_logs")
+@router.exact("admin_error_logs")
 def admin_error_logs_menu(call):
     """Главное меню логов ошибок"""
     user_id = call.from_user.id
@@ -879,7 +963,7 @@ def admin_error_logs_menu(call):
     bot.answer_callback_query(call.id, "📊 Логи обновлены")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("admin_download_logs_"))
+@router.prefix("admin_download_logs_")
 def admin_download_error_logs(call):
     """Скачать файл с логами ошибок"""
     user_id = call.from_user.id
@@ -7,6 +7,7 @@ import logging
 from datetime import datetime
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from loader import bot
+from callback_router import router
 from database.database import db
 
 logger = logging.getLogger(__name__)
@@ -153,7 +154,7 @@ def show_notification_settings_menu(message):
     )
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('notif_toggle_'))
+@router.prefix("notif_toggle_")
 def handle_notification_toggle(call: CallbackQuery):
     """
     Обработчик переключения настроек уведомлений
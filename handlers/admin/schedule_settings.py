@@ -7,6 +7,7 @@ import logging
 from datetime import datetime
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from loader import bot
+from callback_router import router
 from database.database import db
 from config import ADMIN_ID
 
@@ -124,7 +125,7 @@ def update_schedule_setting(schedule_type, enabled=None, time=None, frequency=No
         return False
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "admin_messaging")
+@router.exact("admin_messaging")
 def show_schedule_menu(call: CallbackQuery):
     """
     Показывает меню расписания рассылок
@@ -201,7 +202,7 @@ def show_schedule_menu(call: CallbackQuery):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('schedule_edit_'))
+@router.prefix("schedule_edit_")
 def edit_schedule_item(call: CallbackQuery):
     """
     Редактирование отдельной рассылки
@@ -293,7 +294,7 @@ def edit_schedule_item(call: CallbackQuery):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('schedule_toggle_'))
+@router.prefix("schedule_toggle_")
 def toggle_schedule(call: CallbackQuery):
     """
     Переключение включения/выключения рассылки
@@ -323,7 +324,7 @@ def toggle_schedule(call: CallbackQuery):
         bot.answer_callback_query(call.id, "❌ Ошибка обновления", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('schedule_time_'))
+@router.prefix("schedule_time_")
 def change_schedule_time(call: CallbackQuery):
     """
     Изменение времени рассылки
@@ -7,13 +7,71 @@
 - Реактивация неактивных
 """
 import logging
-from datetime import datetime, timedelta
 from loader import bot
-from database.database import db
+from utils.notification_engine import NotificationEngine
 
 logger = logging.getLogger(__name__)
 
 
+def _low_balance_text(balance):
+    return f"""
+⚠️ <b>Низкий баланс токенов</b>
+
+Ваш текущий баланс: <b>{balance} токенов</b>
+
+Скоро токены закончатся! 
+Пополните баланс, чтобы продолжить использование бота.
+
+<b>Способы пополнения:</b>
+💳 Купить токены - /tariffs
+🎁 Пригласить друзей - получить бонус
+🏆 Выполнить задания
+
+<i>Без токенов генерация контента будет недоступна</i>
+"""
+
+
+def _weekly_news_text():
+    return """
+📰 <b>Еженедельные новости</b>
+
+<b>Что нового на этой неделе:</b>
+
+🆕 Добавлена поддержка WordPress API
+✨ Улучшена генерация статей с Claude Sonnet 4
+🎨 Новые стили оформления для изображений
+⚡ Ускорена публикация в соцсети
+
+<b>Полезные советы:</b>
+💡 Используйте длинные slug для лучшего SEO
+📊 Проверяйте аналитику в профиле
+🔧 Настройте автоматическое расписание
+
+<i>Следующая рассылка через неделю</i>
+"""
+
+
+def _reactivation_text(days_inactive):
+    return f"""
+😔 <b>Давно не виделись!</b>
+
+Вы не заходили в бот уже <b>{days_inactive} дней</b>
+
+<b>Мы скучаем!</b> 🥺
+
+<b>Что нового появилось:</b>
+🎁 Новые бонусные токены
+🚀 Улучшенные алгоритмы генерации
+📈 Расширенная аналитика
+🎨 Больше стилей оформления
+
+💝 <b>Специальное предложение для вас:</b>
+Вернитесь в течение 7 дней и получите +200 бонусных токенов!
+
+Нажмите /start чтобы продолжить
+"""
+
+
 def send_welcome_notification(user_id, username=None):
     """
     Отправляет приветственное уведомление новому пользователю
@@ -65,21 +123,7 @@ def send_low_balance_notification(user_id, current_balance):
         current_balance: Текущий баланс токенов
     """
     try:
-        low_balance_text = f"""
-⚠️ <b>Низкий баланс токенов</b>
-
-Ваш текущий баланс: <b>{current_balance} токенов</b>
-
-Скоро токены закончатся! 
-Пополните баланс, чтобы продолжить использование бота.
-
-<b>Способы пополнения:</b>
-💳 Купить токены - /tariffs
-🎁 Пригласить друзей - получить бонус
-🏆 Выполнить задания
-
-<i>Без токенов генерация контента будет недоступна</i>
-"""
+        low_balance_text = _low_balance_text(current_balance)
         
         bot.send_message(
             user_id,
@@ -103,23 +147,7 @@ def send_weekly_news(user_id):
         user_id: Telegram ID пользователя
     """
     try:
-        news_text = f"""
-📰 <b>Еженедельные новости</b>
-
-<b>Что нового на этой неделе:</b>
-
-🆕 Добавлена поддержка WordPress API
-✨ Улучшена генерация статей с Claude Sonnet 4
-🎨 Новые стили оформления для изображений
-⚡ Ускорена публикация в соцсети
-
-<b>Полезные советы:</b>
-💡 Используйте длинные slug для лучшего SEO
-📊 Проверяйте аналитику в профиле
-🔧 Настройте автоматическое расписание
-
-<i>Следующая рассылка через неделю</i>
-"""
+        news_text = _weekly_news_text()
         
         bot.send_message(
             user_id,
@@ -144,24 +172,7 @@ def send_reactivation_notification(user_id, days_inactive):
         days_inactive: Количество дней неактивности
     """
     try:
-        reactivation_text = f"""
-😔 <b>Давно не виделись!</b>
-
-Вы не заходили в бот уже <b>{days_inactive} дней</b>
-
-<b>Мы скучаем!</b> 🥺
-
-<b>Что нового появилось:</b>
-🎁 Новые бонусные токены
-🚀 Улучшенные алгоритмы генерации
-📈 Расширенная аналитика
-🎨 Больше стилей оформления
-
-💝 <b>Специальное предложение для вас:</b>
-Вернитесь в течение 7 дней и получите +200 бонусных токенов!
-
-Нажмите /start чтобы продолжить
-"""
+        reactivation_text = _reactivation_text(days_inactive)
         
         bot.send_message(
             user_id,
@@ -177,56 +188,33 @@ def send_reactivation_notification(user_id, days_inactive):
         return False
 
 
-def check_and_send_notifications():
+# Тексты уведомлений по строке получателя из claim_notification_recipients
+_RENDERERS = {
+    'low_balance': lambda recipient: _low_balance_text(recipient['balance']),
+    'reactivation': lambda recipient: _reactivation_text(recipient['days_inactive']),
+    'weekly_news': lambda recipient: _weekly_news_text(),
+}
+
+notification_engine = NotificationEngine(bot, _RENDERERS)
+
+
+def check_and_send_notifications(notification_types=None):
     """
-    Проверяет пользователей и отправляет нужные уведомления
-    Запускается по расписанию (cron/scheduler)
+    Отправляет уведомления указанных типов (по умолчанию — всех)
+    Запускается по расписанию (handlers/notification_scheduler.py)
+
+    Получатели выбираются в БД пачками, повторно в пределах паузы
+    NOTIFICATION_COOLDOWNS уведомление не отправляется (notification_log)
     """
     try:
         logger.info("🔍 Запуск проверки уведомлений...")
-        
-        # 1. Проверяем пользователей с низким балансом (< 100 токенов)
-        cursor = db.conn.cursor()
-        cursor.execute("""
-            SELECT id, tokens, username
-            FROM users
-            WHERE tokens < 100 AND tokens > 0
-        """)
-        low_balance_users = cursor.fetchall()
-        
-        logger.info(f"Найдено пользователей с низким балансом: {len(low_balance_users)}")
-        
-        for user in low_balance_users:
-            user_id, tokens, username = user
-            # Проверяем, не отправляли ли уже сегодня
-            # (можно добавить таблицу отправленных уведомлений)
-            send_low_balance_notification(user_id, tokens)
-        
-        # 2. Проверяем неактивных пользователей (не заходили 7+ дней)
-        week_ago = datetime.now() - timedelta(days=7)
-        
-        cursor.execute("""
-            SELECT id, created_at, username
-            FROM users
-            WHERE created_at < %s
-        """, (week_ago,))
-        inactive_users = cursor.fetchall()
-        
-        logger.info(f"Найдено неактивных пользователей: {len(inactive_users)}")
-        
-        for user in inactive_users:
-            user_id, created_at, username = user
-            days_inactive = (datetime.now() - created_at).days
-            
-            # Отправляем реактивацию только раз в 30 дней
-            if days_inactive >= 7 and days_inactive % 30 == 0:
-                send_reactivation_notification(user_id, days_inactive)
-        
-        cursor.close()
-        logger.info("✅ Проверка уведомлений завершена")
-        
+        stats = notification_engine.run(notification_types)
+        logger.info(f"✅ Проверка уведомлений завершена: {stats}")
+        return stats
+
     except Exception as e:
         logger.error(f"❌ Ошибка проверки уведомлений: {e}")
+        return None
 
 
 # Регистрация обработчиков
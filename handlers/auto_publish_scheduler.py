@@ -2,15 +2,43 @@
 """
 Планировщик автоматических публикаций на платформы
 Публикует контент по расписанию из таблицы platform_schedules
+
+Наступившие слоты расписаний ставятся в очередь publication_jobs,
+воркеры арендуют задания из неё (FOR UPDATE SKIP LOCKED). Задание
+переживает рестарт процесса, неудачные попытки повторяются
+с экспоненциальной задержкой, а UNIQUE (schedule_id, slot_time)
+не даёт опубликовать один слот дважды.
 """
+import os
+import socket
 import threading
 import time
 import logging
-from datetime import datetime, time as dt_time
-# from psycopg2.extras import RealDictCursor  # Не используется
+from datetime import datetime
+from config import (
+    PUBLISH_WORKERS, PUBLISH_PLATFORM_LIMITS, PUBLISH_PER_USER_LIMIT,
+    PUBLISH_JOB_LEASE_SECONDS, PUBLISH_JOB_MAX_ATTEMPTS,
+    PUBLISH_JOB_RETRY_BASE_DELAY, PUBLISH_JOB_RETRY_MAX_DELAY, PUBLISH_JOB_RETENTION_DAYS,
+)
+from utils.publication_pool import PublicationWorkerPool
+from utils.rate_limiter import rate_limit
+from utils.schedule_engine import ScheduleEngine
 
 logger = logging.getLogger(__name__)
 
+# Полная сверка с platform_schedules (изменения из других процессов / мимо notify)
+RESYNC_INTERVAL = 600
+
+# Максимальный сон между проверками, даже если ближайший слот далеко
+# (заодно это период опроса очереди на готовые повторы)
+MAX_IDLE_WAIT = 60
+
+# Продление аренды выполняющихся заданий
+LEASE_RENEW_INTERVAL = PUBLISH_JOB_LEASE_SECONDS // 3
+
+# Удаление старых завершённых заданий
+CLEANUP_INTERVAL = 6 * 3600
+
 
 def get_user_id_from_category(db, category):
     """
@@ -30,16 +58,14 @@ def get_user_id_from_category(db, category):
             logger.error(f"❌ В категории отсутствует bot_id")
             return None
         
-        # Получаем user_id через бота
-        db.cursor.execute("SELECT user_id FROM bots WHERE id = %s", (bot_id,))
-        bot_result = db.cursor.fetchone()
+        # Получаем user_id через бота (db.get_bot читает из кэша)
+        bot_result = db.get_bot(bot_id)
         
         if not bot_result:
             logger.error(f"❌ Бот {bot_id} не найден")
             return None
         
-        user_id = bot_result['user_id'] if isinstance(bot_result, dict) else bot_result[0]
-        return user_id
+        return bot_result['user_id']
         
     except Exception as e:
         logger.error(f"❌ Ошибка получения user_id: {e}")
@@ -52,6 +78,24 @@ class AutoPublishScheduler:
     def __init__(self):
         self.is_running = False
         self.thread = None
+        self.engine = ScheduleEngine()
+        self.workers = PublicationWorkerPool(
+            max_workers=PUBLISH_WORKERS,
+            platform_limits=PUBLISH_PLATFORM_LIMITS,
+            per_user_limit=PUBLISH_PER_USER_LIMIT,
+            name="auto-publish",
+        )
+        self._wakeup = threading.Event()
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        self._last_resync = 0
+        # Идентификатор процесса в publication_jobs.locked_by
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # Арендованные этим процессом задания: id -> строка задания
+        self._leased = {}
+        self._leased_lock = threading.Lock()
+        self._last_lease_renewal = time.monotonic()
+        self._last_cleanup = 0
         logger.info("📅 AutoPublishScheduler инициализирован")
     
     def start(self):
@@ -61,6 +105,7 @@ class AutoPublishScheduler:
             return
         
         self.is_running = True
+        self.workers.start()
         self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
         self.thread.start()
         logger.info("✅ Планировщик автоматических публикаций запущен")
@@ -68,134 +113,214 @@ class AutoPublishScheduler:
     def stop(self):
         """Останавливает планировщик"""
         self.is_running = False
+        self._wakeup.set()
         if self.thread:
             self.thread.join(timeout=5)
+        self.workers.shutdown()
         logger.info("🛑 Планировщик автоматических публикаций остановлен")
     
-    def _get_scheduled_publications(self):
+    def notify_schedule_changed(self, category_id, platform_type, platform_id):
+        """
+        Расписание изменено в БД — пересчитать только его.
+        Вызывается из обработчиков после записи в platform_schedules.
         """
-        Получает список запланированных публикаций на текущее время
+        with self._dirty_lock:
+            self._dirty.add(ScheduleEngine.make_key(category_id, platform_type, platform_id))
+        self._wakeup.set()
+    
+    def _sync_all_schedules(self):
+        """Полная загрузка включённых расписаний в движок"""
+        from database.database import db
         
-        Returns:
-            list: Список словарей с информацией о публикациях
+        schedules = db.get_enabled_platform_schedules()
+        self._last_resync = time.monotonic()
+        
+        if schedules is None:
+            logger.warning("⚠️ Не удалось загрузить расписания публикаций (нет таблицы platform_schedules?)")
+            return
+        
+        self.engine.load(schedules)
+        logger.info(f"📅 Загружено расписаний: {len(self.engine)}")
+    
+    def _sync_dirty_schedules(self):
+        """Пересчитать расписания, изменённые через notify_schedule_changed"""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        
+        if not dirty:
+            return
+        
+        from database.database import db
+        
+        for key in dirty:
+            schedule = db.get_platform_schedule(*key)
+            if schedule and schedule.get('enabled'):
+                self.engine.upsert(schedule)
+            else:
+                self.engine.remove(key)
+    
+    def _enqueue_due_publication(self, entry, slot):
         """
+        Поставить наступившее срабатывание в очередь publication_jobs.
+        Повторная постановка того же слота (другой процесс, рестарт)
+        игнорируется уникальным ключом (schedule_id, slot_time).
+        """
+        from database.database import db
+        
+        # Фиксируем время слота: после рестарта движок не вернётся к нему
+        db.update_schedule_last_post_time(*entry.key, datetime.now())
+        
+        delay = (datetime.now() - slot).total_seconds()
+        if delay > 120:
+            logger.info(f"⏪ Догоняем пропущенный слот {slot:%d.%m %H:%M} (опоздание {int(delay // 60)} мин)")
+        
         try:
-            from database.database import db
+            if entry.schedule_id is None:
+                logger.warning(f"⚠️ Нет id расписания {entry.key}, слот {slot:%d.%m %H:%M} пропущен")
+                return
             
-            # Откатываем любую незавершенную транзакцию
-            try:
-                db.conn.rollback()
-            except:
-                pass
+            # Владелец категории — для лимита публикаций на пользователя (из кэша)
+            category = db.get_category(entry.category_id)
+            bot_id = category.get('bot_id') if category else None
+            user_id = get_user_id_from_category(db, category) if category else None
             
-            # Создаём новый cursor для этого запроса с совместимостью psycopg2/3
+            job_id = db.enqueue_publication_job(
+                entry.schedule_id, entry.category_id, bot_id, user_id,
+                entry.platform_type, entry.platform_id, slot,
+                max_attempts=PUBLISH_JOB_MAX_ATTEMPTS,
+            )
+            if job_id:
+                logger.info(f"📥 Задание #{job_id}: {entry.platform_type} (категория {entry.category_id}), слот {slot:%d.%m %H:%M}")
+            else:
+                logger.info(f"ℹ️ Слот {slot:%d.%m %H:%M} расписания {entry.schedule_id} уже в очереди")
+        finally:
+            self.engine.reschedule(entry, slot)
+    
+    # ─────────────────────────────────────────────────────────────
+    # Очередь заданий
+    # ─────────────────────────────────────────────────────────────
+    
+    def _claim_jobs(self):
+        """Арендовать готовые задания по числу свободных воркеров"""
+        from database.database import db
+        
+        stats = self.workers.get_stats()
+        free = self.workers.max_workers - stats['in_flight'] - stats['queue_depth']
+        if free <= 0:
+            return
+        
+        jobs = db.claim_publication_jobs(self.worker_id, free, PUBLISH_JOB_LEASE_SECONDS) or []
+        for job in jobs:
+            self._submit_job(dict(job))
+    
+    def _submit_job(self, job):
+        """Отдать арендованное задание в пул воркеров"""
+        with self._leased_lock:
+            self._leased[job['id']] = job
+        
+        def run():
             try:
-                import psycopg
-                from psycopg.rows import dict_row
-                cursor = db.conn.cursor(row_factory=dict_row)
-            except ImportError:
-                import psycopg2
-                from psycopg2.extras import RealDictCursor
-                cursor = db.conn.cursor(cursor_factory=RealDictCursor)
-            
-            now = datetime.now()
-            current_time = now.time()
-            current_day = now.strftime('%A').lower()  # monday, tuesday, etc.
-            
-            # Проверяем существование таблицы
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'platform_schedules'
-                )
-            """)
-            result = cursor.fetchone()
-            table_exists = result['exists'] if result else False
-            
-            if not table_exists:
-                logger.warning("⚠️ Таблица platform_schedules не существует")
-                cursor.close()
-                return []
-            
-            # Находим все активные расписания
-            cursor.execute("""
-                SELECT 
-                    category_id, 
-                    platform_type, 
-                    platform_id,
-                    schedule_days,
-                    schedule_times,
-                    posts_per_day
-                FROM platform_schedules
-                WHERE enabled = TRUE
-            """)
-            
-            schedules = cursor.fetchall()
-            cursor.close()
-            
-            publications = []
-            
-            # Маппинг сокращенных дней в полные
-            days_map_short = {
-                'mon': 'monday',
-                'tue': 'tuesday',
-                'wed': 'wednesday',
-                'thu': 'thursday',
-                'fri': 'friday',
-                'sat': 'saturday',
-                'sun': 'sunday'
-            }
-            
-            for schedule in schedules:
-                # Проверяем день недели (поддержка обоих форматов)
-                days = schedule.get('schedule_days', []) or []
-                if days:
-                    day_match = False
-                    for day in days:
-                        day_lower = day.lower()
-                        # Конвертируем сокращенный формат в полный
-                        if day_lower in days_map_short:
-                            day_lower = days_map_short[day_lower]
-                        
-                        if day_lower == current_day:
-                            day_match = True
-                            break
-                    
-                    if not day_match:
-                        continue
-                
-                # Проверяем время
-                times = schedule.get('schedule_times', []) or []
-                if not times:
-                    continue
-                
-                # Сравниваем время (с точностью до минуты)
-                for time_str in times:
-                    try:
-                        hour, minute = map(int, time_str.split(':'))
-                        schedule_time = dt_time(hour, minute)
-                        
-                        # Если текущее время совпадает (с точностью до минуты)
-                        if current_time.hour == schedule_time.hour and current_time.minute == schedule_time.minute:
-                            publications.append({
-                                'category_id': schedule['category_id'],
-                                'platform_type': schedule['platform_type'],
-                                'platform_id': schedule['platform_id'],
-                                'posts_per_day': schedule.get('posts_per_day', 1)
-                            })
-                    except:
-                        continue
-            
-            return publications
-            
+                self._run_job(job)
+            finally:
+                with self._leased_lock:
+                    self._leased.pop(job['id'], None)
+                # Освободился воркер — можно взять следующее задание
+                self._wakeup.set()
+        
+        try:
+            self.workers.submit(
+                run,
+                platform=job['platform_type'],
+                user_id=job.get('user_id'),
+                label=f"#{job['id']} {job['platform_type']}:{job['category_id']}:{job['platform_id']}",
+            )
+        except RuntimeError:
+            # Пул остановлен: задание заберёт другой процесс после истечения аренды
+            with self._leased_lock:
+                self._leased.pop(job['id'], None)
+    
+    def _run_job(self, job):
+        """Выполнить публикацию и записать результат в очередь"""
+        from database.database import db
+        
+        attempt = f" (попытка {job['attempts']}/{job['max_attempts']})" if job['attempts'] > 1 else ""
+        logger.info(f"📤 Публикация #{job['id']}: {job['platform_type']} (категория {job['category_id']}){attempt}")
+        
+        try:
+            result = self._publish_content(job['category_id'], job['platform_type'], job['platform_id'])
         except Exception as e:
-            logger.error(f"❌ Ошибка получения расписания публикаций: {e}")
-            try:
-                from database.database import db
-                db.conn.rollback()
-            except:
-                pass
-            return []
+            result = {'success': False, 'error': str(e), 'retry': True}
+        
+        if result.get('success'):
+            if not db.complete_publication_job(job, post_url=result.get('post_url'),
+                                               tokens_spent=result.get('tokens_spent', 0)):
+                logger.warning(f"⚠️ Задание #{job['id']}: аренда потеряна, результат не записан")
+            return
+        
+        status = db.fail_publication_job(
+            job,
+            result.get('error') or 'Неизвестная ошибка',
+            retry=result.get('retry', True),
+            base_delay=PUBLISH_JOB_RETRY_BASE_DELAY,
+            max_delay=PUBLISH_JOB_RETRY_MAX_DELAY,
+        )
+        if status == 'pending':
+            logger.warning(f"🔁 Задание #{job['id']} будет повторено: {result.get('error')}")
+        elif status == 'failed':
+            logger.error(f"❌ Задание #{job['id']} завершилось ошибкой: {result.get('error')}")
+        else:
+            logger.warning(f"⚠️ Задание #{job['id']}: аренда потеряна, ошибка не записана")
+    
+    def _renew_leases(self):
+        """Продлить аренду заданий, которые ещё выполняются"""
+        if time.monotonic() - self._last_lease_renewal < LEASE_RENEW_INTERVAL:
+            return
+        self._last_lease_renewal = time.monotonic()
+        
+        with self._leased_lock:
+            job_ids = list(self._leased)
+        if not job_ids:
+            return
+        
+        from database.database import db
+        db.extend_publication_job_leases(job_ids, self.worker_id, PUBLISH_JOB_LEASE_SECONDS)
+    
+    def _cleanup_finished_jobs(self):
+        """Периодически удалять старые завершённые задания"""
+        if time.monotonic() - self._last_cleanup < CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = time.monotonic()
+        
+        from database.database import db
+        deleted = db.delete_finished_publication_jobs(PUBLISH_JOB_RETENTION_DAYS)
+        if deleted:
+            logger.info(f"🧹 Удалено завершённых заданий публикации: {deleted}")
+    
+    def get_stats(self):
+        """Метрики для админки: расписания, очередь и выполняющиеся публикации"""
+        next_fire = self.engine.next_fire_time()
+        with self._leased_lock:
+            leased = len(self._leased)
+        return {
+            'running': self.is_running,
+            'schedules': len(self.engine),
+            'next_fire': next_fire,
+            'leased': leased,
+            **self.workers.get_stats(),
+        }
+    
+    def _seconds_until_next_fire(self):
+        next_fire = self.engine.next_fire_time()
+        if next_fire is None:
+            return MAX_IDLE_WAIT
+        seconds = (next_fire - datetime.now()).total_seconds()
+        return max(0.5, min(seconds, MAX_IDLE_WAIT))
+    
+    @staticmethod
+    def _publication_failed(error, retry=False):
+        """Результат неудачной публикации (retry=False — ошибка настройки, повтор не поможет)"""
+        logger.error(f"❌ {error}")
+        return {'success': False, 'error': error, 'retry': retry}
     
     def _publish_content(self, category_id, platform_type, platform_id):
         """
@@ -205,33 +330,35 @@ class AutoPublishScheduler:
             category_id: ID категории
             platform_type: Тип платформы (website, telegram, pinterest)
             platform_id: ID платформы
+            
+        Returns:
+            dict: {'success', 'error', 'retry', 'post_url'}
         """
         try:
             logger.info(f"📤 Начинаю публикацию: category={category_id}, platform={platform_type}, id={platform_id}")
             
             if platform_type == 'website':
-                self._publish_to_website(category_id, platform_id)
+                return self._publish_to_website(category_id, platform_id)
             elif platform_type == 'telegram':
-                self._publish_to_telegram(category_id, platform_id)
+                return self._publish_to_telegram(category_id, platform_id)
             elif platform_type == 'pinterest':
-                self._publish_to_pinterest(category_id, platform_id)
-            else:
-                logger.warning(f"⚠️ Неизвестный тип платформы: {platform_type}")
+                return self._publish_to_pinterest(category_id, platform_id)
+            
+            return self._publication_failed(f"Неизвестный тип платформы: {platform_type}")
             
         except Exception as e:
             logger.error(f"❌ Ошибка публикации на {platform_type}: {e}")
+            return {'success': False, 'error': str(e), 'retry': True}
     
     def _publish_to_website(self, category_id, platform_id):
-        """Публикация статьи на сайт"""
+        """Публикация статьи на сайт. Returns: dict результата (см. _publish_content)"""
         try:
             from database.database import db
-            import json
             
             # Получаем категорию
             category = db.get_category(category_id)
             if not category:
-                logger.error(f"❌ Категория {category_id} не найдена")
-                return
+                return self._publication_failed(f"Категория {category_id} не найдена")
             
             # Конвертируем в dict если нужно
             if not isinstance(category, dict):
@@ -240,34 +367,15 @@ class AutoPublishScheduler:
             # Проверяем наличие user_id
             user_id = get_user_id_from_category(db, category)
             if not user_id:
-                return
-            
-            # Получаем пользователя
-            user = db.get_user(user_id)
-            if not user:
-                logger.error(f"❌ Пользователь {user_id} не найден")
-                return
+                return self._publication_failed(f"Владелец категории {category_id} не найден")
             
-            # Конвертируем в dict если нужно
-            if not isinstance(user, dict):
-                user = dict(user)
+            # Находим подключенный сайт (индекс по URL)
+            connection = db.get_platform_connection(user_id, 'websites', external_id=platform_id)
             
-            # Находим подключенный сайт
-            connections = user.get('platform_connections', {})
-            if isinstance(connections, str):
-                connections = json.loads(connections)
+            if not connection or connection['status'] != 'active':
+                return self._publication_failed(f"Сайт {platform_id} не найден или не активен")
             
-            websites = connections.get('websites', [])
-            
-            website = None
-            for site in websites:
-                if isinstance(site, dict) and site.get('url') == platform_id and site.get('status') == 'active':
-                    website = site
-                    break
-            
-            if not website:
-                logger.error(f"❌ Сайт {platform_id} не найден или не активен")
-                return
+            website = connection['settings']
             
             # Генерируем и публикуем статью
             from handlers.website.article_generation import generate_and_publish_article
@@ -281,16 +389,19 @@ class AutoPublishScheduler:
             
             if result.get('success'):
                 logger.info(f"✅ Статья опубликована на {website['url']}")
-            else:
-                logger.error(f"❌ Ошибка публикации статьи: {result.get('error')}")
+                return {'success': True, 'post_url': result.get('post_url') or result.get('url')}
+            
+            logger.error(f"❌ Ошибка публикации статьи: {result.get('error')}")
+            return {'success': False, 'error': result.get('error'), 'retry': True}
             
         except KeyError as e:
-            logger.error(f"❌ Ошибка публикации на сайт: отсутствует ключ {e}")
+            return self._publication_failed(f"Ошибка публикации на сайт: отсутствует ключ {e}")
         except Exception as e:
             logger.error(f"❌ Ошибка публикации на сайт: {e}")
+            return {'success': False, 'error': str(e), 'retry': True}
     
     def _publish_to_telegram(self, category_id, platform_id):
-        """Публикация поста в Telegram"""
+        """Публикация поста в Telegram. Returns: dict результата (см. _publish_content)"""
         try:
             from database.database import db
             from loader import bot
@@ -299,8 +410,7 @@ class AutoPublishScheduler:
             # Получаем категорию
             category = db.get_category(category_id)
             if not category:
-                logger.error(f"❌ Категория {category_id} не найдена")
-                return
+                return self._publication_failed(f"Категория {category_id} не найдена")
             
             # Конвертируем в dict если нужно
             if not isinstance(category, dict):
@@ -309,34 +419,16 @@ class AutoPublishScheduler:
             # Проверяем наличие user_id
             user_id = get_user_id_from_category(db, category)
             if not user_id:
-                return
-            
-            # Получаем пользователя
-            user = db.get_user(user_id)
-            if not user:
-                logger.error(f"❌ Пользователь {user_id} не найден")
-                return
-            
-            # Конвертируем в dict если нужно
-            if not isinstance(user, dict):
-                user = dict(user)
+                return self._publication_failed(f"Владелец категории {category_id} не найден")
             
             # Находим подключенный телеграм канал
-            connections = user.get('platform_connections', {})
-            if isinstance(connections, str):
-                connections = json.loads(connections)
-            
-            telegrams = connections.get('telegrams', [])
-            
-            telegram = None
             platform_index = int(platform_id) if platform_id.isdigit() else 0
+            connection = db.get_platform_connection(user_id, 'telegrams', position=platform_index)
             
-            if platform_index < len(telegrams):
-                telegram = telegrams[platform_index]
+            if not connection or connection['status'] != 'active':
+                return self._publication_failed("Telegram канал не найден или не активен")
             
-            if not telegram or telegram.get('status') != 'active':
-                logger.error(f"❌ Telegram канал не найден или не активен")
-                return
+            telegram = connection['settings']
             
             # Генерируем контент через AI
             from ai.text_generator import generate_social_post
@@ -360,42 +452,43 @@ class AutoPublishScheduler:
             )
             
             if not result.get('success'):
-                logger.error(f"❌ Не удалось сгенерировать текст поста: {result.get('error')}")
-                return
+                return self._publication_failed(
+                    f"Не удалось сгенерировать текст поста: {result.get('error')}", retry=True
+                )
             
             post_text = result.get('post', '')
             
             if not post_text:
-                logger.error("❌ Не удалось сгенерировать текст поста")
-                return
+                return self._publication_failed("Не удалось сгенерировать текст поста", retry=True)
             
             # Публикуем в канал
             channel_id = telegram.get('channel_id')
             if not channel_id:
-                logger.error("❌ Не указан ID канала")
-                return
+                return self._publication_failed("Не указан ID канала")
             
             try:
+                rate_limit('telegram')
                 bot.send_message(channel_id, post_text, parse_mode='HTML')
                 logger.info(f"✅ Пост опубликован в Telegram канал {telegram.get('channel_title', 'Unknown')}")
+                return {'success': True}
             except Exception as e:
-                logger.error(f"❌ Ошибка отправки в Telegram: {e}")
+                return self._publication_failed(f"Ошибка отправки в Telegram: {e}", retry=True)
             
         except KeyError as e:
-            logger.error(f"❌ Ошибка публикации в Telegram: отсутствует ключ {e}")
+            return self._publication_failed(f"Ошибка публикации в Telegram: отсутствует ключ {e}")
         except Exception as e:
             logger.error(f"❌ Ошибка публикации в Telegram: {e}")
+            return {'success': False, 'error': str(e), 'retry': True}
     
     def _publish_to_pinterest(self, category_id, platform_id):
-        """Публикация пина в Pinterest"""
+        """Публикация пина в Pinterest. Returns: dict результата (см. _publish_content)"""
         try:
             from database.database import db
             
             # Получаем категорию
             category = db.get_category(category_id)
             if not category:
-                logger.error(f"❌ Категория {category_id} не найдена")
-                return
+                return self._publication_failed(f"Категория {category_id} не найдена")
             
             # Конвертируем в dict если нужно
             if not isinstance(category, dict):
@@ -404,99 +497,62 @@ class AutoPublishScheduler:
             # Проверяем наличие user_id
             user_id = get_user_id_from_category(db, category)
             if not user_id:
-                return
-            
-            # Получаем пользователя
-            user = db.get_user(user_id)
-            if not user:
-                logger.error(f"❌ Пользователь {user_id} не найден")
-                return
-            
-            # Конвертируем в dict если нужно
-            if not isinstance(user, dict):
-                user = dict(user)
+                return self._publication_failed(f"Владелец категории {category_id} не найден")
             
             # Находим подключенный Pinterest
-            connections = user.get('platform_connections', {})
-            if isinstance(connections, str):
-                import json
-                connections = json.loads(connections)
-            
-            pinterests = connections.get('pinterests', [])
-            
-            pinterest = None
             platform_index = int(platform_id) if platform_id.isdigit() else 0
+            connection = db.get_platform_connection(user_id, 'pinterests', position=platform_index)
             
-            if platform_index < len(pinterests):
-                pinterest = pinterests[platform_index]
+            if not connection or connection['status'] != 'active':
+                return self._publication_failed("Pinterest не найден или не активен")
             
-            if not pinterest or pinterest.get('status') != 'active':
-                logger.error(f"❌ Pinterest не найден или не активен")
-                return
+            pinterest = connection['settings']
             
-            logger.info(f"🚧 Публикация в Pinterest пока не реализована полностью")
             logger.info(f"📌 Запланирован пин для {pinterest.get('username', 'Unknown')}")
+            return self._publication_failed("Публикация в Pinterest пока не реализована")
             
         except KeyError as e:
-            logger.error(f"❌ Ошибка публикации в Pinterest: отсутствует ключ {e}")
+            return self._publication_failed(f"Ошибка публикации в Pinterest: отсутствует ключ {e}")
         except Exception as e:
             logger.error(f"❌ Ошибка публикации в Pinterest: {e}")
+            return {'success': False, 'error': str(e), 'retry': True}
     
     def _run_scheduler(self):
-        """Основной цикл планировщика"""
+        """
+        Основной цикл планировщика: спит до ближайшего слота из кучи
+        (или до notify_schedule_changed), ставит наступившие слоты в очередь
+        publication_jobs и арендует из неё задания по числу свободных воркеров
+        """
         logger.info("🔄 Планировщик публикаций начал работу")
         
         # Запускаем первую проверку через 30 секунд после старта
-        time.sleep(30)
-        
-        last_check_minute = -1
+        self._wakeup.wait(30)
         
         while self.is_running:
             try:
-                # Откатываем любую незавершенную транзакцию в начале цикла
-                try:
-                    from database.database import db
-                    db.conn.rollback()
-                except:
-                    pass
+                self._wakeup.clear()
                 
-                current_time = datetime.now()
-                minute = current_time.minute
+                if time.monotonic() - self._last_resync >= RESYNC_INTERVAL:
+                    self._sync_all_schedules()
                 
-                # Проверяем только раз в минуту
-                if minute == last_check_minute:
-                    time.sleep(10)
-                    continue
+                self._sync_dirty_schedules()
                 
-                last_check_minute = minute
+                due = self.engine.pop_due()
+                if due:
+                    logger.info(f"⏰ Наступило {len(due)} запланированных публикаций")
                 
-                # Получаем список публикаций на текущее время
-                publications = self._get_scheduled_publications()
+                for entry, slot in due:
+                    if not self.is_running:
+                        break
+                    self._enqueue_due_publication(entry, slot)
                 
-                if publications:
-                    logger.info(f"⏰ Найдено {len(publications)} запланированных публикаций")
-                    
-                    for pub in publications:
-                        try:
-                            logger.info(f"📤 Публикация: {pub['platform_type']} (категория {pub['category_id']})")
-                            self._publish_content(
-                                pub['category_id'],
-                                pub['platform_type'],
-                                pub['platform_id']
-                            )
-                            
-                            # Небольшая задержка между публикациями
-                            time.sleep(5)
-                            
-                        except Exception as e:
-                            logger.error(f"❌ Ошибка публикации: {e}")
-                    
-                    # Ждём 2 минуты после публикации
-                    time.sleep(120)
-                    last_check_minute = -1
-                else:
-                    # Ждём 30 секунд перед следующей проверкой
-                    time.sleep(30)
+                self._claim_jobs()
+                self._renew_leases()
+                self._cleanup_finished_jobs()
+                
+                from database.database import db
+                db.release_thread_connection()
+                self._wakeup.wait(self._seconds_until_next_fire())
                     
             except Exception as e:
                 logger.error(f"❌ Ошибка в планировщике публикаций: {e}")
@@ -519,4 +575,9 @@ def stop_auto_publish_scheduler():
     auto_publish_scheduler.stop()
 
 
+def notify_schedule_changed(category_id, platform_type, platform_id):
+    """Сообщить планировщику об изменении строки platform_schedules"""
+    auto_publish_scheduler.notify_schedule_changed(category_id, platform_type, platform_id)
+
+
 print("✅ handlers/auto_publish_scheduler.py загружен")
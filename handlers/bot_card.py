@@ -3,12 +3,13 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from utils import escape_html, safe_answer_callback
 import json
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("open_bot_"))
+@router.prefix("open_bot_")
 def handle_open_bot(call):
     """Открытие карточки бота"""
     bot_id = int(call.data.split("_")[-1])
@@ -132,7 +133,7 @@ def handle_open_bot(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("bot_settings_"))
+@router.prefix("bot_settings_")
 def handle_bot_settings(call):
     """Настройки бота"""
     bot_id = int(call.data.split("_")[-1])
@@ -178,7 +179,7 @@ def handle_bot_settings(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("delete_bot_"))
+@router.prefix("delete_bot_")
 def handle_delete_bot_confirm(call):
     """Подтверждение удаления бота"""
     bot_id = int(call.data.split("_")[-1])
@@ -221,7 +222,7 @@ def handle_delete_bot_confirm(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("confirm_delete_bot_"))
+@router.prefix("confirm_delete_bot_")
 def handle_delete_bot_execute(call):
     """Выполнение удаления бота"""
     bot_id = int(call.data.split("_")[-1])
@@ -260,7 +261,7 @@ print("✅ handlers/bot_card.py загружен")
 # РЕДАКТИРОВАНИЕ ДАННЫХ КОМПАНИИ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("edit_bot_info_"))
+@router.prefix("edit_bot_info_")
 def edit_bot_info_menu(call):
     """Меню редактирования данных компании"""
     bot_id = int(call.data.split("_")[-1])
@@ -348,7 +349,7 @@ def edit_bot_info_menu(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("edit_field_"))
+@router.prefix("edit_field_")
 def edit_field_start(call):
     """Начать редактирование поля"""
     parts = call.data.split("_")
@@ -484,7 +485,7 @@ def save_field_value(message, bot_id, field_key):
     )
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("clear_field_"))
+@router.prefix("clear_field_")
 def clear_field(call):
     """Очистить поле"""
     parts = call.data.split("_")
@@ -530,7 +531,7 @@ def clear_field(call):
 # ПЕРЕИМЕНОВАНИЕ БОТА
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("rename_bot_"))
+@router.prefix("rename_bot_")
 def rename_bot_start(call):
     """Начать переименование бота"""
     bot_id = int(call.data.split("_")[-1])
@@ -626,7 +627,7 @@ def save_new_bot_name(message, bot_id, user_id):
     bot.send_message(message.chat.id, text, reply_markup=markup, parse_mode='HTML')
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("edit_company_data_"))
+@router.prefix("edit_company_data_")
 def edit_company_data_redirect(call):
     """Редирект на редактирование данных компании"""
     bot_id = int(call.data.split("_")[-1])
@@ -637,7 +638,7 @@ def edit_company_data_redirect(call):
     edit_bot_info_menu(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("toggle_platform_"))
+@router.prefix("toggle_platform_")
 def toggle_platform_connection(call):
     """Переключить подключение площадки к боту (подключить/отключить)"""
     parts = call.data.split("_")
@@ -3,6 +3,7 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from utils import escape_html, safe_answer_callback
 import json
@@ -213,7 +214,7 @@ COMPANY_QUESTIONS = [
 # НАЧАЛО СОЗДАНИЯ БОТА
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data == "create_bot")
+@router.exact("create_bot")
 def start_bot_creation(call):
     """Начало создания бота с проверкой незавершенных"""
     user_id = call.from_user.id
@@ -299,7 +300,7 @@ def start_bot_creation(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "ask_bot_name")
+@router.exact("ask_bot_name")
 def ask_bot_name(call):
     """Спросить название проекта"""
     text = (
@@ -387,7 +388,7 @@ def save_bot_name_and_start(message, user_id):
     ask_next_unanswered_question(message.chat.id, user_id, bot_id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("continue_bot_"))
+@router.prefix("continue_bot_")
 def continue_bot_creation(call):
     """Продолжить заполнение незавершенного бота"""
     bot_id = int(call.data.split("_")[-1])
@@ -395,7 +396,7 @@ def continue_bot_creation(call):
     safe_answer_callback(bot, call.id, "▶️ Продолжаем...")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("delete_and_create_"))
+@router.prefix("delete_and_create_")
 def delete_and_create_new(call):
     """Удалить незавершенный и создать новый"""
     bot_id = int(call.data.split("_")[-1])
@@ -403,7 +404,7 @@ def delete_and_create_new(call):
     start_bot_creation(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("delete_and_create_"))
+@router.prefix("delete_and_create_")
 def delete_and_create_new(call):
     """Удалить незавершенный и создать новый"""
     bot_id = int(call.data.split("_")[-1])
@@ -596,7 +597,7 @@ def process_answer(message, bot_id, question_key):
     ask_next_unanswered_question(chat_id, user_id, bot_id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("skip_q_"))
+@router.prefix("skip_q_")
 def skip_question(call):
     """Пропустить вопрос"""
     parts = call.data.split("_")
@@ -634,7 +635,7 @@ def skip_question(call):
     safe_answer_callback(bot, call.id, "⏭ Пропущено")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("cancel_creation_"))
+@router.prefix("cancel_creation_")
 def cancel_creation(call):
     """Прервать создание (бот остается в БД)"""
     bot_id = int(call.data.split("_")[-1])
@@ -3,15 +3,17 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from utils import escape_html, safe_answer_callback
+from utils.state_store import StateStore
 
 
 # Состояния создания категории
-category_creation_state = {}
+category_creation_state = StateStore('category_creation')
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("create_category_"))
+@router.prefix("create_category_")
 def handle_create_category(call):
     """Начало создания категории"""
     bot_id = int(call.data.split("_")[-1])
@@ -130,7 +132,7 @@ def handle_category_name(message):
     bot.send_message(message.chat.id, text, reply_markup=markup, parse_mode='HTML')
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("manage_categories_"))
+@router.prefix("manage_categories_")
 def handle_manage_categories(call):
     """Управление категориями"""
     bot_id = int(call.data.split("_")[-1])
@@ -191,7 +193,7 @@ def handle_manage_categories(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("open_category_"))
+@router.prefix("open_category_")
 def handle_open_category(call):
     """Открытие карточки категории"""
     category_id = int(call.data.split("_")[-1])
@@ -215,7 +217,7 @@ def handle_open_category(call):
     description = category.get('description', '')
     
     # Проверяем наличие данных
-    has_keywords = bool(category.get('keywords'))
+    has_keywords = bool(db.get_category_keywords_count(category_id))
     
     # Проверка медиа: должны быть реальные файлы, не только служебные поля
     media = category.get('media')
@@ -469,7 +471,7 @@ def handle_open_category(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("category_settings_"))
+@router.prefix("category_settings_")
 def handle_category_settings(call):
     """Настройки категории"""
     category_id = int(call.data.split("_")[-1])
@@ -510,7 +512,7 @@ def handle_category_settings(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("delete_category_"))
+@router.prefix("delete_category_")
 def handle_delete_category_confirm(call):
     """Подтверждение удаления категории"""
     category_id = int(call.data.split("_")[-1])
@@ -555,7 +557,7 @@ def handle_delete_category_confirm(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("confirm_delete_category_"))
+@router.prefix("confirm_delete_category_")
 def handle_delete_category_execute(call):
     """Выполнение удаления категории"""
     category_id = int(call.data.split("_")[-1])
@@ -3,16 +3,28 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from config import ADMIN_ID
 from utils import escape_html, safe_answer_callback
+from utils.state_store import StateStore
+from utils.token_ledger import reserve_tokens
+
+
+def _media_items(media):
+    """Файлы медиа категории: список или {'items': [...]} (после опроса ключевых фраз)"""
+    if isinstance(media, list):
+        return media
+    if isinstance(media, dict):
+        return media.get('items') or []
+    return []
 
 
 # ═══════════════════════════════════════════════════════════════
 # МЕДИА
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("category_media_"))
+@router.prefix("category_media_")
 def handle_category_media(call):
     """Управление медиа категории"""
     category_id = int(call.data.split("_")[-1])
@@ -23,8 +35,7 @@ def handle_category_media(call):
         return
     
     category_name = category['name']
-    media = category.get('media', [])
-    media_count = len(media) if isinstance(media, list) else 0
+    media_count = len(_media_items(category.get('media')))
     
     text = (
         f"📷 <b>МОИ МЕДИА</b>\n"
@@ -79,7 +90,7 @@ def handle_category_media(call):
 # ОПИСАНИЕ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("category_description_"))
+@router.prefix("category_description_")
 def handle_category_description(call):
     """Управление описанием категории"""
     category_id = int(call.data.split("_")[-1])
@@ -156,7 +167,7 @@ def handle_category_description(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("add_description_"))
+@router.prefix("add_description_")
 def handle_add_description(call):
     """Добавление описания категории"""
     category_id = int(call.data.split("_")[-1])
@@ -199,7 +210,7 @@ def handle_add_description(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("edit_description_"))
+@router.prefix("edit_description_")
 def handle_edit_description_start(call):
     """Начало редактирования описания"""
     category_id = int(call.data.split("_")[-1])
@@ -258,7 +269,7 @@ def handle_edit_description_start(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("delete_description_"))
+@router.prefix("delete_description_")
 def handle_delete_description(call):
     """Удаление описания"""
     category_id = int(call.data.split("_")[-1])
@@ -363,7 +374,7 @@ def handle_description_text(message):
 # ЦЕНЫ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("category_prices_"))
+@router.prefix("category_prices_")
 def handle_category_prices(call):
     """Управление ценами категории"""
     category_id = int(call.data.split("_")[-1])
@@ -435,7 +446,7 @@ def handle_category_prices(call):
 # ОТЗЫВЫ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("category_reviews_"))
+@router.prefix("category_reviews_")
 def handle_category_reviews(call):
     """Управление отзывами категории"""
     category_id = int(call.data.split("_")[-1])
@@ -511,7 +522,7 @@ def handle_category_reviews(call):
 # ОБЩАЯ ЗАГЛУШКА "СКОРО"
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data == "coming_soon")
+@router.exact("coming_soon")
 def handle_coming_soon(call):
     """Заглушка для функций в разработке"""
     safe_answer_callback(bot, call.id, "🚧 Функция в разработке", show_alert=True)
@@ -521,7 +532,7 @@ def handle_coming_soon(call):
 # ГЕНЕРАЦИЯ ОПИСАНИЯ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gen_desc_"))
+@router.prefix("gen_desc_")
 def handle_generate_description(call):
     """Генерация описания категории с помощью AI"""
     from ai.text_generator import generate_product_description
@@ -541,12 +552,13 @@ def handle_generate_description(call):
         safe_answer_callback(bot, call.id, "❌ Бот не найден")
         return
     
-    # Проверяем баланс (20 токенов за описание)
-    user = db.get_user(user_id)
-    tokens = user.get('tokens', 0)
+    # Резервируем токены (20 токенов за описание, админ — бесплатно)
     cost = 20
+    reservation = None
+    if str(user_id) != str(ADMIN_ID):
+        reservation = reserve_tokens(user_id, cost, 'text_generation', None, category_id)
     
-    if str(user_id) != str(ADMIN_ID) and tokens < cost:
+    if str(user_id) != str(ADMIN_ID) and reservation is None:
         bot.answer_callback_query(
             call.id,
             f"❌ Недостаточно токенов. Нужно: {cost} 💎",
@@ -571,7 +583,7 @@ def handle_generate_description(call):
     # Собираем данные для генерации
     category_name = category['name']
     company_data = bot_data.get('company_data', {})
-    keywords = category.get('keywords', [])
+    keywords = db.get_category_keywords_list(category_id, limit=5)
     
     # Формируем характеристики и преимущества
     features = f"Категория: {category_name}"
@@ -596,6 +608,8 @@ def handle_generate_description(call):
     )
     
     if not result['success']:
+        if reservation:
+            reservation.refund()
         bot.send_message(
             call.message.chat.id,
             f"❌ <b>Ошибка генерации</b>\n\n{result.get('error', 'Неизвестная ошибка')}",
@@ -606,16 +620,9 @@ def handle_generate_description(call):
     description = result['text']
     word_count = result.get('word_count', 0)
     
-    # Списываем токены
-    if str(user_id) != str(ADMIN_ID):
-        db.update_tokens(user_id, -cost)
-        
-        # Логируем расход
-        db.cursor.execute("""
-            INSERT INTO token_expenses (user_id, amount, action, category_id, created_at)
-            VALUES (%s, %s, %s, %s, NOW())
-        """, (user_id, cost, 'text_generation', category_id))
-        db.conn.commit()
+    # Подтверждаем списание токенов
+    if reservation:
+        reservation.commit()
     
     # Сохраняем описание
     db.cursor.execute("""
@@ -666,7 +673,7 @@ def handle_generate_description(call):
 # ГЕНЕРАЦИЯ ИЗОБРАЖЕНИЯ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gen_image_"))
+@router.prefix("gen_image_")
 def handle_generate_image(call):
     """Генерация изображения с помощью Nano Banana Pro"""
     from ai.image_generator import generate_image
@@ -680,12 +687,13 @@ def handle_generate_image(call):
         safe_answer_callback(bot, call.id, "❌ Категория не найдена")
         return
     
-    # Проверяем баланс (30 токенов за изображение)
-    user = db.get_user(user_id)
-    tokens = user.get('tokens', 0)
+    # Резервируем токены (30 токенов за изображение, админ — бесплатно)
     cost = 30
+    reservation = None
+    if str(user_id) != str(ADMIN_ID):
+        reservation = reserve_tokens(user_id, cost, 'image_generation', None, category_id)
     
-    if str(user_id) != str(ADMIN_ID) and tokens < cost:
+    if str(user_id) != str(ADMIN_ID) and reservation is None:
         bot.answer_callback_query(
             call.id,
             f"❌ Недостаточно токенов. Нужно: {cost} 💎",
@@ -721,6 +729,8 @@ def handle_generate_image(call):
     result = generate_image(prompt=prompt, aspect_ratio="1:1")
     
     if not result['success']:
+        if reservation:
+            reservation.refund()
         bot.send_message(
             call.message.chat.id,
             f"❌ <b>Ошибка генерации</b>\n\n{result.get('error', 'Неизвестная ошибка')}",
@@ -730,16 +740,9 @@ def handle_generate_image(call):
     
     image_bytes = result['image_bytes']
     
-    # Списываем токены
-    if str(user_id) != str(ADMIN_ID):
-        db.update_tokens(user_id, -cost)
-        
-        # Логируем расход
-        db.cursor.execute("""
-            INSERT INTO token_expenses (user_id, amount, action, category_id, created_at)
-            VALUES (%s, %s, %s, %s, NOW())
-        """, (user_id, cost, 'image_generation', category_id))
-        db.conn.commit()
+    # Подтверждаем списание токенов
+    if reservation:
+        reservation.commit()
     
     # Сохраняем изображение (TODO: в будущем сохранять в БД или на диск)
     
@@ -782,7 +785,7 @@ print("✅ handlers/category_sections.py загружен")
 # ПРОСМОТР ГАЛЕРЕИ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("view_gallery_"))
+@router.prefix("view_gallery_")
 def handle_view_gallery(call):
     """Просмотр галереи медиа"""
     category_id = int(call.data.split("_")[-1])
@@ -792,8 +795,8 @@ def handle_view_gallery(call):
         safe_answer_callback(bot, call.id, "❌ Категория не найдена")
         return
     
-    media = category.get('media', [])
-    if not media or not isinstance(media, list):
+    media = _media_items(category.get('media'))
+    if not media:
         safe_answer_callback(bot, call.id, "❌ Нет медиа-файлов")
         return
     
@@ -846,7 +849,7 @@ def handle_view_gallery(call):
     )
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("clear_gallery_"))
+@router.prefix("clear_gallery_")
 def handle_clear_gallery(call):
     """Очистка галереи медиа"""
     category_id = int(call.data.split("_")[-1])
@@ -883,7 +886,7 @@ def handle_clear_gallery(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("confirm_clear_"))
+@router.prefix("confirm_clear_")
 def handle_confirm_clear_gallery(call):
     """Подтверждение очистки галереи"""
     import json
@@ -915,7 +918,7 @@ def handle_confirm_clear_gallery(call):
 # ПРАЙС-ЛИСТЫ (EXCEL)
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("download_price_template_"))
+@router.prefix("download_price_template_")
 def handle_download_price_template(call):
     """Скачать шаблон Excel для прайс-листа"""
     category_id = int(call.data.split("_")[-1])
@@ -1021,7 +1024,7 @@ def handle_download_price_template(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка создания шаблона", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("download_current_price_"))
+@router.prefix("download_current_price_")
 def handle_download_current_price(call):
     """Скачать текущий прайс-лист"""
     category_id = int(call.data.split("_")[-1])
@@ -1106,7 +1109,7 @@ def handle_download_current_price(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка экспорта", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("delete_price_"))
+@router.prefix("delete_price_")
 def handle_delete_price(call):
     """Удаление прайс-листа"""
     category_id = int(call.data.split("_")[-1])
@@ -1143,7 +1146,7 @@ def handle_delete_price(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("confirm_delete_price_"))
+@router.prefix("confirm_delete_price_")
 def confirm_delete_price(call):
     """Подтверждение удаления прайса"""
     category_id = int(call.data.split("_")[-1])
@@ -1164,9 +1167,9 @@ def confirm_delete_price(call):
 
 
 # Состояние загрузки прайса
-price_upload_state = {}
+price_upload_state = StateStore('price_upload')
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("upload_price_file_"))
+@router.prefix("upload_price_file_")
 def handle_upload_price_file(call):
     """Инструкция по загрузке прайс-листа"""
     category_id = int(call.data.split("_")[-1])
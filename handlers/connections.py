@@ -3,16 +3,18 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from utils import escape_html, safe_answer_callback
 import json
+from utils.state_store import StateStore
 
 
 # Состояния подключения
-connection_state = {}
+connection_state = StateStore('connections')
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("web_connect_cms:"))
+@router.prefix("web_connect_cms:")
 def handle_connect_cms(call):
     """Начало подключения WordPress"""
     bot_id = int(call.data.split(":")[1])
@@ -56,7 +58,7 @@ def handle_connect_cms(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("start_wp_connect_"))
+@router.prefix("start_wp_connect_")
 def start_wp_connection(call):
     """Запуск процесса подключения WordPress"""
     bot_id = int(call.data.split("_")[-1])
@@ -250,7 +252,7 @@ def handle_wp_password(message):
     bot.send_message(message.chat.id, text, reply_markup=markup, parse_mode='HTML')
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("cancel_connection_"))
+@router.prefix("cancel_connection_")
 def cancel_connection(call):
     """Отмена подключения"""
     bot_id = int(call.data.split("_")[-1])
@@ -278,7 +280,7 @@ def cancel_connection(call):
 # ПОДКЛЮЧЕНИЕ PINTEREST
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("pinterest_auth_"))
+@router.prefix("pinterest_auth_")
 def handle_pinterest_auth(call):
     """Авторизация Pinterest (заглушка)"""
     bot_id = int(call.data.split("_")[-1])
@@ -314,7 +316,7 @@ def handle_pinterest_auth(call):
 # ПОДКЛЮЧЕНИЕ TELEGRAM
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("reconnect_telegram_"))
+@router.prefix("reconnect_telegram_")
 def handle_telegram_reconnect(call):
     """Подключение Telegram бота (заглушка)"""
     bot_id = int(call.data.split("_")[-1])
@@ -6,6 +6,7 @@
 import logging
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html, safe_answer_callback
 
 # psycopg2/3 compatibility
@@ -63,6 +64,15 @@ def _get_platform_scheduler(category_id, platform_type, platform_id):
         return {}
 
 
+def _notify_schedule_changed(category_id, platform_type, platform_id):
+    """Пересчитать расписание в планировщике автопубликаций после записи в БД"""
+    try:
+        from handlers.auto_publish_scheduler import notify_schedule_changed
+        notify_schedule_changed(category_id, platform_type, platform_id)
+    except Exception as e:
+        logger.error(f"Ошибка уведомления планировщика: {e}")
+
+
 def _save_platform_scheduler(category_id, platform_type, platform_id, schedule_data):
     """
     Сохранить настройки планировщика в БД
@@ -92,6 +102,7 @@ def _save_platform_scheduler(category_id, platform_type, platform_id, schedule_d
         
         db.conn.commit()
         cursor.close()
+        _notify_schedule_changed(category_id, platform_type, platform_id)
         return True
     except Exception as e:
         logger.error(f"Ошибка _save_platform_scheduler: {e}")
@@ -106,7 +117,7 @@ def _save_platform_scheduler(category_id, platform_type, platform_id, schedule_d
 # ОБРАБОТЧИКИ CALLBACK
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("global_scheduler_platform_"))
+@router.prefix("global_scheduler_platform_")
 def show_global_scheduler_platform(call):
     """Обработчик для кнопки "Назад" из настройки расписания к платформе"""
     # Парсим: global_scheduler_platform_{category_id}_{bot_id}_{platform_type}_{platform_id}
@@ -121,7 +132,7 @@ def show_global_scheduler_platform(call):
     handle_platform_settings(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("global_scheduler_"))
+@router.prefix("global_scheduler_")
 def show_global_scheduler(call):
     """Показать глобальный планировщик со всеми платформами"""
     parts = call.data.split("_")
@@ -512,7 +523,7 @@ def show_global_scheduler(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gs_select_platforms_"))
+@router.prefix("gs_select_platforms_")
 def select_platforms(call):
     """Выбор платформ для планировщика"""
     bot_id = int(call.data.split("_")[3])
@@ -585,7 +596,7 @@ def select_platforms(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gs_toggle_platform_"))
+@router.prefix("gs_toggle_platform_")
 def toggle_platform(call):
     """Переключение платформы"""
     parts = call.data.split("_")
@@ -612,7 +623,7 @@ def toggle_platform(call):
     select_platforms(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gs_enable_") or call.data.startswith("gs_schedule_"))
+@router.prefix("gs_enable_", "gs_schedule_")
 def show_schedule_menu(call):
     """Меню выбора расписания"""
     parts = call.data.split("_")
@@ -636,6 +647,7 @@ def show_schedule_menu(call):
             """, (category_id, platform_type, platform_id))
             db.conn.commit()
             cursor.close()
+            _notify_schedule_changed(category_id, platform_type, platform_id)
             
             safe_answer_callback(bot, call.id, "✅ Планировщик включен!")
             
@@ -708,7 +720,7 @@ def show_schedule_menu(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gs_set_days_"))
+@router.prefix("gs_set_days_")
 def set_scheduler_days(call):
     """Выбор количества дней и постов в день"""
     parts = call.data.split("_")
@@ -759,7 +771,7 @@ def set_scheduler_days(call):
         confirm_schedule(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gs_confirm_schedule_"))
+@router.prefix("gs_confirm_schedule_")
 def confirm_schedule(call):
     """Подтверждение и сохранение расписания"""
     parts = call.data.split("_")
@@ -829,7 +841,7 @@ def confirm_schedule(call):
     safe_answer_callback(bot, call.id, "✅ Планировщик активирован!")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gs_disable_"))
+@router.prefix("gs_disable_")
 def disable_global_scheduler(call):
     """Отключение глобального планировщика"""
     bot_id = int(call.data.split("_")[2])
@@ -847,7 +859,7 @@ def disable_global_scheduler(call):
     show_global_scheduler(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gs_edit_schedule_"))
+@router.prefix("gs_edit_schedule_")
 def edit_scheduler_settings(call):
     """Редактирование расписания"""
     bot_id = int(call.data.split("_")[3])
@@ -857,7 +869,7 @@ def edit_scheduler_settings(call):
     show_schedule_menu(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gs_stats_"))
+@router.prefix("gs_stats_")
 def show_scheduler_stats(call):
     """Статистика глобального планировщика"""
     bot_id = int(call.data.split("_")[2])
@@ -893,7 +905,7 @@ def show_scheduler_stats(call):
 
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gs_platform_"))
+@router.prefix("gs_platform_")
 def handle_platform_settings(call):
     """Настройка отдельной платформы в глобальном планировщике"""
     parts = call.data.split("_")
@@ -1001,7 +1013,7 @@ def handle_platform_settings(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gs_disable_platform_"))
+@router.prefix("gs_disable_platform_")
 def disable_platform_scheduler(call):
     """Отключить планировщик для платформы"""
     parts = call.data.split("_")
@@ -1025,7 +1037,7 @@ def disable_platform_scheduler(call):
     handle_platform_settings(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gs_stats_"))
+@router.prefix("gs_stats_")
 def show_category_scheduler_stats(call):
     """Показать статистику публикаций"""
     parts = call.data.split("_")
@@ -1151,7 +1163,7 @@ def show_category_scheduler_stats(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("scheduler_setup_"))
+@router.prefix("scheduler_setup_")
 def handle_scheduler_setup(call):
     """
     Настройка расписания публикаций для платформы
@@ -1319,7 +1331,7 @@ def handle_scheduler_setup(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка загрузки настроек")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("schedule_days_"))
+@router.prefix("schedule_days_")
 def handle_schedule_days(call):
     """Выбор дней недели для публикаций"""
     try:
@@ -1401,7 +1413,7 @@ def handle_schedule_days(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("toggle_day_"))
+@router.prefix("toggle_day_")
 def toggle_schedule_day(call):
     """Переключение выбора дня недели"""
     try:
@@ -1438,6 +1450,7 @@ def toggle_schedule_day(call):
             
             db.conn.commit()
             cursor.close()
+            _notify_schedule_changed(category_id, platform_type, platform_id)
         except:
             try:
                 db.conn.rollback()
@@ -1453,7 +1466,7 @@ def toggle_schedule_day(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("schedule_times_"))
+@router.prefix("schedule_times_")
 def handle_schedule_times(call):
     """Выбор времени для публикаций с ограничением"""
     try:
@@ -1550,7 +1563,7 @@ def handle_schedule_times(call):
     except Exception as e:
         logger.error(f"Ошибка в handle_schedule_times: {e}")
         safe_answer_callback(bot, call.id, "❌ Ошибка")
-@bot.callback_query_handler(func=lambda call: call.data.startswith("toggle_time_"))
+@router.prefix("toggle_time_")
 def toggle_schedule_time(call):
     """Переключение выбора времени с проверкой лимита"""
     try:
@@ -1607,6 +1620,7 @@ def toggle_schedule_time(call):
             
             db.conn.commit()
             cursor.close()
+            _notify_schedule_changed(category_id, platform_type, platform_id)
         except Exception as e:
             logger.error(f"Ошибка сохранения времени: {e}")
             try:
@@ -1621,7 +1635,7 @@ def toggle_schedule_time(call):
     except Exception as e:
         logger.error(f"Ошибка в toggle_schedule_time: {e}")
         safe_answer_callback(bot, call.id, "❌ Ошибка")
-@bot.callback_query_handler(func=lambda call: call.data.startswith("schedule_frequency_"))
+@router.prefix("schedule_frequency_")
 def handle_schedule_frequency_select(call):
     """Выбор частоты публикаций в день (1-5)"""
     try:
@@ -1676,7 +1690,7 @@ def handle_schedule_frequency_select(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_frequency_"))
+@router.prefix("set_frequency_")
 def set_frequency(call):
     """Установка частоты публикаций"""
     try:
@@ -1699,6 +1713,7 @@ def set_frequency(call):
             
             db.conn.commit()
             cursor.close()
+            _notify_schedule_changed(category_id, platform_type, platform_id)
             
             safe_answer_callback(bot, call.id, f"✅ Частота: {frequency} раз в день")
         except Exception as e:
@@ -1716,7 +1731,7 @@ def set_frequency(call):
     except Exception as e:
         logger.error(f"Ошибка в set_frequency: {e}")
         safe_answer_callback(bot, call.id, "❌ Ошибка")
-@bot.callback_query_handler(func=lambda call: call.data.startswith("save_days_"))
+@router.prefix("save_days_")
 def save_schedule_days(call):
     """Сохранение выбранных дней и возврат к настройке расписания"""
     try:
@@ -1737,7 +1752,7 @@ def save_schedule_days(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("save_times_"))
+@router.prefix("save_times_")
 def save_schedule_times(call):
     """Сохранение выбранного времени и возврат к настройке расписания"""
     try:
@@ -1,17 +1,25 @@
 """
 Обработчик подбора ключевых фраз для категории
 """
-from telebot import types
+import requests
+from telebot import types, apihelper
 from loader import bot
-from database.database import db
+from callback_router import router
+from database.database import db, KEYWORD_MAX_LENGTH
 from utils import escape_html, safe_answer_callback
 from config import TOKEN_PRICES
-import json
+from utils.generation_executor import generation_executor, submit_generation
+from utils.token_ledger import reserve_tokens
+from functools import partial
 from datetime import datetime
+from utils.state_store import StateStore
 
 
 # Состояния опроса для ключевых фраз (временное хранилище)
-keywords_state = {}
+keywords_state = StateStore('keywords')
+
+# Сколько фраз показывать в сообщении «Все фразы» (полный список — в TXT)
+KEYWORDS_VIEW_LIMIT = 100
 
 
 def save_survey_answers_permanent(user_id, category_id, answers):
@@ -24,38 +32,16 @@ def save_survey_answers_permanent(user_id, category_id, answers):
         print(f"💾 Сохранение ответов опроса НАВСЕГДА для категории {category_id}")
         print(f"   Ответов: {len(answers)}")
         
-        # Получаем категорию
-        category = db.get_category(category_id)
-        if not category:
+        # Сохраняем ответы в отдельное ПОСТОЯННОЕ поле media
+        # (список media превращается в {'items': [...]} на стороне БД)
+        saved = db.update_category_json_patch(category_id, 'media', {
+            'survey_answers': answers,
+            'survey_completed_at': datetime.now().isoformat()
+        })
+        if not saved:
             print(f"⚠️ Категория {category_id} не найдена")
             return False
         
-        # Получаем текущий media
-        current_media = category.get('media', [])
-        
-        # Если media - список, преобразуем в словарь
-        if isinstance(current_media, list):
-            current_media = {'items': current_media}
-        elif not isinstance(current_media, dict):
-            current_media = {}
-        
-        # Сохраняем ответы в отдельное ПОСТОЯННОЕ поле
-        current_media['survey_answers'] = answers
-        current_media['survey_completed_at'] = datetime.now().isoformat()
-        
-        # Сохраняем
-        json_string = json.dumps(current_media, ensure_ascii=False)
-        json.loads(json_string)  # Проверка валидности
-        
-        db.cursor.execute(
-            """
-            UPDATE categories 
-            SET media = %s::jsonb
-            WHERE id = %s
-            """,
-            (json_string, category_id)
-        )
-        db.conn.commit()
         print(f"✅ Ответы опроса сохранены НАВСЕГДА")
         return True
         
@@ -63,19 +49,13 @@ def save_survey_answers_permanent(user_id, category_id, answers):
         print(f"❌ Ошибка сохранения ответов: {e}")
         import traceback
         traceback.print_exc()
-        
-        try:
-            db.conn.rollback()
-        except:
-            pass
-        
         return False
 
 
 def load_survey_answers_permanent(user_id, category_id):
     """Загрузить постоянные ответы опроса"""
     try:
-        category = db.get_category(category_id)
+        category = db.get_category(category_id, fields=['media'])
         if not category:
             return None
         
@@ -118,40 +98,11 @@ def save_survey_state(user_id, category_id, state_data):
         print(f"   Вопрос: {clean_state['question_index']}/{len(KEYWORDS_QUESTIONS)}")
         print(f"   Ответов: {len(clean_state['answers'])}")
         
-        # Получаем категорию
-        category = db.get_category(category_id)
-        if not category:
+        # Записываем только ключ survey_state (jsonb_set), остальной media не передаётся
+        if not db.update_category_json_set(category_id, 'media', ['survey_state'], clean_state):
             print(f"⚠️ Категория {category_id} не найдена")
             return False
         
-        # Получаем текущий media
-        current_media = category.get('media', [])
-        
-        # Если media - список, преобразуем в словарь
-        if isinstance(current_media, list):
-            current_media = {'items': current_media}
-        elif not isinstance(current_media, dict):
-            current_media = {}
-        
-        # Добавляем состояние опроса
-        current_media['survey_state'] = clean_state
-        
-        # ВАЖНО: json.dumps превращает dict в JSON-строку
-        json_string = json.dumps(current_media, ensure_ascii=False)
-        
-        # Проверяем что JSON валидный
-        json.loads(json_string)  # Тест десериализации
-        
-        # Сохраняем (::jsonb превращает JSON-строку в JSONB)
-        db.cursor.execute(
-            """
-            UPDATE categories 
-            SET media = %s::jsonb
-            WHERE id = %s
-            """,
-            (json_string, category_id)
-        )
-        db.conn.commit()
         print(f"✅ Состояние опроса успешно сохранено")
         return True
         
@@ -159,21 +110,13 @@ def save_survey_state(user_id, category_id, state_data):
         print(f"❌ Ошибка сохранения состояния: {e}")
         import traceback
         traceback.print_exc()
-        
-        # ВАЖНО: откатываем транзакцию
-        try:
-            db.conn.rollback()
-            print(f"🔄 Транзакция откачена")
-        except Exception as rollback_error:
-            print(f"⚠️ Ошибка отката: {rollback_error}")
-        
         return False
 
 
 def load_survey_state(user_id, category_id):
     """Загрузить состояние опроса из БД"""
     try:
-        category = db.get_category(category_id)
+        category = db.get_category(category_id, fields=['media'])
         if not category:
             print(f"⚠️ Категория {category_id} не найдена")
             return None
@@ -205,8 +148,8 @@ def load_survey_state(user_id, category_id):
 def clear_survey_state(user_id, category_id):
     """Очистить сохраненное состояние опроса"""
     try:
-        # Получаем категорию
-        category = db.get_category(category_id)
+        # Получаем категорию (только media)
+        category = db.get_category(category_id, fields=['media'])
         if not category:
             return False
         
@@ -215,19 +158,8 @@ def clear_survey_state(user_id, category_id):
         
         # Если media - словарь и есть survey_state
         if isinstance(current_media, dict) and 'survey_state' in current_media:
-            # Удаляем survey_state
-            del current_media['survey_state']
-            
-            # Сохраняем обратно
-            db.cursor.execute(
-                """
-                UPDATE categories 
-                SET media = %s::jsonb
-                WHERE id = %s
-                """,
-                (json.dumps(current_media), category_id)
-            )
-            db.conn.commit()
+            # Удаляем ключ survey_state на стороне БД
+            db.update_category_json_patch(category_id, 'media', remove=['survey_state'])
             print(f"🧹 Состояние опроса очищено для категории {category_id}")
             return True
         else:
@@ -236,11 +168,6 @@ def clear_survey_state(user_id, category_id):
             
     except Exception as e:
         print(f"⚠️ Ошибка очистки состояния: {e}")
-        # Откатываем транзакцию
-        try:
-            db.conn.rollback()
-        except:
-            pass
         return False
 
 
@@ -272,7 +199,7 @@ KEYWORDS_QUESTIONS = [
 ]
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("category_keywords_"))
+@router.prefix("category_keywords_")
 def handle_category_keywords(call):
     """Начало работы с ключевыми фразами"""
     category_id = int(call.data.split("_")[-1])
@@ -291,11 +218,11 @@ def handle_category_keywords(call):
         return
     
     category_name = category['name']
-    existing_keywords = category.get('keywords', [])
+    keywords_count = db.get_category_keywords_count(category_id) or 0
     
     # Если ключевые фразы уже есть - показываем их
-    if existing_keywords:
-        show_existing_keywords(call, category_id, category_name, existing_keywords)
+    if keywords_count:
+        show_existing_keywords(call, category_id, category_name, keywords_count)
         return
     
     # Если нет - предлагаем подобрать
@@ -337,13 +264,12 @@ def handle_category_keywords(call):
     safe_answer_callback(bot, call.id)
 
 
-def show_existing_keywords(call, category_id, category_name, keywords):
+def show_existing_keywords(call, category_id, category_name, keywords_count):
     """Показать существующие ключевые фразы"""
     user_id = call.from_user.id
-    keywords_count = len(keywords) if isinstance(keywords, list) else 0
     
     # Показываем первые 10 фраз
-    keywords_preview = keywords[:10] if isinstance(keywords, list) else []
+    keywords_preview = db.get_category_keywords_list(category_id, limit=10)
     keywords_text = '\n'.join([f"• {escape_html(kw)}" for kw in keywords_preview])
     
     if keywords_count > 10:
@@ -406,7 +332,7 @@ def show_existing_keywords(call, category_id, category_name, keywords):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("view_all_keywords_"))
+@router.prefix("view_all_keywords_")
 def handle_view_all_keywords(call):
     """Просмотр всех ключевых фраз"""
     category_id = int(call.data.split("_")[-1])
@@ -417,25 +343,31 @@ def handle_view_all_keywords(call):
         safe_answer_callback(bot, call.id, "❌ Категория не найдена", show_alert=True)
         return
     
-    keywords = category.get('keywords', [])
-    if not keywords or not isinstance(keywords, list):
+    keywords_count = db.get_category_keywords_count(category_id) or 0
+    if not keywords_count:
         safe_answer_callback(bot, call.id, "❌ Нет ключевых фраз", show_alert=True)
         return
     
     category_name = category.get('name', 'Без названия')
     
+    # В одно сообщение больше не поместится — остальные фразы в TXT
+    keywords = db.get_category_keywords_list(category_id, limit=KEYWORDS_VIEW_LIMIT)
+    
     # Формируем текст со всеми фразами
     text = (
         f"🔑 <b>ВСЕ КЛЮЧЕВЫЕ ФРАЗЫ</b>\n"
         f"📂 Категория: {escape_html(category_name)}\n"
         "━━━━━━━━━━━━━━\n\n"
-        f"📊 Всего: <b>{len(keywords)}</b> фраз\n\n"
+        f"📊 Всего: <b>{keywords_count}</b> фраз\n\n"
     )
     
     # Добавляем все фразы с нумерацией
     for i, kw in enumerate(keywords, 1):
         text += f"{i}. {escape_html(kw)}\n"
     
+    if keywords_count > len(keywords):
+        text += f"\n<i>... и ещё {keywords_count - len(keywords)} фраз (скачайте TXT)</i>\n"
+    
     text += "\n━━━━━━━━━━━━━━"
     
     markup = types.InlineKeyboardMarkup()
@@ -460,12 +392,12 @@ def handle_view_all_keywords(call):
                 f"🔑 <b>КЛЮЧЕВЫЕ ФРАЗЫ (первые 50)</b>\n"
                 f"📂 Категория: {escape_html(category_name)}\n"
                 "━━━━━━━━━━━━━━\n\n"
-                f"📊 Всего: <b>{len(keywords)}</b> фраз\n\n"
+                f"📊 Всего: <b>{keywords_count}</b> фраз\n\n"
             )
             for i, kw in enumerate(keywords[:50], 1):
                 short_text += f"{i}. {escape_html(kw)}\n"
             
-            short_text += f"\n<i>... и ещё {len(keywords) - 50} фраз</i>\n\n━━━━━━━━━━━━━━"
+            short_text += f"\n<i>... и ещё {keywords_count - 50} фраз</i>\n\n━━━━━━━━━━━━━━"
             
             bot.send_message(call.message.chat.id, short_text, reply_markup=markup, parse_mode='HTML')
         else:
@@ -474,7 +406,7 @@ def handle_view_all_keywords(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("delete_keywords_"))
+@router.prefix("delete_keywords_")
 def handle_delete_keywords(call):
     """Удаление всех ключевых фраз"""
     category_id = int(call.data.split("_")[-1])
@@ -486,8 +418,7 @@ def handle_delete_keywords(call):
         return
     
     category_name = category.get('name', 'Без названия')
-    keywords = category.get('keywords', [])
-    keywords_count = len(keywords) if isinstance(keywords, list) else 0
+    keywords_count = db.get_category_keywords_count(category_id) or 0
     
     # Подтверждение удаления
     text = (
@@ -519,7 +450,7 @@ def handle_delete_keywords(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("confirm_delete_keywords_"))
+@router.prefix("confirm_delete_keywords_")
 def handle_confirm_delete_keywords(call):
     """Подтверждение удаления ключевых фраз"""
     category_id = int(call.data.split("_")[-1])
@@ -533,14 +464,7 @@ def handle_confirm_delete_keywords(call):
     category_name = category.get('name', 'Без названия')
     
     # Удаляем ключевые фразы
-    try:
-        db.cursor.execute("""
-            UPDATE categories 
-            SET keywords = '[]'::jsonb
-            WHERE id = %s
-        """, (category_id,))
-        db.conn.commit()
-        
+    if db.delete_category_keywords(category_id):
         text = (
             "✅ <b>КЛЮЧЕВЫЕ ФРАЗЫ УДАЛЕНЫ</b>\n"
             "━━━━━━━━━━━━━━\n\n"
@@ -565,17 +489,11 @@ def handle_confirm_delete_keywords(call):
             bot.send_message(call.message.chat.id, text, reply_markup=markup, parse_mode='HTML')
         
         safe_answer_callback(bot, call.id, "✅ Удалено")
-        
-    except Exception as e:
-        print(f"❌ Ошибка удаления ключевых фраз: {e}")
+    else:
         safe_answer_callback(bot, call.id, "❌ Ошибка удаления", show_alert=True)
-        try:
-            db.conn.rollback()
-        except:
-            pass
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("download_keywords_"))
+@router.prefix("download_keywords_")
 def handle_download_keywords(call):
     """Скачивание ключевых фраз в TXT"""
     category_id = int(call.data.split("_")[-1])
@@ -587,8 +505,8 @@ def handle_download_keywords(call):
         safe_answer_callback(bot, call.id, "❌ Категория не найдена", show_alert=True)
         return
     
-    keywords = category.get('keywords', [])
-    if not keywords or not isinstance(keywords, list):
+    keywords = db.get_category_keywords_list(category_id)
+    if not keywords:
         safe_answer_callback(bot, call.id, "❌ Нет ключевых фраз", show_alert=True)
         return
     
@@ -635,7 +553,7 @@ def handle_download_keywords(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка создания файла", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("upload_keywords_"))
+@router.prefix("upload_keywords_")
 def handle_upload_keywords(call):
     """Инструкция по загрузке ключевых фраз"""
     category_id = int(call.data.split("_")[-1])
@@ -693,6 +611,38 @@ def handle_upload_keywords(call):
     safe_answer_callback(bot, call.id)
 
 
+def _spool_keyword_file(file_path):
+    """
+    Скачать TXT-файл Telegram построчно во временный файл — по фразе на строку
+    (файл целиком в память не читается, соединение с БД на время скачивания
+    не занимается).
+
+    Returns:
+        tuple: (путь к временному файлу, количество фраз)
+    """
+    import tempfile
+    import os
+    
+    url = (apihelper.FILE_URL or "https://api.telegram.org/file/bot{0}/{1}").format(bot.token, file_path)
+    fd, spool_path = tempfile.mkstemp(suffix='.txt', prefix='keywords_upload_')
+    count = 0
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as spool, \
+                requests.get(url, stream=True, proxies=apihelper.proxy,
+                             timeout=(apihelper.CONNECT_TIMEOUT, apihelper.READ_TIMEOUT)) as response:
+            response.raise_for_status()
+            for raw_line in response.iter_lines():
+                line = raw_line.decode('utf-8').lstrip('\ufeff').strip()
+                # Пропускаем пустые строки и комментарии
+                if line and not line.startswith('#'):
+                    spool.write(line + '\n')
+                    count += 1
+    except Exception:
+        os.unlink(spool_path)
+        raise
+    return spool_path, count
+
+
 @bot.message_handler(content_types=['document'], func=lambda message: message.from_user.id in keywords_state 
                      and keywords_state[message.from_user.id].get('step') == 'waiting_file')
 def handle_keywords_file_upload(message):
@@ -714,45 +664,31 @@ def handle_keywords_file_upload(message):
         return
     
     try:
-        # Скачиваем файл
-        file_info = bot.get_file(message.document.file_id)
-        downloaded_file = bot.download_file(file_info.file_path)
+        import os
         
-        # Декодируем содержимое
-        content = downloaded_file.decode('utf-8')
+        file_info = bot.get_file(message.document.file_id)
         
-        # Парсим ключевые фразы
-        new_keywords = []
-        for line in content.split('\n'):
-            line = line.strip()
-            # Пропускаем пустые строки и комментарии
-            if line and not line.startswith('#'):
-                new_keywords.append(line)
+        # Сначала скачиваем во временный файл, затем одним COPY в БД (дубликаты пропускаются в БД)
+        spool_path, received_count = _spool_keyword_file(file_info.file_path)
+        try:
+            if not received_count:
+                bot.send_message(
+                    message.chat.id,
+                    "❌ В файле не найдено ключевых фраз"
+                )
+                return
+            
+            result = db.create_category_keywords_from_file(category_id, spool_path)
+        finally:
+            os.unlink(spool_path)
         
-        if not new_keywords:
-            bot.send_message(
-                message.chat.id,
-                "❌ В файле не найдено ключевых фраз"
-            )
+        if not result:
+            bot.send_message(message.chat.id, "❌ Не удалось сохранить фразы, попробуйте позже")
             return
         
-        # Получаем существующие фразы
-        category = db.get_category(category_id)
-        existing_keywords = category.get('keywords', [])
-        if not isinstance(existing_keywords, list):
-            existing_keywords = []
-        
-        # Объединяем и убираем дубликаты
-        all_keywords = list(set(existing_keywords + new_keywords))
-        added_count = len(all_keywords) - len(existing_keywords)
-        
-        # Сохраняем в БД
-        db.cursor.execute("""
-            UPDATE categories 
-            SET keywords = %s::jsonb
-            WHERE id = %s
-        """, (json.dumps(all_keywords, ensure_ascii=False), category_id))
-        db.conn.commit()
+        added_count = result['added']
+        too_long_count = result['too_long']
+        duplicates_count = received_count - added_count - too_long_count
         
         # Очищаем состояние
         del keywords_state[user_id]
@@ -760,13 +696,15 @@ def handle_keywords_file_upload(message):
         text = (
             "✅ <b>КЛЮЧЕВЫЕ ФРАЗЫ ЗАГРУЖЕНЫ</b>\n"
             "━━━━━━━━━━━━━━\n\n"
-            f"📊 Загружено фраз из файла: <b>{len(new_keywords)}</b>\n"
+            f"📊 Загружено фраз из файла: <b>{received_count}</b>\n"
             f"➕ Добавлено новых: <b>{added_count}</b>\n"
-            f"📈 Всего фраз в категории: <b>{len(all_keywords)}</b>\n"
+            f"📈 Всего фраз в категории: <b>{result['total']}</b>\n"
         )
         
-        if added_count < len(new_keywords):
-            text += f"\n⚠️ Пропущено дубликатов: <b>{len(new_keywords) - added_count}</b>"
+        if duplicates_count > 0:
+            text += f"\n⚠️ Пропущено дубликатов: <b>{duplicates_count}</b>"
+        if too_long_count:
+            text += f"\n⚠️ Пропущено слишком длинных (более {KEYWORD_MAX_LENGTH} символов): <b>{too_long_count}</b>"
         
         markup = types.InlineKeyboardMarkup()
         markup.add(
@@ -786,7 +724,7 @@ def handle_keywords_file_upload(message):
         )
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("start_keywords_survey_"))
+@router.prefix("start_keywords_survey_")
 def handle_start_keywords_survey(call):
     """Начало опроса для подбора ключевых фраз"""
     category_id = int(call.data.split("_")[-1])
@@ -873,7 +811,7 @@ def handle_start_keywords_survey(call):
     safe_answer_callback(bot, call.id, "📝 Начинаем опрос")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("continue_survey_"))
+@router.prefix("continue_survey_")
 def handle_continue_survey(call):
     """Продолжить незавершенный опрос"""
     category_id = int(call.data.split("_")[-1])
@@ -901,7 +839,7 @@ def handle_continue_survey(call):
     safe_answer_callback(bot, call.id, "▶️ Продолжаем опрос")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("use_saved_answers_"))
+@router.prefix("use_saved_answers_")
 def handle_use_saved_answers(call):
     """Использовать сохраненные ответы для генерации"""
     category_id = int(call.data.split("_")[-1])
@@ -934,7 +872,7 @@ def handle_use_saved_answers(call):
     safe_answer_callback(bot, call.id, "✅ Используем сохраненные ответы")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("restart_survey_"))
+@router.prefix("restart_survey_")
 def handle_restart_survey(call):
     """Начать опрос заново"""
     category_id = int(call.data.split("_")[-1])
@@ -1141,7 +1079,7 @@ def show_keywords_count_selection(chat_id, user_id):
     bot.send_message(chat_id, text, reply_markup=markup, parse_mode='HTML')
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("keywords_count_"))
+@router.prefix("keywords_count_")
 def handle_keywords_count_selection(call):
     """Обработка выбора количества фраз"""
     user_id = call.from_user.id
@@ -1152,11 +1090,15 @@ def handle_keywords_count_selection(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка")
         return
     
-    # Проверяем баланс
-    user_tokens = db.get_user_tokens(user_id)
+    if generation_executor.is_user_busy(user_id):
+        safe_answer_callback(bot, call.id, "⏳ Дождитесь завершения текущих генераций", show_alert=True)
+        return
+    
+    # Резервируем токены (проверка баланса и списание — один запрос)
     cost = TOKEN_PRICES['keywords_collection'][f'cost_per_{count}']
+    reservation = reserve_tokens(user_id, cost, f'keywords_{count}', None, state.get('category_id'))
     
-    if user_tokens < cost:
+    if reservation is None:
         safe_answer_callback(bot, call.id, "❌ Недостаточно токенов!", show_alert=True)
         return
     
@@ -1179,27 +1121,37 @@ def handle_keywords_count_selection(call):
     
     safe_answer_callback(bot, call.id, "🚀 Начинаем генерацию...")
     
-    # Запускаем генерацию
-    generate_keywords(call.message.chat.id, user_id)
+    # Запускаем генерацию в пуле генераций (поток TeleBot не ждёт Claude)
+    chat_id = call.message.chat.id
+    submit_generation(
+        partial(generate_keywords, chat_id, user_id, reservation),
+        kind='keywords',
+        user_id=user_id,
+        label=f"ключи {state.get('category_id')} x{count}",
+        on_error=lambda e: bot.send_message(chat_id, "❌ Ошибка генерации ключевых фраз"),
+        reservation=reservation
+    )
 
 
-def generate_keywords(chat_id, user_id):
+def generate_keywords(chat_id, user_id, reservation):
     """Генерация ключевых фраз через Claude AI"""
     from ai.keywords_generator import generate_keywords as ai_generate_keywords
     from ai.keywords_generator import generate_keywords_fallback
     
     state = keywords_state.get(user_id)
     if not state:
+        reservation.refund()
         return
     
     category_id = state['category_id']
     count = state['count']
-    cost = state['cost']
+    cost = reservation.amount
     answers = state['answers']
     
     # Получаем категорию
-    category = db.get_category(category_id)
+    category = db.get_category(category_id, fields=['name'])
     if not category:
+        reservation.refund()
         bot.send_message(chat_id, "❌ Категория не найдена")
         return
     
@@ -1251,6 +1203,7 @@ def generate_keywords(chat_id, user_id):
         pass
     
     if not keywords:
+        reservation.refund()
         bot.send_message(
             chat_id,
             "❌ <b>Ошибка генерации</b>\n\n"
@@ -1260,38 +1213,14 @@ def generate_keywords(chat_id, user_id):
         )
         return
     
-    # Списываем токены
-    db.update_tokens(user_id, -cost)
+    # Дописываем ключевые фразы в категорию (дубликаты пропускаются в БД)
+    result = db.create_category_keywords(category_id, keywords)
+    total_keywords = result['total'] if result else len(keywords)
     
-    # Сохраняем ключевые фразы в категорию
-    existing = category.get('keywords', [])
-    if isinstance(existing, list):
-        keywords = existing + keywords
+    print(f"✅ Сохранено {total_keywords} ключевых фраз в категорию {category_id}")
     
-    # Обновляем категорию (keywords - JSONB, нужна сериализация)
-    db.cursor.execute("""
-        UPDATE categories 
-        SET keywords = %s::jsonb
-        WHERE id = %s
-    """, (json.dumps(keywords, ensure_ascii=False), category_id))
-    db.conn.commit()
-    
-    print(f"✅ Сохранено {len(keywords)} ключевых фраз в категорию {category_id}")
-    
-    # Логируем расход токенов (если таблица существует)
-    try:
-        db.cursor.execute("""
-            INSERT INTO token_expenses (user_id, amount, action, category_id, created_at)
-            VALUES (%s, %s, %s, %s, NOW())
-        """, (user_id, cost, f'keywords_{count}', category_id))
-        db.conn.commit()
-    except Exception as e:
-        print(f"⚠️ Не удалось залогировать расход токенов: {e}")
-        # Откатываем если была ошибка
-        try:
-            db.conn.rollback()
-        except:
-            pass
+    # Подтверждаем списание токенов
+    reservation.commit()
     
     # Формируем сообщение об успехе
     text = (
@@ -1369,7 +1298,7 @@ def show_keywords_result(chat_id, user_id, keywords, cost):
     bot.send_message(chat_id, text, reply_markup=markup, parse_mode='HTML')
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("cancel_keywords_survey_"))
+@router.prefix("cancel_keywords_survey_")
 def handle_cancel_keywords_survey(call):
     """Отмена опроса"""
     category_id = int(call.data.split("_")[-1])
@@ -1398,7 +1327,7 @@ def handle_cancel_keywords_survey(call):
     safe_answer_callback(bot, call.id, "Отменено")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("edit_survey_answers_"))
+@router.prefix("edit_survey_answers_")
 def handle_edit_survey_answers(call):
     """Редактирование сохраненных ответов опроса"""
     category_id = int(call.data.split("_")[-1])
@@ -3,23 +3,24 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from config import ADMIN_ID
 from utils import escape_html, safe_answer_callback
 import os
-import json
+from utils.state_store import StateStore
 
 
 # Временное хранилище для ожидания загрузки
-user_awaiting_media = {}
+user_awaiting_media = StateStore('media_upload')
 
 
 def start_media_upload(call, category_id):
     """Начать процесс загрузки медиа"""
     user_id = call.from_user.id
     
-    # Получаем категорию
-    category = db.get_category(category_id)
+    # Получаем категорию (только название)
+    category = db.get_category(category_id, fields=['name'])
     if not category:
         safe_answer_callback(bot, call.id, "❌ Категория не найдена")
         return
@@ -81,14 +82,14 @@ def start_media_upload(call, category_id):
     safe_answer_callback(bot, call.id, "📤 Ожидаю файл...")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("upload_media_"))
+@router.prefix("upload_media_")
 def handle_upload_media(call):
     """Инициировать загрузку медиа"""
     category_id = int(call.data.split("_")[-1])
     start_media_upload(call, category_id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("cancel_upload_"))
+@router.prefix("cancel_upload_")
 def handle_cancel_upload(call):
     """Отменить загрузку медиа"""
     category_id = int(call.data.split("_")[-1])
@@ -139,17 +140,6 @@ def handle_photo_upload(message):
         )
         return
     
-    # Получаем категорию
-    category = db.get_category(category_id)
-    if not category:
-        bot.send_message(message.chat.id, "❌ Категория не найдена")
-        return
-    
-    # Получаем текущие медиа
-    media = category.get('media', [])
-    if not isinstance(media, list):
-        media = []
-    
     # Добавляем новое фото
     media_item = {
         'type': 'photo',
@@ -158,15 +148,10 @@ def handle_photo_upload(message):
         'uploaded_at': 'NOW()'
     }
     
-    media.append(media_item)
-    
-    # Сохраняем в БД
-    db.cursor.execute("""
-        UPDATE categories 
-        SET media = %s::jsonb
-        WHERE id = %s
-    """, (json.dumps(media), category_id))
-    db.conn.commit()
+    # Добавляем в медиа категории одним UPDATE (без чтения галереи)
+    if not db.update_category_json_append(category_id, 'media', [media_item]):
+        bot.send_message(message.chat.id, "❌ Категория не найдена")
+        return
     
     # Убираем из ожидания
     del user_awaiting_media[user_id]
@@ -222,17 +207,6 @@ def handle_video_upload(message):
         )
         return
     
-    # Получаем категорию
-    category = db.get_category(category_id)
-    if not category:
-        bot.send_message(message.chat.id, "❌ Категория не найдена")
-        return
-    
-    # Получаем текущие медиа
-    media = category.get('media', [])
-    if not isinstance(media, list):
-        media = []
-    
     # Добавляем новое видео
     media_item = {
         'type': 'video',
@@ -242,15 +216,10 @@ def handle_video_upload(message):
         'uploaded_at': 'NOW()'
     }
     
-    media.append(media_item)
-    
-    # Сохраняем в БД
-    db.cursor.execute("""
-        UPDATE categories 
-        SET media = %s::jsonb
-        WHERE id = %s
-    """, (json.dumps(media), category_id))
-    db.conn.commit()
+    # Добавляем в медиа категории одним UPDATE (без чтения галереи)
+    if not db.update_category_json_append(category_id, 'media', [media_item]):
+        bot.send_message(message.chat.id, "❌ Категория не найдена")
+        return
     
     # Убираем из ожидания
     del user_awaiting_media[user_id]
@@ -319,17 +288,6 @@ def handle_document_upload(message):
         )
         return
     
-    # Получаем категорию
-    category = db.get_category(category_id)
-    if not category:
-        bot.send_message(message.chat.id, "❌ Категория не найдена")
-        return
-    
-    # Получаем текущие медиа
-    media = category.get('media', [])
-    if not isinstance(media, list):
-        media = []
-    
     # Добавляем новый документ
     media_item = {
         'type': 'document',
@@ -340,15 +298,10 @@ def handle_document_upload(message):
         'uploaded_at': 'NOW()'
     }
     
-    media.append(media_item)
-    
-    # Сохраняем в БД
-    db.cursor.execute("""
-        UPDATE categories 
-        SET media = %s::jsonb
-        WHERE id = %s
-    """, (json.dumps(media), category_id))
-    db.conn.commit()
+    # Добавляем в медиа категории одним UPDATE (без чтения галереи)
+    if not db.update_category_json_append(category_id, 'media', [media_item]):
+        bot.send_message(message.chat.id, "❌ Категория не найдена")
+        return
     
     # Убираем из ожидания
     del user_awaiting_media[user_id]
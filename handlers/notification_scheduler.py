@@ -86,6 +86,10 @@ class NotificationScheduler:
                     {'type': 'low_balance', 'frequency': 'daily'}
                 ]
             }
+        finally:
+            # Поток планировщика живёт всё время работы бота — соединение не держим
+            from database.database import db
+            db.release_thread_connection()
     
     def _run_scheduler(self):
         """Основной цикл планировщика"""
@@ -120,8 +124,8 @@ class NotificationScheduler:
                     
                     for task in tasks:
                         try:
-                            # Запускаем проверку уведомлений
-                            check_and_send_notifications()
+                            # Отправляем уведомления этого типа
+                            check_and_send_notifications([task['type']])
                             logger.info(f"✅ Выполнена задача: {task['type']}")
                         except Exception as e:
                             logger.error(f"❌ Ошибка выполнения задачи {task['type']}: {e}")
@@ -4,9 +4,10 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_format_pinterest_"))
+@router.prefix("platform_format_pinterest_")
 def handle_pinterest_images_menu(call):
     """Меню настроек изображений для Pinterest"""
     parts = call.data.split("_")
@@ -163,7 +164,7 @@ def handle_pinterest_images_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("pin_preview_format_"))
+@router.prefix("pin_preview_format_")
 def handle_pinterest_preview_format_select(call):
     """Выбор формата превью (множественный выбор)"""
     parts = call.data.split("_")
@@ -240,7 +241,7 @@ def handle_pinterest_preview_format_select(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("pin_set_format_"))
+@router.prefix("pin_set_format_")
 def handle_pinterest_set_format(call):
     """Установка формата превью (toggle)"""
     parts = call.data.split("_")
@@ -275,7 +276,7 @@ def handle_pinterest_set_format(call):
     handle_pinterest_preview_format_select(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("pin_images_count_"))
+@router.prefix("pin_images_count_")
 def handle_pinterest_images_count_menu(call):
     """Меню выбора количества изображений"""
     parts = call.data.split("_")
@@ -334,7 +335,7 @@ def handle_pinterest_images_count_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("pin_set_img_count_"))
+@router.prefix("pin_set_img_count_")
 def handle_pinterest_set_img_count(call):
     """Установка количества изображений"""
     parts = call.data.split("_")
@@ -355,7 +356,7 @@ def handle_pinterest_set_img_count(call):
     handle_pinterest_images_count_menu(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("back_to_pinterest_"))
+@router.prefix("back_to_pinterest_")
 def handle_back_to_pinterest(call):
     """Возврат в меню Pinterest категории"""
     parts = call.data.split("_")
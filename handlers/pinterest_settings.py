@@ -3,12 +3,14 @@ Pinterest Settings - Настройки Pinterest (ссылка и доски)
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html, safe_answer_callback
 import json
+from utils.state_store import StateStore
 
 
 # Хранилище состояний для ввода ссылки
-pinterest_link_state = {}
+pinterest_link_state = StateStore('pinterest_link')
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -103,7 +105,7 @@ def handle_pinterest_link(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('pinterest_link_edit_'))
+@router.prefix("pinterest_link_edit_")
 def handle_pinterest_link_edit(call):
     """Начало редактирования ссылки"""
     try:
@@ -247,7 +249,7 @@ def process_pinterest_link(message, user_id):
         bot.send_message(message.chat.id, f"❌ Ошибка сохранения: {e}")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('pinterest_link_delete_'))
+@router.prefix("pinterest_link_delete_")
 def handle_pinterest_link_delete(call):
     """Удаление ссылки"""
     try:
@@ -441,7 +443,7 @@ def handle_pinterest_boards(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('pinterest_board_toggle_'))
+@router.prefix("pinterest_board_toggle_")
 def handle_pinterest_board_toggle(call):
     """Переключение выбора доски"""
     try:
@@ -493,7 +495,7 @@ def handle_pinterest_board_toggle(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('pinterest_boards_all_'))
+@router.prefix("pinterest_boards_all_")
 def handle_pinterest_boards_all(call):
     """Выбрать все доски"""
     try:
@@ -561,7 +563,7 @@ def handle_pinterest_boards_all(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('pinterest_boards_clear_'))
+@router.prefix("pinterest_boards_clear_")
 def handle_pinterest_boards_clear(call):
     """Сбросить выбор досок (постинг на все)"""
     try:
@@ -6,6 +6,7 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -137,7 +138,7 @@ def save_settings(user_id, category_id, platform_type, **kwargs):
 # ГЛАВНОЕ МЕНЮ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_adv_settings_"))
+@router.prefix("platform_adv_settings_")
 def handle_advanced_menu(call):
     """Главное меню расширенных настроек"""
     parts = call.data.split("_")
@@ -206,7 +207,7 @@ def handle_advanced_menu(call):
 # СТИЛЬ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_adv_style_"))
+@router.prefix("plat_adv_style_")
 def handle_style_menu(call):
     """Меню выбора стилей"""
     parts = call.data.split("_")
@@ -261,7 +262,7 @@ def handle_style_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_toggle_style_"))
+@router.prefix("plat_toggle_style_")
 def handle_toggle_style(call):
     """Переключение стиля"""
     parts = call.data.split("_")
@@ -290,7 +291,7 @@ def handle_toggle_style(call):
 # ТЕКСТ НА ФОТО
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_adv_text_"))
+@router.prefix("plat_adv_text_")
 def handle_text_menu(call):
     """Меню настройки текста на фото"""
     parts = call.data.split("_")
@@ -330,7 +331,7 @@ def handle_text_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_set_text_"))
+@router.prefix("plat_set_text_")
 def handle_set_text(call):
     """Установка текста на фото"""
     parts = call.data.split("_")
@@ -352,7 +353,7 @@ def handle_set_text(call):
 # КОЛЛАЖ ФОТО
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_adv_collage_"))
+@router.prefix("plat_adv_collage_")
 def handle_collage_menu(call):
     """Меню настройки коллажа"""
     parts = call.data.split("_")
@@ -392,7 +393,7 @@ def handle_collage_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_set_collage_"))
+@router.prefix("plat_set_collage_")
 def handle_set_collage(call):
     """Установка режима коллажа"""
     parts = call.data.split("_")
@@ -414,7 +415,7 @@ def handle_set_collage(call):
 # КАМЕРА
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_adv_camera_"))
+@router.prefix("plat_adv_camera_")
 def handle_camera_menu(call):
     """Меню выбора камеры"""
     parts = call.data.split("_")
@@ -469,7 +470,7 @@ def handle_camera_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_toggle_camera_"))
+@router.prefix("plat_toggle_camera_")
 def handle_toggle_camera(call):
     """Переключение камеры"""
     parts = call.data.split("_")
@@ -498,7 +499,7 @@ def handle_toggle_camera(call):
 # РАКУРС
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_adv_angle_"))
+@router.prefix("plat_adv_angle_")
 def handle_angle_menu(call):
     """Меню выбора ракурса"""
     parts = call.data.split("_")
@@ -553,7 +554,7 @@ def handle_angle_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_toggle_angle_"))
+@router.prefix("plat_toggle_angle_")
 def handle_toggle_angle(call):
     """Переключение ракурса"""
     parts = call.data.split("_")
@@ -582,7 +583,7 @@ def handle_toggle_angle(call):
 # КАЧЕСТВО
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_adv_quality_"))
+@router.prefix("plat_adv_quality_")
 def handle_quality_menu(call):
     """Меню выбора качества"""
     parts = call.data.split("_")
@@ -637,7 +638,7 @@ def handle_quality_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_toggle_quality_"))
+@router.prefix("plat_toggle_quality_")
 def handle_toggle_quality(call):
     """Переключение качества"""
     parts = call.data.split("_")
@@ -666,7 +667,7 @@ def handle_toggle_quality(call):
 # ТОНАЛЬНОСТЬ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_adv_tone_"))
+@router.prefix("plat_adv_tone_")
 def handle_tone_menu(call):
     """Меню выбора тональности"""
     parts = call.data.split("_")
@@ -721,7 +722,7 @@ def handle_tone_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("plat_toggle_tone_"))
+@router.prefix("plat_toggle_tone_")
 def handle_toggle_tone(call):
     """Переключение тональности"""
     parts = call.data.split("_")
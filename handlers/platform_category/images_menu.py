@@ -3,6 +3,7 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 
 # Безопасное логирование
@@ -21,7 +22,7 @@ except:
     debug = SimpleDebug()
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_images_menu_"))
+@router.prefix("platform_images_menu_")
 def handle_platform_images_menu(call):
     """Подменю настроек изображений"""
     parts = call.data.split("_")
@@ -235,7 +236,7 @@ def handle_platform_images_menu(call):
 # ПОДМЕНЮ: НАСТРОЙКИ ТЕКСТА
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_text_menu_"))
+@router.prefix("platform_text_menu_")
 def handle_platform_text_menu(call):
     """Подменю настроек текста"""
     parts = call.data.split("_")
@@ -383,7 +384,7 @@ def handle_platform_text_menu(call):
 # ОБРАБОТЧИКИ ДЛЯ НОВЫХ КНОПОК ПОДМЕНЮ ИЗОБРАЖЕНИЯ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_images_count_"))
+@router.prefix("platform_images_count_")
 def handle_platform_images_count(call):
     """Заглушка: Количество изображений"""
     parts = call.data.split("_")
@@ -395,7 +396,7 @@ def handle_platform_images_count(call):
     bot.answer_callback_query(call.id, "⚙️ В разработке", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_text_percent_"))
+@router.prefix("platform_text_percent_")
 def handle_platform_text_percent(call):
     """Заглушка: Текст на фото"""
     parts = call.data.split("_")
@@ -407,7 +408,7 @@ def handle_platform_text_percent(call):
     bot.answer_callback_query(call.id, "⚙️ В разработке", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_collage_percent_"))
+@router.prefix("platform_collage_percent_")
 def handle_platform_collage_percent(call):
     """Заглушка: Коллаж/Фото"""
     parts = call.data.split("_")
@@ -419,7 +420,7 @@ def handle_platform_collage_percent(call):
     bot.answer_callback_query(call.id, "⚙️ В разработке", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_quality_"))
+@router.prefix("platform_quality_")
 def handle_platform_quality(call):
     """Заглушка: Качество"""
     parts = call.data.split("_")
@@ -431,7 +432,7 @@ def handle_platform_quality(call):
     bot.answer_callback_query(call.id, "⚙️ В разработке", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_tone_"))
+@router.prefix("platform_tone_")
 def handle_platform_tone(call):
     """Заглушка: Тональность"""
     parts = call.data.split("_")
@@ -447,7 +448,7 @@ def handle_platform_tone(call):
 # КАМЕРА (МНОЖЕСТВЕННЫЙ ВЫБОР)
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_camera_"))
+@router.prefix("platform_camera_")
 def handle_platform_camera(call):
     """Настройка камеры (множественный выбор)"""
     parts = call.data.split("_")
@@ -526,7 +527,7 @@ def handle_platform_camera(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_camera_"))
+@router.prefix("set_camera_")
 def handle_set_camera(call):
     """Установка типа камеры (toggle)"""
     parts = call.data.split("_")
@@ -581,7 +582,7 @@ def handle_set_camera(call):
     handle_platform_camera(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_angle_"))
+@router.prefix("platform_angle_")
 def handle_platform_angle(call):
     """Настройка ракурса"""
     parts = call.data.split("_")
@@ -660,7 +661,7 @@ def handle_platform_angle(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_angle_"))
+@router.prefix("set_angle_")
 def handle_set_angle(call):
     """Установка ракурса (toggle)"""
     parts = call.data.split("_")
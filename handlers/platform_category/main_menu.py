@@ -5,7 +5,11 @@
 import os
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
+from utils.generation_executor import generation_executor, submit_generation
+from utils.token_ledger import reserve_tokens
+from functools import partial
 import json
 from datetime import datetime
 
@@ -26,7 +30,7 @@ except:
     debug = SimpleDebug()
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_menu_"))
+@router.prefix("platform_menu_")
 def handle_platform_menu(call):
     """
     Открытие меню управления платформой для категории
@@ -360,7 +364,7 @@ def handle_platform_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_toggle_"))
+@router.prefix("platform_toggle_")
 def handle_platform_toggle(call):
     """
     Переключение подключения платформы (вкл/выкл)
@@ -441,7 +445,7 @@ def handle_platform_toggle(call):
     bot.answer_callback_query(call.id, f"{icon} Платформа {action}")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_post_"))
+@router.prefix("platform_post_")
 def handle_platform_post(call):
     """Ручная публикация поста на платформу"""
     parts = call.data.split("_")
@@ -519,7 +523,7 @@ def handle_platform_post(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_ai_post_"))
+@router.prefix("platform_ai_post_")
 def handle_platform_ai_post(call):
     """Генерация и публикация поста с помощью AI"""
     parts = call.data.split("_")
@@ -689,7 +693,7 @@ def handle_platform_ai_post(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ai_post_confirm_"))
+@router.prefix("ai_post_confirm_")
 def handle_ai_post_confirm(call):
     """Подтверждение генерации AI поста"""
     parts = call.data.split("_")
@@ -701,6 +705,10 @@ def handle_ai_post_confirm(call):
     
     user_id = call.from_user.id
     
+    if generation_executor.is_user_busy(user_id):
+        bot.answer_callback_query(call.id, "⏳ Дождитесь завершения текущих генераций", show_alert=True)
+        return
+    
     # Словарь названий для разных платформ
     platform_names = {
         'pinterest': {
@@ -747,25 +755,11 @@ def handle_ai_post_confirm(call):
     else:
         cost = 20
     
-    # Проверяем и списываем
-    tokens = db.get_user_tokens(user_id)
-    if tokens < cost:
-        bot.answer_callback_query(call.id, f"❌ Недостаточно токенов! Нужно: {cost}", show_alert=True)
-        return
-    
-    if not db.update_tokens(user_id, -cost):
-        bot.answer_callback_query(call.id, "❌ Ошибка списания токенов", show_alert=True)
-        return
-    
-    new_balance = db.get_user_tokens(user_id)
-    
     # ═══════════════════════════════════════════════════════════════
     # WEBSITE - ПЕРЕНАПРАВЛЕНИЕ НА СПЕЦИАЛЬНЫЙ ОБРАБОТЧИК
     # ═══════════════════════════════════════════════════════════════
     if platform_type.lower() == 'website':
-        # Возвращаем токены - они спишутся в обработчике website
-        db.update_tokens(user_id, cost)
-        
+        # Токены спишутся в обработчике website
         # Перенаправляем на правильный обработчик
         call.data = f"platform_ai_post_website_{category_id}_{bot_id}_{platform_id}"
         
@@ -774,6 +768,15 @@ def handle_ai_post_confirm(call):
         handle_platform_ai_post_website(call)
         return
     
+    # Резервируем токены одним запросом (проверка остатка + списание + журнал):
+    # подтверждаются после генерации, при ошибке возвращаются
+    reservation = reserve_tokens(user_id, cost, f"ai_post_{platform_type.lower()}", bot_id, category_id)
+    if reservation is None:
+        bot.answer_callback_query(call.id, f"❌ Недостаточно токенов! Нужно: {cost}", show_alert=True)
+        return
+    
+    new_balance = reservation.balance
+    
     # ═══════════════════════════════════════════════════════════════
     # TELEGRAM - СРАЗУ ГЕНЕРАЦИЯ И ПУБЛИКАЦИЯ С ИЗОБРАЖЕНИЕМ
     # ═══════════════════════════════════════════════════════════════
@@ -781,12 +784,11 @@ def handle_ai_post_confirm(call):
         # Получаем категорию
         category = db.get_category(category_id)
         if not category:
-            db.update_tokens(user_id, cost)
+            reservation.refund()
             bot.answer_callback_query(call.id, "❌ Категория не найдена")
             return
         
         category_name = category['name']
-        description = category.get('description', '')
         telegram_topics = category.get('telegram_topics', [])
         
         # КРИТИЧЕСКАЯ ПРОВЕРКА: если telegram_topics не список - сбрасываем!
@@ -859,15 +861,23 @@ def handle_ai_post_confirm(call):
         # Если топиков нет - публикуем в основной чат
         else:
             bot.answer_callback_query(call.id, "🤖 Генерирую и публикую...")
-            _telegram_publish_post(
-                call, 
-                category_id, 
-                bot_id, 
-                platform_id, 
-                topic_id=0, 
-                cost=cost, 
-                new_balance=new_balance,
-                platform_info=platform_info
+            from handlers.platform_category.scheduler_media import _telegram_publish_post
+            submit_generation(
+                partial(
+                    _telegram_publish_post,
+                    call,
+                    category_id,
+                    bot_id,
+                    platform_id,
+                    topic_id=0,
+                    reservation=reservation,
+                    new_balance=new_balance,
+                    platform_info=platform_info
+                ),
+                kind='telegram',
+                user_id=user_id,
+                label=f"Telegram {category_id}",
+                reservation=reservation
             )
             return
     
@@ -878,382 +888,20 @@ def handle_ai_post_confirm(call):
     if platform_type.lower() == 'pinterest':
         bot.answer_callback_query(call.id, "🤖 Генерирую и публикую...")
         
-        # Инициализируем прогресс-бар с GIF
-        from utils.generation_progress import show_generation_progress
-        progress = show_generation_progress(call.message.chat.id, "pinterest", total_steps=3)
-        progress.start("Подготовка к генерации...")
-        
-        # Получаем данные категории
-        category = db.get_category(category_id)
-        if not category:
-            db.update_tokens(user_id, cost)  # Возвращаем токены
-            bot.send_message(call.message.chat.id, "❌ Ошибка: категория не найдена")
-            return
-        
-        category_name = category['name']
-        description = category.get('description', '')
-        keywords = category.get('keywords', [])
-        
-        # Получаем настройки для платформы
-        # Получаем настройки изображений из новой системы
-        from handlers.platform_settings import get_platform_settings, build_image_prompt
-        
-        platform_image_settings = get_platform_settings(category, platform_type)
-        
-        # Обновляем прогресс - шаг 1: Генерация изображения
-        progress.update(1, "🖼 Генерирую изображение...", f"📝 Категория: {category_name}")
-        
-        # Генерируем изображение (30 токенов уже списаны)
-        try:
-            from ai.image_generator import generate_image
-            import tempfile
-            import os
-            import random
-            
-            # ЧИТАЕМ НАСТРОЙКУ "ТЕКСТ НА ИЗОБРАЖЕНИИ"
-            settings = category.get('settings', {})
-            if isinstance(settings, str):
-                import json
-                settings = json.loads(settings)
-            
-            text_on_image_setting = settings.get(f'{platform_type}_text_on_image', 'random')
-            
-            # Варианты текста на изображении
-            TEXT_ON_IMAGE_OPTIONS = {
-                'with_text': {
-                    'prompt': 'text overlay, elegant typography, readable text on image'
-                },
-                'without_text': {
-                    'prompt': 'no text, clean image, no typography, no letters, no words'
-                },
-                'random': None  # Случайно
-            }
-            
-            # Определяем что использовать
-            if text_on_image_setting == 'random':
-                text_on_image_setting = random.choice(['with_text', 'without_text'])
-            
-            text_overlay_prompt = TEXT_ON_IMAGE_OPTIONS.get(text_on_image_setting, {}).get('prompt', '')
-            
-            # 20% шанс коллажа
-            use_collage = random.random() < 0.2
-            
-            if use_collage:
-                base_prompt = f"{category_name}, collection of photos, multiple panels"
-            else:
-                base_prompt = f"{category_name}, single unified image"
-            
-            # 10% шанс использовать описание БОТА (для разнообразия)
-            # НЕ для website - там свои правила для статей
-            use_bot_description = (platform_type != 'website') and (random.random() < 0.1)
-            
-            if use_bot_description:
-                # Получаем описание бота
-                bot_info = db.get_bot(bot_id)
-                bot_description = bot_info.get('description', '') if bot_info else ''
-                
-                if bot_description and len(bot_description) > 20:
-                    # Берём 1-2 фразы из описания бота
-                    bot_phrases = [s.strip() for s in bot_description.split('.') if s.strip() and len(s.strip()) > 10]
-                    
-                    if bot_phrases:
-                        # Берём только 1 фразу (было 1-2)
-                        selected_phrases = [random.choice(bot_phrases)]
-                        phrases_text = selected_phrases[0]
-                        base_prompt = f"{base_prompt}. {phrases_text}"
-                        print(f"🎲 Используем описание БОТА: {phrases_text[:80]}...")
-                    else:
-                        use_bot_description = False
-                else:
-                    use_bot_description = False
-            
-            # Если НЕ используем описание бота - берём из описания категории
-            if not use_bot_description and description:
-                desc_phrases = [s.strip() for s in description.split('.') if s.strip() and len(s.strip()) > 10]
-                
-                if desc_phrases:
-                    # Берём только 1 фразу (было 1-2)
-                    selected_phrases = [random.choice(desc_phrases)]
-                    phrases_text = selected_phrases[0]
-                    base_prompt = f"{base_prompt}. {phrases_text}"
-                    
-                    # Добавляем настройку текста
-                    if text_overlay_prompt:
-                        base_prompt += f". {text_overlay_prompt}"
-                    
-                    # Примечание: конкретный текст не добавляем для избежания переполнения промпта
-                else:
-                    if text_overlay_prompt:
-                        base_prompt += f". {text_overlay_prompt}"
-            else:
-                if text_overlay_prompt:
-                    base_prompt += f". {text_overlay_prompt}"
-            
-            print(f"🎨 Базовый промпт для {platform_type}: {base_prompt[:100]}...")
-            
-            # build_image_prompt ДОБАВИТ: стили, тональность, камеры, ракурсы, качество из настроек
-            full_prompt, image_format = build_image_prompt(base_prompt, platform_image_settings)
-            
-            print(f"✅ Полный промпт: {full_prompt[:150]}...")
-            print(f"📐 Формат: {image_format}")
-            
-            # Генерируем изображение
-            image_result = generate_image(full_prompt, aspect_ratio=image_format)
-            
-            if not image_result.get('success'):
-                raise Exception(image_result.get('error', 'Ошибка генерации изображения'))
-            
-            # Получаем байты изображения
-            image_bytes = image_result.get('image_bytes')
-            if not image_bytes:
-                raise Exception('Изображение не содержит данных')
-            
-            # Сохраняем во временный файл
-            fd, image_path = tempfile.mkstemp(suffix='.jpg', prefix='pinterest_pin_')
-            with os.fdopen(fd, 'wb') as f:
-                f.write(image_bytes)
-            
-        except Exception as e:
-            print(f"❌ Ошибка генерации изображения: {e}")
-            progress.finish()  # Удаляем прогресс-бар
-            db.update_tokens(user_id, cost)  # Возвращаем токены
-            bot.send_message(call.message.chat.id,
-                f"❌ Ошибка генерации изображения: {e}\n\n"
-                f"Токены возвращены на ваш счёт."
-            )
-            return
-        
-        # Генерируем описание (10 токенов уже списаны)
-        try:
-            from ai.text_generator import generate_social_post
-            import json
-            
-            topic = f"{category_name}"
-            if description:
-                topic += f". {description[:200]}"
-            
-            # Получаем настройки текстового стиля
-            settings = category.get('settings', {})
-            if isinstance(settings, str):
-                settings = json.loads(settings)
-            
-            text_style_key = f'{platform_type}_text_style'
-            text_style = settings.get(text_style_key, 'conversational')
-            
-            # Маппинг стилей на параметры генератора
-            style_map = {
-                'sales': 'engaging',
-                'motivational': 'inspiring',
-                'friendly': 'engaging',
-                'conversational': 'engaging',
-                'creative': 'engaging',
-                'professional': 'professional',
-                'informative': 'engaging'
-            }
-            
-            generator_style = style_map.get(text_style, 'engaging')
-            
-            # Обновляем прогресс - шаг 2: Генерация описания
-            progress.update(2, "✍️ Генерирую описание...", f"📝 Стиль: {text_style}")
-            
-            # Генерируем описание для Pinterest (короткое, без спецсимволов, с хэштегами)
-            from ai.text_generator import generate_pinterest_description
-            
-            result = generate_pinterest_description(
-                topic=topic,
-                max_length=500,  # Pinterest лимит - 500 символов
-                include_hashtags=True
-            )
-            
-            if not result.get('success'):
-                raise Exception(result.get('error', 'Ошибка генерации текста'))
-            
-            post_text = result['description']
-            
-        except Exception as e:
-            print(f"❌ Ошибка генерации текста: {e}")
-            progress.finish()  # Удаляем прогресс-бар
-            db.update_tokens(user_id, cost)  # Возвращаем токены
-            bot.send_message(call.message.chat.id,
-                f"❌ Ошибка генерации описания: {e}\n\n"
-                f"Токены возвращены на ваш счёт."
-            )
-            return
-        
-        # Обновляем прогресс - шаг 3: Публикация
-        progress.update(3, "📤 Публикую в Pinterest...", f"📌 Описание готово!")
-        
-        # Публикуем в Pinterest
-        try:
-            from platforms.pinterest.client import PinterestClient
-            
-            # Получаем данные пользователя (не бота!)
-            user_data = db.get_user(user_id)
-            if not user_data:
-                raise Exception('Пользователь не найден')
-            
-            # Pinterest хранится в platform_connections
-            connections = user_data.get('platform_connections', {})
-            if isinstance(connections, str):
-                import json
-                connections = json.loads(connections)
-            
-            pinterests = connections.get('pinterests', [])
-            
-            if not pinterests:
-                raise Exception('Pinterest не подключен. Подключите Pinterest в разделе "⚙️ Настройки → 🔌 Подключения"')
-            
-            # Берем первый подключенный Pinterest
-            pinterest_data = pinterests[0]
-            access_token = pinterest_data.get('access_token')
-            
-            if not access_token:
-                raise Exception('Токен Pinterest не найден')
-            
-            # Инициализируем клиент с токеном
-            client = PinterestClient(access_token)
-            
-            # Получаем список досок
-            boards = client.get_boards()
-            if not boards:
-                raise Exception('Нет доступных досок. Создайте доску в Pinterest.')
-            
-            # Получаем настройки выбранных досок
-            settings = category.get('settings', {})
-            if isinstance(settings, str):
-                settings = json.loads(settings)
-            
-            selected_boards = settings.get('pinterest_boards', [])
-            
-            # Выбираем доску
-            if selected_boards:
-                # Ищем первую выбранную доску из списка
-                board_id = None
-                for board in boards:
-                    if board.get('id') in selected_boards:
-                        board_id = board.get('id')
-                        break
-                
-                if not board_id:
-                    # Если выбранные доски не найдены, используем первую доступную
-                    board_id = boards[0].get('id')
-            else:
-                # Если доски не выбраны, используем первую доступную
-                board_id = boards[0].get('id')
-            
-            if not board_id:
-                raise Exception('Не удалось получить ID доски')
-            
-            # Конвертируем изображение в base64
-            import base64
-            with open(image_path, 'rb') as f:
-                image_data = f.read()
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
-            
-            # Получаем ссылку на сайт из настроек
-            pinterest_link = settings.get('pinterest_link', '')
-            
-            # Публикуем пин
-            # Pinterest лимит: ~500 символов, оставляем место для хештегов
-            description_text = post_text[:400] if len(post_text) > 400 else post_text
-            
-            pin_result = client.create_pin(
-                board_id=board_id,
-                title=category_name[:100],
-                description=description_text,
-                image_base64=image_base64,
-                link=pinterest_link if pinterest_link else None
-            )
-            
-            if pin_result.get('status') != 'ok':
-                raise Exception(pin_result.get('message', 'Ошибка публикации'))
-            
-            pin_url = pin_result.get('url', '')
-            
-            # Удаляем временный файл
-            try:
-                import os
-                os.unlink(image_path)
-            except:
-                pass
-            
-            # Удаляем прогресс-бар
-            progress.finish()
-            
-            # Успешная публикация
-            text = (
-                f"✅ <b>{platform_info['title'].upper()} ОПУБЛИКОВАН{'А' if platform_info['title'] == 'СТАТЬИ' else ''}!</b>\n"
-                "━━━━━━━━━━━━━━\n\n"
-                f"📂 Категория: {escape_html(category_name)}\n"
-                f"💳 Списано: {cost} токенов\n"
-                f"💰 Баланс: {new_balance:,} токенов\n\n"
-            )
-            
-            if pin_url:
-                text += f"📌 {platform_info['title'].capitalize()} успешно опубликован{'а' if platform_info['title'] == 'СТАТЬИ' else ''} в {platform_info['platform_name']}!"
-            else:
-                text += f"📌 {platform_info['title'].capitalize()} успешно опубликован{'а' if platform_info['title'] == 'СТАТЬИ' else ''} в {platform_info['platform_name']}!"
-            
-            markup = types.InlineKeyboardMarkup()
-            
-            # Кнопка "Открыть" если есть URL
-            if pin_url:
-                open_btn_text = {
-                    'pinterest': '🔗 Открыть пин',
-                    'telegram': '🔗 Открыть пост', 
-                    'instagram': '🔗 Открыть пост',
-                    'vk': '🔗 Открыть пост',
-                    'website': '🔗 Открыть статью'
-                }.get(platform_type.lower(), '🔗 Открыть')
-                
-                markup.add(
-                    types.InlineKeyboardButton(
-                        open_btn_text,
-                        url=pin_url
-                    )
-                )
-            
-            # Кнопка "Генерировать ещё"
-            markup.add(
-                types.InlineKeyboardButton(
-                    "🎨 Генерировать ещё",
-                    callback_data=f"platform_ai_post_{platform_type}_{category_id}_{bot_id}_{platform_id}"
-                )
-            )
-            
-            markup.add(
-                types.InlineKeyboardButton(
-                    "🔙 Назад",
-                    callback_data=f"platform_menu_{category_id}_{bot_id}_{platform_type}_{platform_id}"
-                )
-            )
-            
-            bot.edit_message_text(
-                text,
-                call.message.chat.id,
-                call.message.message_id,
-                reply_markup=markup,
-                parse_mode='HTML'
-            )
-            
-        except Exception as e:
-            # Удаляем временный файл при ошибке
-            try:
-                import os
-                os.unlink(image_path)
-            except:
-                pass
-            
-            # Удаляем прогресс-бар
-            progress.finish()
-            
-            print(f"❌ Ошибка публикации в Pinterest: {e}")
-            db.update_tokens(user_id, cost)  # Возвращаем токены
-            bot.send_message(call.message.chat.id,
-                f"❌ Ошибка публикации в Pinterest: {e}\n\n"
-                f"Токены возвращены на ваш счёт."
+        # Генерация и публикация — в пуле генераций, поток TeleBot сразу освобождается
+        submit_generation(
+            partial(
+                _pinterest_generate_and_publish, call, user_id, category_id, bot_id, platform_id,
+                platform_type, reservation, new_balance, platform_info
+            ),
+            kind='pinterest',
+            user_id=user_id,
+            label=f"Pinterest {category_id}",
+            reservation=reservation,
+            on_error=lambda e: bot.send_message(
+                call.message.chat.id, f"❌ Ошибка публикации в Pinterest: {escape_html(str(e)[:200])}"
             )
-        
+        )
         return
     
     # VK - прямая публикация (как Pinterest)
@@ -1262,12 +910,39 @@ def handle_ai_post_confirm(call):
         
         # Вызываем функцию прямой публикации
         from handlers.platform_category.vk_direct_publish import publish_vk_directly
-        publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost)
+        submit_generation(
+            partial(publish_vk_directly, call, user_id, bot_id, platform_id, category_id, reservation),
+            kind='vk',
+            user_id=user_id,
+            label=f"VK {category_id}",
+            reservation=reservation
+        )
         return
     
     # Для других платформ - старая логика с показом поста
     bot.answer_callback_query(call.id, "🤖 Генерирую пост...")
     
+    # Генерация поста — в пуле генераций, поток TeleBot сразу освобождается
+    submit_generation(
+        partial(
+            _generate_platform_post, call, user_id, category_id, bot_id, platform_id,
+            platform_type, reservation, new_balance, platform_info
+        ),
+        kind=platform_type.lower(),
+        user_id=user_id,
+        label=f"пост {platform_type} {category_id}",
+        reservation=reservation,
+        on_error=lambda e: bot.send_message(
+            call.message.chat.id, f"❌ Ошибка генерации: {escape_html(str(e)[:200])}"
+        )
+    )
+
+
+def _generate_platform_post(call, user_id, category_id, bot_id, platform_id,
+                            platform_type, reservation, new_balance, platform_info):
+    """Генерация поста с показом для подтверждения (выполняется в пуле генераций)"""
+    cost = reservation.amount
+    
     try:
         bot.edit_message_text(
             f"🤖 <b>Генерация {platform_info['noun_gen']}...</b>\n\n"
@@ -1283,13 +958,12 @@ def handle_ai_post_confirm(call):
     # Получаем данные категории
     category = db.get_category(category_id)
     if not category:
-        db.update_tokens(user_id, cost)  # Возвращаем токены
+        reservation.refund()  # Возвращаем токены
         bot.send_message(call.message.chat.id, "❌ Ошибка: категория не найдена")
         return
     
     category_name = category['name']
     description = category.get('description', '')
-    keywords = category.get('keywords', [])
     
     # Генерируем пост через Claude
     from ai.text_generator import generate_social_post
@@ -1353,7 +1027,7 @@ def handle_ai_post_confirm(call):
         )
         
     else:
-        db.update_tokens(user_id, cost)  # Возвращаем токены
+        reservation.refund()  # Возвращаем токены
         text = (
             f"❌ <b>ОШИБКА ГЕНЕРАЦИИ</b>\n\n"
             f"Причина: {result.get('error', 'Неизвестная ошибка')}\n\n"
@@ -1385,7 +1059,388 @@ def handle_ai_post_confirm(call):
         )
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("publish_post_"))
+def _pinterest_generate_and_publish(call, user_id, category_id, bot_id, platform_id,
+                                    platform_type, reservation, new_balance, platform_info):
+    """Генерация пина и публикация в Pinterest (выполняется в пуле генераций)"""
+    cost = reservation.amount
+    
+    # Инициализируем прогресс-бар с GIF
+    from utils.generation_progress import show_generation_progress
+    progress = show_generation_progress(call.message.chat.id, "pinterest", total_steps=3)
+    progress.start("Подготовка к генерации...")
+    
+    # Получаем данные категории
+    category = db.get_category(category_id)
+    if not category:
+        reservation.refund()  # Возвращаем токены
+        bot.send_message(call.message.chat.id, "❌ Ошибка: категория не найдена")
+        return
+    
+    category_name = category['name']
+    description = category.get('description', '')
+    
+    # Получаем настройки для платформы
+    # Получаем настройки изображений из новой системы
+    from handlers.platform_settings import get_platform_settings, build_image_prompt
+    
+    platform_image_settings = get_platform_settings(category, platform_type)
+    
+    # Обновляем прогресс - шаг 1: Генерация изображения
+    progress.update(1, "🖼 Генерирую изображение...", f"📝 Категория: {category_name}")
+    
+    # Генерируем изображение (30 токенов уже списаны)
+    try:
+        from ai.image_generator import generate_image
+        import tempfile
+        import os
+        import random
+        
+        # ЧИТАЕМ НАСТРОЙКУ "ТЕКСТ НА ИЗОБРАЖЕНИИ"
+        settings = category.get('settings', {})
+        if isinstance(settings, str):
+            import json
+            settings = json.loads(settings)
+        
+        text_on_image_setting = settings.get(f'{platform_type}_text_on_image', 'random')
+        
+        # Варианты текста на изображении
+        TEXT_ON_IMAGE_OPTIONS = {
+            'with_text': {
+                'prompt': 'text overlay, elegant typography, readable text on image'
+            },
+            'without_text': {
+                'prompt': 'no text, clean image, no typography, no letters, no words'
+            },
+            'random': None  # Случайно
+        }
+        
+        # Определяем что использовать
+        if text_on_image_setting == 'random':
+            text_on_image_setting = random.choice(['with_text', 'without_text'])
+        
+        text_overlay_prompt = TEXT_ON_IMAGE_OPTIONS.get(text_on_image_setting, {}).get('prompt', '')
+        
+        # 20% шанс коллажа
+        use_collage = random.random() < 0.2
+        
+        if use_collage:
+            base_prompt = f"{category_name}, collection of photos, multiple panels"
+        else:
+            base_prompt = f"{category_name}, single unified image"
+        
+        # 10% шанс использовать описание БОТА (для разнообразия)
+        # НЕ для website - там свои правила для статей
+        use_bot_description = (platform_type != 'website') and (random.random() < 0.1)
+        
+        if use_bot_description:
+            # Получаем описание бота
+            bot_info = db.get_bot(bot_id)
+            bot_description = bot_info.get('description', '') if bot_info else ''
+            
+            if bot_description and len(bot_description) > 20:
+                # Берём 1-2 фразы из описания бота
+                bot_phrases = [s.strip() for s in bot_description.split('.') if s.strip() and len(s.strip()) > 10]
+                
+                if bot_phrases:
+                    # Берём только 1 фразу (было 1-2)
+                    selected_phrases = [random.choice(bot_phrases)]
+                    phrases_text = selected_phrases[0]
+                    base_prompt = f"{base_prompt}. {phrases_text}"
+                    print(f"🎲 Используем описание БОТА: {phrases_text[:80]}...")
+                else:
+                    use_bot_description = False
+            else:
+                use_bot_description = False
+        
+        # Если НЕ используем описание бота - берём из описания категории
+        if not use_bot_description and description:
+            desc_phrases = [s.strip() for s in description.split('.') if s.strip() and len(s.strip()) > 10]
+            
+            if desc_phrases:
+                # Берём только 1 фразу (было 1-2)
+                selected_phrases = [random.choice(desc_phrases)]
+                phrases_text = selected_phrases[0]
+                base_prompt = f"{base_prompt}. {phrases_text}"
+                
+                # Добавляем настройку текста
+                if text_overlay_prompt:
+                    base_prompt += f". {text_overlay_prompt}"
+                
+                # Примечание: конкретный текст не добавляем для избежания переполнения промпта
+            else:
+                if text_overlay_prompt:
+                    base_prompt += f". {text_overlay_prompt}"
+        else:
+            if text_overlay_prompt:
+                base_prompt += f". {text_overlay_prompt}"
+        
+        print(f"🎨 Базовый промпт для {platform_type}: {base_prompt[:100]}...")
+        
+        # build_image_prompt ДОБАВИТ: стили, тональность, камеры, ракурсы, качество из настроек
+        full_prompt, image_format = build_image_prompt(base_prompt, platform_image_settings)
+        
+        print(f"✅ Полный промпт: {full_prompt[:150]}...")
+        print(f"📐 Формат: {image_format}")
+        
+        # Генерируем изображение
+        image_result = generate_image(full_prompt, aspect_ratio=image_format)
+        
+        if not image_result.get('success'):
+            raise Exception(image_result.get('error', 'Ошибка генерации изображения'))
+        
+        # Получаем байты изображения
+        image_bytes = image_result.get('image_bytes')
+        if not image_bytes:
+            raise Exception('Изображение не содержит данных')
+        
+        # Сохраняем во временный файл
+        fd, image_path = tempfile.mkstemp(suffix='.jpg', prefix='pinterest_pin_')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(image_bytes)
+        
+    except Exception as e:
+        print(f"❌ Ошибка генерации изображения: {e}")
+        progress.finish()  # Удаляем прогресс-бар
+        reservation.refund()  # Возвращаем токены
+        bot.send_message(call.message.chat.id,
+            f"❌ Ошибка генерации изображения: {e}\n\n"
+            f"Токены возвращены на ваш счёт."
+        )
+        return
+    
+    # Генерируем описание (10 токенов уже списаны)
+    try:
+        import json
+        
+        topic = f"{category_name}"
+        if description:
+            topic += f". {description[:200]}"
+        
+        # Получаем настройки текстового стиля
+        settings = category.get('settings', {})
+        if isinstance(settings, str):
+            settings = json.loads(settings)
+        
+        text_style_key = f'{platform_type}_text_style'
+        text_style = settings.get(text_style_key, 'conversational')
+        
+        # Маппинг стилей на параметры генератора
+        style_map = {
+            'sales': 'engaging',
+            'motivational': 'inspiring',
+            'friendly': 'engaging',
+            'conversational': 'engaging',
+            'creative': 'engaging',
+            'professional': 'professional',
+            'informative': 'engaging'
+        }
+        
+        generator_style = style_map.get(text_style, 'engaging')
+        
+        # Обновляем прогресс - шаг 2: Генерация описания
+        progress.update(2, "✍️ Генерирую описание...", f"📝 Стиль: {text_style}")
+        
+        # Генерируем описание для Pinterest (короткое, без спецсимволов, с хэштегами)
+        from ai.text_generator import generate_pinterest_description
+        
+        result = generate_pinterest_description(
+            topic=topic,
+            max_length=500,  # Pinterest лимит - 500 символов
+            include_hashtags=True
+        )
+        
+        if not result.get('success'):
+            raise Exception(result.get('error', 'Ошибка генерации текста'))
+        
+        post_text = result['description']
+        
+    except Exception as e:
+        print(f"❌ Ошибка генерации текста: {e}")
+        progress.finish()  # Удаляем прогресс-бар
+        reservation.refund()  # Возвращаем токены
+        bot.send_message(call.message.chat.id,
+            f"❌ Ошибка генерации описания: {e}\n\n"
+            f"Токены возвращены на ваш счёт."
+        )
+        return
+    
+    # Обновляем прогресс - шаг 3: Публикация
+    progress.update(3, "📤 Публикую в Pinterest...", f"📌 Описание готово!")
+    
+    # Публикуем в Pinterest
+    try:
+        from platforms.pinterest.client import PinterestClient
+        
+        # Получаем данные пользователя (не бота!)
+        user_data = db.get_user(user_id)
+        if not user_data:
+            raise Exception('Пользователь не найден')
+        
+        # Pinterest хранится в platform_connections
+        connections = user_data.get('platform_connections', {})
+        if isinstance(connections, str):
+            import json
+            connections = json.loads(connections)
+        
+        pinterests = connections.get('pinterests', [])
+        
+        if not pinterests:
+            raise Exception('Pinterest не подключен. Подключите Pinterest в разделе "⚙️ Настройки → 🔌 Подключения"')
+        
+        # Берем первый подключенный Pinterest
+        pinterest_data = pinterests[0]
+        access_token = pinterest_data.get('access_token')
+        
+        if not access_token:
+            raise Exception('Токен Pinterest не найден')
+        
+        # Инициализируем клиент с токеном
+        client = PinterestClient(access_token)
+        
+        # Получаем список досок
+        boards = client.get_boards()
+        if not boards:
+            raise Exception('Нет доступных досок. Создайте доску в Pinterest.')
+        
+        # Получаем настройки выбранных досок
+        settings = category.get('settings', {})
+        if isinstance(settings, str):
+            settings = json.loads(settings)
+        
+        selected_boards = settings.get('pinterest_boards', [])
+        
+        # Выбираем доску
+        if selected_boards:
+            # Ищем первую выбранную доску из списка
+            board_id = None
+            for board in boards:
+                if board.get('id') in selected_boards:
+                    board_id = board.get('id')
+                    break
+            
+            if not board_id:
+                # Если выбранные доски не найдены, используем первую доступную
+                board_id = boards[0].get('id')
+        else:
+            # Если доски не выбраны, используем первую доступную
+            board_id = boards[0].get('id')
+        
+        if not board_id:
+            raise Exception('Не удалось получить ID доски')
+        
+        # Конвертируем изображение в base64
+        import base64
+        with open(image_path, 'rb') as f:
+            image_data = f.read()
+        image_base64 = base64.b64encode(image_data).decode('utf-8')
+        
+        # Получаем ссылку на сайт из настроек
+        pinterest_link = settings.get('pinterest_link', '')
+        
+        # Публикуем пин
+        # Pinterest лимит: ~500 символов, оставляем место для хештегов
+        description_text = post_text[:400] if len(post_text) > 400 else post_text
+        
+        pin_result = client.create_pin(
+            board_id=board_id,
+            title=category_name[:100],
+            description=description_text,
+            image_base64=image_base64,
+            link=pinterest_link if pinterest_link else None
+        )
+        
+        if pin_result.get('status') != 'ok':
+            raise Exception(pin_result.get('message', 'Ошибка публикации'))
+        
+        pin_url = pin_result.get('url', '')
+        
+        # Удаляем временный файл
+        try:
+            import os
+            os.unlink(image_path)
+        except:
+            pass
+        
+        # Удаляем прогресс-бар
+        progress.finish()
+        
+        # Успешная публикация
+        text = (
+            f"✅ <b>{platform_info['title'].upper()} ОПУБЛИКОВАН{'А' if platform_info['title'] == 'СТАТЬИ' else ''}!</b>\n"
+            "━━━━━━━━━━━━━━\n\n"
+            f"📂 Категория: {escape_html(category_name)}\n"
+            f"💳 Списано: {cost} токенов\n"
+            f"💰 Баланс: {new_balance:,} токенов\n\n"
+        )
+        
+        if pin_url:
+            text += f"📌 {platform_info['title'].capitalize()} успешно опубликован{'а' if platform_info['title'] == 'СТАТЬИ' else ''} в {platform_info['platform_name']}!"
+        else:
+            text += f"📌 {platform_info['title'].capitalize()} успешно опубликован{'а' if platform_info['title'] == 'СТАТЬИ' else ''} в {platform_info['platform_name']}!"
+        
+        markup = types.InlineKeyboardMarkup()
+        
+        # Кнопка "Открыть" если есть URL
+        if pin_url:
+            open_btn_text = {
+                'pinterest': '🔗 Открыть пин',
+                'telegram': '🔗 Открыть пост', 
+                'instagram': '🔗 Открыть пост',
+                'vk': '🔗 Открыть пост',
+                'website': '🔗 Открыть статью'
+            }.get(platform_type.lower(), '🔗 Открыть')
+            
+            markup.add(
+                types.InlineKeyboardButton(
+                    open_btn_text,
+                    url=pin_url
+                )
+            )
+        
+        # Кнопка "Генерировать ещё"
+        markup.add(
+            types.InlineKeyboardButton(
+                "🎨 Генерировать ещё",
+                callback_data=f"platform_ai_post_{platform_type}_{category_id}_{bot_id}_{platform_id}"
+            )
+        )
+        
+        markup.add(
+            types.InlineKeyboardButton(
+                "🔙 Назад",
+                callback_data=f"platform_menu_{category_id}_{bot_id}_{platform_type}_{platform_id}"
+            )
+        )
+        
+        bot.edit_message_text(
+            text,
+            call.message.chat.id,
+            call.message.message_id,
+            reply_markup=markup,
+            parse_mode='HTML'
+        )
+        
+    except Exception as e:
+        # Удаляем временный файл при ошибке
+        try:
+            import os
+            os.unlink(image_path)
+        except:
+            pass
+        
+        # Удаляем прогресс-бар
+        progress.finish()
+        
+        print(f"❌ Ошибка публикации в Pinterest: {e}")
+        reservation.refund()  # Возвращаем токены
+        bot.send_message(call.message.chat.id,
+            f"❌ Ошибка публикации в Pinterest: {e}\n\n"
+            f"Токены возвращены на ваш счёт."
+        )
+    
+
+
+@router.prefix("publish_post_")
 def handle_publish_post(call):
     """
     Обработчик публикации поста на платформу
@@ -1,14 +1,14 @@
 """
 Вспомогательные функции и редиректы для платформ
 """
-from loader import bot
+from callback_router import router
 
 # Импортируем основной обработчик из main_menu
 from .main_menu import handle_platform_menu
 
 
 # Обработчик для кнопки "К платформе" из website модуля
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_menu_manage_"))
+@router.prefix("platform_menu_manage_")
 def handle_platform_menu_redirect(call):
     """Редирект с platform_menu_manage_ на platform_menu_"""
     # Убираем _manage из callback_data и вызываем основной обработчик
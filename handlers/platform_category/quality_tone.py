@@ -3,6 +3,7 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 
 # Безопасное логирование
 try:
@@ -20,7 +21,7 @@ except:
     debug = SimpleDebug()
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_quality_"))
+@router.prefix("platform_quality_")
 def handle_platform_quality(call):
     """Настройка качества"""
     parts = call.data.split("_")
@@ -106,7 +107,7 @@ def handle_platform_quality(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_quality_"))
+@router.prefix("set_quality_")
 def handle_set_quality(call):
     """Установка качества"""
     parts = call.data.split("_")
@@ -147,7 +148,7 @@ def handle_set_quality(call):
     handle_platform_quality(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_tone_"))
+@router.prefix("platform_tone_")
 def handle_platform_tone(call):
     """Настройка тональности"""
     parts = call.data.split("_")
@@ -228,7 +229,7 @@ def handle_platform_tone(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_tone_"))
+@router.prefix("set_tone_")
 def handle_set_tone(call):
     """Установка тональности (toggle)"""
     parts = call.data.split("_")
@@ -3,7 +3,11 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
+from utils.generation_executor import submit_generation
+from utils.token_ledger import find_reservation, reserve_tokens
+from functools import partial
 import json
 from datetime import datetime
 
@@ -23,7 +27,7 @@ except:
     debug = SimpleDebug()
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_scheduler_"))
+@router.prefix("platform_scheduler_")
 def handle_platform_scheduler(call):
     """Открытие планировщика для платформы и категории"""
     parts = call.data.split("_")
@@ -90,7 +94,7 @@ def handle_platform_scheduler(call):
 
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_media_"))
+@router.prefix("platform_media_")
 def handle_platform_media(call):
     """Переход к медиа категории из меню платформы"""
     parts = call.data.split("_")
@@ -112,7 +116,7 @@ def handle_platform_media(call):
 # ПУБЛИКАЦИЯ В TELEGRAM
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("telegram_publish_topic_"))
+@router.prefix("telegram_publish_topic_")
 def telegram_publish_topic_handler(call):
     """Публикация в выбранный топик Telegram"""
     parts = call.data.split("_")
@@ -123,9 +127,15 @@ def telegram_publish_topic_handler(call):
     
     user_id = call.from_user.id
     
-    # Получаем текущий баланс (токены уже списаны)
-    new_balance = db.get_user_tokens(user_id)
-    cost = 40  # было списано ранее (10 текст + 30 изображение)
+    # Токены зарезервированы до выбора топика (handle_ai_post_confirm)
+    reservation = find_reservation(user_id, 'ai_post_telegram', category_id)
+    if reservation is None:
+        # Резерв уже возвращён (отмена или истёк TOKEN_RESERVATION_TTL) — списываем заново
+        reservation = reserve_tokens(user_id, 40, 'ai_post_telegram', bot_id, category_id)
+        if reservation is None:
+            bot.answer_callback_query(call.id, "❌ Недостаточно токенов! Нужно: 40", show_alert=True)
+            return
+    new_balance = db.get_user_tokens(user_id) if reservation.balance is None else reservation.balance
     
     # Получаем platform_info
     platform_names = {
@@ -139,38 +149,48 @@ def telegram_publish_topic_handler(call):
     
     bot.answer_callback_query(call.id, "🤖 Генерирую и публикую...")
     
-    _telegram_publish_post(
-        call,
-        category_id,
-        bot_id,
-        platform_id,
-        topic_id,
-        cost,
-        new_balance,
-        platform_info
+    # Генерация и публикация — в пуле генераций, поток TeleBot сразу освобождается
+    submit_generation(
+        partial(
+            _telegram_publish_post,
+            call,
+            category_id,
+            bot_id,
+            platform_id,
+            topic_id,
+            reservation,
+            new_balance,
+            platform_info
+        ),
+        kind='telegram',
+        user_id=user_id,
+        label=f"Telegram {category_id} (тема {topic_id})",
+        reservation=reservation
     )
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("telegram_cancel_publish_"))
+@router.prefix("telegram_cancel_publish_")
 def telegram_cancel_publish(call):
     """Отмена публикации и возврат токенов"""
     parts = call.data.split("_")
     category_id = int(parts[3])
     bot_id = int(parts[4])
     platform_id = parts[5]
-    cost = int(parts[6])
     
     user_id = call.from_user.id
     
-    # Возвращаем токены
-    db.update_tokens(user_id, cost)
-    new_balance = db.get_user_tokens(user_id)
+    # Возвращаем резерв (сумма берётся из журнала, повторное нажатие ничего не вернёт)
+    reservation = find_reservation(user_id, 'ai_post_telegram', category_id)
+    new_balance = reservation.refund() if reservation else None
     
-    text = (
-        "❌ <b>ПУБЛИКАЦИЯ ОТМЕНЕНА</b>\n\n"
-        f"💰 Токены возвращены: +{cost}\n"
-        f"💳 Баланс: {new_balance:,} токенов"
-    )
+    if new_balance is not None:
+        text = (
+            "❌ <b>ПУБЛИКАЦИЯ ОТМЕНЕНА</b>\n\n"
+            f"💰 Токены возвращены: +{reservation.amount}\n"
+            f"💳 Баланс: {new_balance:,} токенов"
+        )
+    else:
+        text = "❌ <b>ПУБЛИКАЦИЯ ОТМЕНЕНА</b>"
     
     markup = types.InlineKeyboardMarkup()
     markup.add(
@@ -199,8 +219,9 @@ def telegram_cancel_publish(call):
     bot.answer_callback_query(call.id)
 
 
-def _telegram_publish_post(call, category_id, bot_id, platform_id, topic_id, cost, new_balance, platform_info):
+def _telegram_publish_post(call, category_id, bot_id, platform_id, topic_id, reservation, new_balance, platform_info):
     """Внутренняя функция для публикации в Telegram"""
+    cost = reservation.amount
     
     # Инициализируем прогресс-бар с GIF
     from utils.generation_progress import show_generation_progress
@@ -211,7 +232,7 @@ def _telegram_publish_post(call, category_id, bot_id, platform_id, topic_id, cos
     category = db.get_category(category_id)
     if not category:
         progress.finish()
-        db.update_tokens(call.from_user.id, cost)
+        reservation.refund()
         bot.send_message(call.message.chat.id, "❌ Ошибка: категория не найдена. Токены возвращены.")
         return
     
@@ -250,7 +271,7 @@ def _telegram_publish_post(call, category_id, bot_id, platform_id, topic_id, cos
     
     if not result.get('success'):
         progress.finish()
-        db.update_tokens(call.from_user.id, cost)
+        reservation.refund()
         bot.send_message(
             call.message.chat.id,
             f"❌ Ошибка генерации текста: {result.get('error', 'Неизвестная ошибка')}\n\n"
@@ -498,7 +519,7 @@ def _telegram_publish_post(call, category_id, bot_id, platform_id, topic_id, cos
         
     except Exception as e:
         progress.finish()
-        db.update_tokens(call.from_user.id, cost)
+        reservation.refund()
         bot.send_message(
             call.message.chat.id,
             f"❌ Ошибка генерации изображения: {str(e)}\n\nТокены возвращены."
@@ -713,7 +734,7 @@ def _telegram_publish_post(call, category_id, bot_id, platform_id, topic_id, cos
         progress.finish()
         
         # Возвращаем токены при ошибке
-        db.update_tokens(call.from_user.id, cost)
+        reservation.refund()
         
         error_msg = str(e)
         
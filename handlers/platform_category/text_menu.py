@@ -4,6 +4,7 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 
 # Безопасное логирование
 try:
@@ -21,7 +22,7 @@ except:
     debug = SimpleDebug()
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_words_count_"))
+@router.prefix("platform_words_count_")
 def handle_platform_words_count(call):
     """Настройка количества слов в статье"""
     parts = call.data.split("_")
@@ -88,7 +89,7 @@ def handle_platform_words_count(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_words_count_"))
+@router.prefix("set_words_count_")
 def handle_set_words_count(call):
     """Установка количества слов"""
     parts = call.data.split("_")
@@ -130,7 +131,7 @@ def handle_set_words_count(call):
 # ОБРАБОТЧИК: HTML СТИЛЬ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_html_style_"))
+@router.prefix("platform_html_style_")
 def handle_platform_html_style(call):
     """Настройка HTML стиля для статей"""
     parts = call.data.split("_")
@@ -209,7 +210,7 @@ def handle_platform_html_style(call):
         bot.answer_callback_query(call.id, "✅ Настройки обновлены")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_html_style_"))
+@router.prefix("set_html_style_")
 def handle_set_html_style(call):
     """Установка HTML стиля"""
     parts = call.data.split("_")
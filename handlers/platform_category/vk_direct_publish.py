@@ -6,6 +6,7 @@
 from loader import bot, db
 from telebot import types
 from utils import escape_html
+from utils.rate_limiter import rate_limit
 import requests
 import tempfile
 import os
@@ -13,7 +14,7 @@ import random
 import json
 
 
-def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost):
+def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, reservation):
     """
     Прямая публикация в VK с генерацией изображения
     
@@ -23,8 +24,10 @@ def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost):
         bot_id: ID бота (категории)
         platform_id: VK user_id
         category_id: ID категории
-        cost: Стоимость (50 токенов)
+        reservation: Резерв токенов (utils/token_ledger.TokenReservation, 50 токенов)
     """
+    cost = reservation.amount
+    
     # Инициализируем прогресс-бар
     from utils.generation_progress import show_generation_progress
     progress = show_generation_progress(call.message.chat.id, "vk", total_steps=4)
@@ -35,13 +38,12 @@ def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost):
         category = db.get_category(category_id)
         if not category:
             progress.finish()
-            db.update_tokens(user_id, cost)  # Возвращаем токены
+            reservation.refund()  # Возвращаем токены
             bot.send_message(call.message.chat.id, "❌ Ошибка: категория не найдена")
             return
         
         category_name = category['name']
         description = category.get('description', '')
-        keywords = category.get('keywords', [])
         
         # Получаем настройки изображения для VK
         settings = category.get('settings', {})
@@ -94,14 +96,14 @@ def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost):
         if not image_result.get('success'):
             error_msg = image_result.get('error', 'Ошибка генерации')
             progress.finish()
-            db.update_tokens(user_id, cost)
+            reservation.refund()
             bot.send_message(call.message.chat.id, f"❌ Ошибка генерации изображения: {error_msg}\n\nТокены возвращены.")
             return
         
         image_bytes = image_result.get('image_bytes')
         if not image_bytes:
             progress.finish()
-            db.update_tokens(user_id, cost)
+            reservation.refund()
             bot.send_message(call.message.chat.id, "❌ Изображение не содержит данных\n\nТокены возвращены.")
             return
         
@@ -132,7 +134,7 @@ def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost):
         if not post_result.get('success'):
             error_msg = post_result.get('error', 'Ошибка генерации текста')
             progress.finish()
-            db.update_tokens(user_id, cost)
+            reservation.refund()
             os.unlink(image_path)
             bot.send_message(call.message.chat.id, f"❌ Ошибка генерации текста: {error_msg}\n\nТокены возвращены.")
             return
@@ -149,7 +151,7 @@ def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost):
         
         if not access_token:
             progress.finish()
-            db.update_tokens(user_id, cost)
+            reservation.refund()
             try:
                 os.unlink(image_path)
             except:
@@ -189,7 +191,7 @@ def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost):
         
         if not vk_connection:
             progress.finish()
-            db.update_tokens(user_id, cost)
+            reservation.refund()
             try:
                 os.unlink(image_path)
             except:
@@ -200,6 +202,7 @@ def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost):
         # Загружаем изображение в VK
         try:
             # Шаг 1: Получаем URL для загрузки
+            rate_limit('vk')
             upload_server_response = requests.get(
                 "https://api.vk.com/method/photos.getWallUploadServer",
                 params={
@@ -227,6 +230,7 @@ def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost):
             upload_result = upload_response.json()
             
             # Шаг 3: Сохраняем фото
+            rate_limit('vk')
             save_response = requests.get(
                 "https://api.vk.com/method/photos.saveWallPhoto",
                 params={
@@ -272,6 +276,7 @@ def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost):
             if vk_type == 'group':
                 post_params["owner_id"] = owner_id
             
+            rate_limit('vk')
             post_response = requests.get(
                 "https://api.vk.com/method/wall.post",
                 params=post_params,
@@ -334,7 +339,7 @@ def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost):
             
         except Exception as e:
             progress.finish()
-            db.update_tokens(user_id, cost)
+            reservation.refund()
             
             try:
                 os.unlink(image_path)
@@ -349,7 +354,7 @@ def publish_vk_directly(call, user_id, bot_id, platform_id, category_id, cost):
     
     except Exception as e:
         progress.finish()
-        db.update_tokens(user_id, cost)
+        reservation.refund()
         print(f"❌ Критическая ошибка: {e}")
         import traceback
         traceback.print_exc()
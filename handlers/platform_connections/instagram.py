@@ -3,11 +3,12 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 from .utils import check_global_platform_uniqueness
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "add_platform_instagram")
+@router.exact("add_platform_instagram")
 def add_platform_instagram_start(call):
     """Начало подключения Instagram"""
     user_id = call.from_user.id
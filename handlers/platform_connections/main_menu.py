@@ -4,11 +4,12 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 from .utils import check_global_platform_uniqueness
 import json
 
-@bot.callback_query_handler(func=lambda call: call.data == "settings_api_keys")
+@router.exact("settings_api_keys")
 def handle_platform_connections(call):
     """Управление подключениями к площадкам"""
     user_id = call.from_user.id
@@ -134,7 +135,7 @@ def handle_platform_connections(call):
 # ДОБАВЛЕНИЕ ПЛОЩАДКИ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data == "add_platform_menu")
+@router.exact("add_platform_menu")
 def add_platform_menu(call):
     """Меню выбора типа площадки"""
     text = (
@@ -174,7 +175,7 @@ def add_platform_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "manage_platforms")
+@router.exact("manage_platforms")
 def handle_manage_platforms(call):
     """Управление существующими подключениями"""
     user_id = call.from_user.id
@@ -4,6 +4,7 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 import json
 from .vk import user_adding_platform  # Импорт для совместимости с VK handlers
@@ -66,7 +67,7 @@ def manage_social_platforms(call):
 
 
 # Обработчики удаления для соцсетей
-@bot.callback_query_handler(func=lambda call: call.data.startswith("edit_instagram_") or call.data.startswith("edit_vk_") or call.data.startswith("edit_pinterest_") or call.data.startswith("edit_telegram_"))
+@router.prefix("edit_instagram_", "edit_vk_", "edit_pinterest_", "edit_telegram_")
 def edit_social_platform(call):
     """Редактирование соцсети"""
     parts = call.data.split("_")
@@ -130,7 +131,7 @@ def edit_social_platform(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("delete_instagram_") or call.data.startswith("delete_vk_") or call.data.startswith("delete_pinterest_") or call.data.startswith("delete_telegram_"))
+@router.prefix("delete_instagram_", "delete_vk_", "delete_pinterest_", "delete_telegram_")
 def delete_social_platform(call):
     """Удаление соцсети"""
     parts = call.data.split("_")
@@ -185,7 +186,7 @@ print("✅ handlers/platform_connections.py полностью загружен"
 # ПОКАЗ ИНСТРУКЦИЙ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("show_instruction_"))
+@router.prefix("show_instruction_")
 def show_platform_instruction(call):
     """Показ детальной инструкции по подключению"""
     from handlers.connection_instructions import (
@@ -232,7 +233,7 @@ def show_platform_instruction(call):
 
 
 # Обновим меню выбора CMS
-@bot.callback_query_handler(func=lambda call: call.data == "add_platform_website")
+@router.exact("add_platform_website")
 def add_platform_website_choose_cms(call):
     """Выбор типа CMS для подключения"""
     text = (
@@ -266,7 +267,7 @@ def add_platform_website_choose_cms(call):
 
 
 # Обработчики для каждой CMS
-@bot.callback_query_handler(func=lambda call: call.data.startswith("connect_cms_"))
+@router.prefix("connect_cms_")
 def start_cms_connection(call):
     """Начало подключения CMS"""
     cms = call.data.replace("connect_cms_", "")
@@ -309,7 +310,7 @@ def start_cms_connection(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("begin_connect_"))
+@router.prefix("begin_connect_")
 def begin_cms_connection(call):
     """Начало процесса подключения CMS"""
     cms = call.data.replace("begin_connect_", "")
@@ -361,7 +362,7 @@ def begin_cms_connection(call):
 
 
 # Аналогично добавим кнопки инструкций для соцсетей
-@bot.callback_query_handler(func=lambda call: call.data == "add_platform_instagram")
+@router.exact("add_platform_instagram")
 def add_platform_instagram_with_instruction(call):
     """Instagram с кнопкой инструкции"""
     text = (
@@ -391,7 +392,7 @@ def add_platform_instagram_with_instruction(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "begin_connect_instagram")
+@router.exact("begin_connect_instagram")
 def begin_instagram_connection(call):
     """Начало подключения Instagram"""
     user_id = call.from_user.id
@@ -4,10 +4,11 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 import json
 
-@bot.callback_query_handler(func=lambda call: call.data == "manage_websites")
+@router.exact("manage_websites")
 def manage_websites(call):
     """Список сайтов для управления"""
     user_id = call.from_user.id
@@ -60,7 +61,7 @@ def manage_websites(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("edit_website_") or call.data.startswith("view_website_"))
+@router.prefix("edit_website_", "view_website_")
 def edit_website(call):
     """Редактирование сайта"""
     user_id = call.from_user.id
@@ -111,7 +112,7 @@ def edit_website(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("delete_website_"))
+@router.prefix("delete_website_")
 def delete_website(call):
     """Удаление сайта"""
     user_id = call.from_user.id
@@ -150,7 +151,7 @@ def delete_website(call):
     manage_websites(fake_call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("test_website_"))
+@router.prefix("test_website_")
 def test_website(call):
     """Тест подключения к сайту"""
     user_id = call.from_user.id
@@ -186,7 +187,7 @@ def test_website(call):
 
 
 # Аналогично для Instagram и VK
-@bot.callback_query_handler(func=lambda call: call.data in ["manage_instagrams", "manage_vks", "manage_pinterests", "manage_telegrams"])
+@router.exact("manage_instagrams", "manage_vks", "manage_pinterests", "manage_telegrams")
 def manage_social_platforms(call):
     """Перенаправление на общий обработчик управления соцсетями"""
     # Эта функция теперь в management_social.py
@@ -194,7 +195,7 @@ def manage_social_platforms(call):
     handler(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("wp_categories_"))
+@router.prefix("wp_categories_")
 def handle_wp_categories(call):
     """Настройка рубрик WordPress"""
     idx = int(call.data.split("_")[2])
@@ -245,7 +246,7 @@ def handle_wp_categories(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("edit_wp_categories_"))
+@router.prefix("edit_wp_categories_")
 def edit_wp_categories_prompt(call):
     """Запрос на ввод рубрик"""
     idx = int(call.data.split("_")[3])
@@ -280,7 +281,7 @@ def edit_wp_categories_prompt(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("clear_wp_categories_"))
+@router.prefix("clear_wp_categories_")
 def clear_wp_categories(call):
     """Очистка рубрик"""
     idx = int(call.data.split("_")[3])
@@ -311,7 +312,7 @@ def clear_wp_categories(call):
     handle_wp_categories(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("wp_tags_"))
+@router.prefix("wp_tags_")
 def handle_wp_tags(call):
     """Настройка меток WordPress"""
     idx = int(call.data.split("_")[2])
@@ -362,7 +363,7 @@ def handle_wp_tags(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("edit_wp_tags_"))
+@router.prefix("edit_wp_tags_")
 def edit_wp_tags_prompt(call):
     """Запрос на ввод меток"""
     idx = int(call.data.split("_")[3])
@@ -397,7 +398,7 @@ def edit_wp_tags_prompt(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("clear_wp_tags_"))
+@router.prefix("clear_wp_tags_")
 def clear_wp_tags(call):
     """Очистка меток"""
     idx = int(call.data.split("_")[3])
@@ -429,7 +430,7 @@ def clear_wp_tags(call):
 
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("wp_seo_settings_"))
+@router.prefix("wp_seo_settings_")
 def handle_wp_seo_settings(call):
     """Меню SEO настроек"""
     idx = int(call.data.split("_")[3])
@@ -486,7 +487,7 @@ def handle_wp_seo_settings(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("seo_canonical_"))
+@router.prefix("seo_canonical_")
 def handle_seo_canonical(call):
     """Настройка Canonical URL"""
     idx = int(call.data.split("_")[2])
@@ -539,7 +540,7 @@ def handle_seo_canonical(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("edit_seo_canonical_"))
+@router.prefix("edit_seo_canonical_")
 def edit_seo_canonical_prompt(call):
     """Запрос на ввод Canonical URL"""
     idx = int(call.data.split("_")[3])
@@ -573,7 +574,7 @@ def edit_seo_canonical_prompt(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("clear_seo_canonical_"))
+@router.prefix("clear_seo_canonical_")
 def clear_seo_canonical(call):
     """Очистка Canonical URL"""
     idx = int(call.data.split("_")[3])
@@ -597,7 +598,7 @@ def clear_seo_canonical(call):
     handle_seo_canonical(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("seo_robots_"))
+@router.prefix("seo_robots_")
 def handle_seo_robots(call):
     """Настройка Robots Meta"""
     idx = int(call.data.split("_")[2])
@@ -663,7 +664,7 @@ def handle_seo_robots(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_robots_"))
+@router.prefix("set_robots_")
 def set_robots_meta(call):
     """Установка Robots Meta"""
     parts = call.data.split("_")
@@ -689,7 +690,7 @@ def set_robots_meta(call):
     handle_seo_robots(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("seo_schema_"))
+@router.prefix("seo_schema_")
 def handle_seo_schema(call):
     """Настройка Schema.org типа"""
     idx = int(call.data.split("_")[2])
@@ -767,7 +768,7 @@ def handle_seo_schema(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_schema_"))
+@router.prefix("set_schema_")
 def set_schema_type(call):
     """Установка Schema.org типа"""
     parts = call.data.split("_")
@@ -793,7 +794,7 @@ def set_schema_type(call):
     handle_seo_schema(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("internal_links_"))
+@router.prefix("internal_links_")
 def handle_internal_links(call):
     """Управление внутренними ссылками"""
     idx = int(call.data.split("_")[2])
@@ -870,7 +871,7 @@ def handle_internal_links(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("crawl_site_"))
+@router.prefix("crawl_site_")
 def start_crawling(call):
     """Запуск краулера"""
     idx = int(call.data.split("_")[2])
@@ -982,7 +983,7 @@ def start_crawling(call):
     # Обновляем до и после
     update_progress(4, 12, "📡 Краулинг сайта (может занять до минуты)...")
     
-    result = crawl_website(site_url, max_pages=50, timeout=60)
+    result = crawl_website(site_url, max_pages=300, timeout=60)
     
     update_progress(9, 12, "📊 Анализ приоритетов...")
     time.sleep(0.3)
@@ -997,10 +998,8 @@ def start_crawling(call):
         pass
     
     if result['success']:
-        # Сохраняем ссылки
-        websites[idx]['internal_links'] = result['links']
-        connections['websites'] = websites
-        db.update_user(user_id, {'platform_connections': connections})
+        # Сохраняем ссылки (только этот сайт: connections загружены до обхода)
+        db.update_platform_connection(user_id, 'websites', idx, {'internal_links': result['links']})
         
         # Формируем отчет
         text = (
@@ -1047,31 +1046,23 @@ def start_crawling(call):
         )
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("clear_internal_links_"))
+@router.prefix("clear_internal_links_")
 def clear_internal_links(call):
     """Очистка внутренних ссылок"""
     idx = int(call.data.split("_")[3])
     user_id = call.from_user.id
     
-    user = db.get_user(user_id)
-    connections = user.get('platform_connections', {})
-    websites = connections.get('websites', [])
-    
-    if idx >= len(websites):
+    if not db.update_platform_connection(user_id, 'websites', idx, {'internal_links': []}):
         bot.answer_callback_query(call.id, "❌ Сайт не найден")
         return
     
-    websites[idx]['internal_links'] = []
-    connections['websites'] = websites
-    db.update_user(user_id, {'platform_connections': connections})
-    
     bot.answer_callback_query(call.id, "✅ Внутренние ссылки очищены")
     
     call.data = f"internal_links_{idx}"
     handle_internal_links(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("external_links_"))
+@router.prefix("external_links_")
 def handle_external_links(call):
     """Управление внешними ссылками (соцсети)"""
     idx = int(call.data.split("_")[2])
@@ -1137,7 +1128,7 @@ def handle_external_links(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("edit_external_links_"))
+@router.prefix("edit_external_links_")
 def edit_external_links_prompt(call):
     """Запрос на ввод внешних ссылок"""
     idx = int(call.data.split("_")[3])
@@ -1171,7 +1162,7 @@ def edit_external_links_prompt(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("clear_external_links_"))
+@router.prefix("clear_external_links_")
 def clear_external_links(call):
     """Очистка внешних ссылок"""
     idx = int(call.data.split("_")[3])
@@ -3,13 +3,14 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 from .utils import check_global_platform_uniqueness
 from datetime import datetime
 import json
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "add_platform_pinterest")
+@router.exact("add_platform_pinterest")
 def add_platform_pinterest_with_instruction(call):
     """Pinterest OAuth авторизация"""
     user_id = call.from_user.id
@@ -90,7 +91,7 @@ def add_platform_pinterest_with_instruction(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("pinterest_enter_code_"))
+@router.prefix("pinterest_enter_code_")
 def pinterest_enter_code(call):
     """Запрос кода авторизации Pinterest"""
     user_id = call.from_user.id
@@ -134,14 +135,14 @@ def pinterest_enter_code(call):
     bot.answer_callback_query(call.id, "📝 Ожидаю код...")
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "begin_connect_pinterest")
+@router.exact("begin_connect_pinterest")
 def begin_pinterest_connection(call):
     """Редирект на новый OAuth процесс"""
     call.data = "add_platform_pinterest"
     add_platform_pinterest_with_instruction(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "show_instruction_pinterest")
+@router.exact("show_instruction_pinterest")
 def show_pinterest_instruction(call):
     """Показать подробную инструкцию Pinterest OAuth"""
     text = (
@@ -3,12 +3,13 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 from .utils import check_global_platform_uniqueness
 import json
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "add_platform_telegram")
+@router.exact("add_platform_telegram")
 def add_platform_telegram_with_instruction(call):
     """Telegram - показ инструкции"""
     text = (
@@ -70,7 +71,7 @@ def add_platform_telegram_with_instruction(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "begin_connect_telegram")
+@router.exact("begin_connect_telegram")
 def begin_telegram_connection(call):
     """Начало подключения Telegram - запрос ссылки на канал"""
     user_id = call.from_user.id
@@ -13,10 +13,11 @@ from datetime import datetime
 
 # Импортируем cms_platforms из корня проекта
 from cms_platforms import SUPPORTED_CMS, get_cms_list, get_cms_info, get_cms_instruction
+from utils.state_store import StateStore
 
 
 # Временное хранилище для процесса подключения
-user_adding_platform = {}
+user_adding_platform = StateStore('adding_platform')
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -9,12 +9,13 @@ from utils import escape_html
 from .utils import check_global_platform_uniqueness
 import re
 import json
+from utils.state_store import StateStore
 
 
 # ============================================================================
 # ВАЖНО: Эта переменная экспортируется и используется другими модулями!
 # ============================================================================
-user_adding_platform = {}
+user_adding_platform = StateStore('adding_platform_vk')
 
 # Экспортируем для использования в других модулях
 __all__ = ['user_adding_platform', 'extract_vk_id', 'extract_vk_token']
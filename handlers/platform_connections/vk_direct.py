@@ -4,10 +4,11 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 import json
 
 
-@bot.callback_query_handler(func=lambda call: call.data == 'add_platform_vk')
+@router.exact("add_platform_vk")
 def handle_vk_connection_choice(call):
     """
     Выбор способа подключения VK
@@ -55,7 +56,7 @@ def handle_vk_connection_choice(call):
     )
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('vk_method_group_'))
+@router.prefix("vk_method_group_")
 def handle_vk_group_token_instruction(call):
     """
     Инструкция для токена сообщества
@@ -111,7 +112,7 @@ def handle_vk_group_token_instruction(call):
     db.conn.commit()
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('vk_method_personal_'))
+@router.prefix("vk_method_personal_")
 def handle_vk_personal_token_instruction(call):
     """
     Инструкция для личного токена
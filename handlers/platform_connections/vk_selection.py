@@ -3,11 +3,12 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 import json
 import time
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('vk_select_'))
+@router.prefix("vk_select_")
 def handle_vk_selection(call):
     """
     Обработчик выбора VK профиля или группы
@@ -106,17 +107,11 @@ def handle_vk_selection(call):
         
         if selection_type == 'user':
             # Проверка глобальной уникальности
-            db.cursor.execute("""
-                SELECT u.id, u.username
-                FROM users u
-                WHERE u.platform_connections::text LIKE %s
-            """, (f'%"user_id": "{vk_user_id}"%',))
-            
-            existing_users = db.cursor.fetchall()
+            existing_users = db.get_platform_connection_owners_list('vks', vk_user_id)
             
             if existing_users:
                 for existing_user in existing_users:
-                    existing_user_id = existing_user.get('id') if isinstance(existing_user, dict) else existing_user[0]
+                    existing_user_id = existing_user['user_id']
                     
                     if existing_user_id != user_id:
                         bot.answer_callback_query(call.id, "❌ Эта страница уже подключена у другого пользователя")
@@ -167,17 +162,11 @@ def handle_vk_selection(call):
             group_id = selected_group['id']
             
             # Проверка глобальной уникальности
-            db.cursor.execute("""
-                SELECT u.id, u.username
-                FROM users u
-                WHERE u.platform_connections::text LIKE %s
-            """, (f'%"group_id": {group_id}%',))
-            
-            existing_users = db.cursor.fetchall()
+            existing_users = db.get_platform_connection_owners_list('vks', str(-group_id))
             
             if existing_users:
                 for existing_user in existing_users:
-                    existing_user_id = existing_user.get('id') if isinstance(existing_user, dict) else existing_user[0]
+                    existing_user_id = existing_user['user_id']
                     
                     if existing_user_id != user_id:
                         bot.answer_callback_query(call.id, "❌ Эта группа уже подключена у другого пользователя")
@@ -3,15 +3,17 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 from .utils import check_global_platform_uniqueness
 import json
+from utils.state_store import StateStore
 
 # Состояние добавления платформы
-user_adding_platform = {}
+user_adding_platform = StateStore('adding_platform_website')
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "add_platform_website")
+@router.exact("add_platform_website")
 def add_platform_website_start(call):
     """Начало подключения сайта - перенаправляем на WordPress"""
     # Перенаправляем на новый обработчик WordPress
@@ -3,12 +3,13 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 from .utils import check_global_platform_uniqueness
 import json
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("add_cms_"))
+@router.prefix("add_cms_")
 def add_cms_start(call):
     """Показать инструкцию для выбранной CMS"""
     cms_id = call.data.replace("add_cms_", "")
@@ -47,7 +48,7 @@ def add_cms_start(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("cms_connect_"))
+@router.prefix("cms_connect_")
 def cms_connect_start(call):
     """Начать процесс подключения CMS"""
     cms_id = call.data.replace("cms_connect_", "")
@@ -3,13 +3,14 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 from .utils import check_global_platform_uniqueness
 from cms_platforms import SUPPORTED_CMS
 import json
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "add_website_menu")
+@router.exact("add_website_menu")
 def add_website_menu(call):
     """Подменю выбора CMS для WEB сайта"""
     text = (
@@ -11,13 +11,15 @@ platform_management/instagram_management.py - Управление Instagram
 
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 import os
 from datetime import datetime
+from utils.state_store import StateStore
 
 
 # Временное хранилище для процесса создания поста
-instagram_post_state = {}
+instagram_post_state = StateStore('instagram_post')
 
 
 def register_instagram_management_handlers(bot):
@@ -29,7 +31,7 @@ def register_instagram_management_handlers(bot):
     # СОЗДАНИЕ ПОСТА - ВЫБОР ИСТОЧНИКА
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('platform_post_instagram_'))
+    @router.prefix("platform_post_instagram_")
     def handle_instagram_post(call):
         """Обработчик создания поста для Instagram"""
         try:
@@ -140,7 +142,7 @@ def register_instagram_management_handlers(bot):
     # AI ГЕНЕРАЦИЯ ПОСТА (ИЗОБРАЖЕНИЕ + ТЕКСТ)
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('instagram_ai_full_'))
+    @router.prefix("instagram_ai_full_")
     def start_ai_post_generation(call):
         """Начало AI генерации поста"""
         try:
@@ -239,7 +241,7 @@ def register_instagram_management_handlers(bot):
         bot.send_message(message.chat.id, text, reply_markup=markup, parse_mode='HTML')
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('instagram_ai_confirm_'))
+    @router.prefix("instagram_ai_confirm_")
     def confirm_ai_post(call):
         """Подтверждение и генерация AI поста"""
         try:
@@ -295,7 +297,7 @@ def register_instagram_management_handlers(bot):
     # РУЧНОЙ ВВОД ТЕКСТА
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('instagram_manual_text_'))
+    @router.prefix("instagram_manual_text_")
     def start_manual_text(call):
         """Начало ручного ввода текста"""
         try:
@@ -435,7 +437,7 @@ def register_instagram_management_handlers(bot):
     # ЗАГРУЗКА ИЗОБРАЖЕНИЯ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('instagram_upload_image_') or call.data.startswith('instagram_upload_now_'))
+    @router.prefix("instagram_upload_image_", "instagram_upload_now_")
     def start_image_upload(call):
         """Начало загрузки изображения"""
         try:
@@ -580,7 +582,7 @@ def register_instagram_management_handlers(bot):
             bot.send_message(chat_id, caption, reply_markup=markup, parse_mode='HTML')
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('instagram_publish_'))
+    @router.prefix("instagram_publish_")
     def publish_instagram_post(call):
         """Публикация поста в Instagram"""
         try:
@@ -640,7 +642,7 @@ def register_instagram_management_handlers(bot):
     
     
     # Заглушка для AI генерации изображения
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('instagram_ai_image_'))
+    @router.prefix("instagram_ai_image_")
     def ai_image_stub(call):
         """Заглушка для AI генерации изображения"""
         bot.answer_callback_query(
@@ -11,13 +11,15 @@ platform_management/pinterest_management.py - Управление Pinterest
 
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 import os
 from datetime import datetime
+from utils.state_store import StateStore
 
 
 # Временное хранилище для процесса создания пина
-pinterest_pin_state = {}
+pinterest_pin_state = StateStore('pinterest_pin')
 
 
 def register_pinterest_management_handlers(bot):
@@ -29,7 +31,7 @@ def register_pinterest_management_handlers(bot):
     # СОЗДАНИЕ ПИНА - ВЫБОР ИСТОЧНИКА
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('platform_post_pinterest_'))
+    @router.prefix("platform_post_pinterest_")
     def handle_pinterest_pin(call):
         """Обработчик создания пина для Pinterest"""
         try:
@@ -150,7 +152,7 @@ def register_pinterest_management_handlers(bot):
     # AI ГЕНЕРАЦИЯ ПИНА (ЗАГЛУШКА)
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('pinterest_ai_full_'))
+    @router.prefix("pinterest_ai_full_")
     def start_ai_pin_generation(call):
         """Начало AI генерации пина"""
         try:
@@ -248,7 +250,7 @@ def register_pinterest_management_handlers(bot):
     # РУЧНОЙ ВВОД ОПИСАНИЯ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('pinterest_manual_desc_'))
+    @router.prefix("pinterest_manual_desc_")
     def start_manual_description(call):
         """Начало ручного ввода описания"""
         try:
@@ -419,7 +421,7 @@ def register_pinterest_management_handlers(bot):
     # ЗАГРУЗКА ИЗОБРАЖЕНИЯ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('pinterest_upload_image_'))
+    @router.prefix("pinterest_upload_image_")
     def start_image_upload(call):
         """Начало загрузки изображения"""
         try:
@@ -559,7 +561,7 @@ def register_pinterest_management_handlers(bot):
             bot.send_message(chat_id, caption, reply_markup=markup, parse_mode='HTML')
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('pinterest_publish_'))
+    @router.prefix("pinterest_publish_")
     def publish_pinterest_pin(call):
         """Публикация пина в Pinterest"""
         try:
@@ -619,7 +621,7 @@ def register_pinterest_management_handlers(bot):
     
     
     # Заглушки
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('pinterest_ai_image_'))
+    @router.prefix("pinterest_ai_image_")
     def ai_image_stub(call):
         """Заглушка для AI генерации изображения"""
         bot.answer_callback_query(
@@ -628,7 +630,7 @@ def register_pinterest_management_handlers(bot):
             show_alert=True
         )
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('pinterest_choose_board_'))
+    @router.prefix("pinterest_choose_board_")
     def choose_board_stub(call):
         """Заглушка для выбора доски"""
         bot.answer_callback_query(
@@ -10,6 +10,7 @@ platform_management/platform_menu.py - Главное меню платформ
 
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 import json
 from datetime import datetime
@@ -24,7 +25,7 @@ def register_platform_menu_handlers(bot):
     # ОТКРЫТИЕ МЕНЮ ПЛАТФОРМЫ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('platform_action_'))
+    @router.prefix("platform_action_")
     def handle_platform_action(call):
         """
         Обработчик клика на платформу в категории
@@ -278,7 +279,7 @@ def register_platform_menu_handlers(bot):
     # ЗАГЛУШКИ ДЛЯ БУДУЩИХ ФУНКЦИЙ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('platform_post_'))
+    @router.prefix("platform_post_")
     def handle_platform_post(call):
         """Заглушка для создания поста (будет реализовано позже)"""
         bot.answer_callback_query(
@@ -287,7 +288,7 @@ def register_platform_menu_handlers(bot):
             show_alert=True
         )
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('platform_scheduler_'))
+    @router.prefix("platform_scheduler_")
     def handle_platform_scheduler(call):
         """Заглушка для планировщика (будет реализовано позже)"""
         bot.answer_callback_query(
@@ -296,7 +297,7 @@ def register_platform_menu_handlers(bot):
             show_alert=True
         )
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('platform_settings_'))
+    @router.prefix("platform_settings_")
     def handle_platform_settings(call):
         """Заглушка для настроек (будет реализовано позже)"""
         bot.answer_callback_query(
@@ -305,7 +306,7 @@ def register_platform_menu_handlers(bot):
             show_alert=True
         )
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('platform_delete_confirm_'))
+    @router.prefix("platform_delete_confirm_")
     def handle_platform_delete(call):
         """Подтверждение удаления платформы"""
         try:
@@ -373,7 +374,7 @@ def register_platform_menu_handlers(bot):
             bot.answer_callback_query(call.id, "❌ Ошибка", show_alert=True)
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('platform_delete_execute_'))
+    @router.prefix("platform_delete_execute_")
     def execute_platform_delete(call):
         """Выполняет удаление платформы"""
         try:
@@ -11,6 +11,7 @@ platform_management/platform_scheduler.py - Планировщик автопо
 
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 import json
 from datetime import datetime
@@ -25,7 +26,7 @@ def register_platform_scheduler_handlers(bot):
     # ОТКРЫТИЕ ПЛАНИРОВЩИКА
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('platform_scheduler_'))
+    @router.prefix("platform_scheduler_")
     def handle_platform_scheduler(call):
         """Обработчик открытия планировщика"""
         try:
@@ -271,7 +272,7 @@ def register_platform_scheduler_handlers(bot):
     # ВКЛЮЧЕНИЕ/ВЫКЛЮЧЕНИЕ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_toggle_'))
+    @router.prefix("sched_toggle_")
     def handle_scheduler_toggle(call):
         """Включение/выключение планировщика"""
         try:
@@ -333,7 +334,7 @@ def register_platform_scheduler_handlers(bot):
     # НАСТРОЙКА ЧАСТОТЫ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_frequency_'))
+    @router.prefix("sched_frequency_")
     def handle_scheduler_frequency(call):
         """Настройка частоты публикаций"""
         try:
@@ -412,7 +413,7 @@ def register_platform_scheduler_handlers(bot):
             bot.answer_callback_query(call.id, "❌ Ошибка", show_alert=True)
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_setfreq_'))
+    @router.prefix("sched_setfreq_")
     def handle_set_frequency(call):
         """Сохранение частоты"""
         try:
@@ -484,7 +485,7 @@ def register_platform_scheduler_handlers(bot):
     # НАСТРОЙКА ВРЕМЕНИ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_times_'))
+    @router.prefix("sched_times_")
     def handle_scheduler_times(call):
         """Настройка времени публикаций"""
         try:
@@ -567,7 +568,7 @@ def register_platform_scheduler_handlers(bot):
             bot.answer_callback_query(call.id, "❌ Ошибка", show_alert=True)
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_settime_'))
+    @router.prefix("sched_settime_")
     def handle_set_time(call):
         """Сохранение времени"""
         try:
@@ -644,7 +645,7 @@ def register_platform_scheduler_handlers(bot):
     # ВЫБОР ТОПИКОВ ДЛЯ TELEGRAM
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_topics_warning_'))
+    @router.prefix("sched_topics_warning_")
     def handle_scheduler_topics_warning(call):
         """Предупреждение о ненастроенных топиках"""
         try:
@@ -664,7 +665,7 @@ def register_platform_scheduler_handlers(bot):
             bot.answer_callback_query(call.id, "❌ Ошибка", show_alert=True)
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_topics_'))
+    @router.prefix("sched_topics_")
     def handle_scheduler_topics(call):
         """Выбор топиков для публикации в планировщике"""
         try:
@@ -792,7 +793,7 @@ def register_platform_scheduler_handlers(bot):
             bot.answer_callback_query(call.id, "❌ Ошибка", show_alert=True)
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_topic_toggle_'))
+    @router.prefix("sched_topic_toggle_")
     def handle_scheduler_topic_toggle(call):
         """Переключение выбора топика"""
         try:
@@ -856,7 +857,7 @@ def register_platform_scheduler_handlers(bot):
             bot.answer_callback_query(call.id, "❌ Ошибка", show_alert=True)
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_topic_main_'))
+    @router.prefix("sched_topic_main_")
     def handle_scheduler_topic_main(call):
         """Публикация в основной чат (без топика)"""
         try:
@@ -906,7 +907,7 @@ def register_platform_scheduler_handlers(bot):
             bot.answer_callback_query(call.id, "❌ Ошибка", show_alert=True)
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_topics_all_'))
+    @router.prefix("sched_topics_all_")
     def handle_scheduler_topics_all(call):
         """Выбрать все топики"""
         try:
@@ -970,7 +971,7 @@ def register_platform_scheduler_handlers(bot):
             bot.answer_callback_query(call.id, "❌ Ошибка", show_alert=True)
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_topics_clear_'))
+    @router.prefix("sched_topics_clear_")
     def handle_scheduler_topics_clear(call):
         """Сбросить выбор топиков"""
         try:
@@ -1024,7 +1025,7 @@ def register_platform_scheduler_handlers(bot):
     # ВЫБОР ДОСОК ДЛЯ PINTEREST
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_boards_'))
+    @router.prefix("sched_boards_")
     def handle_scheduler_boards(call):
         """Выбор досок для публикации в планировщике Pinterest"""
         try:
@@ -1156,7 +1157,7 @@ def register_platform_scheduler_handlers(bot):
             bot.answer_callback_query(call.id, "❌ Ошибка", show_alert=True)
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_board_toggle_'))
+    @router.prefix("sched_board_toggle_")
     def handle_scheduler_board_toggle(call):
         """Переключение выбора доски"""
         try:
@@ -1213,7 +1214,7 @@ def register_platform_scheduler_handlers(bot):
             bot.answer_callback_query(call.id, "❌ Ошибка", show_alert=True)
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_boards_all_'))
+    @router.prefix("sched_boards_all_")
     def handle_scheduler_boards_all(call):
         """Выбрать все доски"""
         try:
@@ -1287,7 +1288,7 @@ def register_platform_scheduler_handlers(bot):
             bot.answer_callback_query(call.id, "❌ Ошибка", show_alert=True)
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('sched_boards_clear_'))
+    @router.prefix("sched_boards_clear_")
     def handle_scheduler_boards_clear(call):
         """Сбросить выбор досок"""
         try:
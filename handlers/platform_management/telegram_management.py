@@ -10,13 +10,15 @@ platform_management/telegram_management.py - Управление Telegram
 
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 import os
 from datetime import datetime
+from utils.state_store import StateStore
 
 
 # Временное хранилище для процесса создания поста
-telegram_post_state = {}
+telegram_post_state = StateStore('telegram_post')
 
 
 def register_telegram_management_handlers(bot):
@@ -28,7 +30,7 @@ def register_telegram_management_handlers(bot):
     # СОЗДАНИЕ ПОСТА - ВЫБОР ИСТОЧНИКА
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('platform_post_telegram_'))
+    @router.prefix("platform_post_telegram_")
     def handle_telegram_post(call):
         """Обработчик создания поста для Telegram"""
         try:
@@ -149,7 +151,7 @@ def register_telegram_management_handlers(bot):
     # AI ГЕНЕРАЦИЯ ПОСТА (ЗАГЛУШКА)
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('telegram_ai_full_'))
+    @router.prefix("telegram_ai_full_")
     def start_ai_post_generation(call):
         """Начало AI генерации поста"""
         try:
@@ -248,7 +250,7 @@ def register_telegram_management_handlers(bot):
     # РУЧНОЙ ВВОД ТЕКСТА
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('telegram_manual_text_'))
+    @router.prefix("telegram_manual_text_")
     def start_manual_text(call):
         """Начало ручного ввода текста"""
         try:
@@ -399,7 +401,7 @@ def register_telegram_management_handlers(bot):
     # ЗАГРУЗКА ИЗОБРАЖЕНИЯ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('telegram_upload_image_') or call.data.startswith('telegram_upload_now_image_'))
+    @router.prefix("telegram_upload_image_", "telegram_upload_now_image_")
     def start_image_upload(call):
         """Начало загрузки изображения"""
         try:
@@ -495,7 +497,7 @@ def register_telegram_management_handlers(bot):
     # ЗАГРУЗКА ВИДЕО
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('telegram_upload_video_') or call.data.startswith('telegram_upload_now_video_'))
+    @router.prefix("telegram_upload_video_", "telegram_upload_now_video_")
     def start_video_upload(call):
         """Начало загрузки видео"""
         try:
@@ -591,7 +593,7 @@ def register_telegram_management_handlers(bot):
     # БЕЗ МЕДИА
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('telegram_no_media_'))
+    @router.prefix("telegram_no_media_")
     def handle_no_media(call):
         """Пост без медиа"""
         try:
@@ -679,7 +681,7 @@ def register_telegram_management_handlers(bot):
             bot.send_message(chat_id, caption, reply_markup=markup, parse_mode='HTML')
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('telegram_publish_'))
+    @router.prefix("telegram_publish_")
     def publish_telegram_post(call):
         """Публикация поста в Telegram"""
         try:
@@ -752,7 +754,7 @@ def register_telegram_management_handlers(bot):
     
     
     # Заглушка для AI генерации изображения
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('telegram_ai_image_'))
+    @router.prefix("telegram_ai_image_")
     def ai_image_stub(call):
         """Заглушка для AI генерации изображения"""
         bot.answer_callback_query(
@@ -11,13 +11,15 @@ platform_management/vk_management.py - Управление ВКонтакте
 
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 import os
 from datetime import datetime
+from utils.state_store import StateStore
 
 
 # Временное хранилище для процесса создания поста
-vk_post_state = {}
+vk_post_state = StateStore('vk_post')
 
 
 def register_vk_management_handlers(bot):
@@ -29,7 +31,7 @@ def register_vk_management_handlers(bot):
     # СОЗДАНИЕ ПОСТА - ВЫБОР ИСТОЧНИКА
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('platform_post_vk_'))
+    @router.prefix("platform_post_vk_")
     def handle_vk_post(call):
         """Обработчик создания поста для VK"""
         try:
@@ -140,7 +142,7 @@ def register_vk_management_handlers(bot):
     # AI ГЕНЕРАЦИЯ ПОСТА (ЗАГЛУШКА)
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('vk_ai_full_'))
+    @router.prefix("vk_ai_full_")
     def start_ai_post_generation(call):
         """Начало AI генерации поста"""
         try:
@@ -238,7 +240,7 @@ def register_vk_management_handlers(bot):
     # РУЧНОЙ ВВОД ТЕКСТА
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('vk_manual_text_'))
+    @router.prefix("vk_manual_text_")
     def start_manual_text(call):
         """Начало ручного ввода текста"""
         try:
@@ -378,7 +380,7 @@ def register_vk_management_handlers(bot):
     # ЗАГРУЗКА ИЗОБРАЖЕНИЯ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('vk_upload_image_') or call.data.startswith('vk_upload_now_'))
+    @router.prefix("vk_upload_image_", "vk_upload_now_")
     def start_image_upload(call):
         """Начало загрузки изображения"""
         try:
@@ -473,7 +475,7 @@ def register_vk_management_handlers(bot):
     # БЕЗ ИЗОБРАЖЕНИЯ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('vk_no_image_'))
+    @router.prefix("vk_no_image_")
     def handle_no_image(call):
         """Пост без изображения"""
         try:
@@ -551,7 +553,7 @@ def register_vk_management_handlers(bot):
             bot.send_message(chat_id, caption, reply_markup=markup, parse_mode='HTML')
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('vk_publish_'))
+    @router.prefix("vk_publish_")
     def publish_vk_post(call):
         """Публикация поста в VK"""
         try:
@@ -624,7 +626,7 @@ def register_vk_management_handlers(bot):
     
     
     # Заглушка для AI генерации изображения
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('vk_ai_image_'))
+    @router.prefix("vk_ai_image_")
     def ai_image_stub(call):
         """Заглушка для AI генерации изображения"""
         bot.answer_callback_query(
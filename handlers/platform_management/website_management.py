@@ -10,14 +10,16 @@ platform_management/website_management.py - Управление сайтами
 
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 import json
 import os
 from datetime import datetime
+from utils.state_store import StateStore
 
 
 # Временное хранилище для процесса создания статьи
-website_article_state = {}
+website_article_state = StateStore('website_article')
 
 
 def register_website_management_handlers(bot):
@@ -29,7 +31,7 @@ def register_website_management_handlers(bot):
     # СОЗДАНИЕ СТАТЬИ - ВЫБОР ИСТОЧНИКА
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('platform_post_website_'))
+    @router.prefix("platform_post_website_")
     def handle_website_post(call):
         """Обработчик создания статьи для сайта"""
         try:
@@ -144,7 +146,7 @@ def register_website_management_handlers(bot):
     # AI ГЕНЕРАЦИЯ СТАТЬИ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('website_ai_generate_'))
+    @router.prefix("website_ai_generate_")
     def start_ai_article_generation(call):
         """Начало AI генерации статьи"""
         try:
@@ -262,7 +264,7 @@ def register_website_management_handlers(bot):
         )
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('website_ai_confirm_'))
+    @router.prefix("website_ai_confirm_")
     def confirm_ai_generation(call):
         """Подтверждение и запуск AI генерации"""
         try:
@@ -339,7 +341,7 @@ def register_website_management_handlers(bot):
     # РУЧНОЙ ВВОД СТАТЬИ
     # ═══════════════════════════════════════════════════════════════
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('website_manual_input_'))
+    @router.prefix("website_manual_input_")
     def start_manual_input(call):
         """Начало ручного ввода статьи"""
         try:
@@ -500,7 +502,7 @@ def register_website_management_handlers(bot):
         bot.send_message(chat_id, text, reply_markup=markup, parse_mode='HTML')
     
     
-    @bot.callback_query_handler(func=lambda call: call.data.startswith('website_publish_manual_'))
+    @router.prefix("website_publish_manual_")
     def publish_manual_article(call):
         """Публикация ручной статьи"""
         try:
@@ -4,8 +4,10 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html, safe_answer_callback
 import json
+from utils.state_store import StateStore
 
 print("✅ handlers/platform_scheduler.py загружен")
 
@@ -15,7 +17,7 @@ print("✅ handlers/platform_scheduler.py загружен")
 # ═══════════════════════════════════════════════════════════════
 
 # Временное хранилище состояния настройки
-scheduler_states = {}
+scheduler_states = StateStore('platform_scheduler')
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -63,7 +65,7 @@ def _save_platform_scheduler(category_id, platform_type, platform_id, schedule_d
 # ШАГ 1: ВЫБОР ЧАСТОТЫ (1-7 ДНЕЙ В НЕДЕЛЮ)
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("old_scheduler_setup_"))
+@router.prefix("old_scheduler_setup_")
 def handle_scheduler_setup(call):
     """Начало настройки планировщика - выбор частоты"""
     parts = call.data.split("_")
@@ -153,7 +155,7 @@ def handle_scheduler_setup(call):
 # ШАГ 2: ВЫБОР ПОСТОВ В ДЕНЬ (ЕСЛИ ВЫБРАНО 7 ДНЕЙ)
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("sched_freq_"))
+@router.prefix("sched_freq_")
 def handle_schedule_frequency(call):
     """Обработка выбора частоты"""
     parts = call.data.split("_")
@@ -224,7 +226,7 @@ def handle_schedule_frequency(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("sched_ppd_"))
+@router.prefix("sched_ppd_")
 def handle_schedule_posts_per_day(call):
     """Обработка выбора постов в день"""
     parts = call.data.split("_")
@@ -478,7 +480,7 @@ def _show_telegram_topics_selection(chat_id, message_id, user_id, category_id, b
 
 
 # Обработчики переключения досок/топиков
-@bot.callback_query_handler(func=lambda call: call.data.startswith("sched_board_toggle_"))
+@router.prefix("sched_board_toggle_")
 def handle_board_toggle(call):
     """Переключение выбора доски"""
     parts = call.data.split("_")
@@ -507,7 +509,7 @@ def handle_board_toggle(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("sched_topic_toggle_"))
+@router.prefix("sched_topic_toggle_")
 def handle_topic_toggle(call):
     """Переключение выбора топика"""
     parts = call.data.split("_")
@@ -537,7 +539,7 @@ def handle_topic_toggle(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("sched_boards_done_") or call.data.startswith("sched_topics_done_"))
+@router.prefix("sched_boards_done_", "sched_topics_done_")
 def handle_boards_topics_done(call):
     """Завершение выбора досок/топиков"""
     parts = call.data.split("_")
@@ -680,7 +682,7 @@ def _save_and_activate_scheduler(chat_id, message_id, category_id, bot_id, platf
 # ОТКЛЮЧЕНИЕ ПЛАНИРОВЩИКА
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("sched_disable_"))
+@router.prefix("sched_disable_")
 def handle_schedule_disable(call):
     """Отключение планировщика"""
     parts = call.data.split("_")
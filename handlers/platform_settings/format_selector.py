@@ -4,6 +4,7 @@ Format Selector - Выбор форматов изображений
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from .constants import PLATFORM_FORMATS, PLATFORM_NAMES, RECOMMENDED_FORMATS
 from .utils import get_platform_settings, save_platform_settings
@@ -226,7 +227,7 @@ def handle_formats_reset(call, platform_type, category_id, bot_id, platform_id=N
 # РЕГИСТРАЦИЯ ОБРАБОТЧИКОВ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_format_"))
+@router.prefix("platform_format_")
 def handle_platform_format(call):
     """Вход в выбор форматов"""
     parts = call.data.split("_")
@@ -238,7 +239,7 @@ def handle_platform_format(call):
     show_format_selector(call, platform_type, category_id, bot_id, platform_id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("toggle_format_"))
+@router.prefix("toggle_format_")
 def callback_toggle_format(call):
     """Переключение формата"""
     parts = call.data.split("_")
@@ -269,7 +270,7 @@ def callback_toggle_format(call):
     handle_toggle_format(call, platform_type, category_id, bot_id, format_code, platform_id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("formats_all_"))
+@router.prefix("formats_all_")
 def callback_formats_all(call):
     """Выбрать все форматы"""
     parts = call.data.split("_")
@@ -281,7 +282,7 @@ def callback_formats_all(call):
     handle_formats_all(call, platform_type, category_id, bot_id, platform_id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("formats_reset_"))
+@router.prefix("formats_reset_")
 def callback_formats_reset(call):
     """Сбросить форматы"""
     parts = call.data.split("_")
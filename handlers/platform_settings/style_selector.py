@@ -8,6 +8,7 @@ print("="*80)
 
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from .constants import IMAGE_STYLES, PLATFORM_NAMES
 from .utils import get_platform_settings, save_platform_settings
@@ -206,7 +207,7 @@ def handle_styles_clear(call, platform_type, category_id, bot_id):
 # РЕГИСТРАЦИЯ ОБРАБОТЧИКОВ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("next_style_"))
+@router.prefix("next_style_")
 def handle_next_style(call):
     """Переход к выбору стилей"""
     parts = call.data.split("_")
@@ -217,7 +218,7 @@ def handle_next_style(call):
     show_style_selector(call, platform_type, category_id, bot_id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("toggle_style_"))
+@router.prefix("toggle_style_")
 def callback_toggle_style(call):
     """Переключение стиля"""
     print(f"\n🔵 CALLBACK toggle_style получен!")
@@ -237,7 +238,7 @@ def callback_toggle_style(call):
 print("✅ Декоратор @bot.callback_query_handler для 'toggle_style_' зарегистрирован!")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("styles_all_"))
+@router.prefix("styles_all_")
 def callback_styles_all(call):
     """Выбрать все стили"""
     parts = call.data.split("_")
@@ -248,7 +249,7 @@ def callback_styles_all(call):
     handle_styles_all(call, platform_type, category_id, bot_id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("styles_clear_"))
+@router.prefix("styles_clear_")
 def callback_styles_clear(call):
     """Очистить стили"""
     parts = call.data.split("_")
@@ -4,6 +4,7 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 from .constants import TEXT_ON_IMAGE_PRESETS, COLLAGE_PRESETS, TEXT_STYLES_DESCRIPTION, COLLAGE_DESCRIPTION
 from .utils import get_platform_settings, save_platform_settings
@@ -13,7 +14,7 @@ from .utils import get_platform_settings, save_platform_settings
 # ТЕКСТ НА ИЗОБРАЖЕНИИ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("next_text_percent_"))
+@router.prefix("next_text_percent_")
 def handle_next_text_percent(call):
     """Обработчик для next_text_percent_ (из images_menu)"""
     parts = call.data.split("_")
@@ -24,7 +25,7 @@ def handle_next_text_percent(call):
     show_text_percent_menu(call, platform_type, category_id, bot_id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_text_percent_"))
+@router.prefix("platform_text_percent_")
 def handle_text_percent_selector(call):
     """
     Меню выбора процента текста на изображениях
@@ -104,7 +105,7 @@ def show_text_percent_menu(call, platform_type, category_id, bot_id, platform_id
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_text_percent_"))
+@router.prefix("set_text_percent_")
 def handle_set_text_percent(call):
     """
     Сохранение процента текста на изображениях
@@ -136,7 +137,7 @@ def handle_set_text_percent(call):
 # КОЛЛАЖ ИЛИ ЦЕЛЬНОЕ ИЗОБРАЖЕНИЕ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("next_collage_percent_"))
+@router.prefix("next_collage_percent_")
 def handle_next_collage_percent(call):
     """Обработчик для next_collage_percent_ (из images_menu)"""
     parts = call.data.split("_")
@@ -147,7 +148,7 @@ def handle_next_collage_percent(call):
     show_collage_percent_menu(call, platform_type, category_id, bot_id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_collage_percent_"))
+@router.prefix("platform_collage_percent_")
 def handle_collage_percent_selector(call):
     """
     Меню выбора процента коллажей
@@ -227,7 +228,7 @@ def show_collage_percent_menu(call, platform_type, category_id, bot_id, platform
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_collage_percent_"))
+@router.prefix("set_collage_percent_")
 def handle_set_collage_percent(call):
     """
     Сохранение процента коллажей
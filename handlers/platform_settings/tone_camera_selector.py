@@ -4,6 +4,7 @@ Tone & Camera Selector - Выбор тональности и камеры
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from .constants import TONE_PRESETS, CAMERA_PRESETS, PLATFORM_NAMES
 from .utils import get_platform_settings, save_platform_settings
@@ -248,12 +249,12 @@ def handle_save_settings(call, platform_type, category_id, bot_id):
 # ═══════════════════════════════════════════════════════════════
 
 # Тональность
-@bot.callback_query_handler(func=lambda call: call.data.startswith("next_tone_"))
+@router.prefix("next_tone_")
 def callback_next_tone(call):
     parts = call.data.split("_")
     show_tone_selector(call, parts[2], int(parts[3]), int(parts[4]))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("toggle_tone_"))
+@router.prefix("toggle_tone_")
 def callback_toggle_tone(call):
     parts = call.data.split("_")
     # toggle_tone_pinterest_123_456_light_airy
@@ -266,14 +267,14 @@ def callback_toggle_tone(call):
     
     handle_toggle_tone(call, platform_type, category_id, bot_id, tone_code)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("tones_all_"))
+@router.prefix("tones_all_")
 def callback_tones_all(call):
     parts = call.data.split("_")
     save_platform_settings(db, int(parts[3]), parts[2], tones=list(TONE_PRESETS.keys()))
     bot.answer_callback_query(call.id, "✅ Все тональности")
     show_tone_selector(call, parts[2], int(parts[3]), int(parts[4]))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("tones_clear_"))
+@router.prefix("tones_clear_")
 def callback_tones_clear(call):
     parts = call.data.split("_")
     save_platform_settings(db, int(parts[3]), parts[2], tones=[])
@@ -281,12 +282,12 @@ def callback_tones_clear(call):
     show_tone_selector(call, parts[2], int(parts[3]), int(parts[4]))
 
 # Камера
-@bot.callback_query_handler(func=lambda call: call.data.startswith("next_camera_"))
+@router.prefix("next_camera_")
 def callback_next_camera(call):
     parts = call.data.split("_")
     show_camera_selector(call, parts[2], int(parts[3]), int(parts[4]))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("toggle_camera_"))
+@router.prefix("toggle_camera_")
 def callback_toggle_camera(call):
     parts = call.data.split("_")
     # toggle_camera_pinterest_123_456_canon_r5
@@ -298,14 +299,14 @@ def callback_toggle_camera(call):
     
     handle_toggle_camera(call, platform_type, category_id, bot_id, camera_code)
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("cameras_all_"))
+@router.prefix("cameras_all_")
 def callback_cameras_all(call):
     parts = call.data.split("_")
     save_platform_settings(db, int(parts[3]), parts[2], cameras=list(CAMERA_PRESETS.keys()))
     bot.answer_callback_query(call.id, "✅ Все камеры")
     show_camera_selector(call, parts[2], int(parts[3]), int(parts[4]))
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("cameras_clear_"))
+@router.prefix("cameras_clear_")
 def callback_cameras_clear(call):
     parts = call.data.split("_")
     save_platform_settings(db, int(parts[3]), parts[2], cameras=[])
@@ -313,7 +314,7 @@ def callback_cameras_clear(call):
     show_camera_selector(call, parts[2], int(parts[3]), int(parts[4]))
 
 # Сохранение
-@bot.callback_query_handler(func=lambda call: call.data.startswith("save_settings_"))
+@router.prefix("save_settings_")
 def callback_save_settings(call):
     parts = call.data.split("_")
     handle_save_settings(call, parts[2], int(parts[3]), int(parts[4]))
@@ -3,6 +3,7 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from config import ADMIN_ID
 from utils import escape_html, safe_answer_callback
@@ -252,7 +253,7 @@ def show_profile(message):
     bot.send_message(message.chat.id, text, reply_markup=markup, parse_mode='HTML')
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "show_expenses")
+@router.exact("show_expenses")
 def show_user_expenses(call):
     """История расходов токенов"""
     user_id = call.from_user.id
@@ -261,7 +262,7 @@ def show_user_expenses(call):
     db.cursor.execute("""
         SELECT amount, action, created_at, bot_id, category_id
         FROM token_expenses
-        WHERE user_id = %s
+        WHERE user_id = %s AND status <> 'refunded'
         ORDER BY created_at DESC
         LIMIT 20
     """, (user_id,))
@@ -325,7 +326,7 @@ def show_user_expenses(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "referral_program")
+@router.exact("referral_program")
 def show_referral_program(call):
     """Реферальная программа"""
     user_id = call.from_user.id
@@ -382,7 +383,7 @@ def show_referral_program(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "referral_share")
+@router.exact("referral_share")
 def show_referral_share(call):
     """Показать текст для приглашения друзей с кнопкой поделиться"""
     user_id = call.from_user.id
@@ -430,7 +431,7 @@ def show_referral_share(call):
     safe_answer_callback(bot, call.id, "✅ Отправьте друзьям!")
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "back_to_profile")
+@router.exact("back_to_profile")
 def back_to_profile(call):
     """Возврат к профилю"""
     try:
@@ -3,6 +3,7 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from utils import escape_html, safe_answer_callback
 from datetime import datetime
@@ -12,8 +13,8 @@ def show_projects_menu(message):
     """Показать меню проектов с расширенной информацией"""
     user_id = message.from_user.id
     
-    # Получаем список ботов пользователя
-    bots = db.get_user_bots(user_id)
+    # Боты пользователя со сводкой по категориям (один запрос)
+    bots = db.get_user_project_tree_list(user_id)
     
     if not bots:
         # Если ботов нет - предлагаем создать первого
@@ -47,27 +48,9 @@ def show_projects_menu(message):
         )
         
         # Считаем общую статистику
-        total_categories = 0
-        total_keywords = 0
-        total_media = 0
-        
-        for bot_item in bots:
-            bot_id = bot_item['id']
-            categories = db.get_bot_categories(bot_id)
-            
-            if categories:
-                total_categories += len(categories)
-                
-                for cat in categories:
-                    # Подсчитываем ключевые фразы
-                    keywords = cat.get('keywords', [])
-                    if isinstance(keywords, list):
-                        total_keywords += len(keywords)
-                    
-                    # Подсчитываем медиа
-                    media = cat.get('media', [])
-                    if isinstance(media, list):
-                        total_media += len(media)
+        total_categories = sum(bot_item['categories_count'] for bot_item in bots)
+        total_keywords = sum(bot_item['keywords_count'] for bot_item in bots)
+        total_media = sum(bot_item['media_count'] for bot_item in bots)
         
         text += (
             f"📂 Категорий: <b>{total_categories}</b>\n"
@@ -84,9 +67,7 @@ def show_projects_menu(message):
             bot_id = bot_item['id']
             bot_name = bot_item['name']
             
-            # Получаем количество категорий
-            categories = db.get_bot_categories(bot_id)
-            cat_count = len(categories) if categories else 0
+            cat_count = bot_item['categories_count']
             
             # Формируем текст кнопки с номером
             btn_text = f"{idx}. {bot_name}"
@@ -127,7 +108,7 @@ def handle_projects_button(message):
     show_projects_menu(message)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "show_projects")
+@router.exact("show_projects")
 def handle_show_projects_callback(call):
     """Обработчик callback для показа списка проектов"""
     # Создаем fake message
@@ -150,12 +131,12 @@ def handle_show_projects_callback(call):
 # ДЕТАЛЬНАЯ СТАТИСТИКА ПРОЕКТОВ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data == "projects_stats")
+@router.exact("projects_stats")
 def show_projects_statistics(call):
     """Показать детальную статистику всех проектов"""
     user_id = call.from_user.id
     
-    bots = db.get_user_bots(user_id)
+    bots = db.get_user_project_tree_list(user_id)
     
     if not bots:
         safe_answer_callback(bot, call.id, "❌ Нет проектов")
@@ -178,9 +159,8 @@ def show_projects_statistics(call):
     max_categories = 0
     
     for bot_item in bots:
-        bot_id = bot_item['id']
         bot_name = bot_item['name']
-        categories = db.get_bot_categories(bot_id)
+        categories = bot_item['categories']
         
         if not categories:
             continue
@@ -193,30 +173,17 @@ def show_projects_statistics(call):
             max_categories = cat_count
             most_active_bot = bot_name
         
+        total_keywords += bot_item['keywords_count']
+        total_media += bot_item['media_count']
+        
         for cat in categories:
-            # Ключевые фразы
-            keywords = cat.get('keywords', [])
-            if isinstance(keywords, list):
-                total_keywords += len(keywords)
-            
-            # Медиа
-            media = cat.get('media', [])
-            if isinstance(media, list):
-                total_media += len(media)
-            
             # Описания
-            if cat.get('description'):
+            if cat['has_description']:
                 total_descriptions += 1
             
-            # Цены
-            prices = cat.get('prices', {})
-            if isinstance(prices, dict) and prices:
-                total_prices += len(prices)
-            
-            # Отзывы
-            reviews = cat.get('reviews', [])
-            if isinstance(reviews, list):
-                total_reviews += len(reviews)
+            # Цены и отзывы
+            total_prices += cat['prices_count']
+            total_reviews += cat['reviews_count']
     
     # Средние показатели
     avg_categories = total_categories / len(bots) if bots else 0
@@ -267,12 +234,12 @@ def show_projects_statistics(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "top_projects")
+@router.exact("top_projects")
 def show_top_projects(call):
     """Показать топ проектов по активности"""
     user_id = call.from_user.id
     
-    bots = db.get_user_bots(user_id)
+    bots = db.get_user_project_tree_list(user_id)
     
     if not bots:
         safe_answer_callback(bot, call.id, "❌ Нет проектов")
@@ -284,21 +251,9 @@ def show_top_projects(call):
     for bot_item in bots:
         bot_id = bot_item['id']
         bot_name = bot_item['name']
-        categories = db.get_bot_categories(bot_id)
-        
-        cat_count = len(categories) if categories else 0
-        keywords_count = 0
-        media_count = 0
-        
-        if categories:
-            for cat in categories:
-                keywords = cat.get('keywords', [])
-                if isinstance(keywords, list):
-                    keywords_count += len(keywords)
-                
-                media = cat.get('media', [])
-                if isinstance(media, list):
-                    media_count += len(media)
+        cat_count = bot_item['categories_count']
+        keywords_count = bot_item['keywords_count']
+        media_count = bot_item['media_count']
         
         # Считаем общий балл активности
         activity_score = cat_count * 10 + keywords_count + media_count * 2
@@ -359,7 +314,7 @@ def show_top_projects(call):
 # ПОКАЗ ВСЕХ ПРОЕКТОВ (ПОСТРАНИЧНО)
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("show_all_projects"))
+@router.prefix("show_all_projects")
 def show_all_projects(call):
     """Показать все проекты постранично"""
     user_id = call.from_user.id
@@ -368,7 +323,7 @@ def show_all_projects(call):
     parts = call.data.split("_")
     page = int(parts[-1]) if len(parts) > 3 and parts[-1].isdigit() else 0
     
-    bots = db.get_user_bots(user_id)
+    bots = db.get_user_project_tree_list(user_id)
     
     if not bots:
         safe_answer_callback(bot, call.id, "❌ Нет проектов")
@@ -393,9 +348,7 @@ def show_all_projects(call):
     for idx, bot_item in enumerate(current_bots, start_idx + 1):
         bot_id = bot_item['id']
         bot_name = bot_item['name']
-        
-        categories = db.get_bot_categories(bot_id)
-        cat_count = len(categories) if categories else 0
+        cat_count = bot_item['categories_count']
         
         btn_text = f"{idx}. {bot_name}"
         if cat_count > 0:
@@ -443,7 +396,7 @@ def show_all_projects(call):
 # БЫСТРЫЕ ДЕЙСТВИЯ С ПРОЕКТАМИ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data == "quick_actions_projects")
+@router.exact("quick_actions_projects")
 def show_quick_actions(call):
     """Быстрые действия с проектами"""
     text = (
@@ -476,7 +429,7 @@ def show_quick_actions(call):
 
 
 # Заглушка для поиска
-@bot.callback_query_handler(func=lambda call: call.data == "search_project")
+@router.exact("search_project")
 def search_project(call):
     """Поиск проекта (заглушка)"""
     text = (
@@ -509,7 +462,7 @@ def search_project(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "quick_publish_menu")
+@router.exact("quick_publish_menu")
 def show_quick_publish_menu(call):
     """Меню быстрого доступа к публикациям"""
     user_id = call.from_user.id
@@ -678,7 +631,7 @@ def show_quick_publish_menu(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("quick_publish_"))
+@router.prefix("quick_publish_")
 def handle_quick_publish(call):
     """Быстрая публикация на платформу"""
     platform_type = call.data.replace("quick_publish_", "")
@@ -688,13 +641,13 @@ def handle_quick_publish(call):
     
     try:
         # Получаем все проекты пользователя
-        bots = db.get_user_bots(user_id)
+        bots = db.get_user_project_tree_list(user_id)
         
         # Собираем все категории из всех проектов
         all_categories = []
         for bot_item in bots:
             bot_id = bot_item['id']
-            categories = db.get_bot_categories(bot_id)
+            categories = bot_item['categories']
             if categories:
                 for cat in categories:
                     all_categories.append({
@@ -759,7 +712,7 @@ def handle_quick_publish(call):
         bot.send_message(call.message.chat.id, f"❌ Ошибка публикации: {e}")
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "back_to_projects")
+@router.exact("back_to_projects")
 def back_to_projects(call):
     """Возврат к меню проектов"""
     show_projects_menu(call.message)
@@ -3,16 +3,22 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from utils import escape_html, safe_answer_callback
 from config import TOKEN_PRICES
+from utils.rate_limiter import rate_limit
+from utils.generation_executor import generation_executor, submit_generation
+from utils.token_ledger import reserve_tokens
+from functools import partial
 import json
 from datetime import datetime, timedelta
 import re
+from utils.state_store import StateStore
 
 
 # Временное хранилище сгенерированных отзывов
-generated_reviews_storage = {}
+generated_reviews_storage = StateStore('generated_reviews')
 
 
 def get_review_date_range():
@@ -23,7 +29,7 @@ def get_review_date_range():
     return f"между {date_from} и {date_to}"
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gen_reviews_"))
+@router.prefix("gen_reviews_")
 def handle_generate_reviews_start(call):
     """Выбор количества отзывов для генерации"""
     category_id = int(call.data.split("_")[-1])
@@ -79,7 +85,7 @@ def handle_generate_reviews_start(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("gen_rev_exec_"))
+@router.prefix("gen_rev_exec_")
 def handle_generate_reviews_execute(call):
     """Выполнение генерации отзывов через Claude AI"""
     parts = call.data.split("_")
@@ -89,6 +95,10 @@ def handle_generate_reviews_execute(call):
     user_id = call.from_user.id
     chat_id = call.message.chat.id
     
+    if generation_executor.is_user_busy(user_id):
+        safe_answer_callback(bot, call.id, "⏳ Дождитесь завершения текущих генераций", show_alert=True)
+        return
+    
     # Получаем категорию
     category = db.get_category(category_id)
     if not category:
@@ -101,22 +111,17 @@ def handle_generate_reviews_execute(call):
     # Рассчитываем стоимость
     cost = count * 10
     
-    # Проверяем баланс
-    tokens = db.get_user_tokens(user_id)
-    if tokens < cost:
+    # Резервируем токены одним запросом: подтверждаются после генерации
+    reservation = reserve_tokens(user_id, cost, f'reviews_{count}', category.get('bot_id'), category_id)
+    if reservation is None:
         bot.answer_callback_query(
             call.id,
-            f"❌ Недостаточно токенов! Нужно: {cost}, у вас: {tokens}",
+            f"❌ Недостаточно токенов! Нужно: {cost}, у вас: {db.get_user_tokens(user_id)}",
             show_alert=True
         )
         return
     
-    # Списываем токены
-    if not db.update_tokens(user_id, -cost):
-        safe_answer_callback(bot, call.id, "❌ Ошибка списания токенов", show_alert=True)
-        return
-    
-    new_balance = db.get_user_tokens(user_id)
+    new_balance = reservation.balance
     
     # Показываем прогресс
     bot.edit_message_text(
@@ -128,6 +133,24 @@ def handle_generate_reviews_execute(call):
     )
     safe_answer_callback(bot, call.id)
     
+    # Генерация — в пуле генераций, поток TeleBot сразу освобождается
+    submit_generation(
+        partial(
+            _run_reviews_generation, call, user_id, chat_id, category_id, category,
+            category_name, description, count, reservation, new_balance
+        ),
+        kind='reviews',
+        user_id=user_id,
+        label=f"отзывы {category_id} x{count}",
+        reservation=reservation
+    )
+
+
+def _run_reviews_generation(call, user_id, chat_id, category_id, category,
+                            category_name, description, count, reservation, new_balance):
+    """Генерация отзывов через Claude (выполняется в пуле генераций)"""
+    cost = reservation.amount
+    
     # Вычисляем диапазон дат
     date_range = get_review_date_range()
     
@@ -357,6 +380,7 @@ def handle_generate_reviews_execute(call):
         if not client:
             raise Exception("Claude API не настроен")
         
+        rate_limit('anthropic')
         response = client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=4000,
@@ -427,7 +451,7 @@ def handle_generate_reviews_execute(call):
         traceback.print_exc()
         
         # Возвращаем токены
-        db.update_tokens(user_id, cost)
+        reservation.refund()
         
         bot.edit_message_text(
             f"❌ Ошибка генерации отзывов: {e}\n\n"
@@ -437,7 +461,7 @@ def handle_generate_reviews_execute(call):
         )
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("save_reviews_"))
+@router.prefix("save_reviews_")
 def handle_save_reviews(call):
     """Сохранение сгенерированных отзывов"""
     category_id = int(call.data.split("_")[-1])
@@ -490,7 +514,7 @@ def handle_save_reviews(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка сохранения", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("view_all_reviews_"))
+@router.prefix("view_all_reviews_")
 def handle_view_all_reviews(call):
     """Просмотр всех отзывов категории"""
     category_id = int(call.data.split("_")[-1])
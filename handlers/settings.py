@@ -3,6 +3,7 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from config import ADMIN_ID
 from utils import escape_html, safe_answer_callback
@@ -30,7 +31,7 @@ def show_settings(message):
     bot.send_message(message.chat.id, text, reply_markup=markup, parse_mode='HTML')
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "settings_notifications")
+@router.exact("settings_notifications")
 def handle_notifications_settings(call):
     """Настройки уведомлений"""
     user_id = call.from_user.id
@@ -63,7 +64,7 @@ def handle_notifications_settings(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "settings_support")
+@router.exact("settings_support")
 def handle_support(call):
     """Техподдержка"""
     text = (
@@ -107,7 +108,7 @@ def handle_support(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "contact_support")
+@router.exact("contact_support")
 def handle_contact_support(call):
     """Написать в поддержку (заглушка)"""
     text = (
@@ -135,7 +136,7 @@ def handle_contact_support(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "settings_about")
+@router.exact("settings_about")
 def handle_about(call):
     """О боте"""
     text = (
@@ -192,7 +193,7 @@ def handle_about(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "share_bot")
+@router.exact("share_bot")
 def handle_share_bot(call):
     """Поделиться ботом"""
     bot_username = "your_bot_name"  # TODO: взять из конфига
@@ -220,7 +221,7 @@ def handle_share_bot(call):
     )
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "back_to_settings")
+@router.exact("back_to_settings")
 def back_to_settings(call):
     """Возврат в меню настроек"""
     text = (
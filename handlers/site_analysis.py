@@ -3,16 +3,18 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from utils import escape_html, safe_answer_callback
 import time
 import requests
 from bs4 import BeautifulSoup
 import re
+from utils.state_store import StateStore
 
 
 # Состояние анализа
-analysis_state = {}
+analysis_state = StateStore('site_analysis')
 
 
 def update_progress(chat_id, message_id, percent, text, title="АНАЛИЗ"):
@@ -47,7 +49,7 @@ def update_progress(chat_id, message_id, percent, text, title="АНАЛИЗ"):
         pass
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("analyze_site_"))
+@router.prefix("analyze_site_")
 def handle_analyze_site(call):
     """Начало анализа сайта"""
     bot_id = int(call.data.split("_")[-1])
@@ -83,7 +85,7 @@ def handle_analyze_site(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("tech_audit_"))
+@router.prefix("tech_audit_")
 def handle_tech_audit(call):
     """Технический аудит сайта"""
     bot_id = int(call.data.split("_")[-1])
@@ -301,7 +303,7 @@ def process_tech_audit(message):
     del analysis_state[user_id]
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("seo_audit_"))
+@router.prefix("seo_audit_")
 def handle_seo_audit(call):
     """SEO анализ (заглушка)"""
     bot_id = int(call.data.split("_")[-1])
@@ -334,7 +336,7 @@ def handle_seo_audit(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ai_content_"))
+@router.prefix("ai_content_")
 def handle_ai_content_analysis(call):
     """AI анализ контента (заглушка)"""
     bot_id = int(call.data.split("_")[-1])
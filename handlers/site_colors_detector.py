@@ -72,6 +72,14 @@ def hex_to_brightness(hex_color):
         return 128
 
 
+DEFAULT_COLORS = {
+    'background': '#ffffff',
+    'text': '#333333',
+    'accent': '#0066cc',
+    'is_dark_theme': False
+}
+
+
 def detect_site_colors(url):
     """
     Определяет цветовую схему сайта
@@ -87,14 +95,33 @@ def detect_site_colors(url):
             'is_dark_theme': bool  # Тёмная ли тема
         }
     """
+    return fetch_site_colors(url) or dict(DEFAULT_COLORS)
+
+
+def fetch_site_colors(url):
+    """Как detect_site_colors, но None если страница не загрузилась"""
     try:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
         response = requests.get(url, headers=headers, timeout=10)
-        html = response.text
-        
+        response.raise_for_status()
+    except Exception as e:
+        logger.error(f"⚠️ Ошибка определения цветов: {e}")
+        return None
+    
+    return detect_colors_from_html(response.text)
+
+
+def detect_colors_from_html(html):
+    """
+    Определяет цветовую схему по HTML страницы (CSS из тегов <style>)
+    
+    Returns:
+        dict: как detect_site_colors
+    """
+    try:
         colors = {
             'background': None,
             'text': None,
@@ -172,12 +199,7 @@ def detect_site_colors(url):
     except Exception as e:
         logger.error(f"⚠️ Ошибка определения цветов: {e}")
         # Возвращаем цвета по умолчанию
-        return {
-            'background': '#ffffff',
-            'text': '#333333',
-            'accent': '#0066cc',
-            'is_dark_theme': False
-        }
+        return dict(DEFAULT_COLORS)
 
 
 print("✅ handlers/site_colors_detector.py загружен")
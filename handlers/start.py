@@ -3,6 +3,7 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from config import ADMIN_ID
 from utils import escape_html, safe_answer_callback
@@ -103,9 +104,13 @@ def handle_start(message):
     
     # Регистрируем пользователя если его нет в БД
     try:
-        if not db.get_user(user_id):
+        user = db.get_user(user_id)
+        if not user:
             db.add_user(user_id, username, first_name)
             print(f"✅ Новый пользователь зарегистрирован: {user_id} ({first_name})")
+        elif user.get('is_blocked'):
+            # Раньше заблокировал бота (ответ 403 при рассылке) — снова получатель рассылок
+            db.update_user_unblocked(user_id)
     except Exception as e:
         print(f"⚠️ Ошибка регистрации пользователя: {e}")
     
@@ -124,7 +129,7 @@ def handle_back_to_menu(message):
 # СИСТЕМА ПОМОЩИ
 # ═══════════════════════════════════════════════════════════════
 
-@bot.callback_query_handler(func=lambda call: call.data == "help_menu")
+@router.exact("help_menu")
 def show_help_menu(call):
     """Главное меню помощи"""
     text = """
@@ -155,7 +160,7 @@ def show_help_menu(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "help_first_connection")
+@router.exact("help_first_connection")
 def show_help_first_connection(call):
     """Инструкция по первому подключению"""
     text = """
@@ -213,7 +218,7 @@ def show_help_first_connection(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "help_create_bot")
+@router.exact("help_create_bot")
 def show_help_create_bot(call):
     """Инструкция по созданию бота"""
     text = """
@@ -266,7 +271,7 @@ def show_help_create_bot(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "help_categories")
+@router.exact("help_categories")
 def show_help_categories(call):
     """Инструкция по категориям"""
     text = """
@@ -322,7 +327,7 @@ def show_help_categories(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "help_publishing")
+@router.exact("help_publishing")
 def show_help_publishing(call):
     """Инструкция по публикации и планировщикам"""
     text = """
@@ -2,9 +2,10 @@
 """
 Менеджер состояний пользователей для обработки многошаговых действий
 """
+from utils.state_store import StateStore
 
 # Хранилище состояний {user_id: {'state': str, 'data': dict}}
-user_states = {}
+user_states = StateStore('user_states')
 
 
 def set_user_state(user_id, state, data=None):
@@ -3,6 +3,7 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 from database.database import db
 from config import TOKEN_PRICES
 from utils import escape_html, safe_answer_callback
@@ -114,7 +115,7 @@ def show_tariffs(message):
     bot.send_message(message.chat.id, text, reply_markup=markup, parse_mode='HTML')
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "topup_balance")
+@router.exact("topup_balance")
 def handle_topup_balance(call):
     """Меню пополнения баланса"""
     user_id = call.from_user.id
@@ -159,13 +160,13 @@ def handle_topup_balance(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "buy_tokens")
+@router.exact("buy_tokens")
 def handle_buy_tokens(call):
     """Алиас для buy_tokens - перенаправляем на пополнение"""
     handle_topup_balance(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("buy_package_"))
+@router.prefix("buy_package_")
 def handle_buy_package(call):
     """Обработка покупки пакета"""
     package_key = call.data.split("_")[-1]
@@ -221,7 +222,7 @@ def handle_buy_package(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "back_to_tariffs")
+@router.exact("back_to_tariffs")
 def back_to_tariffs(call):
     """Возврат к меню тарифов"""
     try:
@@ -4,9 +4,10 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_format_telegram_"))
+@router.prefix("platform_format_telegram_")
 def handle_telegram_images_menu(call):
     """Меню настроек изображений для Telegram"""
     parts = call.data.split("_")
@@ -163,7 +164,7 @@ def handle_telegram_images_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("tg_preview_format_"))
+@router.prefix("tg_preview_format_")
 def handle_telegram_preview_format_select(call):
     """Выбор формата превью (множественный выбор)"""
     parts = call.data.split("_")
@@ -238,7 +239,7 @@ def handle_telegram_preview_format_select(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("tg_set_format_"))
+@router.prefix("tg_set_format_")
 def handle_telegram_set_format(call):
     """Установка формата превью (toggle)"""
     parts = call.data.split("_")
@@ -273,7 +274,7 @@ def handle_telegram_set_format(call):
     handle_telegram_preview_format_select(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("tg_images_count_"))
+@router.prefix("tg_images_count_")
 def handle_telegram_images_count_menu(call):
     """Меню выбора количества изображений"""
     parts = call.data.split("_")
@@ -332,7 +333,7 @@ def handle_telegram_images_count_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("tg_set_img_count_"))
+@router.prefix("tg_set_img_count_")
 def handle_telegram_set_img_count(call):
     """Установка количества изображений"""
     parts = call.data.split("_")
@@ -353,7 +354,7 @@ def handle_telegram_set_img_count(call):
     handle_telegram_images_count_menu(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("back_to_telegram_"))
+@router.prefix("back_to_telegram_")
 def handle_back_to_telegram(call):
     """Возврат в меню Telegram категории"""
     parts = call.data.split("_")
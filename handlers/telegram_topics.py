@@ -3,7 +3,9 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html, safe_answer_callback
+from utils.state_store import StateStore
 
 
 @bot.callback_query_handler(func=lambda call: call.data.startswith("telegram_topics_") 
@@ -123,7 +125,7 @@ def telegram_topics_menu(call):
     safe_answer_callback(bot, call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("telegram_topics_help_"))
+@router.prefix("telegram_topics_help_")
 def telegram_topics_help(call):
     """Инструкция по настройке топиков"""
     parts = call.data.split("_")
@@ -192,10 +194,10 @@ def telegram_topics_help(call):
 
 
 # Словарь для хранения состояний добавления топиков
-user_states = {}
+user_states = StateStore('telegram_topics')
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("add_telegram_topic_"))
+@router.prefix("add_telegram_topic_")
 def add_telegram_topic_start(call):
     """Начало добавления топика"""
     parts = call.data.split("_")
@@ -415,7 +417,7 @@ def add_telegram_topic_process(message):
     )
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("clear_telegram_topics_"))
+@router.prefix("clear_telegram_topics_")
 def clear_telegram_topics(call):
     """Удаление всех топиков"""
     parts = call.data.split("_")
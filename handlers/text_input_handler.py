@@ -32,24 +32,13 @@ def handle_wp_text_input(message):
         idx = state_data.get('idx')
         categories_text = message.text.strip()
         
-        # Сохраняем рубрики
-        user = db.get_user(user_id)
-        connections = user.get('platform_connections', {})
-        websites = connections.get('websites', [])
-        
-        if idx < len(websites):
-            websites[idx]['wp_categories'] = categories_text
-            
-            if not isinstance(connections, dict):
-                connections = {}
-            connections['websites'] = websites
-            
-            db.update_user(user_id, {'platform_connections': connections})
-            
+        # Сохраняем рубрики (одна строка platform_connections)
+        if db.update_platform_connection(user_id, 'websites', idx, {'wp_categories': categories_text}):
             clear_user_state(user_id)
             
             # Попытка создать рубрики в WordPress сразу
-            site = websites[idx]
+            connection = db.get_platform_connection(user_id, 'websites', position=idx)
+            site = connection['settings'] if connection else {}
             wp_url = site.get('url', '').rstrip('/')
             wp_login = site.get('username', '')
             wp_password = site.get('password', '')
@@ -101,20 +90,8 @@ def handle_wp_text_input(message):
         idx = state_data.get('idx')
         tags_text = message.text.strip()
         
-        # Сохраняем метки
-        user = db.get_user(user_id)
-        connections = user.get('platform_connections', {})
-        websites = connections.get('websites', [])
-        
-        if idx < len(websites):
-            websites[idx]['wp_tags'] = tags_text
-            
-            if not isinstance(connections, dict):
-                connections = {}
-            connections['websites'] = websites
-            
-            db.update_user(user_id, {'platform_connections': connections})
-            
+        # Сохраняем метки (одна строка platform_connections)
+        if db.update_platform_connection(user_id, 'websites', idx, {'wp_tags': tags_text}):
             clear_user_state(user_id)
             
             markup = types.InlineKeyboardMarkup()
@@ -142,20 +119,8 @@ def handle_wp_text_input(message):
             )
             return
         
-        # Сохраняем Canonical URL
-        user = db.get_user(user_id)
-        connections = user.get('platform_connections', {})
-        websites = connections.get('websites', [])
-        
-        if idx < len(websites):
-            websites[idx]['seo_canonical'] = canonical_url
-            
-            if not isinstance(connections, dict):
-                connections = {}
-            connections['websites'] = websites
-            
-            db.update_user(user_id, {'platform_connections': connections})
-            
+        # Сохраняем Canonical URL (одна строка platform_connections)
+        if db.update_platform_connection(user_id, 'websites', idx, {'seo_canonical': canonical_url}):
             clear_user_state(user_id)
             
             bot.send_message(
@@ -179,20 +144,8 @@ def handle_wp_text_input(message):
             )
             return
         
-        # Сохраняем внешние ссылки
-        user = db.get_user(user_id)
-        connections = user.get('platform_connections', {})
-        websites = connections.get('websites', [])
-        
-        if idx < len(websites):
-            websites[idx]['external_links'] = links_text
-            
-            if not isinstance(connections, dict):
-                connections = {}
-            connections['websites'] = websites
-            
-            db.update_user(user_id, {'platform_connections': connections})
-            
+        # Сохраняем внешние ссылки (одна строка platform_connections)
+        if db.update_platform_connection(user_id, 'websites', idx, {'external_links': links_text}):
             # Подсчитываем количество ссылок
             num_links = links_text.count('http')
             
@@ -3,6 +3,7 @@ Text Style Settings - Настройка стиля текста и текста
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html, safe_answer_callback
 import json
 
@@ -78,7 +79,7 @@ TEXT_ON_IMAGE_OPTIONS = {
 }
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('platform_style_'))
+@router.prefix("platform_style_")
 def handle_text_style_main(call):
     """Главное меню стиля текста - множественный выбор стилей"""
     try:
@@ -207,7 +208,7 @@ def handle_text_style_main(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('text_style_toggle_'))
+@router.prefix("text_style_toggle_")
 def handle_text_style_toggle(call):
     """Переключение выбора стиля текста (чекбокс)"""
     try:
@@ -276,7 +277,7 @@ def handle_text_style_toggle(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('text_styles_all_'))
+@router.prefix("text_styles_all_")
 def handle_text_styles_all(call):
     """Выбрать все стили"""
     try:
@@ -322,7 +323,7 @@ def handle_text_styles_all(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('text_styles_clear_'))
+@router.prefix("text_styles_clear_")
 def handle_text_styles_clear(call):
     """Сбросить выбор стилей (оставить только разговорный)"""
     try:
@@ -367,7 +368,7 @@ def handle_text_styles_clear(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('text_on_image_menu_'))
+@router.prefix("text_on_image_menu_")
 def handle_text_on_image_menu(call):
     """Меню выбора текста на изображении"""
     try:
@@ -488,7 +489,7 @@ def handle_text_on_image_menu(call):
         import traceback
         traceback.print_exc()
         safe_answer_callback(bot, call.id, "❌ Ошибка", show_alert=True)
-@bot.callback_query_handler(func=lambda call: call.data.startswith('text_on_image_'))
+@router.prefix("text_on_image_")
 def handle_text_on_image_toggle(call):
     """Переключение настройки текста на изображении"""
     try:
@@ -4,12 +4,14 @@ Universal Platform Settings - Универсальные настройки дл
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html, safe_answer_callback
 import json
+from utils.state_store import StateStore
 
 
 # Хранилище состояний для ввода ссылки
-platform_link_state = {}
+platform_link_state = StateStore('platform_link')
 
 # Названия платформ
 PLATFORM_NAMES = {
@@ -114,7 +116,7 @@ def handle_platform_link(call):
         safe_answer_callback(bot, call.id, "❌ Ошибка", show_alert=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('platform_link_edit_'))
+@router.prefix("platform_link_edit_")
 def handle_platform_link_edit(call):
     """Начало редактирования ссылки"""
     try:
@@ -267,7 +269,7 @@ def process_platform_link(message, user_id):
         bot.send_message(message.chat.id, f"❌ Ошибка сохранения: {e}")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith('platform_link_delete_'))
+@router.prefix("platform_link_delete_")
 def handle_platform_link_delete(call):
     """Удаление ссылки"""
     try:
@@ -6,6 +6,7 @@ import os
 import hashlib
 import base64
 import secrets
+from utils.state_store import StateStore
 
 # VK Application credentials
 VK_APP_ID = os.getenv("VK_APP_ID", "5354809")  # Standalone приложение "Хроники героя"
@@ -27,8 +28,8 @@ VK_OAUTH_AUTHORIZE_URL = "https://id.vk.com/authorize"
 VK_OAUTH_TOKEN_URL = "https://id.vk.com/oauth2/auth"
 VK_API_BASE_URL = "https://api.vk.com/method"
 
-# Временное хранилище для PKCE verifiers
-_pkce_storage = {}
+# Временное хранилище для PKCE verifiers (запасное, если нет таблицы vk_pkce_sessions)
+_pkce_storage = StateStore('vk_pkce', ttl=600, max_size=1000)
 
 
 def generate_pkce_pair():
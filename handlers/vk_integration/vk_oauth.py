@@ -323,17 +323,11 @@ class VKOAuth:
             vk_user_id = vk_data['user_id']
             
             # Проверяем что этот VK аккаунт не подключен ни у кого
-            db.cursor.execute("""
-                SELECT u.id, u.username
-                FROM users u
-                WHERE u.platform_connections::text LIKE %s
-            """, (f'%"user_id": "{vk_user_id}"%',))
-            
-            existing_users = db.cursor.fetchall()
+            existing_users = db.get_platform_connection_owners_list('vks', vk_user_id)
             
             if existing_users:
                 for existing_user in existing_users:
-                    existing_user_id = existing_user.get('id') if isinstance(existing_user, dict) else existing_user[0]
+                    existing_user_id = existing_user['user_id']
                     
                     if existing_user_id != telegram_user_id:
                         # VK уже подключен у другого пользователя
@@ -4,10 +4,11 @@ Telegram обработчик для VK авторизации (OAuth через
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from .vk_config import get_vk_auth_url
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "add_platform_vk")
+@router.exact("add_platform_vk")
 def handle_connect_vk(call):
     """
     Обработчик кнопки "Подключить VK" 
@@ -61,7 +62,7 @@ def handle_connect_vk(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "check_vk_connection")
+@router.exact("check_vk_connection")
 def handle_check_vk_connection(call):
     """
     Проверяет статус подключения VK
@@ -144,7 +145,7 @@ def handle_check_vk_connection(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "disconnect_vk")
+@router.exact("disconnect_vk")
 def handle_disconnect_vk(call):
     """
     Отключает VK от аккаунта
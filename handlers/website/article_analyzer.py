@@ -4,6 +4,7 @@
 """
 from telebot import types
 from loader import bot
+from callback_router import router
 import requests
 from bs4 import BeautifulSoup
 import re
@@ -273,7 +274,7 @@ def analyze_seo_content(html_content, url):
     }
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("analyze_article_"))
+@router.prefix("analyze_article_")
 def handle_analyze_article(call):
     """Анализ опубликованной статьи"""
     parts = call.data.split("_")
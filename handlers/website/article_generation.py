@@ -5,12 +5,19 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
+from utils.generation_executor import generation_executor, submit_generation
+from utils.token_ledger import reserve_tokens
+from functools import partial
 import random
+from utils.state_store import StateStore
+from utils.site_index import get_relevant_links, get_site_colors
+from config import ARTICLE_INTERNAL_LINKS_LIMIT
 
 
 # Храним параметры статьи для каждой категории (временный кеш)
-article_params_storage = {}
+article_params_storage = StateStore('article_params', ttl=24 * 3600)
 
 
 def get_image_settings(user_id, category_id):
@@ -166,7 +173,7 @@ def save_image_settings(user_id, category_id, settings):
         print(f"❌ Категория {category_id} не найдена!")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_ai_post_website_"))
+@router.prefix("platform_ai_post_website_")
 def handle_platform_ai_post_website(call):
     """Сразу генерировать статью без промежуточного меню"""
     parts = call.data.split("_")
@@ -239,7 +246,7 @@ def handle_platform_ai_post_website(call):
     handle_website_article_generate(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("wa_generate_"))
+@router.prefix("wa_generate_")
 def handle_website_article_generate(call):
     """Генерация статьи с выбранными параметрами"""
     parts = call.data.split("_")
@@ -249,6 +256,10 @@ def handle_website_article_generate(call):
     
     user_id = call.from_user.id
     
+    if generation_executor.is_user_busy(user_id):
+        bot.answer_callback_query(call.id, "⏳ Дождитесь завершения текущих генераций", show_alert=True)
+        return
+    
     # КРИТИЧНО: Загружаем параметры из БД!
     key = f"{user_id}_{category_id}"
     params = get_image_settings(user_id, category_id)
@@ -264,48 +275,20 @@ def handle_website_article_generate(call):
     # ============================================================
     
     print(f"\n{'='*80}")
-    print(f"[ЛОВУШКА 0] НАЧАЛО - проверяем connections из users")
+    print(f"[ЛОВУШКА 0] НАЧАЛО - ищем сайт в platform_connections")
     print(f"{'='*80}\n")
     
-    # Получаем пользователя
-    user = db.get_user(user_id)
-    if not user:
-        bot.answer_callback_query(call.id, "❌ Пользователь не найден", show_alert=True)
-        return
-    
-    # Получаем connections из users
-    connections = user.get('platform_connections', {})
-    if isinstance(connections, str):
-        try:
-            import json
-            connections = json.loads(connections)
-        except:
-            connections = {}
-    
-    print(f"[ЛОВУШКА 0] connections type = {type(connections)}")
-    print(f"[ЛОВУШКА 0] connections keys = {list(connections.keys()) if isinstance(connections, dict) else 'NOT A DICT'}")
-    print(f"[ЛОВУШКА 0] connections = {connections}")
-    
-    # Получаем websites из connections
-    websites = connections.get('websites', [])
-    print(f"[ЛОВУШКА 0] websites = {websites}")
-    print(f"[ЛОВУШКА 0] platform_id искомый = '{platform_id}'")
-    
-    # Ищем нужный сайт по platform_id (URL)
-    website_data = None
-    for site in websites:
-        site_url = site.get('url', '')
-        print(f"[ЛОВУШКА 0] Проверяем site: url='{site_url}'")
-        if site_url == platform_id:
-            website_data = site
-            print(f"[ЛОВУШКА 0] ✅ НАЙДЕН! site_data = {site}")
-            break
+    # Ищем нужный сайт по platform_id (URL) — индекс platform_connections
+    connection = db.get_platform_connection(user_id, 'websites', external_id=platform_id)
+    website_data = connection['settings'] if connection else None
+    print(f"[ЛОВУШКА 0] platform_id искомый = '{platform_id}', найден: {bool(website_data)}")
     
     if not website_data:
+        websites = db.get_platform_connections_list(user_id, 'websites') or []
         error_msg = (
             "❌ <b>Website не найден в connections!</b>\n\n"
             f"platform_id = {platform_id}\n"
-            f"Доступные сайты: {[s.get('url') for s in websites]}\n\n"
+            f"Доступные сайты: {[site['settings'].get('url') for site in websites]}\n\n"
             "Переподключите Website в настройках."
         )
         bot.answer_callback_query(call.id, "❌ Website не найден", show_alert=True)
@@ -332,7 +315,9 @@ def handle_website_article_generate(call):
                 'title': link  # Используем URL как title
             })
     
-    # Парсим внутренние ссылки (список словарей с url, title, priority)
+    # Парсим внутренние ссылки (список словарей с url, title, priority).
+    # Для статьи они подбираются по ключевому слову из индекса сайта, эти —
+    # запасной вариант, если сайт ещё не обходили краулером
     internal_links = []
     if internal_links_data and isinstance(internal_links_data, list):
         internal_links = internal_links_data
@@ -408,25 +393,45 @@ def handle_website_article_generate(call):
     image_cost = (params['images'] + 1) * 30  # +1 за обложку
     total_cost = text_cost + image_cost
     
-    # Проверяем баланс
-    tokens = db.get_user_tokens(user_id)
-    if tokens < total_cost:
+    # Резервируем токены одним запросом (проверка остатка + списание + журнал):
+    # подтверждаются после генерации, при ошибке возвращаются
+    reservation = reserve_tokens(user_id, total_cost, 'website_article', bot_id, category_id)
+    if reservation is None:
         bot.answer_callback_query(
             call.id,
-            f"❌ Недостаточно токенов!\nНужно: {total_cost}, у вас: {tokens}",
+            f"❌ Недостаточно токенов!\nНужно: {total_cost}, у вас: {db.get_user_tokens(user_id)}",
             show_alert=True
         )
         return
     
-    # Списываем токены
-    if not db.update_tokens(user_id, -total_cost):
-        bot.answer_callback_query(call.id, "❌ Ошибка списания токенов", show_alert=True)
-        return
-    
-    new_balance = db.get_user_tokens(user_id)
+    new_balance = reservation.balance
     
     bot.answer_callback_query(call.id, "🤖 Генерирую статью...")
     
+    # Дальше — долгая генерация: выполняется в пуле генераций,
+    # поток TeleBot сразу освобождается для других пользователей
+    submit_generation(
+        partial(
+            _run_website_article_generation, call, user_id, category_id, bot_id, platform_id,
+            params, category, website_data, wp_url, wp_login, wp_password,
+            external_links, internal_links, key, reservation, new_balance
+        ),
+        kind='article',
+        user_id=user_id,
+        label=f"статья {category_id} → {platform_id}",
+        reservation=reservation,
+        on_error=lambda e: bot.send_message(
+            call.message.chat.id, f"❌ Ошибка генерации статьи: {escape_html(str(e)[:200])}"
+        )
+    )
+
+
+def _run_website_article_generation(call, user_id, category_id, bot_id, platform_id,
+                                    params, category, website_data, wp_url, wp_login, wp_password,
+                                    external_links, internal_links, key, reservation, new_balance):
+    """Генерация и публикация статьи (выполняется в пуле генераций)"""
+    total_cost = reservation.amount
+    
     # Отправляем GIF с начальным текстом
     gif_url = "https://ecosteni.ru/wp-content/uploads/2026/01/202601191550.gif"
     
@@ -538,28 +543,18 @@ def handle_website_article_generate(call):
         price_headers = []
     
     # Получаем ключевые слова
-    keywords = category.get('keywords', [])
-    if isinstance(keywords, str):
-        import json
-        try:
-            keywords = json.loads(keywords)
-        except:
-            keywords = []
+    keywords_count = db.get_category_keywords_count(category_id) or 0
     
     print(f"\n\033[93m1.2 КЛЮЧЕВЫЕ СЛОВА:\033[0m")
-    print(f"   • Всего ключевых слов: \033[92m{len(keywords) if keywords else 0}\033[0m")
-    if keywords and len(keywords) > 0:
-        for i, kw in enumerate(keywords[:5], 1):
-            print(f"   {i}. {kw}")
-        if len(keywords) > 5:
-            print(f"   ... и еще {len(keywords) - 5} ключевых слов")
-    
-    # Выбираем рандомное ключевое слово как тему статьи
-    if keywords and len(keywords) > 0:
-        article_keyword = random.choice(keywords)
-        print(f"\n   ✅ Выбрано для статьи: \033[92m{article_keyword}\033[0m")
+    print(f"   • Всего ключевых слов: \033[92m{keywords_count}\033[0m")
+    
+    # Тема статьи — давно не использованное ключевое слово (отметка использования в БД)
+    picked = db.pick_category_keyword(category_id) if keywords_count else None
+    if picked:
+        article_keyword = picked['keyword']
+        print(f"\n   ✅ Выбрано для статьи: \033[92m{article_keyword}\033[0m (использований: {picked['usage_count']})")
         extra_info['selected_keyword'] = article_keyword
-        extra_info['total_keywords'] = len(keywords)
+        extra_info['total_keywords'] = keywords_count
     else:
         article_keyword = category_name
         print(f"\n   ℹ️ Ключевые слова не найдены, используется название категории")
@@ -834,20 +829,157 @@ def handle_website_article_generate(call):
         }
     
     # ═══════════════════════════════════════════════════════════════
-    # ЭТАП 2: ГЕНЕРАЦИЯ ТЕКСТА СТАТЬИ
+    # ЭТАП 2: ГЕНЕРАЦИЯ ТЕКСТА СТАТЬИ И ИЗОБРАЖЕНИЙ (параллельно)
     # ═══════════════════════════════════════════════════════════════
     
     print("\n" + "="*80)
-    print("📝 \033[96mЭТАП 2: ГЕНЕРАЦИЯ ТЕКСТА СТАТЬИ\033[0m")
+    print("📝 \033[96mЭТАП 2: ГЕНЕРАЦИЯ ТЕКСТА СТАТЬИ И ИЗОБРАЖЕНИЙ\033[0m")
     print("="*80 + "\n")
     
-    # Шаг 2: Генерация статьи (17-67%)
-    update_progress(2, 12, "Генерация текста статьи...")
+    from ai.image_generator import ImageBatch
+    import tempfile
+    import os
+    
+    # ВАЖНО: platform_image_settings уже получены в ЭТАПЕ 1
+    # Не дублируем код, используем существующие настройки
+    
+    print(f"\n🎨 Настройки изображений (из ЭТАПА 1):")
+    print(f"   Формат превью: \033[96m{platform_image_settings['preview_format']}\033[0m")
+    print(f"   Форматы статьи: {platform_image_settings['article_formats']}")
+    print(f"   Стили: {platform_image_settings['styles']}")
+    print(f"   Камеры: {platform_image_settings['cameras']}")
+    print(f"   Ракурсы: {platform_image_settings['angles']}")
+    print(f"   Качество: {platform_image_settings['quality']}")
+    print(f"   Тональность: {platform_image_settings['tones']}")
+    print(f"   Текст на фото: {platform_image_settings['text_percent']}%")
+    print(f"   Коллаж: {platform_image_settings['collage_percent']}%")
+    
+    # Если не указан стиль - берем первый из выбранных или дефолтный
+    if 'style' not in params or params['style'] == 'professional':
+        if text_styles and len(text_styles) > 0:
+            params['style'] = random.choice(text_styles)
+        else:
+            params['style'] = 'professional'
+    
+    # Шаг 2: Анализ контекста (17%)
+    update_progress(2, 12, "Анализ ключевых слов и контекста...")
+    
+    # Выбираем 1-2 случайные фразы
+    selected_phrases = []
+    if description:
+        desc_phrases = [s.strip() for s in description.split(',') if s.strip()]
+        if len(desc_phrases) <= 1:
+            desc_phrases = [s.strip() for s in description.split('.') if s.strip() and len(s.strip()) > 5]
+        
+        if desc_phrases:
+            num_phrases = random.randint(1, min(2, len(desc_phrases)))
+            selected_phrases = random.sample(desc_phrases, num_phrases)
+    
+    # Подготавливаем контекст для изображений
+    # ВАЖНО: используем только основное ключевое слово + 1-2 выбранные фразы
+    image_context_parts = []
+    
+    # Добавляем выбранное ключевое слово первым
+    image_context_parts.append(article_keyword)
+    
+    # Добавляем 1-2 ВЫБРАННЫЕ фразы (не всё описание!)
+    if selected_phrases:
+        image_context_parts.extend(selected_phrases)
+    
+    # Собираем всё в единый контекст
+    full_image_context = ', '.join(image_context_parts)
+    
+    # Промпт обложки
+    base_prompt = f"{full_image_context}, professional website header image, clean product photography, no UI elements, no website interface, no menus, no logos, no text overlays, pure product shot"
+    
+    print(f"\n📋 Контекст для изображения обложки:")
+    print(f"   • Основное ключевое слово: {article_keyword}")
+    print(f"   • Выбранные фразы: {len(selected_phrases)}")
+    print(f"   • Итоговый базовый промпт: {base_prompt}")
+    
+    # Используем ФОРМАТ ПРЕВЬЮ, а не первый из всех форматов
+    preview_format = platform_image_settings.get('preview_format', '16:9')
+    full_prompt, _ = build_image_prompt(base_prompt, platform_image_settings, use_first_format=False)
+    print(f"🎨 Промпт обложки: {full_prompt[:100]}...")
+    print(f"📐 Формат превью (выбранный): {preview_format}")
+    
+    # Первый запрос — обложка, дальше изображения для статьи
+    image_requests = [(full_prompt, preview_format)]
+    num_images = params.get('images', 3)  # Количество изображений из параметров
+    
+    for i in range(num_images):
+        # Варьируем промпт для каждого изображения
+        # ВАЖНО: используем только основное ключевое слово + 1 случайная фраза
+        
+        # Добавляем основное ключевое слово
+        base_context = article_keyword
+        
+        # Варьируем стиль изображения в зависимости от номера
+        if i == 0:
+            img_prompt = f"{base_context}, detailed view, professional photography"
+        elif i == 1:
+            img_prompt = f"{base_context}, installation process, professional setting"
+        else:
+            img_prompt = f"{base_context}, finished result, high quality"
+        
+        # Добавляем случайную фразу из описания
+        if selected_phrases:
+            random_phrase = random.choice(selected_phrases)
+            img_prompt = f"{img_prompt}, {random_phrase}"
+        
+        print(f"\n📋 Контекст для изображения {i+1}:")
+        print(f"   • Основное ключевое слово: {article_keyword}")
+        print(f"   • Добавлена фраза: {random_phrase if selected_phrases else 'Нет'}")
+        print(f"   • Базовый промпт: {img_prompt}")
+        
+        full_img_prompt, img_format = build_image_prompt(img_prompt, platform_image_settings)
+        print(f"🎨 Итоговый промпт: {full_img_prompt[:100]}...")
+        image_requests.append((full_img_prompt, img_format))
+    
+    # Изображения не зависят от текста: генерируются в фоне, пока Claude пишет статью
+    image_batch = ImageBatch(image_requests)
+    print(f"🖼️ Запущена генерация: обложка + {num_images} изображений для статьи")
+    
+    # Шаг 3: Генерация статьи и изображений (25%)
+    update_progress(3, 12, f"Генерация текста и {num_images + 1} изображений...")
     
     try:
         from ai.website_article_generator import generate_website_article
         
-        # Генерируем статью
+        # Получаем автора из WordPress
+        from handlers.website.wordpress_api import get_wordpress_users
+        
+        wp_users = get_wordpress_users(wp_url, wp_login, wp_password)
+        author_data = None
+        
+        if wp_users:
+            # Берем первого пользователя (обычно это владелец сайта)
+            first_user = wp_users[0]
+            author_data = {
+                'id': first_user.get('id'),
+                'name': first_user.get('name'),
+                'avatar_url': first_user.get('avatar_url'),
+                'bio': first_user.get('description', '')
+            }
+            print(f"✍️ Данные автора получены: {author_data['name']}")
+        
+        # Реальный прогресс потоковой генерации: шаги 3-8 из 12 по числу написанных слов
+        def on_article_progress(progress):
+            target = progress.get('target_words') or params['words']
+            done = min(progress['words'] / target, 1.0) if target else 0.0
+            update_progress(
+                3 + 5 * done, 12,
+                f"Пишу статью: {progress['words']} из ~{target} слов, разделов: {progress['sections']}..."
+            )
+        
+        # Внутренние ссылки — самые релевантные ключевому слову (индекс BM25 сайта)
+        internal_links = (
+            get_relevant_links(wp_url, article_keyword)
+            or internal_links[:ARTICLE_INTERNAL_LINKS_LIMIT]
+        )
+        print(f"🔗 Внутренних ссылок для статьи: {len(internal_links)}")
+        
+        # Генерируем статью с выбранными параметрами
         article_result = generate_website_article(
             keyword=article_keyword,
             category_name=category_name,
@@ -859,186 +991,78 @@ def handle_website_article_generate(call):
             internal_links=internal_links,
             text_style=params['style'],
             html_style=html_style,
-            site_colors=None,
+            site_colors=get_site_colors(wp_url),  # Из профиля сайта (site_profiles)
             min_words=params['words'] - 200,
             max_words=params['words'] + 200,
-            h2_list=None,
-            author_data=None  # Для preview не нужен автор
+            h2_list=None,  # AI сам придумает
+            author_data=author_data,  # Передаем данные автора
+            on_progress=on_article_progress
         )
         
         if not article_result.get('success'):
             raise Exception(article_result.get('error', 'Ошибка генерации статьи'))
         
-        article_html = article_result['html']
-        seo_title_raw = article_result.get('seo_title', category_name)
-        meta_desc_raw = article_result.get('meta_description', description[:150])
-        
-        extra_info['title'] = seo_title_raw
-        
-        print(f"✅ Текст статьи сгенерирован успешно")
-        print(f"   • SEO заголовок: {seo_title_raw}")
-        print(f"   • Мета-описание: {meta_desc_raw[:80]}...")
-        print(f"   • Длина HTML: {len(article_html)} символов")
+        if article_result.get('partial'):
+            print(f"⚠️ Статья сгенерирована не полностью: {article_result.get('error')}")
+        else:
+            print(f"✅ Текст статьи сгенерирован успешно")
         
     except Exception as e:
         print(f"❌ Ошибка генерации статьи: {e}")
         
+        # Не тратим запросы к Gemini на ещё не начатые изображения
+        image_batch.cancel()
+        
         try:
             bot.delete_message(call.message.chat.id, generation_msg.message_id)
         except:
             pass
         
-        db.update_tokens(user_id, total_cost)
+        reservation.refund()
         bot.send_message(call.message.chat.id, f"❌ Ошибка генерации текста: {e}\n\nТокены возвращены.")
         return
     
     # ═══════════════════════════════════════════════════════════════
-    # ЭТАП 3: ГЕНЕРАЦИЯ ИЗОБРАЖЕНИЙ
+    # ЭТАП 3: ПОЛУЧЕНИЕ ИЗОБРАЖЕНИЙ
     # ═══════════════════════════════════════════════════════════════
     
     print("\n" + "="*80)
-    print("🎨 \033[96mЭТАП 3: ГЕНЕРАЦИЯ ИЗОБРАЖЕНИЙ\033[0m")
+    print("🎨 \033[96mЭТАП 3: ПОЛУЧЕНИЕ ИЗОБРАЖЕНИЙ\033[0m")
     print("="*80 + "\n")
     
-    # Генерируем изображения
-    try:
-        from ai.image_generator import generate_image
-        import tempfile
-        import os
-        
-        # ВАЖНО: platform_image_settings уже получены в ЭТАПЕ 1
-        # Не дублируем код, используем существующие настройки
-        
-        print(f"\n🎨 Настройки изображений (из ЭТАПА 1):")
-        print(f"   Формат превью: \033[96m{platform_image_settings['preview_format']}\033[0m")
-        print(f"   Форматы статьи: {platform_image_settings['article_formats']}")
-        print(f"   Стили: {platform_image_settings['styles']}")
-        print(f"   Камеры: {platform_image_settings['cameras']}")
-        print(f"   Ракурсы: {platform_image_settings['angles']}")
-        print(f"   Качество: {platform_image_settings['quality']}")
-        print(f"   Тональность: {platform_image_settings['tones']}")
-        print(f"   Текст на фото: {platform_image_settings['text_percent']}%")
-        print(f"   Коллаж: {platform_image_settings['collage_percent']}%")
-        
-        # Если не указан стиль - берем первый из выбранных или дефолтный
-        if 'style' not in params or params['style'] == 'professional':
-            if text_styles and len(text_styles) > 0:
-                params['style'] = random.choice(text_styles)
-            else:
-                params['style'] = 'professional'
-        
-        # Шаг 2: Анализ контекста (17%)
-        update_progress(2, 12, "Анализ ключевых слов и контекста...")
-        
-        # Выбираем 1-2 случайные фразы
-        selected_phrases = []
-        if description:
-            desc_phrases = [s.strip() for s in description.split(',') if s.strip()]
-            if len(desc_phrases) <= 1:
-                desc_phrases = [s.strip() for s in description.split('.') if s.strip() and len(s.strip()) > 5]
-            
-            if desc_phrases:
-                num_phrases = random.randint(1, min(2, len(desc_phrases)))
-                selected_phrases = random.sample(desc_phrases, num_phrases)
-        
-        # Шаг 3: Генерация обложки (25%)
-        update_progress(3, 12, "Генерация обложки...")
-        
-        # Подготавливаем контекст для изображений
-        # ВАЖНО: используем только основное ключевое слово + 1-2 выбранные фразы
-        image_context_parts = []
-        
-        # Добавляем выбранное ключевое слово первым
-        image_context_parts.append(article_keyword)
-        
-        # Добавляем 1-2 ВЫБРАННЫЕ фразы (не всё описание!)
-        if selected_phrases:
-            image_context_parts.extend(selected_phrases)
-        
-        # Собираем всё в единый контекст
-        full_image_context = ', '.join(image_context_parts)
-        
-        # Генерируем обложку
-        base_prompt = f"{full_image_context}, professional website header image, clean product photography, no UI elements, no website interface, no menus, no logos, no text overlays, pure product shot"
-        
-        print(f"\n📋 Контекст для изображения обложки:")
-        print(f"   • Основное ключевое слово: {article_keyword}")
-        print(f"   • Выбранные фразы: {len(selected_phrases)}")
-        print(f"   • Итоговый базовый промпт: {base_prompt}")
-        
-        # Используем ФОРМАТ ПРЕВЬЮ, а не первый из всех форматов
-        preview_format = platform_image_settings.get('preview_format', '16:9')
-        full_prompt, _ = build_image_prompt(base_prompt, platform_image_settings, use_first_format=False)
-        print(f"🎨 Промпт обложки: {full_prompt[:100]}...")
-        print(f"📐 Формат превью (выбранный): {preview_format}")
-        
-        image_result = generate_image(full_prompt, preview_format)
+    # Шаг 8: Изображения для статьи (67%) — шаги 3-8 заняты реальным прогрессом текста
+    update_progress(8, 12, f"Завершение генерации {num_images} изображений для статьи...")
+    
+    cover_path = None
+    cover_error = None
+    article_images = []
+    
+    for i, image_result in enumerate(image_batch.results()):
+        label = "Обложка" if i == 0 else f"Изображение {i}/{num_images}"
         
         if not image_result.get('success'):
-            raise Exception(image_result.get('error', 'Ошибка генерации обложки'))
-        
-        # Сохраняем обложку
-        cover_image_bytes = image_result['image_bytes']
-        temp_cover = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-        temp_cover.write(cover_image_bytes)
-        temp_cover.close()
-        cover_path = temp_cover.name
+            print(f"⚠️ {label}: {image_result.get('error')}")
+            if i == 0:
+                cover_error = image_result.get('error', 'Ошибка генерации обложки')
+            continue
         
-        # Генерируем дополнительные изображения для статьи
-        article_images = []
-        num_images = params.get('images', 3)  # Количество изображений из параметров
+        temp_img = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
+        temp_img.write(image_result['image_bytes'])
+        temp_img.close()
         
-        # Шаг 4: Генерация изображений для статьи (33%)
-        update_progress(4, 12, f"Генерация {num_images} изображений для статьи...")
-        
-        print(f"🖼️ Генерирую {num_images} дополнительных изображений для статьи...")
-        
-        for i in range(num_images):
-            try:
-                # Варьируем промпт для каждого изображения
-                # ВАЖНО: используем только основное ключевое слово + 1 случайная фраза
-                
-                # Добавляем основное ключевое слово
-                base_context = article_keyword
-                
-                # Варьируем стиль изображения в зависимости от номера
-                if i == 0:
-                    img_prompt = f"{base_context}, detailed view, professional photography"
-                elif i == 1:
-                    img_prompt = f"{base_context}, installation process, professional setting"
-                else:
-                    img_prompt = f"{base_context}, finished result, high quality"
-                
-                # Добавляем случайную фразу из описания
-                if selected_phrases:
-                    random_phrase = random.choice(selected_phrases)
-                    img_prompt = f"{img_prompt}, {random_phrase}"
-                
-                print(f"\n📋 Контекст для изображения {i+1}:")
-                print(f"   • Основное ключевое слово: {article_keyword}")
-                print(f"   • Добавлена фраза: {random_phrase if selected_phrases else 'Нет'}")
-                print(f"   • Базовый промпт: {img_prompt}")
-                
-                full_img_prompt, img_format = build_image_prompt(img_prompt, platform_image_settings)
-                print(f"🎨 Итоговый промпт: {full_img_prompt[:100]}...")
-                img_result = generate_image(full_img_prompt, img_format)
-                
-                if img_result.get('success'):
-                    temp_img = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-                    temp_img.write(img_result['image_bytes'])
-                    temp_img.close()
-                    article_images.append(temp_img.name)
-                    print(f"✅ Изображение {i+1}/{num_images} сгенерировано")
-                else:
-                    print(f"⚠️ Ошибка генерации изображения {i+1}: {img_result.get('error')}")
-            except Exception as img_err:
-                print(f"⚠️ Ошибка при генерации изображения {i+1}: {img_err}")
-                # Продолжаем, даже если одно изображение не сгенерировалось
-        
-        print(f"📊 Итого сгенерировано: обложка + {len(article_images)} изображений для статьи")
-        
-    except Exception as e:
-        print(f"❌ Ошибка генерации изображений: {e}")
+        if i == 0:
+            cover_path = temp_img.name
+        else:
+            article_images.append(temp_img.name)
+        print(f"✅ {label} сгенерировано")
+    
+    # Обложка не получилась — используем первое изображение статьи
+    if not cover_path and article_images:
+        cover_path = article_images.pop(0)
+        print(f"⚠️ Обложка заменена первым изображением статьи")
+    
+    if not cover_path:
+        print(f"❌ Ошибка генерации изображений: {cover_error}")
         
         # Удаляем GIF
         try:
@@ -1046,66 +1070,14 @@ def handle_website_article_generate(call):
         except:
             pass
         
-        db.update_tokens(user_id, total_cost)
-        bot.send_message(call.message.chat.id, f"❌ Ошибка создания изображений: {e}\n\nТокены возвращены.")
+        reservation.refund()
+        bot.send_message(call.message.chat.id, f"❌ Ошибка создания изображений: {cover_error}\n\nТокены возвращены.")
         return
     
-    # Генерируем статью
+    print(f"📊 Итого сгенерировано: обложка + {len(article_images)} изображений для статьи")
+    
+    # Обрабатываем статью
     try:
-        from ai.website_article_generator import generate_website_article
-        
-        # Шаг 5: Написание введения (42%)
-        update_progress(5, 12, "Написание введения...")
-        
-        # Получаем отзывы из категории (если есть)
-        reviews_data = category.get('reviews', [])
-        reviews = reviews_data[:3] if reviews_data else None  # Берём первые 3
-        
-        # Шаг 6: Создание основного контента (50%)
-        update_progress(6, 12, "Создание основного контента...")
-        
-        # Получаем автора из WordPress
-        from handlers.website.wordpress_api import get_wordpress_users
-        
-        wp_users = get_wordpress_users(wp_url, wp_login, wp_password)
-        author_data = None
-        
-        if wp_users:
-            # Берем первого пользователя (обычно это владелец сайта)
-            first_user = wp_users[0]
-            author_data = {
-                'id': first_user.get('id'),
-                'name': first_user.get('name'),
-                'avatar_url': first_user.get('avatar_url'),
-                'bio': first_user.get('description', '')
-            }
-            print(f"✍️ Данные автора получены: {author_data['name']}")
-        
-        # Генерируем статью с выбранными параметрами
-        article_result = generate_website_article(
-            keyword=article_keyword,
-            category_name=category_name,
-            category_description=description,
-            company_data=company_data,
-            prices=selected_prices,
-            reviews=reviews,
-            external_links=external_links,
-            internal_links=internal_links,
-            text_style=params['style'],
-            html_style=html_style,
-            site_colors=None,  # TODO: можно парсить цвета сайта
-            min_words=params['words'] - 200,
-            max_words=params['words'] + 200,
-            h2_list=None,  # AI сам придумает
-            author_data=author_data  # Передаем данные автора
-        )
-        
-        # Шаг 7: SEO-оптимизация (58%)
-        update_progress(7, 12, "SEO-оптимизация текста...")
-        
-        # Шаг 8: Создание мета-тегов (67%)
-        update_progress(8, 12, "Создание мета-тегов и Schema.org...")
-        
         # Шаг 9: Yoast SEO разметка (75%)
         update_progress(9, 12, "Добавление Yoast SEO разметки...")
         
@@ -1251,7 +1223,7 @@ def handle_website_article_generate(call):
         except:
             pass
         
-        db.update_tokens(user_id, total_cost)
+        reservation.refund()
         bot.send_message(call.message.chat.id, f"❌ Ошибка генерации текста: {e}\n\nТокены возвращены.")
         return
     
@@ -1453,15 +1425,9 @@ def handle_website_article_generate(call):
             print(f"🏷 Используем метки из настроек: {tag_names}")
         else:
             # Используем ключевые слова категории
-            keywords = category.get('keywords', [])
-            if isinstance(keywords, str):
-                import json
-                try:
-                    keywords = json.loads(keywords)
-                except:
-                    keywords = []
+            keywords = db.get_category_keywords_list(category_id, limit=5)
             
-            tag_names = keywords[:5] if keywords else [category_name]
+            tag_names = keywords or [category_name]
             print(f"🏷 Используем ключевые слова категории: {tag_names}")
         
         # Конвертируем названия меток в ID
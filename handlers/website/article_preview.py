@@ -3,6 +3,7 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 import os
 
@@ -10,7 +11,7 @@ import os
 from .article_generation import article_params_storage
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("wa_download_html_"))
+@router.prefix("wa_download_html_")
 def handle_download_html(call):
     """Скачать HTML файл статьи"""
     parts = call.data.split("_")
@@ -60,7 +61,7 @@ def handle_download_html(call):
     bot.answer_callback_query(call.id, "✅ Файл отправлен")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("wa_copy_html_"))
+@router.prefix("wa_copy_html_")
 def handle_copy_html(call):
     """Показать HTML для копирования"""
     parts = call.data.split("_")
@@ -102,7 +103,7 @@ def handle_copy_html(call):
     bot.answer_callback_query(call.id, "✅ HTML отправлен")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("wa_show_seo_"))
+@router.prefix("wa_show_seo_")
 def handle_show_seo(call):
     """Показать SEO данные"""
     parts = call.data.split("_")
@@ -3,6 +3,7 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 import os
 
@@ -10,7 +11,7 @@ import os
 from .article_generation import article_params_storage
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("wa_publish_wp_"))
+@router.prefix("wa_publish_wp_")
 def handle_publish_wordpress(call):
     """Опубликовать статью на WordPress"""
     parts = call.data.split("_")
@@ -90,7 +91,7 @@ def handle_publish_wordpress(call):
         )
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("wa_show_html_"))
+@router.prefix("wa_show_html_")
 def handle_show_html(call):
     """Показать HTML код статьи"""
     parts = call.data.split("_")
@@ -5,6 +5,7 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 
 # Хранилище для параметров (общее с article_generation)
 from handlers.website.article_generation import article_params_storage
@@ -109,7 +110,7 @@ def save_user_advanced_params(user_id, category_id, adv_params):
 # СТИЛЬ ИЗОБРАЖЕНИЯ
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_adv_style_"))
+@router.prefix("ws_adv_style_")
 def handle_style_menu(call):
     """Меню выбора стиля изображений"""
     parts = call.data.split("_")
@@ -157,7 +158,7 @@ def handle_style_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_toggle_style_"))
+@router.prefix("ws_toggle_style_")
 def handle_toggle_style(call):
     """Toggle стиля"""
     parts = call.data.split("_")
@@ -186,7 +187,7 @@ def handle_toggle_style(call):
 # КОЛИЧЕСТВО ИЗОБРАЖЕНИЙ
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_adv_count_"))
+@router.prefix("ws_adv_count_")
 def handle_count_menu(call):
     """Меню выбора количества изображений"""
     parts = call.data.split("_")
@@ -230,7 +231,7 @@ def handle_count_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_set_count_"))
+@router.prefix("ws_set_count_")
 def handle_set_count(call):
     """Установка количества"""
     parts = call.data.split("_")
@@ -252,7 +253,7 @@ def handle_set_count(call):
 # ТЕКСТ НА ФОТО
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_adv_text_"))
+@router.prefix("ws_adv_text_")
 def handle_text_menu(call):
     """Меню настройки текста на фото"""
     parts = call.data.split("_")
@@ -294,7 +295,7 @@ def handle_text_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_set_text_"))
+@router.prefix("ws_set_text_")
 def handle_set_text(call):
     """Установка текста"""
     parts = call.data.split("_")
@@ -316,7 +317,7 @@ def handle_set_text(call):
 # КОЛЛАЖ ФОТО
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_adv_collage_"))
+@router.prefix("ws_adv_collage_")
 def handle_collage_menu(call):
     """Меню настройки коллажа"""
     parts = call.data.split("_")
@@ -358,7 +359,7 @@ def handle_collage_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_set_collage_"))
+@router.prefix("ws_set_collage_")
 def handle_set_collage(call):
     """Установка коллажа"""
     parts = call.data.split("_")
@@ -380,7 +381,7 @@ def handle_set_collage(call):
 # КАМЕРА
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_adv_camera_"))
+@router.prefix("ws_adv_camera_")
 def handle_camera_menu(call):
     """Меню выбора камеры"""
     parts = call.data.split("_")
@@ -428,7 +429,7 @@ def handle_camera_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_toggle_camera_"))
+@router.prefix("ws_toggle_camera_")
 def handle_toggle_camera(call):
     """Toggle камеры"""
     parts = call.data.split("_")
@@ -457,7 +458,7 @@ def handle_toggle_camera(call):
 # РАКУРС
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_adv_angle_"))
+@router.prefix("ws_adv_angle_")
 def handle_angle_menu(call):
     """Меню выбора ракурса"""
     parts = call.data.split("_")
@@ -505,7 +506,7 @@ def handle_angle_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_toggle_angle_"))
+@router.prefix("ws_toggle_angle_")
 def handle_toggle_angle(call):
     """Toggle ракурса"""
     parts = call.data.split("_")
@@ -534,7 +535,7 @@ def handle_toggle_angle(call):
 # КАЧЕСТВО
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_adv_quality_"))
+@router.prefix("ws_adv_quality_")
 def handle_quality_menu(call):
     """Меню выбора качества"""
     parts = call.data.split("_")
@@ -582,7 +583,7 @@ def handle_quality_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_toggle_quality_"))
+@router.prefix("ws_toggle_quality_")
 def handle_toggle_quality(call):
     """Toggle качества"""
     parts = call.data.split("_")
@@ -611,7 +612,7 @@ def handle_toggle_quality(call):
 # ТОНАЛЬНОСТЬ
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_adv_tone_"))
+@router.prefix("ws_adv_tone_")
 def handle_tone_menu(call):
     """Меню выбора тональности"""
     parts = call.data.split("_")
@@ -659,7 +660,7 @@ def handle_tone_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_toggle_tone_"))
+@router.prefix("ws_toggle_tone_")
 def handle_toggle_tone(call):
     """Toggle тональности"""
     parts = call.data.split("_")
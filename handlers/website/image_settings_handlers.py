@@ -5,6 +5,7 @@ next_style_, next_text_percent_, next_collage_percent_, next_camera_, next_angle
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from handlers.website.image_advanced_settings import (
     get_user_advanced_params, save_user_advanced_params,
     IMAGE_STYLES, CAMERAS, ANGLES, QUALITY_LEVELS, TONES
@@ -15,7 +16,7 @@ from handlers.website.image_advanced_settings import (
 # СТИЛЬ ИЗОБРАЖЕНИЯ
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("next_style_website_"))
+@router.prefix("next_style_website_")
 def handle_next_style(call):
     """Меню выбора стиля изображений"""
     parts = call.data.split("_")
@@ -72,7 +73,7 @@ def handle_next_style(call):
 # ТЕКСТ НА ФОТО
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("next_text_percent_website_"))
+@router.prefix("next_text_percent_website_")
 def handle_next_text_percent(call):
     """Меню настройки текста на фото"""
     parts = call.data.split("_")
@@ -118,7 +119,7 @@ def handle_next_text_percent(call):
 # КОЛЛАЖ ФОТО
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("next_collage_percent_website_"))
+@router.prefix("next_collage_percent_website_")
 def handle_next_collage_percent(call):
     """Меню настройки коллажа фото"""
     parts = call.data.split("_")
@@ -160,7 +161,7 @@ def handle_next_collage_percent(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_set_collage_"))
+@router.prefix("ws_set_collage_")
 def handle_set_collage(call):
     """Установка коллажа"""
     parts = call.data.split("_")
@@ -182,7 +183,7 @@ def handle_set_collage(call):
 # КАМЕРА
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("next_camera_website_"))
+@router.prefix("next_camera_website_")
 def handle_next_camera(call):
     """Меню выбора камеры"""
     parts = call.data.split("_")
@@ -235,7 +236,7 @@ def handle_next_camera(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_toggle_camera_"))
+@router.prefix("ws_toggle_camera_")
 def handle_toggle_camera(call):
     """Toggle камеры"""
     parts = call.data.split("_")
@@ -264,7 +265,7 @@ def handle_toggle_camera(call):
 # РАКУРС
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("next_angle_website_"))
+@router.prefix("next_angle_website_")
 def handle_next_angle(call):
     """Меню выбора ракурса"""
     parts = call.data.split("_")
@@ -317,7 +318,7 @@ def handle_next_angle(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_toggle_angle_"))
+@router.prefix("ws_toggle_angle_")
 def handle_toggle_angle(call):
     """Toggle ракурса"""
     parts = call.data.split("_")
@@ -346,7 +347,7 @@ def handle_toggle_angle(call):
 # КАЧЕСТВО
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("next_quality_website_"))
+@router.prefix("next_quality_website_")
 def handle_next_quality(call):
     """Меню выбора качества"""
     parts = call.data.split("_")
@@ -399,7 +400,7 @@ def handle_next_quality(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_toggle_quality_"))
+@router.prefix("ws_toggle_quality_")
 def handle_toggle_quality(call):
     """Toggle качества"""
     parts = call.data.split("_")
@@ -428,7 +429,7 @@ def handle_toggle_quality(call):
 # ТОНАЛЬНОСТЬ
 # ============================================================
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("next_tone_website_"))
+@router.prefix("next_tone_website_")
 def handle_next_tone(call):
     """Меню выбора тональности"""
     parts = call.data.split("_")
@@ -481,7 +482,7 @@ def handle_next_tone(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_toggle_tone_"))
+@router.prefix("ws_toggle_tone_")
 def handle_toggle_tone(call):
     """Toggle тональности"""
     parts = call.data.split("_")
@@ -4,9 +4,10 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_format_website_"))
+@router.prefix("platform_format_website_")
 def handle_website_images_menu(call):
     """Меню настроек изображений для Website"""
     parts = call.data.split("_")
@@ -166,7 +167,7 @@ def handle_website_images_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_preview_format_"))
+@router.prefix("ws_preview_format_")
 def handle_preview_format_select(call):
     """Выбор формата превью (множественный выбор)"""
     parts = call.data.split("_")
@@ -239,7 +240,7 @@ def handle_preview_format_select(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_set_format_"))
+@router.prefix("ws_set_format_")
 def handle_set_preview_format(call):
     """Установка формата превью (single choice - один выбор)"""
     parts = call.data.split("_")
@@ -264,7 +265,7 @@ def handle_set_preview_format(call):
     handle_preview_format_select(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_article_images_format_"))
+@router.prefix("ws_article_images_format_")
 def handle_article_images_format_select(call):
     """Выбор формата изображений в статье (множественный выбор)"""
     try:
@@ -363,7 +364,7 @@ def handle_article_images_format_select(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_set_article_format_"))
+@router.prefix("ws_set_article_format_")
 def handle_set_article_format(call):
     """Установка формата изображений в статье (toggle)"""
     parts = call.data.split("_")
@@ -406,7 +407,7 @@ def handle_set_article_format(call):
     handle_article_images_format_select(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("ws_images_count_"))
+@router.prefix("ws_images_count_")
 def handle_images_count_menu(call):
     """Меню выбора количества изображений"""
     parts = call.data.split("_")
@@ -470,7 +471,7 @@ def handle_images_count_menu(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_img_count_"))
+@router.prefix("set_img_count_")
 def handle_set_img_count(call):
     """Установка количества изображений"""
     parts = call.data.split("_")
@@ -514,7 +515,7 @@ def handle_set_img_count(call):
 
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_images_menu_website_"))
+@router.prefix("platform_images_menu_website_")
 def handle_platform_images_menu_website(call):
     """Редирект для Website: platform_images_menu → platform_format_website"""
     parts = call.data.split("_")
@@ -528,7 +529,7 @@ def handle_platform_images_menu_website(call):
     handle_website_images_menu(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("back_to_wpc_"))
+@router.prefix("back_to_wpc_")
 def handle_back_to_wpc(call):
     """Возврат в меню WPC категории"""
     parts = call.data.split("_")
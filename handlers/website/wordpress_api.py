@@ -3,12 +3,24 @@
 Модуль публикации статей на WordPress через REST API
 """
 import base64
+import mimetypes
+import os
 import requests
 import re
 import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from config import WP_UPLOAD_CONCURRENCY
+from utils.rate_limiter import rate_limit
 
 logger = logging.getLogger(__name__)
 
+# Клиентов (keep-alive сессий) в памяти процесса
+WP_CLIENTS_MAX = 32
+
 
 def get_wp_headers(wp_login, wp_password):
     """
@@ -28,6 +40,142 @@ def get_wp_headers(wp_login, wp_password):
     }
 
 
+class WordPressClient:
+    """
+    Клиент WordPress REST API одного сайта
+    
+    Одна requests.Session на сайт: TCP/TLS соединение переиспользуется
+    между запросами (категории, метки, медиа, пост), а медиа загружаются
+    параллельно через пул соединений сессии.
+    """
+    
+    def __init__(self, wp_url, wp_login, wp_password):
+        self.base_url = wp_url.rstrip('/')
+        self.session = requests.Session()
+        token = base64.b64encode(f"{wp_login}:{wp_password}".encode()).decode()
+        self.session.headers['Authorization'] = f'Basic {token}'
+        
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(4, WP_UPLOAD_CONCURRENCY))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def request(self, method, endpoint, timeout=30, **kwargs):
+        """Запрос к /wp-json/wp/v2/<endpoint> с учётом лимита частоты"""
+        rate_limit('wordpress')
+        return self.session.request(
+            method,
+            f"{self.base_url}/wp-json/wp/v2/{endpoint.lstrip('/')}",
+            timeout=timeout,
+            **kwargs
+        )
+    
+    def get(self, endpoint, timeout=10, **kwargs):
+        return self.request('GET', endpoint, timeout=timeout, **kwargs)
+    
+    def post(self, endpoint, timeout=30, **kwargs):
+        return self.request('POST', endpoint, timeout=timeout, **kwargs)
+    
+    def upload_media(self, image_path, filename_slug, alt_text="", caption=None):
+        """
+        Загружает изображение одним multipart-запросом вместе с ALT и подписью
+        
+        Returns:
+            dict: {'id', 'url', 'upload_seconds', 'meta_seconds'} или None
+        """
+        extension = os.path.splitext(image_path)[1].lower() or '.jpg'
+        img_filename = f"{filename_slug}-image{extension}"
+        content_type = mimetypes.guess_type(img_filename)[0] or 'image/jpeg'
+        
+        fields = {}
+        if alt_text:
+            fields['alt_text'] = alt_text
+            fields['caption'] = caption if caption is not None else alt_text
+        
+        started = time.perf_counter()
+        with open(image_path, 'rb') as f:
+            response = self.post(
+                'media',
+                files={'file': (img_filename, f, content_type)},
+                data=fields,
+                timeout=60
+            )
+        upload_seconds = time.perf_counter() - started
+        
+        if response.status_code not in [200, 201]:
+            logger.error(f"⚠️ Ошибка загрузки: {response.status_code}")
+            return None
+        
+        media_data = response.json()
+        media_id = media_data.get('id')
+        
+        # Старые версии WordPress / плагины игнорируют поля multipart — дописываем отдельно
+        meta_seconds = 0.0
+        if alt_text and media_id and not media_data.get('alt_text'):
+            meta_started = time.perf_counter()
+            try:
+                self.post(f'media/{media_id}', json=fields, timeout=30)
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось установить ALT-текст: {e}")
+            meta_seconds = time.perf_counter() - meta_started
+        
+        if alt_text:
+            logger.info(f"✅ ALT-текст установлен: {alt_text[:50]}...")
+        
+        logger.info(f"✅ Изображение загружено: ID {media_id} за {upload_seconds:.1f} с")
+        return {
+            'id': media_id,
+            'url': media_data.get('source_url', ''),
+            'upload_seconds': upload_seconds,
+            'meta_seconds': meta_seconds
+        }
+    
+    def upload_media_batch(self, uploads, max_workers=None):
+        """
+        Параллельная загрузка изображений
+        
+        Args:
+            uploads: список (image_path, filename_slug, alt_text)
+            max_workers: одновременных загрузок (по умолчанию WP_UPLOAD_CONCURRENCY)
+            
+        Returns:
+            list: результат upload_media (или None) для каждого изображения по порядку
+        """
+        def upload(item):
+            image_path, filename_slug, alt_text = item
+            try:
+                return self.upload_media(image_path, filename_slug, alt_text)
+            except Exception as e:
+                logger.error(f"❌ Ошибка загрузки {image_path}: {e}")
+                return None
+        
+        if not uploads:
+            return []
+        
+        workers = max(1, min(max_workers or WP_UPLOAD_CONCURRENCY, len(uploads)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wp-upload") as executor:
+            return list(executor.map(upload, uploads))
+
+
+_wp_clients = OrderedDict()
+_wp_clients_lock = threading.Lock()
+
+
+def get_wp_client(wp_url, wp_login, wp_password):
+    """Клиент сайта из кэша процесса (одна keep-alive сессия на сайт и учётную запись)"""
+    key = (wp_url.rstrip('/'), wp_login, wp_password)
+    with _wp_clients_lock:
+        client = _wp_clients.get(key)
+        if client is None:
+            client = WordPressClient(wp_url, wp_login, wp_password)
+            _wp_clients[key] = client
+            while len(_wp_clients) > WP_CLIENTS_MAX:
+                _, evicted = _wp_clients.popitem(last=False)
+                evicted.session.close()
+        else:
+            _wp_clients.move_to_end(key)
+        return client
+
+
 def test_wp_connection(wp_url, wp_login, wp_password):
     """
     Проверяет подключение к WordPress API
@@ -41,14 +189,8 @@ def test_wp_connection(wp_url, wp_login, wp_password):
         dict: {'success': bool, 'message': str}
     """
     try:
-        headers = get_wp_headers(wp_login, wp_password)
-        
         # Пробуем получить информацию о пользователе
-        response = requests.get(
-            f"{wp_url}/wp-json/wp/v2/users/me",
-            headers=headers,
-            timeout=10
-        )
+        response = get_wp_client(wp_url, wp_login, wp_password).get('users/me')
         
         if response.status_code == 200:
             user_data = response.json()
@@ -86,62 +228,9 @@ def upload_image_to_wp(wp_url, wp_login, wp_password, image_path, filename_slug,
         dict: {'id': int, 'url': str} или None
     """
     try:
-        media_url = f"{wp_url}/wp-json/wp/v2/media"
-        token = base64.b64encode(f"{wp_login}:{wp_password}".encode()).decode()
-        
-        # Читаем файл
-        with open(image_path, 'rb') as f:
-            img_data = f.read()
-        
-        # Формируем имя файла
-        img_filename = f"{filename_slug}-image.jpg"
-        
-        # Заголовки для загрузки медиа
-        media_headers = {
-            'Authorization': f'Basic {token}',
-            'Content-Disposition': f'attachment; filename="{img_filename}"',
-            'Content-Type': 'image/jpeg'
-        }
-        
-        # Загружаем
-        response = requests.post(
-            media_url,
-            headers=media_headers,
-            data=img_data,
-            timeout=60
+        return get_wp_client(wp_url, wp_login, wp_password).upload_media(
+            image_path, filename_slug, alt_text
         )
-        
-        if response.status_code in [200, 201]:
-            media_data = response.json()
-            media_id = media_data.get('id')
-            
-            # Если есть ALT-текст, обновляем метаданные изображения
-            if alt_text and media_id:
-                try:
-                    update_url = f"{wp_url}/wp-json/wp/v2/media/{media_id}"
-                    update_headers = {
-                        'Authorization': f'Basic {token}',
-                        'Content-Type': 'application/json'
-                    }
-                    update_data = {
-                        'alt_text': alt_text,
-                        'caption': alt_text  # Также устанавливаем как подпись
-                    }
-                    requests.post(update_url, headers=update_headers, json=update_data, timeout=30)
-                    logger.info(f"✅ ALT-текст установлен: {alt_text[:50]}...")
-                except Exception as e:
-                    logger.warning(f"⚠️ Не удалось установить ALT-текст: {e}")
-            
-            result = {
-                'id': media_id,
-                'url': media_data.get('source_url', '')
-            }
-            logger.info(f"✅ Изображение загружено: ID {result['id']}")
-            return result
-        else:
-            logger.error(f"⚠️ Ошибка загрузки: {response.status_code}")
-            return None
-            
     except Exception as e:
         logger.error(f"❌ Ошибка upload_image_to_wp: {e}")
         return None
@@ -205,8 +294,7 @@ def create_wordpress_post(wp_url, wp_login, wp_password, article_data):
         dict: {'success': bool, 'post_id': int, 'url': str, 'error': str}
     """
     try:
-        headers = get_wp_headers(wp_login, wp_password)
-        posts_url = f"{wp_url}/wp-json/wp/v2/posts"
+        client = get_wp_client(wp_url, wp_login, wp_password)
         
         # Формируем данные поста
         post_data = {
@@ -270,12 +358,7 @@ def create_wordpress_post(wp_url, wp_login, wp_password, article_data):
             post_data['meta'] = yoast_meta
         
         # Создаём пост
-        response = requests.post(
-            posts_url,
-            headers=headers,
-            json=post_data,
-            timeout=30
-        )
+        response = client.post('posts', json=post_data, timeout=30)
         
         if response.status_code in [200, 201]:
             post = response.json()
@@ -325,12 +408,7 @@ def get_wordpress_categories(wp_url, wp_login, wp_password):
         list: [{'id': int, 'name': str, 'slug': str}] или []
     """
     try:
-        headers = get_wp_headers(wp_login, wp_password)
-        response = requests.get(
-            f"{wp_url}/wp-json/wp/v2/categories?per_page=100",
-            headers=headers,
-            timeout=10
-        )
+        response = get_wp_client(wp_url, wp_login, wp_password).get('categories?per_page=100')
         
         if response.status_code == 200:
             categories = response.json()
@@ -364,10 +442,8 @@ def create_wordpress_category(wp_url, wp_login, wp_password, category_name):
         dict: {'id': int, 'name': str, 'slug': str} или None
     """
     try:
-        headers = get_wp_headers(wp_login, wp_password)
-        response = requests.post(
-            f"{wp_url}/wp-json/wp/v2/categories",
-            headers=headers,
+        response = get_wp_client(wp_url, wp_login, wp_password).post(
+            'categories',
             json={'name': category_name},
             timeout=10
         )
@@ -400,12 +476,7 @@ def get_wordpress_tags(wp_url, wp_login, wp_password):
         list: [{'id': int, 'name': str, 'slug': str}] или []
     """
     try:
-        headers = get_wp_headers(wp_login, wp_password)
-        response = requests.get(
-            f"{wp_url}/wp-json/wp/v2/tags?per_page=100",
-            headers=headers,
-            timeout=10
-        )
+        response = get_wp_client(wp_url, wp_login, wp_password).get('tags?per_page=100')
         
         if response.status_code == 200:
             tags = response.json()
@@ -438,12 +509,7 @@ def get_wordpress_users(wp_url, wp_login, wp_password):
         list: [{'id': int, 'name': str, 'slug': str, 'avatar_url': str}] или []
     """
     try:
-        headers = get_wp_headers(wp_login, wp_password)
-        response = requests.get(
-            f"{wp_url}/wp-json/wp/v2/users?per_page=100",
-            headers=headers,
-            timeout=10
-        )
+        response = get_wp_client(wp_url, wp_login, wp_password).get('users?per_page=100')
         
         if response.status_code == 200:
             users = response.json()
@@ -479,10 +545,8 @@ def create_wordpress_tag(wp_url, wp_login, wp_password, tag_name):
         dict: {'id': int, 'name': str, 'slug': str} или None
     """
     try:
-        headers = get_wp_headers(wp_login, wp_password)
-        response = requests.post(
-            f"{wp_url}/wp-json/wp/v2/tags",
-            headers=headers,
+        response = get_wp_client(wp_url, wp_login, wp_password).post(
+            'tags',
             json={'name': tag_name},
             timeout=10
         )
@@ -526,7 +590,7 @@ def publish_article_to_wordpress(wp_credentials, article_html, seo_title, meta_d
         author_id: ID автора в WordPress (опционально)
         
     Returns:
-        dict: {'success': bool, 'post_url': str, 'message': str}
+        dict: {'success': bool, 'post_url': str, 'message': str, 'timings': dict}
     """
     print(f"\n{'='*60}")
     print(f"📝 publish_article_to_wordpress() ВЫЗВАНА")
@@ -550,8 +614,14 @@ def publish_article_to_wordpress(wp_credentials, article_html, seo_title, meta_d
     
     print(f"✅ Credentials в порядке")
     
+    # Время этапов публикации, сек
+    timings = {'upload': 0.0, 'upload_slowest': 0.0, 'meta': 0.0, 'post_create': 0.0}
+    publish_started = time.perf_counter()
+    
     try:
-        # 1. Загружаем изображения
+        client = get_wp_client(wp_url, wp_login, wp_password)
+        
+        # 1. Загружаем изображения (параллельно, ALT и подпись — в том же запросе)
         print(f"\n2️⃣ Загрузка изображений...")
         uploaded_images = []
         featured_media_id = None
@@ -562,12 +632,11 @@ def publish_article_to_wordpress(wp_credentials, article_html, seo_title, meta_d
             # Извлекаем ключевое слово для ALT-текстов из focus_keyword или seo_title
             primary_keyword = focus_keyword if focus_keyword else seo_title.split()[0]
             
+            # Slug имени файла из заголовка (увеличена длина для более информативных URL)
+            image_slug = re.sub(r'[^a-z0-9]+', '-', seo_title.lower())[:100]
+            
+            uploads = []
             for i, img_path in enumerate(images_paths):
-                print(f"   Загружаю изображение {i+1}/{len(images_paths)}: {img_path}")
-                import os
-                # Генерируем slug из заголовка (увеличена длина для более информативных URL)
-                slug = re.sub(r'[^a-z0-9]+', '-', seo_title.lower())[:100]
-                
                 # Генерируем описательный ALT-текст для SEO
                 if i == 0:
                     # Первое изображение (обложка)
@@ -578,18 +647,22 @@ def publish_article_to_wordpress(wp_credentials, article_html, seo_title, meta_d
                     alt_text = f"Установка и монтаж {primary_keyword} - этапы работы"
                 else:
                     alt_text = f"{primary_keyword} - вариант {i}"
-                
-                try:
-                    result = upload_image_to_wp(wp_url, wp_login, wp_password, img_path, f"{slug}-{i}", alt_text)
-                    if result:
-                        uploaded_images.append(result['url'])
-                        if i == 0:  # Первое изображение = featured
-                            featured_media_id = result['id']
-                        print(f"   ✅ Изображение {i+1} загружено, ID: {result.get('id')}")
-                    else:
-                        print(f"   ⚠️ Изображение {i+1} не загружено")
-                except Exception as e:
-                    print(f"   ❌ Ошибка загрузки изображения {i+1}: {e}")
+                uploads.append((img_path, f"{image_slug}-{i}", alt_text))
+            
+            upload_started = time.perf_counter()
+            results = client.upload_media_batch(uploads)
+            timings['upload'] = time.perf_counter() - upload_started
+            
+            for i, result in enumerate(results):
+                if result:
+                    uploaded_images.append(result['url'])
+                    if i == 0:  # Первое изображение = featured
+                        featured_media_id = result['id']
+                    timings['upload_slowest'] = max(timings['upload_slowest'], result['upload_seconds'])
+                    timings['meta'] += result['meta_seconds']
+                    print(f"   ✅ Изображение {i+1} загружено, ID: {result.get('id')} ({result['upload_seconds']:.1f} с)")
+                else:
+                    print(f"   ⚠️ Изображение {i+1} не загружено")
         else:
             print(f"   ℹ️ Изображения не предоставлены")
         
@@ -643,8 +716,15 @@ def publish_article_to_wordpress(wp_credentials, article_html, seo_title, meta_d
         print(f"   Author ID: {author_id}")
         
         print(f"   🚀 Вызываю create_wordpress_post()...")
+        post_started = time.perf_counter()
         result = create_wordpress_post(wp_url, wp_login, wp_password, article_data)
+        timings['post_create'] = time.perf_counter() - post_started
+        timings['total'] = time.perf_counter() - publish_started
         print(f"   Результат: {result}")
+        print(
+            f"⏱ Загрузка медиа: {timings['upload']:.1f} с (самое долгое {timings['upload_slowest']:.1f} с), "
+            f"ALT: {timings['meta']:.1f} с, пост: {timings['post_create']:.1f} с, всего: {timings['total']:.1f} с"
+        )
         
         if result.get('success'):
             print(f"\n{'='*60}")
@@ -656,7 +736,8 @@ def publish_article_to_wordpress(wp_credentials, article_html, seo_title, meta_d
                 'success': True,
                 'post_url': result.get('url', ''),
                 'post_id': result.get('post_id'),
-                'message': f"✅ Статья опубликована!\n🔗 {result.get('url', '')}"
+                'message': f"✅ Статья опубликована!\n🔗 {result.get('url', '')}",
+                'timings': timings
             }
         else:
             print(f"\n{'='*60}")
@@ -665,7 +746,8 @@ def publish_article_to_wordpress(wp_credentials, article_html, seo_title, meta_d
             print(f"{'='*60}\n")
             return {
                 'success': False,
-                'message': result.get('message', '❌ Ошибка публикации')
+                'message': result.get('message', '❌ Ошибка публикации'),
+                'timings': timings
             }
             
     except Exception as e:
@@ -4,10 +4,11 @@
 """
 from telebot import types
 from loader import bot, db
+from callback_router import router
 from utils import escape_html
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("platform_words_"))
+@router.prefix("platform_words_")
 def handle_platform_words(call):
     """Настройка объёма статьи (количества слов)"""
     parts = call.data.split("_")
@@ -102,7 +103,7 @@ def handle_platform_words(call):
     bot.answer_callback_query(call.id)
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("set_words_"))
+@router.prefix("set_words_")
 def handle_set_words(call):
     """Установка объёма статьи"""
     parts = call.data.split("_")
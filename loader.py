@@ -89,6 +89,12 @@ def create_bot_with_connection_check():
 # Создаем бота
 bot = create_bot_with_connection_check()
 
+# Индексированный роутер callback регистрируется первым: маршруты
+# @router.prefix / @router.exact проверяются одним поиском по словарю и trie,
+# оставшиеся фильтры-лямбды — после него в порядке регистрации
+from callback_router import router
+router.attach(bot)
+
 # Инициализация базы данных (будет создана позже)
 db = None
 
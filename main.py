@@ -82,6 +82,11 @@ try:
     from handlers import text_input_handler
     
     logger.info("✅ Все модули загружены")
+
+    # Маршруты callback, которые перехвачены зарегистрированными раньше
+    from callback_router import router, log_shadowed_routes
+    log_shadowed_routes()
+    print(f"✅ Маршрутов callback в индексе: {len(router._routes)}")
     
     # ═══════════════════════════════════════════════════════════════
     # НАСТРОЙКА CALLBACK TRACKER (отлов "мёртвых" кнопок)
@@ -127,12 +132,27 @@ def main():
     except Exception as e:
         logger.warning(f"Не удалось установить команды: {e}")
     
-    # Удаление webhook (для polling режима)
-    try:
-        bot.delete_webhook(drop_pending_updates=True)
-        logger.info("Webhook очищен")
-    except Exception as e:
-        logger.warning(f"Ошибка очистки webhook: {e}")
+    from config import BOT_MODE, TELEGRAM_WEBHOOK_URL, TELEGRAM_WEBHOOK_SECRET
+    
+    if BOT_MODE == 'webhook':
+        # Обновления принимает telegram_webhook.py, этот процесс — воркер очереди
+        if TELEGRAM_WEBHOOK_URL:
+            try:
+                bot.set_webhook(
+                    url=TELEGRAM_WEBHOOK_URL,
+                    secret_token=TELEGRAM_WEBHOOK_SECRET,
+                    allowed_updates=['message', 'callback_query']
+                )
+                logger.info(f"Webhook установлен: {TELEGRAM_WEBHOOK_URL}")
+            except Exception as e:
+                logger.warning(f"Ошибка установки webhook: {e}")
+    else:
+        # Удаление webhook (для polling режима)
+        try:
+            bot.delete_webhook(drop_pending_updates=True)
+            logger.info("Webhook очищен")
+        except Exception as e:
+            logger.warning(f"Ошибка очистки webhook: {e}")
     
     print("=" * 60)
     print("✅ БОТ ЗАПУЩЕН")
@@ -159,19 +179,52 @@ def main():
     except Exception as e:
         logger.warning(f"⚠️ Не удалось запустить планировщик публикаций: {e}")
         print(f"⚠️ Планировщик публикаций не запущен: {e}")
+
+    # Продолжаем рассылки, прерванные рестартом
+    try:
+        from utils.broadcast_engine import resume_broadcasts
+        resume_broadcasts()
+        logger.info("✅ Возобновление рассылок запущено")
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось запустить возобновление рассылок: {e}")
+
+    # Возврат резервов токенов, брошенных прерванными генерациями
+    try:
+        from utils.token_ledger import start_reservation_sweeper
+        start_reservation_sweeper()
+        logger.info("✅ Проверка резервов токенов запущена")
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось запустить проверку резервов токенов: {e}")
+
+    update_worker = None
     
-    # Запуск бота в режиме polling
     try:
-        bot.infinity_polling(
-            timeout=60,
-            long_polling_timeout=30,
-            skip_pending=True,
-            allowed_updates=['message', 'callback_query']
-        )
+        if BOT_MODE == 'webhook':
+            # Обработка очереди telegram_updates (процессов может быть несколько)
+            from utils.telegram_update_worker import TelegramUpdateWorker
+            # Обработчики выполняются прямо в потоке воркера очереди: иначе TeleBot
+            # отдаст их своему пулу, и аренда чата освободится раньше, чем
+            # обработка закончится
+            bot.threaded = False
+            update_worker = TelegramUpdateWorker(bot)
+            print(f"📥 Режим webhook: обработка очереди обновлений ({update_worker.worker_id})")
+            update_worker.serve_forever()
+        else:
+            # Запуск бота в режиме polling
+            bot.infinity_polling(
+                timeout=60,
+                long_polling_timeout=30,
+                skip_pending=True,
+                allowed_updates=['message', 'callback_query']
+            )
     except KeyboardInterrupt:
         logger.info("Остановка бота по Ctrl+C")
         print("\n👋 Бот остановлен")
         
+        # Дорабатываем взятые из очереди обновления
+        if update_worker:
+            update_worker.stop()
+        
         # Останавливаем планировщик уведомлений
         try:
             from handlers.notification_scheduler import stop_notification_scheduler
@@ -185,7 +238,21 @@ def main():
             stop_auto_publish_scheduler()
         except:
             pass
-        
+
+        # Останавливаем пул генераций (выполняющиеся генерации дорабатывают в фоне)
+        try:
+            from utils.generation_executor import generation_executor
+            generation_executor.shutdown()
+        except:
+            pass
+
+        # Дописываем в БД накопленный журнал вызовов API
+        try:
+            from utils.api_cost_tracker import stop_usage_writer
+            stop_usage_writer()
+        except:
+            pass
+
         # Выводим статистику по кнопкам при остановке
         try:
             from callback_tracker import print_callback_report
@@ -1,17 +1,17 @@
 """
 OAuth Server для обработки Pinterest callback
-Запускается через gunicorn на Render
+Запускается через gunicorn на Render:
+    gunicorn -c gunicorn.conf.py oauth_server:app
 """
 from flask import Flask, request, render_template_string
 import requests
-import json
 import os
 import sys
 
 # Добавляем текущую директорию в путь для импорта модулей
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database.database import Database
+from database.flask_db import init_app, get_db
 from config import (
     PINTEREST_APP_ID, 
     PINTEREST_APP_SECRET, 
@@ -19,6 +19,7 @@ from config import (
 )
 
 app = Flask(__name__)
+init_app(app)
 
 # ==========================================
 # ИМПОРТ VK WEBHOOK ROUTES
@@ -37,21 +38,6 @@ except Exception as e:
     traceback.print_exc()
 
 
-# Функция для получения свежего подключения к БД
-def get_db():
-    """
-    Создаёт новое подключение к БД для каждого запроса
-    Решает проблему SSL connection timeout
-    """
-    try:
-        db = Database()
-        # Проверяем подключение
-        db.cursor.execute("SELECT 1")
-        return db
-    except Exception as e:
-        print(f"❌ Database connection error: {e}")
-        return None
-
 # HTML шаблон для страницы успеха
 SUCCESS_PAGE = """
 <!DOCTYPE html>
@@ -314,17 +300,9 @@ def pinterest_callback():
             bot_username=bot_username
         )
     
-    # Получаем свежее подключение к БД
+    # Общий пул соединений (database/flask_db.py)
     db = get_db()
     
-    if not db:
-        print("❌ Database not connected")
-        return render_template_string(
-            ERROR_PAGE,
-            error="Ошибка подключения к базе данных",
-            bot_username=bot_username
-        )
-    
     try:
         # State содержит user_id
         user_id = int(state)
@@ -391,13 +369,6 @@ def pinterest_callback():
             error_detail = user_response.text
             print(f"❌ Pinterest API error: {error_detail}")
             
-            # Закрываем БД
-            try:
-                db.cursor.close()
-                db.conn.close()
-            except:
-                pass
-            
             raise Exception(
                 f"Pinterest API вернул ошибку (HTTP {user_response.status_code}). "
                 f"Возможно, токен истёк или недостаточно прав. Попробуйте подключиться заново."
@@ -419,31 +390,17 @@ def pinterest_callback():
         # ============================================
         
         # Проверяем что этот Pinterest аккаунт не подключен ни у кого (в ЛЮБОЙ БД)
-        db.cursor.execute("""
-            SELECT u.id, u.username
-            FROM users u
-            WHERE u.platform_connections::text LIKE %s
-        """, (f'%"username": "{pinterest_username}"%',))
-        
-        existing_users = db.cursor.fetchall()
+        existing_users = db.get_platform_connection_owners_list('pinterests', pinterest_username)
         
         if existing_users:
             # Pinterest уже подключен у кого-то (возможно у текущего пользователя)
             for existing_user in existing_users:
-                existing_user_id = existing_user.get('id') if isinstance(existing_user, dict) else existing_user[0]
-                existing_username = existing_user.get('username') if isinstance(existing_user, dict) else (existing_user[1] if len(existing_user) > 1 else 'Unknown')
+                existing_user_id = existing_user['user_id']
                 
                 if existing_user_id == user_id:
                     # Текущий пользователь уже подключил этот Pinterest
                     print(f"❌ Pinterest @{pinterest_username} уже подключен у пользователя {user_id}")
                     
-                    # Закрываем БД
-                    try:
-                        db.cursor.close()
-                        db.conn.close()
-                    except:
-                        pass
-                    
                     return render_template_string(
                         ERROR_PAGE,
                         error=f"Аккаунт @{pinterest_username} уже подключен к вашему боту",
@@ -453,13 +410,6 @@ def pinterest_callback():
                     # Другой пользователь уже подключил этот Pinterest
                     print(f"❌ Pinterest @{pinterest_username} уже подключен у другого пользователя (ID: {existing_user_id})")
                     
-                    # Закрываем БД
-                    try:
-                        db.cursor.close()
-                        db.conn.close()
-                    except:
-                        pass
-                    
                     return render_template_string(
                         ERROR_PAGE,
                         error=f"Аккаунт @{pinterest_username} уже используется другим пользователем",
@@ -487,19 +437,8 @@ def pinterest_callback():
         })
         
         # Обновляем в БД
-        db.cursor.execute("""
-            UPDATE users 
-            SET platform_connections = %s::jsonb
-            WHERE id = %s
-        """, (json.dumps(connections), user_id))
-        db.conn.commit()
-        
-        # Закрываем соединение
-        try:
-            db.cursor.close()
-            db.conn.close()
-        except:
-            pass
+        if not db.update_user(user_id, {'platform_connections': connections}):
+            raise Exception("Не удалось сохранить подключение. Попробуйте ещё раз.")
         
         # Отправляем уведомление и меню подключений в Telegram
         try:
@@ -550,14 +489,6 @@ def pinterest_callback():
         print(f"❌ Error: {str(e)}")
         print("=" * 60)
         
-        # Закрываем соединение при ошибке
-        try:
-            if db:
-                db.cursor.close()
-                db.conn.close()
-        except:
-            pass
-        
         return render_template_string(
             ERROR_PAGE,
             error=str(e),
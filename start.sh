@@ -2,7 +2,7 @@
 # Скрипт запуска бота и webhook сервера
 
 echo "🚀 Запуск VK Webhook сервера..."
-python vk_webhook.py &
+gunicorn -c gunicorn.conf.py vk_webhook:app &
 
 echo "⏳ Ожидание 3 секунды..."
 sleep 3
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Flask Webhook для приёма обновлений Telegram (BOT_MODE=webhook)
+
+Сервер ничего не обрабатывает сам: проверяет секретный токен
+(X-Telegram-Bot-Api-Secret-Token), кладёт обновление в очередь
+telegram_updates и сразу отвечает 200. Обработку выполняют процессы
+main.py с BOT_MODE=webhook (utils/telegram_update_worker.py).
+
+Запуск:
+    gunicorn -c gunicorn.conf.py telegram_webhook:app
+"""
+from flask import Flask, request
+import hmac
+import json
+import logging
+import os
+from config import TELEGRAM_WEBHOOK_SECRET
+from database.flask_db import init_app, get_db
+
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+init_app(app)
+
+WEBHOOK_PATH = '/telegram/webhook'
+
+
+def extract_chat_id(update):
+    """Чат обновления — ключ упорядочивания в очереди (0, если чата нет)"""
+    for field in ('message', 'edited_message', 'channel_post', 'edited_channel_post'):
+        if field in update:
+            return update[field].get('chat', {}).get('id', 0)
+
+    callback = update.get('callback_query')
+    if callback:
+        message = callback.get('message') or {}
+        return message.get('chat', {}).get('id') or callback.get('from', {}).get('id', 0)
+
+    # Остальные типы (inline, my_chat_member и т.д.) — по отправителю
+    for value in update.values():
+        if isinstance(value, dict) and 'from' in value:
+            return value['from'].get('id', 0)
+    return 0
+
+
+@app.route(WEBHOOK_PATH, methods=['POST'])
+def telegram_webhook():
+    """Приём обновления от Telegram"""
+    token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+    if not TELEGRAM_WEBHOOK_SECRET or not hmac.compare_digest(token, TELEGRAM_WEBHOOK_SECRET):
+        logger.warning(f"⚠️ Запрос webhook с неверным секретом от {request.remote_addr}")
+        return {'ok': False}, 403
+
+    payload = request.get_data(as_text=True)
+    try:
+        update = json.loads(payload)
+        update_id = int(update['update_id'])
+    except (ValueError, KeyError, TypeError):
+        return {'ok': False, 'error': 'bad update'}, 400
+
+    # Ошибка БД — 500: Telegram повторит доставку этого обновления позже
+    if not get_db().create_telegram_update(update_id, extract_chat_id(update), payload):
+        return {'ok': False}, 500
+
+    return {'ok': True}, 200
+
+
+@app.route('/health')
+def health_check():
+    """Health check endpoint для Render.com"""
+    return {'status': 'ok', 'service': 'telegram_webhook'}, 200
+
+
+@app.route('/')
+def index():
+    """Главная страница"""
+    return {
+        'service': 'Telegram Webhook',
+        'status': 'running',
+        'endpoints': {
+            WEBHOOK_PATH: 'Telegram updates (POST)',
+            '/health': 'Health check'
+        }
+    }, 200
+
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5000))
+    app.run(host='0.0.0.0', port=port, debug=False)
+
+
+print("✅ Telegram Webhook Server готов к запуску")
@@ -1,101 +1,276 @@
 """
 Трекер затрат на API - отслеживание расходов на Claude и другие сервисы
+
+Вызовы не пишутся в БД по одному: они копятся в буфере и фоновый поток
+сбрасывает их пачкой (один INSERT в api_usage + обновление дневных сводок
+api_usage_daily) раз в API_USAGE_FLUSH_INTERVAL секунд или при накоплении
+API_USAGE_BATCH_SIZE записей. Отчёт читает только дневные сводки, поэтому
+его стоимость не зависит от количества вызовов.
 """
-from datetime import datetime, timedelta
+import atexit
+import threading
+from collections import deque
+from datetime import datetime
+from config import (
+    API_USAGE_FLUSH_INTERVAL, API_USAGE_BATCH_SIZE,
+    API_USAGE_MAX_BUFFER, API_USAGE_RETENTION_DAYS
+)
+
+
+# Цены Claude, USD за 1M токенов: (вход, выход, чтение кэша, запись в кэш)
+CLAUDE_PRICES = {
+    'claude-sonnet-4': (3.0, 15.0, 0.30, 3.75),
+    'claude-3-5-sonnet': (3.0, 15.0, 0.30, 3.75),
+    'claude-3-5-haiku': (0.80, 4.0, 0.08, 1.0),
+    'claude-opus-4': (15.0, 75.0, 1.50, 18.75),
+}
+DEFAULT_CLAUDE_PRICE = CLAUDE_PRICES['claude-sonnet-4']
+
+# Удаление старых детальных записей — не чаще раза в сутки
+CLEANUP_INTERVAL = 24 * 3600
+
+
+def calculate_claude_cost(model, input_tokens, output_tokens,
+                          cache_read_tokens=0, cache_write_tokens=0):
+    """Стоимость вызова Claude в USD"""
+    price = next(
+        (p for prefix, p in CLAUDE_PRICES.items() if (model or '').startswith(prefix)),
+        DEFAULT_CLAUDE_PRICE
+    )
+    return (
+        input_tokens * price[0]
+        + output_tokens * price[1]
+        + cache_read_tokens * price[2]
+        + cache_write_tokens * price[3]
+    ) / 1_000_000
+
+
+class UsageWriter:
+    """
+    Буфер записей api_usage с фоновым сбросом пачками.
+
+    Если БД недоступна, записи возвращаются в буфер и уходят со следующей
+    пачкой; буфер ограничен max_buffer (самые старые отбрасываются).
+    """
+
+    def __init__(self, flush_interval=API_USAGE_FLUSH_INTERVAL,
+                 batch_size=API_USAGE_BATCH_SIZE, max_buffer=API_USAGE_MAX_BUFFER):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._buffer = deque(maxlen=max_buffer)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_cleanup = 0.0
+
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+
+    def add(self, record):
+        """Поставить запись в очередь (не блокирует вызывающий поток)"""
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(record)
+            size = len(self._buffer)
+            self._ensure_thread_locked()
+        if size >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_thread_locked(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='api-usage-writer', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            self._cleanup_old_records()
+
+    def flush(self):
+        """Записать всё накопленное пачками по batch_size. Returns: записано строк"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [
+                        self._buffer.popleft()
+                        for _ in range(min(self.batch_size, len(self._buffer)))
+                    ]
+                if not batch:
+                    break
+
+                try:
+                    from database.database import db
+                    ok = db.create_api_usage_batch(batch)
+                except Exception as e:
+                    print(f"⚠️ Ошибка записи api_usage: {e}")
+                    ok = False
+
+                if not ok:
+                    self.failed_flushes += 1
+                    with self._lock:
+                        # Вернуть в начало очереди, не вытесняя более новые записи
+                        free = self._buffer.maxlen - len(self._buffer)
+                        self.dropped += max(0, len(batch) - free)
+                        self._buffer.extendleft(reversed(batch[-free:] if free else []))
+                    break
+
+                written += len(batch)
+                self.written += len(batch)
+        return written
 
+    def _cleanup_old_records(self):
+        now = datetime.now().timestamp()
+        if now - self._last_cleanup < CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        try:
+            from database.database import db
+            deleted = db.delete_old_api_usage(API_USAGE_RETENTION_DAYS)
+            if deleted:
+                print(f"🧹 Удалено старых записей api_usage: {deleted}")
+        except Exception as e:
+            print(f"⚠️ Ошибка очистки api_usage: {e}")
 
-# Временное хранилище затрат (в продакшене - БД)
-api_costs = []
+    def pending(self):
+        """Копия ещё не записанных записей"""
+        with self._lock:
+            return list(self._buffer)
 
+    def stop(self):
+        """Остановить фоновый поток и записать остаток"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
 
-def track_api_call(service, model, input_tokens, output_tokens, cost_usd):
+
+usage_writer = UsageWriter()
+atexit.register(usage_writer.flush)
+
+
+def track_api_call(service, model, input_tokens, output_tokens, cost_usd,
+                   user_id=None, operation='', cache_read_tokens=0, cache_write_tokens=0):
     """Записать вызов API"""
-    api_costs.append({
-        'timestamp': datetime.now(),
+    usage_writer.add({
+        'created_at': datetime.now(),
+        'user_id': user_id,
         'service': service,
-        'model': model,
-        'input_tokens': input_tokens,
-        'output_tokens': output_tokens,
-        'cost_usd': cost_usd
+        'model': model or '',
+        'operation': operation or '',
+        'input_tokens': input_tokens or 0,
+        'output_tokens': output_tokens or 0,
+        'cache_read_tokens': cache_read_tokens or 0,
+        'cache_write_tokens': cache_write_tokens or 0,
+        'cost_usd': cost_usd or 0,
     })
 
 
+def log_claude_usage(user_id, input_tokens, output_tokens, model,
+                     operation_type='', cache_read_tokens=0, cache_write_tokens=0):
+    """Записать вызов Claude (стоимость считается по цене модели)"""
+    track_api_call(
+        service='claude',
+        model=model,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cost_usd=calculate_claude_cost(
+            model, input_tokens, output_tokens, cache_read_tokens, cache_write_tokens
+        ),
+        user_id=user_id,
+        operation=operation_type,
+        cache_read_tokens=cache_read_tokens,
+        cache_write_tokens=cache_write_tokens,
+    )
+
+
+def stop_usage_writer():
+    """Записать накопленные вызовы при остановке бота"""
+    usage_writer.stop()
+
+
 def get_costs_period(days=30):
-    """Получить затраты за период"""
-    if not api_costs:
-        return {
-            'total_calls': 0,
-            'total_input_tokens': 0,
-            'total_output_tokens': 0,
-            'total_cost_usd': 0,
-            'by_service': {}
-        }
-    
-    cutoff_date = datetime.now() - timedelta(days=days)
-    filtered = [c for c in api_costs if c['timestamp'] >= cutoff_date]
-    
-    if not filtered:
-        return {
-            'total_calls': 0,
-            'total_input_tokens': 0,
-            'total_output_tokens': 0,
-            'total_cost_usd': 0,
-            'by_service': {}
-        }
-    
+    """Получить затраты за период (дневные сводки + ещё не записанный буфер)"""
     stats = {
-        'total_calls': len(filtered),
-        'total_input_tokens': sum(c['input_tokens'] for c in filtered),
-        'total_output_tokens': sum(c['output_tokens'] for c in filtered),
-        'total_cost_usd': sum(c['cost_usd'] for c in filtered),
+        'total_calls': 0,
+        'total_input_tokens': 0,
+        'total_output_tokens': 0,
+        'total_cache_read_tokens': 0,
+        'total_cost_usd': 0,
         'by_service': {}
     }
-    
+
+    from database.database import db
+    rows = list(db.get_api_usage_totals(days) or [])
+    for record in usage_writer.pending():
+        rows.append(dict(record, calls=1))
+
     # Группировка по сервисам
-    for call in filtered:
-        service = call['service']
+    for row in rows:
+        service = row['service']
         if service not in stats['by_service']:
             stats['by_service'][service] = {
                 'calls': 0,
                 'input_tokens': 0,
                 'output_tokens': 0,
+                'cache_read_tokens': 0,
                 'cost_usd': 0
             }
-        
-        stats['by_service'][service]['calls'] += 1
-        stats['by_service'][service]['input_tokens'] += call['input_tokens']
-        stats['by_service'][service]['output_tokens'] += call['output_tokens']
-        stats['by_service'][service]['cost_usd'] += call['cost_usd']
-    
+
+        data = stats['by_service'][service]
+        data['calls'] += row['calls'] or 0
+        data['input_tokens'] += row['input_tokens'] or 0
+        data['output_tokens'] += row['output_tokens'] or 0
+        data['cache_read_tokens'] += row['cache_read_tokens'] or 0
+        data['cost_usd'] += float(row['cost_usd'] or 0)
+
+    for data in stats['by_service'].values():
+        stats['total_calls'] += data['calls']
+        stats['total_input_tokens'] += data['input_tokens']
+        stats['total_output_tokens'] += data['output_tokens']
+        stats['total_cache_read_tokens'] += data['cache_read_tokens']
+        stats['total_cost_usd'] += data['cost_usd']
+
     return stats
 
 
 def format_costs_report(days=30):
     """Форматировать отчет о затратах"""
     stats = get_costs_period(days)
-    
+
     if stats['total_calls'] == 0:
         return (
             f"💵 <b>ЗАТРАТЫ НА API ({days} дней)</b>\n\n"
             "📊 Данных пока нет\n\n"
             "<i>Статистика начнет собираться после первых запросов к API</i>"
         )
-    
+
     # Конвертация USD в рубли (примерный курс)
     usd_to_rub = 95
     total_rub = stats['total_cost_usd'] * usd_to_rub
-    
+
     text = (
         f"💵 <b>ЗАТРАТЫ НА API ({days} дней)</b>\n"
         "━━━━━━━━━━━━━━━━━━━━\n\n"
-        
+
         f"📊 <b>ОБЩАЯ СТАТИСТИКА:</b>\n"
         f"🔢 Всего запросов: <code>{stats['total_calls']}</code>\n"
         f"📥 Входных токенов: <code>{stats['total_input_tokens']:,}</code>\n"
+        f"🧠 Из кэша промптов: <code>{stats['total_cache_read_tokens']:,}</code>\n"
         f"📤 Выходных токенов: <code>{stats['total_output_tokens']:,}</code>\n"
         f"💰 Затраты: <code>${stats['total_cost_usd']:.2f}</code> (~{total_rub:.0f} ₽)\n\n"
     )
-    
+
     # По сервисам
     if stats['by_service']:
         text += "<b>📈 ПО СЕРВИСАМ:</b>\n"
@@ -107,7 +282,10 @@ def format_costs_report(days=30):
                 f"   ├─ Токенов: {data['input_tokens'] + data['output_tokens']:,}\n"
                 f"   └─ Затраты: ${data['cost_usd']:.2f} (~{cost_rub:.0f} ₽)\n"
             )
-    
+
+    if usage_writer.dropped:
+        text += f"\n⚠️ Потеряно записей (БД недоступна): {usage_writer.dropped}\n"
+
     return text
 
 
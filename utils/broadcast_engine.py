@@ -0,0 +1,321 @@
+"""
+Рассылки из админ-панели
+
+Рассылка выполняется в фоне, а не в потоке callback:
+  - получатели — снимок аудитории в broadcast_recipients, обход пачками
+    по user_id; курсор и результаты пачки пишутся в БД одной транзакцией,
+    поэтому после рестарта рассылка продолжается с места остановки
+    (resume_broadcasts при запуске бота и периодически в фоне);
+  - скорость — общий token bucket на все рассылки процесса
+    (BROADCAST_RATE сообщений в секунду, ниже лимита Telegram ~30/с);
+    пачку отправляет пул из BROADCAST_WORKERS потоков;
+  - 429 Too Many Requests — пауза всего bucket на retry_after и повтор;
+  - 403 (бот заблокирован, аккаунт удалён) — получатель помечается blocked,
+    а пользователь исключается из следующих рассылок (users.is_blocked).
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    BROADCAST_RATE, BROADCAST_WORKERS, BROADCAST_CHUNK_SIZE,
+    BROADCAST_LEASE_SECONDS, BROADCAST_MAX_RETRIES, BROADCAST_STATUS_INTERVAL
+)
+from utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Проверка брошенных рассылок других процессов
+RESUME_INTERVAL = 60
+
+AUDIENCE_NAMES = {
+    'all': '👥 Всем пользователям',
+    '7d': '🟢 Активным за 7 дней',
+    'paid': '💎 Платным пользователям'
+}
+
+
+def _telegram_error(error):
+    """(код ошибки, retry_after) из ApiTelegramException"""
+    code = getattr(error, 'error_code', None)
+    result = getattr(error, 'result_json', None) or {}
+    retry_after = (result.get('parameters') or {}).get('retry_after')
+    return code, retry_after
+
+
+def _is_blocked_error(code, error):
+    """Получатель недоступен навсегда: заблокировал бота, удалён, чат не найден"""
+    if code == 403:
+        return True
+    return code == 400 and 'chat not found' in str(error).lower()
+
+
+def send_with_retry(bucket, send, on_rate_limited=None, max_retries=BROADCAST_MAX_RETRIES):
+    """
+    Отправить одно сообщение Telegram через общий token bucket
+
+    send — вызов bot API без аргументов. 429 Too Many Requests — пауза
+    всего bucket на retry_after (останавливаются все отправки процесса,
+    не только эта) и повтор; on_rate_limited() вызывается на каждый 429.
+
+    Returns:
+        tuple: (status, error) — status: sent / blocked / failed
+    """
+    error = None
+    for _ in range(max_retries + 1):
+        bucket.acquire()
+        try:
+            send()
+            return 'sent', None
+        except Exception as e:
+            error = e
+            code, retry_after = _telegram_error(e)
+            if code == 429:
+                if on_rate_limited:
+                    on_rate_limited()
+                bucket.pause(retry_after or 1)
+                continue
+            if _is_blocked_error(code, e):
+                return 'blocked', e
+            return 'failed', e
+    return 'failed', error
+
+
+class BroadcastEngine:
+    """Фоновые рассылки с курсором в БД и token bucket"""
+
+    def __init__(self, bot, rate=BROADCAST_RATE, workers=BROADCAST_WORKERS,
+                 chunk_size=BROADCAST_CHUNK_SIZE, lease_seconds=BROADCAST_LEASE_SECONDS):
+        self.bot = bot
+        self.bucket = TokenBucket(rate, capacity=rate)
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='broadcast-send')
+        self._active = set()
+        self._lock = threading.Lock()
+        self._resume_thread = None
+
+        self.rate_limited = 0
+
+    # ─────────────────────────────────────────────────────────────
+    # Запуск
+    # ─────────────────────────────────────────────────────────────
+
+    def start(self, admin_id, audience, source_chat_id, source_message_id, status_chat_id):
+        """
+        Создать рассылку и запустить её в фоне.
+        Returns: строка broadcasts или None (ошибка БД)
+        """
+        from database.database import db
+
+        broadcast = db.create_broadcast(
+            admin_id, audience, source_chat_id, source_message_id,
+            self.worker_id, self.lease_seconds
+        )
+        if not broadcast:
+            return None
+
+        status_msg = self.bot.send_message(
+            status_chat_id, self._format_progress(broadcast),
+            reply_markup=self._cancel_markup(broadcast['id']), parse_mode='HTML'
+        )
+        db.update_broadcast_status_message(broadcast['id'], status_chat_id, status_msg.message_id)
+        broadcast['status_chat_id'] = status_chat_id
+        broadcast['status_message_id'] = status_msg.message_id
+
+        self._spawn(broadcast)
+        return broadcast
+
+    def resume(self):
+        """Продолжить рассылки, чей процесс остановился (истекла аренда)"""
+        from database.database import db
+
+        for broadcast in db.claim_broadcasts(self.worker_id, self.lease_seconds) or []:
+            logger.info(f"📢 Продолжаем рассылку #{broadcast['id']} с user_id > {broadcast['cursor_user_id']}")
+            self._spawn(broadcast)
+
+    def start_resume_loop(self):
+        """Фоновая проверка брошенных рассылок (при запуске и раз в RESUME_INTERVAL)"""
+        if self._resume_thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.resume()
+                except Exception as e:
+                    logger.error(f"❌ Ошибка возобновления рассылок: {e}")
+                time.sleep(RESUME_INTERVAL)
+
+        self._resume_thread = threading.Thread(target=loop, name='broadcast-resume', daemon=True)
+        self._resume_thread.start()
+
+    def cancel(self, broadcast_id):
+        """Отменить рассылку (исполнитель остановится после текущей пачки)"""
+        from database.database import db
+        return db.update_broadcast_cancelled(broadcast_id)
+
+    def _spawn(self, broadcast):
+        with self._lock:
+            if broadcast['id'] in self._active:
+                return
+            self._active.add(broadcast['id'])
+        thread = threading.Thread(
+            target=self._run, args=(broadcast,), name=f"broadcast-{broadcast['id']}", daemon=True
+        )
+        thread.start()
+
+    # ─────────────────────────────────────────────────────────────
+    # Выполнение
+    # ─────────────────────────────────────────────────────────────
+
+    def _run(self, broadcast):
+        from database.database import db
+
+        broadcast_id = broadcast['id']
+        last_status = 0.0
+        try:
+            while broadcast['status'] == 'running':
+                recipients = db.get_broadcast_recipients_list(
+                    broadcast_id, broadcast['cursor_user_id'], self.chunk_size
+                )
+                if not recipients:
+                    broadcast = db.update_broadcast_finished(broadcast_id, self.worker_id, 'done') or broadcast
+                    break
+
+                results = list(self._pool.map(
+                    lambda user_id: self._send(broadcast, user_id), recipients
+                ))
+
+                updated = db.update_broadcast_progress(
+                    broadcast_id, self.worker_id, self.lease_seconds, recipients[-1], results
+                )
+                if not updated:
+                    logger.warning(f"⚠️ Рассылка #{broadcast_id}: аренда потеряна, останавливаемся")
+                    return
+                broadcast = updated
+
+                if time.monotonic() - last_status >= BROADCAST_STATUS_INTERVAL:
+                    last_status = time.monotonic()
+                    self._update_status_message(broadcast, final=False)
+
+            if broadcast['status'] == 'cancelled':
+                broadcast = db.update_broadcast_finished(broadcast_id, self.worker_id, 'cancelled') or broadcast
+
+            self._update_status_message(broadcast, final=True)
+            logger.info(
+                f"📢 Рассылка #{broadcast_id} завершена ({broadcast['status']}): "
+                f"✅ {broadcast['sent']}, ❌ {broadcast['failed']}, 🚫 {broadcast['blocked']}"
+            )
+        except Exception as e:
+            # Аренда истечёт, и рассылку продолжит resume()
+            logger.error(f"❌ Рассылка #{broadcast_id} прервана: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._active.discard(broadcast_id)
+
+    def _send(self, broadcast, user_id):
+        """Отправить одному получателю. Returns: (user_id, status, error)"""
+        status, error = send_with_retry(
+            self.bucket,
+            lambda: self.bot.copy_message(user_id, broadcast['source_chat_id'], broadcast['source_message_id']),
+            on_rate_limited=self._count_rate_limited
+        )
+        return user_id, status, error
+
+    def _count_rate_limited(self):
+        self.rate_limited += 1
+
+    # ─────────────────────────────────────────────────────────────
+    # Сообщение о прогрессе
+    # ─────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _cancel_markup(broadcast_id):
+        from telebot import types
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton("⏹ Остановить", callback_data=f"bcast_cancel_{broadcast_id}"))
+        return markup
+
+    @staticmethod
+    def _format_progress(broadcast):
+        done = broadcast['sent'] + broadcast['failed'] + broadcast['blocked']
+        return (
+            f"📤 <b>Рассылка #{broadcast['id']}</b>: {done}/{broadcast['total']}\n"
+            f"Аудитория: {AUDIENCE_NAMES.get(broadcast['audience'], broadcast['audience'])}\n\n"
+            f"✅ Успешно: {broadcast['sent']}\n"
+            f"❌ Ошибок: {broadcast['failed']}\n"
+            f"🚫 Заблокировали бота: {broadcast['blocked']}"
+        )
+
+    @staticmethod
+    def _format_report(broadcast):
+        title = "✅ <b>РАССЫЛКА ЗАВЕРШЕНА</b>" if broadcast['status'] == 'done' else "⏹ <b>РАССЫЛКА ОСТАНОВЛЕНА</b>"
+        return (
+            f"{title}\n"
+            "━━━━━━━━━━━━━━━━━━━━\n\n"
+            f"📊 Всего: <code>{broadcast['total']}</code>\n"
+            f"✅ Успешно: <code>{broadcast['sent']}</code>\n"
+            f"❌ Ошибок: <code>{broadcast['failed']}</code>\n"
+            f"🚫 Заблокировали бота: <code>{broadcast['blocked']}</code>"
+        )
+
+    def _update_status_message(self, broadcast, final):
+        if not broadcast.get('status_message_id'):
+            return
+        from telebot import types
+
+        if final:
+            text = self._format_report(broadcast)
+            markup = types.InlineKeyboardMarkup()
+            markup.add(types.InlineKeyboardButton("🔙 В админку", callback_data="back_to_admin"))
+        else:
+            text = self._format_progress(broadcast)
+            markup = self._cancel_markup(broadcast['id'])
+
+        try:
+            self.bot.edit_message_text(
+                text, broadcast['status_chat_id'], broadcast['status_message_id'],
+                reply_markup=markup, parse_mode='HTML'
+            )
+        except Exception as e:
+            if final:
+                try:
+                    self.bot.send_message(broadcast['status_chat_id'], text, reply_markup=markup, parse_mode='HTML')
+                except Exception:
+                    logger.warning(f"⚠️ Не удалось отправить отчёт рассылки #{broadcast['id']}: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            active = len(self._active)
+        return {
+            'active': active,
+            'sent_tokens': self.bucket.acquired,
+            'waited_seconds': self.bucket.waited_seconds,
+            'rate_limited': self.rate_limited,
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_broadcast_engine():
+    """Общий движок рассылок процесса (создаётся при первом обращении)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            from loader import bot
+            _engine = BroadcastEngine(bot)
+        return _engine
+
+
+def resume_broadcasts():
+    """Вызывается при запуске бота: продолжить незавершённые рассылки"""
+    get_broadcast_engine().start_resume_loop()
+
+
+print("✅ utils/broadcast_engine.py загружен")
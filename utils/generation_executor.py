@@ -0,0 +1,195 @@
+"""
+Пул фоновых генераций (статьи, посты, отзывы, ключевые фразы)
+
+Долгие вызовы Claude/Gemini не выполняются в потоках TeleBot: обработчик
+проверяет параметры, отвечает на callback и отдаёт тяжёлую работу сюда,
+после чего поток TeleBot сразу свободен для кнопок других пользователей.
+
+Пул — тот же PublicationWorkerPool (FIFO, лимиты на тип задачи и на
+пользователя, метрики очереди); задание возвращает GenerationJob — handle
+со статусом, результатом и ожиданием завершения.
+
+Если заданию передан резерв токенов (utils/token_ledger.py), он
+подтверждается после успешного выполнения и возвращается, если задание
+упало, было отменено до начала, отброшено при остановке пула или не
+принято остановленным пулом. Все генерации, списывающие токены,
+передают резерв — иначе вернуть токены за упавшее задание нечем.
+"""
+import itertools
+import logging
+import threading
+import time
+from config import (
+    GENERATION_WORKERS, GENERATION_PER_USER_LIMIT,
+    GENERATION_KIND_LIMITS, GENERATION_MAX_JOBS_PER_USER
+)
+from utils.publication_pool import PublicationJob, PublicationWorkerPool
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationJob(PublicationJob):
+    """Handle фоновой генерации"""
+
+    __slots__ = ('id', 'target', 'status', 'result', 'error', 'finished_at', 'on_error',
+                 'reservation', '_done')
+
+    _ids = itertools.count(1)
+
+    def __init__(self, func, kind, user_id, label, on_error=None, reservation=None):
+        # Воркер пула вызывает job.func() — это run(), который сохраняет результат
+        super().__init__(self.run, kind, user_id, label)
+        self.id = next(self._ids)
+        self.target = func
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.on_error = on_error
+        self.reservation = reservation
+        self._done = threading.Event()
+
+    @property
+    def kind(self):
+        return self.platform
+
+    def run(self):
+        """Выполняется воркером пула"""
+        self.status = 'running'
+        try:
+            self.result = self.target()
+            self.status = 'done'
+            if self.reservation is not None:
+                # Если генерация сама вернула токены, commit ничего не сделает
+                self.reservation.commit()
+        except Exception as e:
+            self.error = e
+            self.status = 'failed'
+            if self.reservation is not None:
+                self.reservation.refund()
+            if self.on_error:
+                try:
+                    self.on_error(e)
+                except Exception as callback_error:
+                    logger.error(f"❌ Ошибка on_error для {self.label}: {callback_error}")
+            raise
+        finally:
+            self.finished_at = time.monotonic()
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Дождаться завершения. Returns: result (исключение задания пробрасывается)"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Генерация {self.label} не завершилась за {timeout} с")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    @property
+    def wait_seconds(self):
+        """Время в очереди (до начала выполнения)"""
+        started = self.started_at or time.monotonic()
+        return started - self.enqueued_at
+
+    @property
+    def run_seconds(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+
+class GenerationExecutor(PublicationWorkerPool):
+    """Пул генераций: handle на каждое задание, отмена ожидающих, счётчик по пользователю"""
+
+    def __init__(self, max_workers=GENERATION_WORKERS, kind_limits=None,
+                 per_user_limit=GENERATION_PER_USER_LIMIT, name="generator"):
+        super().__init__(
+            max_workers=max_workers,
+            platform_limits=kind_limits if kind_limits is not None else GENERATION_KIND_LIMITS,
+            per_user_limit=per_user_limit,
+            name=name,
+        )
+        self.cancelled = 0
+
+    def submit(self, func, kind, user_id=None, label='', on_error=None, reservation=None):
+        """
+        Поставить генерацию в очередь (пул запускается при первом задании).
+
+        func — функция без аргументов (functools.partial / lambda);
+        on_error(exception) вызывается в потоке воркера, если func упала;
+        reservation — TokenReservation: commit при успехе, refund при ошибке.
+        """
+        self.start()
+        job = GenerationJob(func, kind, user_id, label or kind, on_error=on_error, reservation=reservation)
+        with self._cond:
+            if self._stopped:
+                if reservation is not None:
+                    reservation.refund()
+                raise RuntimeError(f"{self.name} остановлен")
+            self._pending.append(job)
+            self._cond.notify()
+        logger.info(f"🧵 {self.name}: {job.label} в очереди (#{job.id}, перед ним {len(self._pending) - 1})")
+        return job
+
+    def cancel(self, job):
+        """Отменить задание, если оно ещё не началось. Returns: True если отменено"""
+        with self._cond:
+            if job not in self._pending:
+                return False
+            self._pending.remove(job)
+            self.cancelled += 1
+        self._drop(job)
+        return True
+
+    def shutdown(self, wait=False, timeout=5):
+        """Остановить воркеров; задания из очереди отменяются с возвратом токенов"""
+        with self._cond:
+            # Новые задания больше не принимаются: очередь пуста до super().shutdown
+            self._stopped = True
+            dropped = list(self._pending)
+            self._pending.clear()
+            self.cancelled += len(dropped)
+        for job in dropped:
+            self._drop(job)
+        if dropped:
+            logger.warning(f"⚠️ {self.name}: при остановке отменено {len(dropped)} генераций")
+        super().shutdown(wait=wait, timeout=timeout)
+
+    @staticmethod
+    def _drop(job):
+        """Завершить задание, снятое с очереди, и вернуть его резерв"""
+        job.status = 'cancelled'
+        job.finished_at = time.monotonic()
+        job._done.set()
+        if job.reservation is not None:
+            job.reservation.refund()
+
+    def user_jobs(self, user_id):
+        """Сколько генераций пользователя в очереди и в работе"""
+        with self._cond:
+            return sum(
+                1 for job in itertools.chain(self._pending, self._in_flight)
+                if job.user_id == user_id
+            )
+
+    def is_user_busy(self, user_id):
+        """Пользователь уже запустил максимум генераций"""
+        return self.user_jobs(user_id) >= GENERATION_MAX_JOBS_PER_USER
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats['cancelled'] = self.cancelled
+        return stats
+
+
+generation_executor = GenerationExecutor()
+
+
+def submit_generation(func, kind, user_id=None, label='', on_error=None, reservation=None):
+    """Отдать тяжёлую генерацию в пул (см. GenerationExecutor.submit)"""
+    return generation_executor.submit(
+        func, kind, user_id=user_id, label=label, on_error=on_error, reservation=reservation
+    )
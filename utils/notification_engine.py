@@ -0,0 +1,126 @@
+"""
+Автоматические уведомления (низкий баланс, реактивация, новости недели)
+
+Запуск по расписанию (handlers/notification_scheduler.py):
+  - получатели выбираются пачками по user_id одним запросом на пачку:
+    условие типа + anti-join по notification_log, поэтому получившие
+    уведомление в пределах паузы (NOTIFICATION_COOLDOWNS) не выбираются,
+    а выбранные сразу записываются в журнал со статусом pending —
+    повторный или параллельный запуск их не возьмёт;
+  - скорость — token bucket (NOTIFICATION_RATE сообщений в секунду),
+    пачку отправляет пул из NOTIFICATION_WORKERS потоков;
+  - отправка — общий с рассылками send_with_retry: 429 — пауза bucket
+    на retry_after и повтор, 403 — пользователь помечается
+    users.is_blocked и исключается из следующих запусков;
+  - результаты пачки пишутся в БД одним запросом.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    NOTIFICATION_RATE, NOTIFICATION_WORKERS, NOTIFICATION_BATCH_SIZE,
+    NOTIFICATION_COOLDOWNS, NOTIFICATION_LOG_RETENTION_DAYS
+)
+from utils.broadcast_engine import send_with_retry
+from utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationEngine:
+    """
+    Отправка уведомлений по журналу notification_log
+
+    renderers: {тип: функция(строка получателя) -> текст HTML}
+    """
+
+    def __init__(self, bot, renderers, rate=NOTIFICATION_RATE, workers=NOTIFICATION_WORKERS,
+                 batch_size=NOTIFICATION_BATCH_SIZE, cooldowns=NOTIFICATION_COOLDOWNS):
+        self.bot = bot
+        self.renderers = renderers
+        self.cooldowns = cooldowns
+        self.batch_size = batch_size
+        self.bucket = TokenBucket(rate, capacity=rate)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='notification-send')
+        self._run_lock = threading.Lock()
+
+        self.rate_limited = 0
+
+    def run(self, notification_types=None):
+        """
+        Отправить уведомления указанных типов (по умолчанию — всех известных)
+
+        Returns:
+            dict: {тип: {'sent', 'failed', 'blocked'}} или None, если запуск уже идёт
+        """
+        from database.database import db
+
+        if not self._run_lock.acquire(blocking=False):
+            logger.warning("⚠️ Отправка уведомлений уже выполняется, запуск пропущен")
+            return None
+        try:
+            db.update_stale_notifications()
+            stats = {}
+            for notification_type in notification_types or list(self.renderers):
+                if notification_type not in self.renderers or notification_type not in self.cooldowns:
+                    logger.info(f"ℹ️ Уведомления '{notification_type}' не рассылаются по расписанию")
+                    continue
+                stats[notification_type] = self._run_type(db, notification_type)
+                logger.info(f"📨 Уведомления {notification_type}: {stats[notification_type]}")
+
+            db.delete_old_notification_log(NOTIFICATION_LOG_RETENTION_DAYS)
+            return stats
+        finally:
+            self._run_lock.release()
+
+    def _run_type(self, db, notification_type):
+        counts = {'sent': 0, 'failed': 0, 'blocked': 0}
+        cursor = 0
+        while True:
+            rows = db.claim_notification_recipients(
+                notification_type, self.cooldowns[notification_type], cursor, self.batch_size
+            )
+            if not rows:
+                break
+            cursor = rows[-1]['user_id']
+            # Пачка может оказаться пустой, если всех взял параллельный запуск
+            recipients = [row for row in rows if row['log_id'] is not None]
+            if not recipients:
+                continue
+
+            results = list(self._pool.map(
+                lambda recipient: self._send(notification_type, recipient), recipients
+            ))
+            db.update_notification_results(results)
+            for _, _, status, _ in results:
+                counts[status] += 1
+        return counts
+
+    def _send(self, notification_type, recipient):
+        """Отправить одному получателю. Returns: (log_id, user_id, status, error)"""
+        log_id, user_id = recipient['log_id'], recipient['user_id']
+        try:
+            text = self.renderers[notification_type](recipient)
+        except Exception as e:
+            logger.error(f"❌ Ошибка подготовки уведомления {notification_type} для {user_id}: {e}")
+            return log_id, user_id, 'failed', e
+
+        status, error = send_with_retry(
+            self.bucket,
+            lambda: self.bot.send_message(user_id, text, parse_mode='HTML'),
+            on_rate_limited=self._count_rate_limited
+        )
+        return log_id, user_id, status, error
+
+    def _count_rate_limited(self):
+        self.rate_limited += 1
+
+    def get_stats(self):
+        return {
+            'sent_tokens': self.bucket.acquired,
+            'waited_seconds': self.bucket.waited_seconds,
+            'rate_limited': self.rate_limited,
+        }
+
+
+print("✅ utils/notification_engine.py загружен")
@@ -0,0 +1,186 @@
+"""
+Пул воркеров для публикаций по расписанию
+
+Ограничения:
+  - max_workers одновременных публикаций всего;
+  - platform_limits — на тип платформы (website, telegram, ...);
+  - per_user_limit — на одного пользователя, чтобы один клиент с 50 категориями
+    не занимал весь пул.
+
+Задание, упёршееся в лимит платформы или пользователя, остаётся в очереди,
+а воркер берёт следующее подходящее (порядок FIFO среди допустимых).
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from utils.state_store import flush_thread_states
+
+logger = logging.getLogger(__name__)
+
+
+class PublicationJob:
+    """Задание на публикацию"""
+
+    __slots__ = ('func', 'platform', 'user_id', 'label', 'enqueued_at', 'started_at')
+
+    def __init__(self, func, platform, user_id, label):
+        self.func = func
+        self.platform = platform
+        self.user_id = user_id
+        self.label = label
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+
+
+class PublicationWorkerPool:
+    """Ограниченный пул потоков с лимитами по платформе и пользователю"""
+
+    def __init__(self, max_workers=4, platform_limits=None, per_user_limit=2, name="publisher"):
+        self.max_workers = max(1, max_workers)
+        self.platform_limits = platform_limits or {}
+        self.per_user_limit = per_user_limit
+        self.name = name
+
+        self._pending = deque()
+        self._running_by_platform = defaultdict(int)
+        self._running_by_user = defaultdict(int)
+        self._in_flight = []
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+        # Метрики
+        self.completed = 0
+        self.failed = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            self._stopped = False
+            for index in range(self.max_workers):
+                thread = threading.Thread(
+                    target=self._worker, name=f"{self.name}-{index + 1}", daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+
+    def shutdown(self, wait=False, timeout=5):
+        """Остановить воркеров; невыполненные задания отбрасываются"""
+        with self._cond:
+            self._stopped = True
+            dropped = len(self._pending)
+            self._pending.clear()
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        if dropped:
+            logger.warning(f"⚠️ {self.name}: отброшено {dropped} заданий из очереди")
+        if wait:
+            for thread in threads:
+                thread.join(timeout=timeout)
+
+    def submit(self, func, platform, user_id=None, label=''):
+        """Поставить публикацию в очередь"""
+        job = PublicationJob(func, platform, user_id, label)
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError(f"{self.name} остановлен")
+            self._pending.append(job)
+            self._cond.notify()
+        return job
+
+    # ─────────────────────────────────────────────────────────────
+    # Воркеры
+    # ─────────────────────────────────────────────────────────────
+
+    def _can_start(self, job):
+        limit = self.platform_limits.get(job.platform)
+        if limit is not None and self._running_by_platform[job.platform] >= limit:
+            return False
+        if (job.user_id is not None and self.per_user_limit
+                and self._running_by_user[job.user_id] >= self.per_user_limit):
+            return False
+        return True
+
+    def _take_job(self):
+        """Первое задание, для которого есть свободные слоты (под блокировкой)"""
+        for job in self._pending:
+            if self._can_start(job):
+                self._pending.remove(job)
+                self._running_by_platform[job.platform] += 1
+                if job.user_id is not None:
+                    self._running_by_user[job.user_id] += 1
+                job.started_at = time.monotonic()
+                self._in_flight.append(job)
+                return job
+        return None
+
+    def _finish_job(self, job, success):
+        with self._cond:
+            self._running_by_platform[job.platform] -= 1
+            if job.user_id is not None:
+                self._running_by_user[job.user_id] -= 1
+                if not self._running_by_user[job.user_id]:
+                    del self._running_by_user[job.user_id]
+            self._in_flight.remove(job)
+            self._total_wait += job.started_at - job.enqueued_at
+            self._total_run += time.monotonic() - job.started_at
+            if success:
+                self.completed += 1
+            else:
+                self.failed += 1
+            # Освободились слоты — задания, ждавшие лимита, могут стартовать
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopped:
+                    job = self._take_job()
+                    if job is not None:
+                        break
+                    self._cond.wait()
+                if job is None:
+                    return
+
+            success = False
+            try:
+                job.func()
+                success = True
+            except Exception as e:
+                logger.error(f"❌ {self.name}: ошибка задания {job.label}: {e}")
+            finally:
+                self._finish_job(job, success)
+                flush_thread_states()
+                # Соединение db.cursor / db.conn задания — обратно в пул
+                from database.database import db
+                db.release_thread_connection()
+
+    # ─────────────────────────────────────────────────────────────
+    # Метрики
+    # ─────────────────────────────────────────────────────────────
+
+    def get_stats(self):
+        """Глубина очереди, выполняющиеся задания и средние времена"""
+        with self._cond:
+            finished = self.completed + self.failed
+            now = time.monotonic()
+            oldest_wait = max((now - job.enqueued_at for job in self._pending), default=0.0)
+            return {
+                'workers': self.max_workers,
+                'queue_depth': len(self._pending),
+                'in_flight': len(self._in_flight),
+                'in_flight_by_platform': {
+                    platform: count
+                    for platform, count in self._running_by_platform.items() if count
+                },
+                'completed': self.completed,
+                'failed': self.failed,
+                'oldest_wait_seconds': oldest_wait,
+                'avg_wait_seconds': self._total_wait / finished if finished else 0.0,
+                'avg_run_seconds': self._total_run / finished if finished else 0.0,
+            }
@@ -0,0 +1,108 @@
+"""
+Ограничение частоты запросов к внешним API (token bucket)
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Классический token bucket: rate токенов в секунду, не больше capacity.
+    acquire() блокирует поток до появления токена (или до timeout).
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Взять токен без ожидания; вернуть секунды до следующей попытки (0 = взят)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.acquired += 1
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1, timeout=None):
+        """Дождаться токена. Returns: True если взят, False по timeout"""
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0.0:
+                self.waited_seconds += time.monotonic() - started
+                return True
+            if timeout is not None and time.monotonic() + wait - started > timeout:
+                return False
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Не выдавать токены seconds секунд (например, по retry_after от API)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class ProviderRateLimiter:
+    """
+    Набор token bucket по провайдерам (anthropic, gemini, wordpress, vk, telegram).
+    Неизвестный провайдер не ограничивается.
+    """
+
+    def __init__(self, limits):
+        """
+        Args:
+            limits: {provider: (запросов в минуту, burst)}
+        """
+        self._buckets = {
+            provider: TokenBucket(per_minute / 60.0, burst)
+            for provider, (per_minute, burst) in limits.items()
+        }
+
+    def acquire(self, provider, timeout=None):
+        bucket = self._buckets.get(provider)
+        if bucket is None:
+            return True
+        return bucket.acquire(timeout=timeout)
+
+    def pause(self, provider, seconds):
+        bucket = self._buckets.get(provider)
+        if bucket is not None:
+            bucket.pause(seconds)
+
+    def get_stats(self):
+        return {
+            provider: {
+                'per_minute': round(bucket.rate * 60),
+                'acquired': bucket.acquired,
+                'waited_seconds': bucket.waited_seconds,
+            }
+            for provider, bucket in self._buckets.items()
+        }
+
+
+def _create_provider_limiter():
+    from config import PROVIDER_RATE_LIMITS
+    return ProviderRateLimiter(PROVIDER_RATE_LIMITS)
+
+
+# Глобальные лимиты на процесс: общие для планировщика и интерактивных обработчиков
+provider_limiter = _create_provider_limiter()
+
+
+def rate_limit(provider, timeout=None):
+    """Дождаться разрешения на запрос к провайдеру"""
+    return provider_limiter.acquire(provider, timeout=timeout)
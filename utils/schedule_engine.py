@@ -0,0 +1,238 @@
+"""
+Движок расписания публикаций: min-heap ближайших срабатываний
+
+Время следующего срабатывания каждого расписания (schedule_days / schedule_times
+из platform_schedules) вычисляется один раз и кладётся в кучу. Планировщик
+забирает только наступившие задания — O(due) вместо перебора всех расписаний
+на каждом тике. Пропущенные слоты (простой, долгая публикация) догоняются
+по last_post_time, но не больше одного раза на расписание.
+"""
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+
+# Маппинг дней недели (поддержка сокращённого и полного формата)
+WEEKDAYS = {
+    'mon': 0, 'monday': 0,
+    'tue': 1, 'tuesday': 1,
+    'wed': 2, 'wednesday': 2,
+    'thu': 3, 'thursday': 3,
+    'fri': 4, 'friday': 4,
+    'sat': 5, 'saturday': 5,
+    'sun': 6, 'sunday': 6,
+}
+
+# Слоты старше этого окна при догоне пропускаются
+DEFAULT_CATCHUP_WINDOW = timedelta(hours=6)
+
+# Слот текущей минуты для ещё ни разу не публиковавшегося расписания
+NEW_SCHEDULE_GRACE = timedelta(minutes=1)
+
+
+def parse_days(days):
+    """Дни недели -> множество номеров (0 = понедельник); пусто = каждый день"""
+    weekdays = set()
+    for day in days or []:
+        number = WEEKDAYS.get(str(day).strip().lower())
+        if number is not None:
+            weekdays.add(number)
+    return weekdays or set(range(7))
+
+
+def parse_times(times):
+    """Строки "HH:MM" -> отсортированный список (час, минута)"""
+    parsed = set()
+    for time_str in times or []:
+        try:
+            hour, minute = map(int, str(time_str).split(':'))
+            if 0 <= hour < 24 and 0 <= minute < 60:
+                parsed.add((hour, minute))
+        except ValueError:
+            continue
+    return sorted(parsed)
+
+
+def next_slot_after(moment, weekdays, times):
+    """Первый слот расписания строго позже moment (None если слотов нет)"""
+    if not times:
+        return None
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset in range(8):
+        current = day + timedelta(days=offset)
+        if current.weekday() not in weekdays:
+            continue
+        for hour, minute in times:
+            slot = current.replace(hour=hour, minute=minute)
+            if slot > moment:
+                return slot
+    return None
+
+
+def latest_slot_between(after, until, weekdays, times):
+    """Последний слот в интервале (after, until] (None если нет)"""
+    if not times or after >= until:
+        return None
+    day = until.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day + timedelta(days=1) > after:
+        if day.weekday() in weekdays:
+            for hour, minute in reversed(times):
+                slot = day.replace(hour=hour, minute=minute)
+                if after < slot <= until:
+                    return slot
+        day -= timedelta(days=1)
+    return None
+
+
+class ScheduleEntry:
+    """Одно расписание (category_id, platform_type, platform_id)"""
+
+    __slots__ = ('key', 'schedule_id', 'weekdays', 'times', 'posts_per_day', 'next_fire', 'version')
+
+    def __init__(self, key, weekdays, times, posts_per_day=1, schedule_id=None):
+        self.key = key
+        self.schedule_id = schedule_id
+        self.weekdays = weekdays
+        self.times = times
+        self.posts_per_day = posts_per_day
+        self.next_fire = None
+        self.version = 0
+
+    @property
+    def category_id(self):
+        return self.key[0]
+
+    @property
+    def platform_type(self):
+        return self.key[1]
+
+    @property
+    def platform_id(self):
+        return self.key[2]
+
+
+class ScheduleEngine:
+    """
+    Куча (next_fire, seq, key, version).
+
+    Изменённые/удалённые расписания не удаляются из кучи: устаревшие элементы
+    отбрасываются при извлечении по несовпадению version (ленивое удаление).
+    """
+
+    def __init__(self, catchup_window=DEFAULT_CATCHUP_WINDOW):
+        self.catchup_window = catchup_window
+        self._heap = []
+        self._entries = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(category_id, platform_type, platform_id):
+        return (int(category_id), str(platform_type), str(platform_id))
+
+    # ─────────────────────────────────────────────────────────────
+    # Загрузка расписаний
+    # ─────────────────────────────────────────────────────────────
+
+    def load(self, rows, now=None):
+        """Полная синхронизация с таблицей: rows — включённые расписания"""
+        now = now or datetime.now()
+        with self._lock:
+            seen = set()
+            for row in rows:
+                seen.add(self._upsert_locked(row, now))
+            for key in list(self._entries):
+                if key not in seen:
+                    del self._entries[key]
+            self._compact_locked()
+
+    def upsert(self, row, now=None):
+        """Добавить или пересчитать одно расписание (после изменения в БД)"""
+        now = now or datetime.now()
+        with self._lock:
+            self._upsert_locked(row, now)
+
+    def remove(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _upsert_locked(self, row, now):
+        key = self.make_key(row['category_id'], row['platform_type'], row['platform_id'])
+        entry = self._entries.get(key)
+        version = entry.version + 1 if entry else 0
+
+        entry = ScheduleEntry(
+            key,
+            parse_days(row.get('schedule_days')),
+            parse_times(row.get('schedule_times')),
+            row.get('posts_per_day') or 1,
+            schedule_id=row.get('id'),
+        )
+        entry.version = version
+        self._entries[key] = entry
+
+        last_post_time = row.get('last_post_time')
+        threshold = last_post_time or (now - NEW_SCHEDULE_GRACE)
+        self._schedule_locked(entry, threshold, now)
+        return key
+
+    # ─────────────────────────────────────────────────────────────
+    # Вычисление срабатываний
+    # ─────────────────────────────────────────────────────────────
+
+    def _schedule_locked(self, entry, threshold, now):
+        """
+        Пропущенный слот в (threshold, now] в пределах окна догона
+        срабатывает немедленно (один раз), иначе — следующий слот.
+        """
+        oldest = now - self.catchup_window
+        missed = latest_slot_between(max(threshold, oldest), now, entry.weekdays, entry.times)
+        entry.next_fire = missed or next_slot_after(now, entry.weekdays, entry.times)
+        if entry.next_fire is not None:
+            heapq.heappush(self._heap, (entry.next_fire, next(self._seq), entry.key, entry.version))
+
+    def pop_due(self, now=None):
+        """Извлечь все наступившие срабатывания: список (entry, slot)"""
+        now = now or datetime.now()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                slot, _, key, version = heapq.heappop(self._heap)
+                entry = self._entries.get(key)
+                if entry is None or entry.version != version:
+                    continue
+                entry.next_fire = None
+                due.append((entry, slot))
+        return due
+
+    def reschedule(self, entry, fired_slot, now=None):
+        """Запланировать следующее срабатывание после выполненного слота"""
+        now = now or datetime.now()
+        with self._lock:
+            current = self._entries.get(entry.key)
+            # Расписание удалили или изменили во время публикации
+            if current is not entry or entry.next_fire is not None:
+                return
+            self._schedule_locked(entry, fired_slot, now)
+
+    def next_fire_time(self):
+        """Время ближайшего актуального срабатывания (None если пусто)"""
+        with self._lock:
+            while self._heap:
+                slot, _, key, version = self._heap[0]
+                entry = self._entries.get(key)
+                if entry is not None and entry.version == version:
+                    return slot
+                heapq.heappop(self._heap)
+        return None
+
+    def _compact_locked(self):
+        """Пересобрать кучу без устаревших элементов"""
+        self._heap = [
+            item for item in self._heap
+            if item[2] in self._entries and self._entries[item[2]].version == item[3]
+        ]
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,25 +1,465 @@
 # -*- coding: utf-8 -*-
 """
 Краулер для автоматического сбора внутренних ссылок сайта
+
+Обход параллельный, но вежливый:
+  - очередь — deque + множество уже увиденных URL;
+  - затравка — главная и URL из sitemap.xml (адреса из robots.txt,
+    sitemap index, .xml.gz) — только sitemap этого же сайта, не больше
+    SITEMAP_MAX_BYTES после распаковки;
+  - robots.txt: Disallow и Crawl-delay соблюдаются;
+  - до CRAWLER_CONCURRENCY запросов одновременно и не больше
+    CRAWLER_RATE в секунду на сайт;
+  - одна keep-alive сессия на обход;
+  - разбираются только <title>, заголовки, абзацы и <a href> (SoupStrainer),
+    парсер lxml, если установлен; из текста считаются термы для подбора
+    внутренних ссылок по ключевому слову (utils/text_relevance.py).
+
+Результаты сохраняются в индекс сайта (site_pages, utils/site_index.py).
+Повторный обход проверяет только изменившиеся страницы: страница с тем же
+lastmod в sitemap не запрашивается вовсе, остальные запрашиваются с
+If-None-Match / If-Modified-Since, а при том же хэше HTML не разбираются.
 """
+import hashlib
+import zlib
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+from xml.etree import ElementTree
 import time
 import logging
+from config import (
+    CRAWLER_CONCURRENCY, CRAWLER_RATE, CRAWLER_REQUEST_TIMEOUT, CRAWLER_SITEMAP_MAX_URLS
+)
+from utils.rate_limiter import TokenBucket
+from utils.site_index import site_key
+from utils.text_relevance import page_terms
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Приоритетные пути (важные разделы)
+PRIORITY_KEYWORDS = [
+    'услуг', 'товар', 'продукт', 'категор', 'о-компани', 'about',
+    'контакт', 'contact', 'цен', 'price', 'портфол', 'portfolio',
+    'проект', 'work', 'отзыв', 'review'
+]
+
+# Игнорируемые пути
+IGNORE_PATTERNS = [
+    'wp-admin', 'wp-login', 'wp-content', 'wp-includes',
+    'admin', 'login', 'register', 'cart', 'checkout',
+    'search', 'feed', 'rss', 'sitemap.xml', 'robots.txt',
+    '.jpg', '.png', '.gif', '.pdf', '.zip', '.css', '.js'
+]
+
+# Вложенных sitemap (sitemap index) читаем не больше
+SITEMAP_MAX_FILES = 20
+# Размер одного sitemap (и после распаковки .gz) — лимит протокола sitemaps
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+
+_PAGE_STRAINER = SoupStrainer(['title', 'h1', 'h2', 'h3', 'p', 'li', 'a'])
+
+
+def _host(netloc):
+    """Хост без www. — example.com и www.example.com считаются одним сайтом"""
+    host = netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def _read_sitemap(response):
+    """Тело sitemap (распакованное, если .gz) или None, если больше SITEMAP_MAX_BYTES"""
+    content = bytearray()
+    for chunk in response.iter_content(64 * 1024):
+        content += chunk
+        if len(content) > SITEMAP_MAX_BYTES:
+            return None
+    content = bytes(content)
+    if content[:2] == b'\x1f\x8b':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        content = decompressor.decompress(content, SITEMAP_MAX_BYTES + 1)
+        if len(content) > SITEMAP_MAX_BYTES or decompressor.unconsumed_tail:
+            return None
+    return content
+
+
+class SiteCrawler:
+    """Один обход сайта: очередь, robots.txt, sitemap и пул запросов"""
+
+    def __init__(self, base_url, max_pages=50, timeout=30, known_pages=None,
+                 concurrency=CRAWLER_CONCURRENCY, rate=CRAWLER_RATE):
+        self.base_url = base_url
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.rate = rate
+        self.domain = _host(urlparse(base_url).netloc)
+        self.home_url = self.normalize_url(base_url, base_url)
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.robots = None
+        self.bucket = None
+        self.frontier = deque()
+        self.seen = set()
+        self.links = []
+        self.deadline = None
+
+        # Страницы из индекса (прошлый обход) и lastmod из sitemap
+        self.known = {page['url']: page for page in known_pages or []}
+        self.sitemap_lastmod = {}
+        # Результат для индекса: все обработанные страницы и исчезнувшие URL
+        self.pages = []
+        self.gone = []
+        self.site_colors = None
+
+        self.requested = 0
+        self.not_modified = 0
+        self.changed = 0
+        self.sitemap_urls = 0
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def normalize_url(self, url, base):
+        """Абсолютный URL без якоря и параметров; None — чужой домен или игнорируемый путь"""
+        absolute_url = urljoin(base, url.strip())
+        parsed = urlparse(absolute_url)
+        if parsed.scheme not in ('http', 'https') or _host(parsed.netloc) != self.domain:
+            return None
+        clean_url = absolute_url.split('#')[0].split('?')[0]
+        if not parsed.path:
+            clean_url += '/'
+        if any(pattern in clean_url.lower() for pattern in IGNORE_PATTERNS):
+            return None
+        return clean_url
+
+    def is_own_sitemap(self, url):
+        """Sitemap этого же сайта (адреса из robots.txt и sitemap index не проверены)"""
+        parsed = urlparse(url)
+        return parsed.scheme in ('http', 'https') and _host(parsed.netloc) == self.domain
+
+    def enqueue(self, url):
+        if url and url not in self.seen:
+            self.seen.add(url)
+            self.frontier.append(url)
+            return True
+        return False
+
+    # ─────────────────────────────────────────────────────────────
+    # robots.txt и sitemap
+    # ─────────────────────────────────────────────────────────────
+
+    def load_robots(self):
+        """robots.txt: правила обхода, Crawl-delay и адреса sitemap"""
+        self.robots = RobotFileParser()
+        lines = []
+        try:
+            response = self.session.get(
+                urljoin(self.home_url, '/robots.txt'), timeout=CRAWLER_REQUEST_TIMEOUT
+            )
+            if response.status_code == 200:
+                lines = response.text.splitlines()
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ robots.txt недоступен: {e}")
+        self.robots.parse(lines)
+
+        rate = self.rate
+        delay = self.robots.crawl_delay('*')
+        if delay:
+            rate = min(rate, 1 / float(delay))
+            print(f"🐢 Crawl-delay {delay}с из robots.txt")
+        self.bucket = TokenBucket(rate, capacity=min(self.concurrency, max(1, rate)))
+
+        return self.robots.site_maps() or [
+            urljoin(self.home_url, '/sitemap.xml'),
+            urljoin(self.home_url, '/sitemap_index.xml'),
+        ]
+
+    def load_sitemaps(self, sitemap_urls):
+        """Добавить в очередь страницы из sitemap (с обходом sitemap index)"""
+        pending = deque(sitemap_urls)
+        fetched = set()
+
+        while pending and len(fetched) < SITEMAP_MAX_FILES and self.sitemap_urls < CRAWLER_SITEMAP_MAX_URLS:
+            if self.remaining() <= 0:
+                break
+            sitemap_url = pending.popleft()
+            if sitemap_url in fetched:
+                continue
+            if not self.is_own_sitemap(sitemap_url):
+                print(f"⚠️ Sitemap {sitemap_url} с другого сайта — пропуск")
+                continue
+            fetched.add(sitemap_url)
+
+            try:
+                with self.session.get(
+                    sitemap_url, timeout=min(CRAWLER_REQUEST_TIMEOUT, max(1, self.remaining())), stream=True
+                ) as response:
+                    # Редирект на другой сайт тоже не читаем
+                    if response.status_code != 200 or not self.is_own_sitemap(response.url):
+                        continue
+                    content = _read_sitemap(response)
+                if content is None:
+                    print(f"⚠️ Sitemap {sitemap_url} больше {SITEMAP_MAX_BYTES // (1024 * 1024)} МБ — пропуск")
+                    continue
+                root = ElementTree.fromstring(content)
+            except (requests.exceptions.RequestException, ElementTree.ParseError, zlib.error, OSError) as e:
+                print(f"⚠️ Sitemap {sitemap_url} не прочитан: {e}")
+                continue
+
+            for element in root:
+                tag = element.tag.rsplit('}', 1)[-1]
+                fields = {child.tag.rsplit('}', 1)[-1]: (child.text or '').strip() for child in element}
+                loc = fields.get('loc')
+                if not loc:
+                    continue
+                if tag == 'sitemap':
+                    pending.append(loc)
+                elif tag == 'url':
+                    url = self.normalize_url(loc, sitemap_url)
+                    if url and fields.get('lastmod'):
+                        self.sitemap_lastmod[url] = fields['lastmod']
+                    if self.enqueue(url):
+                        self.sitemap_urls += 1
+                        if self.sitemap_urls >= CRAWLER_SITEMAP_MAX_URLS:
+                            break
+
+        if self.sitemap_urls:
+            print(f"🗺 Из sitemap добавлено страниц: {self.sitemap_urls}")
+
+    # ─────────────────────────────────────────────────────────────
+    # Загрузка страниц
+    # ─────────────────────────────────────────────────────────────
+
+    def fetch_page(self, url):
+        """
+        Загрузить и разобрать страницу (выполняется в пуле).
+        Returns: dict страницы для индекса, {'url', 'gone': True} для 404 / 410, или None
+        """
+        known = self.known.get(url)
+        lastmod = self.sitemap_lastmod.get(url)
+        if known is not None and known.get('terms') is None:
+            # Проиндексирована до подсчёта термов — загружаем и разбираем заново
+            known = None
+
+        # lastmod в sitemap не изменился — страницу не запрашиваем
+        if known and lastmod and known.get('sitemap_lastmod') == lastmod and known.get('content_hash'):
+            self.not_modified += 1
+            return self._known_page(known, lastmod)
+
+        if not self.bucket.acquire(timeout=max(0, self.remaining())):
+            return None
+
+        headers = {}
+        if known:
+            if known.get('etag'):
+                headers['If-None-Match'] = known['etag']
+            if known.get('last_modified'):
+                headers['If-Modified-Since'] = known['last_modified']
+
+        try:
+            response = self.session.get(
+                url,
+                headers=headers,
+                timeout=min(CRAWLER_REQUEST_TIMEOUT, max(1, self.remaining())),
+                allow_redirects=True
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Ошибка запроса {url}: {e}")
+            return None
+
+        if response.status_code == 304 and known:
+            self.not_modified += 1
+            return self._known_page(known, lastmod)
+
+        if response.status_code in (404, 410):
+            return {'url': url, 'gone': True}
+
+        # Проверка статуса
+        if response.status_code != 200:
+            print(f"⚠️ Пропуск {url}: статус {response.status_code}")
+            return None
+
+        if 'html' not in response.headers.get('Content-Type', 'text/html'):
+            return None
+
+        # Цвета оформления — по HTML главной, отдельный запрос не нужен
+        if url == self.home_url:
+            from handlers.site_colors_detector import detect_colors_from_html
+            self.site_colors = detect_colors_from_html(response.text)
+
+        content_hash = hashlib.sha1(response.content).hexdigest()
+        if known and known.get('content_hash') == content_hash:
+            # Тот же HTML (сервер без ETag) — разбор не нужен
+            self.not_modified += 1
+            page = self._known_page(known, lastmod)
+            page['etag'] = response.headers.get('ETag')
+            page['last_modified'] = response.headers.get('Last-Modified')
+            return page
+
+        try:
+            soup = BeautifulSoup(response.content, HTML_PARSER, parse_only=_PAGE_STRAINER)
+        except Exception as e:
+            print(f"⚠️ Ошибка парсинга {url}: {e}")
+            return None
+
+        # Получаем title страницы
+        title_tag = soup.find('title')
+        page_title = title_tag.get_text().strip() if title_tag else url
+
+        # Термы для подбора ссылок по ключевому слову
+        headings = [tag.get_text(' ', strip=True) for tag in soup.find_all(['h1', 'h2', 'h3'])]
+        body = ' '.join(tag.get_text(' ', strip=True) for tag in soup.find_all(['p', 'li']))
+        terms, doc_length = page_terms(page_title, headings, body)
+
+        # Ссылки относительно конечного адреса (после редиректов)
+        links = []
+        for link in soup.find_all('a', href=True):
+            clean_url = self.normalize_url(link['href'], response.url)
+            if clean_url:
+                links.append(clean_url)
+
+        self.changed += 1
+        return {
+            'url': url,
+            'title': page_title,
+            'links': list(dict.fromkeys(links)),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sitemap_lastmod': lastmod,
+            'content_hash': content_hash,
+            'terms': terms,
+            'doc_length': doc_length
+        }
+
+    @staticmethod
+    def _known_page(known, lastmod):
+        """Страница из индекса без изменений (lastmod обновляется из sitemap)"""
+        return {
+            'url': known['url'],
+            'title': known.get('title') or known['url'],
+            'links': known.get('links') or [],
+            'etag': known.get('etag'),
+            'last_modified': known.get('last_modified'),
+            'sitemap_lastmod': lastmod or known.get('sitemap_lastmod'),
+            'content_hash': known.get('content_hash'),
+            'terms': known.get('terms'),
+            'doc_length': known.get('doc_length') or 0
+        }
+
+    def handle_page(self, page):
+        url = page['url']
+        if page.get('gone'):
+            if url in self.known:
+                self.gone.append(url)
+            return
+        page_title = page['title']
+
+        # Определяем приоритет
+        priority = 1  # Обычная страница
+        url_lower = url.lower()
+
+        # Повышенный приоритет для важных разделов
+        for keyword in PRIORITY_KEYWORDS:
+            if keyword in url_lower or keyword in page_title.lower():
+                priority = 2
+                break
+
+        # Главная страница - максимальный приоритет
+        if url == self.home_url:
+            priority = 3
+        else:  # Не добавляем главную
+            self.links.append({
+                'url': url,
+                'title': page_title[:100],  # Обрезаем длинные заголовки
+                'priority': priority
+            })
+
+        page['priority'] = priority
+        self.pages.append(page)
+
+        print(f"✅ [{self.requested}/{self.max_pages}] {url[:60]}... (приоритет: {priority})")
+
+        # Ищем новые ссылки на странице
+        for link in page['links']:
+            self.enqueue(link)
+
+    # ─────────────────────────────────────────────────────────────
+    # Обход
+    # ─────────────────────────────────────────────────────────────
+
+    def crawl(self):
+        self.deadline = time.monotonic() + self.timeout
+        sitemap_urls = self.load_robots()
+        self.enqueue(self.home_url)
+
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawler')
+        in_flight = set()
+        sitemaps_loaded = False
+        try:
+            while True:
+                # Заполняем пул до concurrency запросов
+                while (self.frontier and len(in_flight) < self.concurrency
+                       and self.requested < self.max_pages and self.remaining() > 0):
+                    url = self.frontier.popleft()
+                    if not self.robots.can_fetch(USER_AGENT, url):
+                        continue
+                    self.requested += 1
+                    in_flight.add(pool.submit(self.fetch_page, url))
+
+                # sitemap читаем, пока грузится главная
+                if not sitemaps_loaded:
+                    sitemaps_loaded = True
+                    self.load_sitemaps(sitemap_urls)
+                    continue
+
+                if not in_flight:
+                    break
+                if self.remaining() <= 0:
+                    print(f"⏱ Достигнут таймаут {self.timeout}с")
+                    break
+
+                done, in_flight = wait(in_flight, timeout=self.remaining(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = future.result()
+                    if page:
+                        self.handle_page(page)
+        finally:
+            # Начатые запросы дожидаемся (их ограничивает таймаут запроса),
+            # иначе сессия закроется у них под ногами
+            pool.shutdown(wait=True, cancel_futures=True)
+            self.session.close()
+
+        # Сортируем по приоритету
+        self.links.sort(key=lambda x: x['priority'], reverse=True)
+        return self.links
+
 
 def crawl_website(base_url, max_pages=50, timeout=30):
     """
     Краулит сайт и собирает важные внутренние ссылки
-    
+
     Args:
         base_url: Базовый URL сайта (например, https://ecosteni.ru)
         max_pages: Максимум страниц для обхода
         timeout: Максимальное время выполнения (секунды)
-        
+
     Returns:
         dict: {
             'success': bool,
@@ -28,137 +468,37 @@ def crawl_website(base_url, max_pages=50, timeout=30):
         }
     """
     try:
-        start_time = time.time()
-        base_domain = urlparse(base_url).netloc
-        
-        visited = set()
-        to_visit = [base_url]
-        important_links = []
-        
-        # Приоритетные пути (важные разделы)
-        priority_keywords = [
-            'услуг', 'товар', 'продукт', 'категор', 'о-компани', 'about',
-            'контакт', 'contact', 'цен', 'price', 'портфол', 'portfolio',
-            'проект', 'work', 'отзыв', 'review'
-        ]
-        
-        # Игнорируемые пути
-        ignore_patterns = [
-            'wp-admin', 'wp-login', 'wp-content', 'wp-includes',
-            'admin', 'login', 'register', 'cart', 'checkout',
-            'search', 'feed', 'rss', 'sitemap.xml', 'robots.txt',
-            '.jpg', '.png', '.gif', '.pdf', '.zip', '.css', '.js'
-        ]
-        
         print(f"🕷 Начинаю краулинг: {base_url}")
         print(f"📊 Макс. страниц: {max_pages}, таймаут: {timeout}с")
-        
-        while to_visit and len(visited) < max_pages:
-            # Проверка таймаута
-            if time.time() - start_time > timeout:
-                print(f"⏱ Достигнут таймаут {timeout}с")
-                break
-            
-            current_url = to_visit.pop(0)
-            
-            # Пропускаем уже посещенные
-            if current_url in visited:
-                continue
-            
-            # Пропускаем игнорируемые пути
-            if any(pattern in current_url.lower() for pattern in ignore_patterns):
-                continue
-            
-            visited.add(current_url)
-            
-            try:
-                # Запрос страницы
-                response = requests.get(
-                    current_url,
-                    headers={
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                    },
-                    timeout=10,
-                    allow_redirects=True
-                )
-                
-                # Проверка статуса
-                if response.status_code != 200:
-                    print(f"⚠️ Пропуск {current_url}: статус {response.status_code}")
-                    continue
-                
-                # Парсинг HTML
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Получаем title страницы
-                title_tag = soup.find('title')
-                page_title = title_tag.get_text().strip() if title_tag else current_url
-                
-                # Определяем приоритет
-                priority = 1  # Обычная страница
-                url_lower = current_url.lower()
-                
-                # Повышенный приоритет для важных разделов
-                for keyword in priority_keywords:
-                    if keyword in url_lower or keyword in page_title.lower():
-                        priority = 2
-                        break
-                
-                # Главная страница - максимальный приоритет
-                if current_url == base_url or current_url == base_url + '/':
-                    priority = 3
-                
-                # Добавляем ссылку
-                if current_url != base_url:  # Не добавляем главную
-                    important_links.append({
-                        'url': current_url,
-                        'title': page_title[:100],  # Обрезаем длинные заголовки
-                        'priority': priority
-                    })
-                
-                print(f"✅ [{len(visited)}/{max_pages}] {current_url[:60]}... (приоритет: {priority})")
-                
-                # Ищем новые ссылки на странице
-                for link in soup.find_all('a', href=True):
-                    href = link.get('href')
-                    
-                    # Преобразуем относительные ссылки в абсолютные
-                    absolute_url = urljoin(current_url, href)
-                    
-                    # Проверяем что ссылка на тот же домен
-                    if urlparse(absolute_url).netloc == base_domain:
-                        # Убираем якоря и параметры
-                        clean_url = absolute_url.split('#')[0].split('?')[0]
-                        
-                        if clean_url not in visited and clean_url not in to_visit:
-                            to_visit.append(clean_url)
-                
-                # Небольшая задержка между запросами
-                time.sleep(0.5)
-                
-            except requests.exceptions.RequestException as e:
-                print(f"⚠️ Ошибка запроса {current_url}: {e}")
-                continue
-            except Exception as e:
-                print(f"⚠️ Ошибка парсинга {current_url}: {e}")
-                continue
-        
-        # Сортируем по приоритету
-        important_links.sort(key=lambda x: x['priority'], reverse=True)
-        
+
+        from database.database import db
+
+        started = time.time()
+        key = site_key(base_url)
+        crawler = SiteCrawler(
+            base_url, max_pages=max_pages, timeout=timeout,
+            known_pages=db.get_site_pages_list(key)
+        )
+        important_links = crawler.crawl()
+
+        # Сохраняем в индекс сайта
+        db.update_site_pages(key, crawler.pages)
+        db.delete_site_pages(key, crawler.gone)
+        db.update_site_profile(key, colors=crawler.site_colors, pages_total=len(crawler.pages))
+
         # Ограничиваем до топ-30
         important_links = important_links[:30]
-        
-        print(f"\n✅ Краулинг завершен!")
-        print(f"📊 Посещено страниц: {len(visited)}")
+
+        print(f"\n✅ Краулинг завершен за {time.time() - started:.1f}с!")
+        print(f"📊 Посещено страниц: {crawler.requested} (изменились: {crawler.changed}, без изменений: {crawler.not_modified})")
         print(f"🔗 Собрано важных ссылок: {len(important_links)}")
-        
+
         return {
             'success': True,
             'links': important_links,
-            'total_visited': len(visited)
+            'total_visited': crawler.requested
         }
-        
+
     except Exception as e:
         logger.error(f"❌ Ошибка краулинга: {e}")
         return {
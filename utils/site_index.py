@@ -0,0 +1,122 @@
+"""
+Индекс сайтов: страницы (site_pages) и профиль сайта (site_profiles)
+
+Краулер (utils/site_crawler.py) записывает сюда найденные страницы, а
+генерация статей читает внутренние ссылки и цвета оформления отсюда, не
+обращаясь к сайту клиента при каждой статье.
+
+Ссылки для статьи подбираются по ключевому слову: индекс BM25 сайта
+(utils/text_relevance.py) строится из site_pages.terms и хранится в памяти
+процесса, пока сайт не обойдут заново (site_profiles.crawled_at).
+
+Ключ сайта — site_key(url): хост без www. и путь без завершающего /,
+поэтому http/https и www-варианты одного сайта попадают в одну запись.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from config import SITE_COLORS_MAX_AGE_DAYS, ARTICLE_INTERNAL_LINKS_LIMIT, SITE_INDEX_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# site_key → (crawled_at, BM25Index)
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def site_key(url):
+    """Нормализованный ключ сайта для site_pages / site_profiles"""
+    url = (url or '').strip()
+    parsed = urlparse(url if '://' in url else f'https://{url}')
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return f"{host}{parsed.path.rstrip('/')}"
+
+
+def get_internal_links(site_url, limit=30):
+    """
+    Внутренние ссылки сайта из индекса
+
+    Returns:
+        list: [{'url', 'title', 'priority'}] (пусто, если сайт ещё не обходили)
+    """
+    from database.database import db
+    rows = db.get_site_links_list(site_key(site_url), limit) or []
+    return [
+        {'url': row['url'], 'title': row['title'] or row['url'], 'priority': row['priority']}
+        for row in rows
+    ]
+
+
+def _get_index(key):
+    """BM25-индекс сайта; перестраивается после нового обхода"""
+    from database.database import db
+    from utils.text_relevance import BM25Index
+
+    profile = db.get_site_profile(key)
+    version = profile.get('crawled_at') if profile else None
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached and cached[0] == version:
+            _indexes.move_to_end(key)
+            return cached[1]
+
+    index = BM25Index(db.get_site_terms_list(key) or [])
+    with _indexes_lock:
+        _indexes[key] = (version, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > SITE_INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def get_relevant_links(site_url, keyword, limit=ARTICLE_INTERNAL_LINKS_LIMIT):
+    """
+    Внутренние ссылки, релевантные ключевому слову статьи
+
+    Если ни одна страница не подходит — страницы с наибольшим приоритетом.
+
+    Returns:
+        list: [{'url', 'title', 'priority'}]
+    """
+    found = _get_index(site_key(site_url)).search(keyword, limit)
+    if not found:
+        return get_internal_links(site_url, limit)
+    return [
+        {'url': page['url'], 'title': page['title'] or page['url'], 'priority': page['priority']}
+        for score, page in found
+    ]
+
+
+def get_site_colors(site_url):
+    """
+    Цвета сайта из профиля; устаревшие (SITE_COLORS_MAX_AGE_DAYS) или
+    отсутствующие определяются заново и сохраняются
+
+    Returns:
+        dict: как handlers.site_colors_detector.detect_site_colors
+    """
+    from database.database import db
+    from handlers.site_colors_detector import fetch_site_colors, DEFAULT_COLORS
+
+    key = site_key(site_url)
+    profile = db.get_site_profile(key)
+    if profile and profile.get('colors') and profile.get('colors_detected_at'):
+        if datetime.now() - profile['colors_detected_at'] < timedelta(days=SITE_COLORS_MAX_AGE_DAYS):
+            return profile['colors']
+
+    colors = fetch_site_colors(site_url)
+    if colors:
+        db.update_site_profile(key, colors=colors)
+        return colors
+
+    # Сайт недоступен — прошлые цвета лучше цветов по умолчанию
+    if profile and profile.get('colors'):
+        return profile['colors']
+    return dict(DEFAULT_COLORS)
+
+
+print("✅ utils/site_index.py загружен")
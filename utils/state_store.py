@@ -0,0 +1,485 @@
+"""
+Хранилище состояний многошаговых диалогов
+
+Заменяет модульные словари вида keywords_state = {}: у каждого хранилища
+есть TTL ключа (брошенные диалоги удаляются) и ограничение размера
+(LRU), а интерфейс — обычный dict (in, [], get, pop, del), поэтому
+обработчики не меняются.
+
+Бэкенды (STATE_BACKEND):
+    memory   — только память процесса (по умолчанию)
+    postgres — таблица bot_state (UNLOGGED): состояние переживает рестарт
+               и общее для нескольких процессов бота
+
+С бэкендом postgres значения кэшируются в процессе и перечитываются из БД
+не чаще раза в STATE_SYNC_INTERVAL секунд. Запись [] = / del уходит в БД
+сразу. Изменения внутри значения (state['step'] = ...) записываются в конце
+обработки обновления (flush_thread_states — воркер очереди обновлений,
+роутер callback'ов, пулы заданий), до того как чат сможет взять другой
+процесс; остальное фоновый поток досылает раз в STATE_SYNC_INTERVAL.
+Такие записи — compare-and-set по updated_at: если другой процесс уже
+записал более новую версию, она не затирается, а перечитывается. Значение,
+вытесняемое из локального LRU, перед вытеснением записывается в БД.
+
+Значения хранятся в БД как JSON: только dict / list / str / числа / bool /
+None (сообщения — chat_id и message_id, а не объекты Message). Значение,
+которое не переживает JSON без изменений (кортежи, множества, нестроковые
+ключи dict), хранится только в памяти процесса.
+
+Использование:
+    keywords_state = StateStore('keywords', ttl=6 * 3600)
+    keywords_state[user_id] = {'step': 'survey'}
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from datetime import datetime
+from config import (
+    STATE_BACKEND, STATE_DEFAULT_TTL, STATE_MAX_SIZE,
+    STATE_SYNC_INTERVAL, STATE_SWEEP_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+# Отметка «ключа нет» (отрицательный кэш для бэкенда postgres)
+_MISSING = object()
+
+
+class MemoryStateBackend:
+    """Состояние только в памяти процесса"""
+
+    persistent = False
+    name = 'memory'
+
+
+class StateBackendError(Exception):
+    """БД недоступна: состояние неизвестно (не путать с «ключа нет»)"""
+
+
+class PostgresStateBackend:
+    """Состояние в таблице bot_state (см. миграцию 010_bot_state.sql)"""
+
+    persistent = True
+    name = 'postgres'
+
+    def load(self, namespace, key):
+        """Returns: (value_bytes, expires_at_timestamp, version) или None; StateBackendError при ошибке"""
+        from database.database import db
+        row = db.get_bot_state(namespace, key)
+        if row is None:
+            raise StateBackendError(f"{namespace}:{key}")
+        if row['value'] is None:
+            return None
+        # psycopg2 возвращает BYTEA как memoryview
+        return bytes(row['value']), row['expires_at'].timestamp(), row['updated_at']
+
+    def save(self, namespace, rows):
+        """
+        rows: [(key, value_bytes, expires_at_timestamp, expected_version)]
+        Returns: {key: version} записанных (конфликты отсутствуют) или None при ошибке
+        """
+        from database.database import db
+        written = db.update_bot_states(namespace, [
+            (key, blob, datetime.fromtimestamp(expires_at), version)
+            for key, blob, expires_at, version in rows
+        ])
+        return None if written is False else written
+
+    def delete(self, namespace, key):
+        from database.database import db
+        return db.delete_bot_state(namespace, key)
+
+    def cleanup(self, namespace, max_size):
+        from database.database import db
+        return db.delete_expired_bot_states(namespace, max_size) or 0
+
+
+def get_default_backend():
+    if STATE_BACKEND == 'postgres':
+        return PostgresStateBackend()
+    return MemoryStateBackend()
+
+
+class _Entry:
+    __slots__ = ('value', 'ttl', 'expires_at', 'checked_at', 'blob', 'version')
+
+    def __init__(self, value, ttl, expires_at, checked_at, blob=None, version=None):
+        self.value = value
+        self.ttl = ttl
+        self.expires_at = expires_at
+        self.checked_at = checked_at
+        # Снимок последней записанной в БД версии (для поиска изменений)
+        self.blob = blob
+        # updated_at строки bot_state, от которой получено значение (compare-and-set)
+        self.version = version
+
+
+class StateStore(MutableMapping):
+    """dict с TTL ключей, LRU-ограничением размера и подключаемым бэкендом"""
+
+    def __init__(self, namespace, ttl=STATE_DEFAULT_TTL, max_size=STATE_MAX_SIZE, backend=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_size = max_size
+        self.backend = backend if backend is not None else get_default_backend()
+        self._local = OrderedDict()
+        self._lock = threading.RLock()
+        self._last_sweep = time.time()
+        self._last_cleanup = 0.0
+        # Ключи, прочитанные / записанные текущим потоком с последнего flush_thread_states
+        self._touched = threading.local()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.sync_errors = 0
+        self.conflicts = 0
+
+        _register(self)
+
+    # ─────────────────────────────────────────────────────────────
+    # Интерфейс dict
+    # ─────────────────────────────────────────────────────────────
+
+    def __getitem__(self, key):
+        entry = self._entry(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry.value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if self._entry(key) is None:
+            raise KeyError(key)
+        now = time.time()
+        with self._lock:
+            if self.backend.persistent:
+                self._local[key] = _Entry(_MISSING, 0, 0, now)
+            else:
+                self._local.pop(key, None)
+        if self.backend.persistent:
+            self.backend.delete(self.namespace, self._dump_key(key))
+
+    def __contains__(self, key):
+        return self._entry(key) is not None
+
+    def __iter__(self):
+        """Ключи, известные этому процессу (живые записи локального кэша)"""
+        now = time.time()
+        with self._lock:
+            keys = [
+                key for key, entry in self._local.items()
+                if entry.value is not _MISSING and entry.expires_at > now
+            ]
+        return iter(keys)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def set(self, key, value, ttl=None):
+        """Записать значение; ttl (сек) переопределяет TTL хранилища для этого ключа"""
+        ttl = ttl or self.ttl
+        now = time.time()
+        blob = self._dump_value(value) if self.backend.persistent else None
+        entry = _Entry(value, ttl, now + ttl, now, blob)
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            evicted = self._evict()
+        self._touch(key)
+        if blob is not None:
+            dumped = self._dump_key(key)
+            written = self.backend.save(self.namespace, [(dumped, blob, entry.expires_at, None)])
+            if written is None:
+                self.sync_errors += 1
+            else:
+                entry.version = written.get(dumped)
+        self._flush_evicted(evicted)
+
+    # ─────────────────────────────────────────────────────────────
+    # Внутреннее
+    # ─────────────────────────────────────────────────────────────
+
+    def _entry(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None and entry.value is not _MISSING and entry.expires_at <= now:
+                del self._local[key]
+                self.expirations += 1
+                entry = None
+
+        if self.backend.persistent and (entry is None or now - entry.checked_at >= STATE_SYNC_INTERVAL):
+            if entry is None or not self._flush_entry(key, entry, reload=False):
+                entry = self._load(key, now, entry)
+
+        with self._lock:
+            if entry is None or entry.value is _MISSING:
+                self.misses += 1
+                return None
+            if key in self._local:
+                self._local.move_to_end(key)
+            self.hits += 1
+        self._touch(key)
+        return entry
+
+    def _load(self, key, now, current=None):
+        """
+        Перечитать ключ из БД (запись в локальный кэш, в т.ч. отрицательная).
+        При ошибке БД кэш не меняется: отсутствие ключа не запоминается.
+        """
+        try:
+            row = self.backend.load(self.namespace, self._dump_key(key))
+        except StateBackendError:
+            self.sync_errors += 1
+            logger.warning(f"⚠️ Состояние {self.namespace}:{key} не прочитано (ошибка БД)")
+            return current
+        if row is None:
+            entry = _Entry(_MISSING, 0, 0, now)
+        elif current is not None and current.value is not _MISSING and row[0] == current.blob:
+            # В БД та же версия — оставляем объект, который уже держат обработчики
+            current.expires_at = row[1]
+            current.version = row[2]
+            current.checked_at = now
+            return current
+        else:
+            blob, expires_at, version = row
+            try:
+                value = json.loads(blob)
+            except Exception as e:
+                logger.error(f"❌ Состояние {self.namespace}:{key} не читается: {e}")
+                value, blob = _MISSING, None
+            entry = _Entry(value, self.ttl, expires_at, now, blob, version)
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            evicted = self._evict()
+        self._flush_evicted(evicted)
+        return entry
+
+    def _evict(self):
+        """
+        LRU-вытеснение сверх max_size (под self._lock).
+        Returns: вытесненные значения, которые нужно записать в БД перед потерей
+        """
+        evicted = []
+        while len(self._local) > self.max_size:
+            key, entry = self._local.popitem(last=False)
+            self.evictions += 1
+            if self.backend.persistent and entry.value is not _MISSING:
+                evicted.append((key, entry))
+        return evicted
+
+    def _flush_evicted(self, evicted):
+        for key, entry in evicted:
+            self._flush_entry(key, entry, reload=False)
+
+    def _touch(self, key):
+        if not self.backend.persistent:
+            return
+        touched = getattr(self._touched, 'keys', None)
+        if touched is None:
+            touched = self._touched.keys = set()
+        touched.add(key)
+
+    def flush_touched(self):
+        """Записать изменения значений, которые читал / писал текущий поток"""
+        touched = getattr(self._touched, 'keys', None)
+        if not touched:
+            return
+        self._touched.keys = None
+        for key in touched:
+            with self._lock:
+                entry = self._local.get(key)
+            if entry is not None:
+                self._flush_entry(key, entry)
+
+    def _flush_entry(self, key, entry, reload=True):
+        """
+        Записать значение, если оно изменилось внутри (compare-and-set).
+        Returns: True если записано
+        """
+        if entry.value is _MISSING:
+            return False
+        blob = self._dump_value(entry.value)
+        if blob is None or blob == entry.blob:
+            return False
+        expires_at = time.time() + entry.ttl
+        dumped = self._dump_key(key)
+        written = self.backend.save(self.namespace, [(dumped, blob, expires_at, entry.version)])
+        if written is None:
+            self.sync_errors += 1
+            return False
+        if dumped not in written:
+            self._on_conflict(key, reload)
+            return False
+        entry.blob = blob
+        entry.expires_at = expires_at
+        entry.version = written[dumped]
+        entry.checked_at = time.time()
+        return True
+
+    def _on_conflict(self, key, reload=True):
+        """В БД версия новее (записал другой процесс или ключ удалён) — перечитываем её"""
+        self.conflicts += 1
+        logger.warning(f"⚠️ Состояние {self.namespace}:{key} изменено другим процессом, локальные изменения отброшены")
+        if reload:
+            self._load(key, time.time())
+
+    def _dump_key(self, key):
+        return json.dumps(key, ensure_ascii=False)
+
+    def _dump_value(self, value):
+        try:
+            blob = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        except (TypeError, ValueError) as e:
+            logger.error(f"❌ Состояние {self.namespace} не сериализуется в JSON, хранится только в памяти: {e}")
+            return None
+        if json.loads(blob) != value:
+            logger.error(
+                f"❌ Состояние {self.namespace} меняется при сериализации в JSON "
+                f"(кортежи, нестроковые ключи), хранится только в памяти"
+            )
+            return None
+        return blob
+
+    def sync(self):
+        """
+        Фоновое обслуживание: удалить просроченные ключи, записать изменённые
+        значения пачкой (postgres), раз в STATE_SWEEP_INTERVAL — почистить таблицу
+        """
+        now = time.time()
+        changed = []
+        with self._lock:
+            if now - self._last_sweep >= STATE_SWEEP_INTERVAL:
+                self._last_sweep = now
+                for key in [k for k, e in self._local.items()
+                            if e.expires_at <= now or (e.value is _MISSING and now - e.checked_at >= STATE_SYNC_INTERVAL)]:
+                    if self._local.pop(key).value is not _MISSING:
+                        self.expirations += 1
+            if self.backend.persistent:
+                for key, entry in self._local.items():
+                    if entry.value is _MISSING:
+                        continue
+                    blob = self._dump_value(entry.value)
+                    if blob is not None and blob != entry.blob:
+                        changed.append((key, entry, blob))
+
+        if not self.backend.persistent:
+            return
+        if changed:
+            expires = {key: now + entry.ttl for key, entry, _ in changed}
+            written = self.backend.save(self.namespace, [
+                (self._dump_key(key), blob, expires[key], entry.version)
+                for key, entry, blob in changed
+            ])
+            if written is None:
+                self.sync_errors += 1
+            else:
+                for key, entry, blob in changed:
+                    version = written.get(self._dump_key(key))
+                    if version is None:
+                        self._on_conflict(key)
+                        continue
+                    entry.blob = blob
+                    entry.expires_at = expires[key]
+                    entry.version = version
+        if now - self._last_cleanup >= STATE_SWEEP_INTERVAL:
+            self._last_cleanup = now
+            deleted = self.backend.cleanup(self.namespace, self.max_size)
+            if deleted:
+                logger.info(f"🧹 {self.namespace}: удалено состояний {deleted}")
+
+    def get_stats(self):
+        with self._lock:
+            cached = sum(1 for e in self._local.values() if e.value is not _MISSING)
+        total = self.hits + self.misses
+        return {
+            'namespace': self.namespace,
+            'backend': self.backend.name,
+            'size': cached,
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'sync_errors': self.sync_errors,
+            'conflicts': self.conflicts,
+        }
+
+
+# ─────────────────────────────────────────────────────────────
+# Реестр хранилищ и фоновый поток обслуживания
+# ─────────────────────────────────────────────────────────────
+
+_stores = {}
+_stores_lock = threading.Lock()
+_sync_thread = None
+
+
+def _register(store):
+    global _sync_thread
+    with _stores_lock:
+        if store.namespace in _stores:
+            logger.warning(f"⚠️ Хранилище состояний '{store.namespace}' создано повторно")
+        _stores[store.namespace] = store
+        if _sync_thread is None:
+            _sync_thread = threading.Thread(target=_sync_loop, name='state-store-sync', daemon=True)
+            _sync_thread.start()
+
+
+def _sync_loop():
+    while True:
+        time.sleep(STATE_SYNC_INTERVAL)
+        sync_all()
+
+
+def sync_all():
+    """Обслужить все хранилища (вызывается фоновым потоком и при выходе)"""
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        try:
+            store.sync()
+        except Exception as e:
+            store.sync_errors += 1
+            logger.error(f"❌ Ошибка синхронизации состояний {store.namespace}: {e}")
+
+
+def flush_thread_states():
+    """
+    Записать изменения состояний, сделанные текущим потоком (postgres).
+    Вызывается в конце обработки обновления / callback'а / задания пула.
+    """
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        if not store.backend.persistent:
+            continue
+        try:
+            store.flush_touched()
+        except Exception as e:
+            store.sync_errors += 1
+            logger.error(f"❌ Ошибка записи состояний {store.namespace}: {e}")
+
+
+atexit.register(sync_all)
+
+
+def get_state_store_stats():
+    """Статистика всех хранилищ состояний"""
+    with _stores_lock:
+        stores = list(_stores.values())
+    return [store.get_stats() for store in stores]
+
+
+print("✅ utils/state_store.py загружен")
@@ -74,14 +74,17 @@ def check_database():
         db.cursor.execute("SELECT 1")
         
         # Получаем версию PostgreSQL
-        db.cursor.execute("SELECT version()")
-        version = db.cursor.fetchone()[0]
+        db.cursor.execute("SELECT version() AS version")
+        row = db.cursor.fetchone()
+        version = row['version'] if isinstance(row, dict) else row[0]
         version_short = version.split('PostgreSQL')[1].split('on')[0].strip() if 'PostgreSQL' in version else 'Unknown'
         
         return {
             'status': 'ok',
             'message': 'Подключена',
-            'version': version_short
+            'version': version_short,
+            'pool': db.get_pool_stats(),
+            'cache': db.get_cache_stats()
         }
     except Exception as e:
         return {
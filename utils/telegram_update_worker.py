@@ -0,0 +1,209 @@
+"""
+Обработка очереди обновлений Telegram (режим BOT_MODE=webhook)
+
+telegram_webhook.py складывает обновления в telegram_updates; здесь потоки
+процесса бота забирают их и передают в bot.process_new_updates. Процессов
+может быть сколько угодно (на одной машине или на разных репликах).
+
+Порядок внутри чата сохраняется арендой чата (telegram_chat_leases): пока
+воркер держит чат, обновления этого чата обрабатывает только он, строго по
+update_id. Разные чаты обрабатываются параллельно всеми воркерами. Пока чат
+в работе, аренда продлевается фоновым heartbeat — долгий обработчик не
+отдаёт чат другому воркеру, и обновление не выполняется повторно.
+
+Доставка «хотя бы один раз»: если процесс упал посреди обработки, аренда
+истекает и обновление забирает другой воркер.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from telebot import types
+from utils.state_store import flush_thread_states
+from config import (
+    TELEGRAM_UPDATE_WORKERS, TELEGRAM_UPDATE_LEASE_SECONDS, TELEGRAM_UPDATE_BATCH_SIZE,
+    TELEGRAM_UPDATE_POLL_INTERVAL, TELEGRAM_UPDATE_RETENTION_DAYS
+)
+
+logger = logging.getLogger(__name__)
+
+# Очистка обработанных обновлений — не чаще раза в час
+CLEANUP_INTERVAL = 3600
+
+
+class _LeaseHeartbeat:
+    """Продление аренды чата каждые lease_seconds / 3, пока идёт обработка"""
+
+    def __init__(self, db, chat_id, worker_id, lease_seconds):
+        self.db = db
+        self.chat_id = chat_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f'tg-lease-{chat_id}', daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        interval = max(1.0, self.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            # Не продлили (перехватили или ошибка БД) — дальше чат не обрабатываем:
+            # после истечения аренды его может взять другой воркер
+            if not self.db.update_telegram_chat_lease(self.chat_id, self.worker_id, self.lease_seconds):
+                logger.warning(f"⚠️ Аренда чата {self.chat_id} потеряна ({self.worker_id})")
+                self.lost = True
+                return
+
+
+class TelegramUpdateWorker:
+    """
+    Потоки, обрабатывающие telegram_updates с арендой чатов
+
+    bot должен быть создан или переключён с threaded=False (main.py,
+    режим webhook): обработчик должен завершиться до снятия аренды чата.
+    """
+
+    def __init__(self, bot, threads=TELEGRAM_UPDATE_WORKERS,
+                 lease_seconds=TELEGRAM_UPDATE_LEASE_SECONDS,
+                 batch_size=TELEGRAM_UPDATE_BATCH_SIZE,
+                 poll_interval=TELEGRAM_UPDATE_POLL_INTERVAL):
+        self.bot = bot
+        self.threads = threads
+        self.lease_seconds = lease_seconds
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads = []
+        self._last_cleanup = 0.0
+        self._stats_lock = threading.Lock()
+
+        self.processed = 0
+        self.failed = 0
+        self.chats_claimed = 0
+        self.total_handle_seconds = 0.0
+
+    def start(self):
+        """Запустить потоки-обработчики"""
+        if self._threads:
+            return
+        self._stop.clear()
+        for index in range(self.threads):
+            thread = threading.Thread(
+                target=self._run, name=f'tg-update-worker-{index}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"✅ Обработка очереди обновлений: {self.threads} потоков ({self.worker_id})")
+
+    def stop(self, timeout=10):
+        """Дождаться завершения текущих обновлений и остановить потоки"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        logger.info("🛑 Обработка очереди обновлений остановлена")
+
+    def serve_forever(self):
+        """Запустить и блокировать поток вызова (до KeyboardInterrupt)"""
+        self.start()
+        while not self._stop.is_set():
+            time.sleep(1)
+            self._cleanup_processed()
+
+    def _run(self):
+        from database.database import db
+
+        while not self._stop.is_set():
+            try:
+                chat_id = db.claim_telegram_chat(self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"❌ Ошибка аренды чата: {e}")
+                chat_id = None
+
+            if chat_id is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            with self._stats_lock:
+                self.chats_claimed += 1
+            try:
+                with _LeaseHeartbeat(db, chat_id, self.worker_id, self.lease_seconds) as heartbeat:
+                    self._process_chat(db, chat_id, heartbeat)
+            finally:
+                db.delete_telegram_chat_lease(chat_id, self.worker_id)
+
+    def _process_chat(self, db, chat_id, heartbeat):
+        """Обработать очередь чата пачками, пока она не опустеет"""
+        while not self._stop.is_set():
+            updates = db.get_queued_telegram_updates(chat_id, self.batch_size) or []
+            if not updates:
+                return
+
+            for row in updates:
+                # Аренду перехватили — чат обрабатывает другой воркер
+                if heartbeat.lost:
+                    return
+                self._process_update(db, row)
+
+    def _process_update(self, db, row):
+        started = time.perf_counter()
+        try:
+            update = types.Update.de_json(row['payload'])
+            try:
+                self.bot.process_new_updates([update])
+            finally:
+                # Состояния диалога — в БД до того, как чат сможет взять другой процесс
+                flush_thread_states()
+        except Exception as e:
+            # Не повторяем: обработчик мог уже списать токены или отправить сообщения
+            logger.error(f"❌ Ошибка обработки обновления {row['update_id']}: {e}", exc_info=True)
+            db.update_telegram_update_status(row['update_id'], 'failed', self.worker_id, e)
+            with self._stats_lock:
+                self.failed += 1
+        else:
+            db.update_telegram_update_status(row['update_id'], 'done', self.worker_id)
+            with self._stats_lock:
+                self.processed += 1
+        finally:
+            # Соединение обработчика (db.cursor) — обратно в пул после каждого обновления
+            db.release_thread_connection()
+            with self._stats_lock:
+                self.total_handle_seconds += time.perf_counter() - started
+
+    def _cleanup_processed(self):
+        now = time.monotonic()
+        if now - self._last_cleanup < CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        from database.database import db
+        deleted = db.delete_processed_telegram_updates(TELEGRAM_UPDATE_RETENTION_DAYS)
+        if deleted:
+            logger.info(f"🧹 Удалено обработанных обновлений Telegram: {deleted}")
+
+    def get_stats(self):
+        """Статистика этого процесса"""
+        with self._stats_lock:
+            handled = self.processed + self.failed
+            return {
+                'worker_id': self.worker_id,
+                'threads': len(self._threads),
+                'processed': self.processed,
+                'failed': self.failed,
+                'chats_claimed': self.chats_claimed,
+                'avg_handle_ms': self.total_handle_seconds / handled * 1000 if handled else 0.0,
+            }
+
+
+print("✅ utils/telegram_update_worker.py загружен")
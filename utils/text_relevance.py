@@ -0,0 +1,180 @@
+"""
+Поиск релевантных страниц сайта по ключевому слову (BM25)
+
+Краулер для каждой страницы считает взвешенные частоты основ слов
+(page_terms): заголовок <title> ×3, заголовки h1-h3 ×2, текст ×1. Из них
+строится обратный индекс BM25Index; поиск по ключевой фразе статьи
+занимает миллисекунды и не обращается к сайту.
+
+Основы слов — стеммер Портера для русского языка (алгоритм Snowball),
+английские слова только приводятся к нижнему регистру.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+# Вес полей страницы
+TITLE_WEIGHT = 3
+HEADING_WEIGHT = 2
+BODY_WEIGHT = 1
+
+# Текста страницы учитываем не больше (слов)
+BODY_MAX_WORDS = 3000
+
+# Параметры BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r'[a-zа-я0-9]+')
+
+STOP_WORDS = {
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а', 'то', 'все', 'она',
+    'так', 'его', 'но', 'да', 'ты', 'к', 'у', 'же', 'вы', 'за', 'бы', 'по', 'только', 'ее',
+    'мне', 'было', 'вот', 'от', 'меня', 'еще', 'нет', 'о', 'из', 'ему', 'теперь', 'когда',
+    'даже', 'ну', 'ли', 'если', 'уже', 'или', 'ни', 'быть', 'был', 'него', 'до', 'вас',
+    'нибудь', 'уж', 'вам', 'ведь', 'там', 'потом', 'себя', 'ничего', 'ей', 'может', 'они',
+    'тут', 'где', 'есть', 'надо', 'ней', 'для', 'мы', 'тебя', 'их', 'чем', 'была', 'сам',
+    'чтоб', 'без', 'будто', 'чего', 'раз', 'тоже', 'себе', 'под', 'будет', 'ж', 'тогда',
+    'кто', 'этот', 'того', 'потому', 'этого', 'какой', 'совсем', 'ним', 'здесь', 'этом',
+    'один', 'почти', 'мой', 'тем', 'чтобы', 'нее', 'были', 'куда', 'зачем', 'всех', 'при',
+    'об', 'это', 'эти', 'наш', 'ваш', 'вся', 'весь', 'через', 'the', 'and',
+    'of', 'to', 'in', 'for', 'on', 'with', 'is', 'a', 'an', 'by', 'at', 'or',
+}
+
+# ─────────────────────────────────────────────────────────────
+# Стеммер (Snowball Russian)
+# ─────────────────────────────────────────────────────────────
+
+_VOWELS = 'аеиоуыэюя'
+_PERFECTIVE_GERUND = re.compile(r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+_REFLEXIVE = re.compile(r'(с[яь])$')
+_ADJECTIVE = re.compile(r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|ую|юю|ая|яя|ою|ею)$')
+_PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+_VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)'
+    r'|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+_NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+_SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+_DERIVATIONAL = re.compile(r'ость?$')
+
+
+def _region_start(word, start):
+    """Начало R1 (start=0) / R2 (start=R1): после первой согласной, идущей за гласной"""
+    for i in range(max(start, 1), len(word)):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            return i + 1
+    return len(word)
+
+
+def stem_ru(word):
+    """Основа русского слова (алгоритм Snowball); прочие слова без изменений"""
+    position = next((i for i, char in enumerate(word) if char in _VOWELS), None)
+    if position is None:
+        return word
+    head, rv = word[:position + 1], word[position + 1:]
+
+    # Шаг 1: деепричастие, иначе возвратность + прилагательное / глагол / существительное
+    stripped = _PERFECTIVE_GERUND.sub('', rv, 1)
+    if stripped == rv:
+        rv = _REFLEXIVE.sub('', rv, 1)
+        stripped = _ADJECTIVE.sub('', rv, 1)
+        if stripped != rv:
+            rv = _PARTICIPLE.sub('', stripped, 1)
+        else:
+            stripped = _VERB.sub('', rv, 1)
+            rv = stripped if stripped != rv else _NOUN.sub('', rv, 1)
+    else:
+        rv = stripped
+
+    # Шаг 2: и
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательные ость / ост (в R2)
+    match = _DERIVATIONAL.search(rv)
+    if match and len(head) + match.start() >= _region_start(word, _region_start(word, 0)):
+        rv = rv[:match.start()]
+
+    # Шаг 4: нн → н, превосходная степень, ь
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        stripped = _SUPERLATIVE.sub('', rv, 1)
+        if stripped != rv:
+            rv = stripped[:-1] if stripped.endswith('нн') else stripped
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+
+    return head + rv
+
+
+def tokenize(text):
+    """Основы значимых слов текста"""
+    words = _TOKEN_RE.findall((text or '').lower().replace('ё', 'е'))
+    return [stem_ru(word) for word in words if len(word) > 1 and word not in STOP_WORDS]
+
+
+def page_terms(title, headings, body):
+    """
+    Взвешенные частоты основ страницы
+
+    Returns:
+        (terms: dict {основа: вес}, doc_length: int)
+    """
+    terms = Counter()
+    for token in tokenize(title):
+        terms[token] += TITLE_WEIGHT
+    for token in tokenize(' '.join(headings)):
+        terms[token] += HEADING_WEIGHT
+    for token in tokenize(' '.join((body or '').split()[:BODY_MAX_WORDS])):
+        terms[token] += BODY_WEIGHT
+    return dict(terms), sum(terms.values())
+
+
+class BM25Index:
+    """Обратный индекс страниц одного сайта"""
+
+    def __init__(self, pages):
+        """pages: [{'url', 'title', 'priority', 'terms', 'doc_length'}]"""
+        self.pages = [page for page in pages if page.get('terms')]
+        self.postings = defaultdict(list)
+        for doc_id, page in enumerate(self.pages):
+            for term, tf in page['terms'].items():
+                self.postings[term].append((doc_id, tf))
+
+        total = len(self.pages)
+        self.avg_length = (sum(page['doc_length'] for page in self.pages) / total) if total else 0.0
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query, limit=10):
+        """
+        Страницы по убыванию релевантности запросу (только с ненулевым счётом)
+
+        Returns:
+            list: [(score, page)]
+        """
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                length = self.pages[doc_id]['doc_length'] or 1
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (self.avg_length or 1))
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (item[1], self.pages[item[0]].get('priority', 1)),
+            reverse=True
+        )
+        return [(score, self.pages[doc_id]) for doc_id, score in ranked[:limit]]
+
+
+print("✅ utils/text_relevance.py загружен")
@@ -0,0 +1,193 @@
+"""
+Списание токенов за генерации
+
+Баланс меняется только атомарными запросами Database.charge_tokens /
+refund_tokens: проверка остатка, списание и запись в token_expenses —
+один запрос, без отдельных get_user_tokens до и после.
+
+Долгие генерации резервируют токены заранее:
+
+    reservation = reserve_tokens(user_id, cost, 'article', bot_id, category_id)
+    if reservation is None:
+        ...  # недостаточно токенов
+    submit_generation(partial(...), kind='article', reservation=reservation)
+
+Резерв подтверждается (commit) после успешной генерации и возвращается
+(refund) при ошибке — явно из кода генерации или автоматически пулом
+генераций (utils/generation_executor.py) и в блоке with. Повторный
+commit / refund ничего не делает, статус handle меняется только после
+успешного запроса к БД. Резервы, брошенные остановившимся процессом,
+возвращаются фоновой проверкой через TOKEN_RESERVATION_TTL; резервы,
+на которые в процессе ещё есть ссылки (задача в очереди или в работе),
+фоновая проверка отмечает живыми, а неудавшиеся commit повторяет.
+"""
+import logging
+import threading
+import time
+import weakref
+from config import TOKEN_RESERVATION_TTL, TOKEN_SWEEP_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class TokenReservation:
+    """Handle резерва токенов (строка token_expenses со status='reserved')"""
+
+    __slots__ = ('user_id', 'amount', 'expense_id', 'balance', 'status', '_lock', '__weakref__')
+
+    def __init__(self, user_id, amount, expense_id, balance, status='reserved'):
+        self.user_id = user_id
+        self.amount = amount
+        self.expense_id = expense_id
+        self.balance = balance
+        self.status = status
+        self._lock = threading.Lock()
+        if status == 'reserved':
+            with _registry_lock:
+                _live.add(self)
+
+    def commit(self):
+        """
+        Подтвердить списание. Если запрос к БД не прошёл, резерв остаётся
+        reserved и commit повторяет фоновая проверка (иначе она вернула бы
+        токены за уже выданную генерацию). Резерв, который уже не reserved
+        (вернула фоновая проверка или другой процесс), не повторяется.
+
+        Returns: True если резерв был подтверждён сейчас
+        """
+        from database.database import db
+
+        with self._lock:
+            if self.status != 'reserved':
+                return False
+            row = db.update_token_reservation_committed(self.expense_id)
+            if row is False:
+                with _registry_lock:
+                    _unconfirmed.add(self)
+                return False
+            if row['committed'] or row['status'] == 'committed':
+                self.status = 'committed'
+            else:
+                logger.warning(
+                    f"⚠️ Резерв #{self.expense_id} уже возвращён ({row['status']}), генерация "
+                    f"выдана пользователю {self.user_id} без списания {self.amount} токенов"
+                )
+                self.status = 'refunded'
+        _forget(self)
+        return bool(row['committed'])
+
+    def refund(self):
+        """Вернуть токены. Returns: баланс после возврата или None (уже завершён)"""
+        from database.database import db
+
+        with self._lock:
+            if self.status != 'reserved':
+                return None
+            balance = db.refund_tokens(self.expense_id, self.user_id)
+            if balance is not None:
+                self.status = 'refunded'
+                self.balance = balance
+        # Не удалось — резерв больше не отмечается живым, его вернёт фоновая проверка
+        _forget(self)
+        if balance is not None:
+            logger.info(f"💰 Возвращено {self.amount} токенов пользователю {self.user_id} (#{self.expense_id})")
+        return balance
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.refund()
+        else:
+            self.commit()
+        return False
+
+    def __repr__(self):
+        return f"<TokenReservation #{self.expense_id} {self.amount} {self.status}>"
+
+
+def reserve_tokens(user_id, amount, action, bot_id=None, category_id=None):
+    """
+    Зарезервировать amount токенов (списываются сразу, до commit / refund)
+
+    Returns:
+        TokenReservation или None — недостаточно токенов
+    """
+    from database.database import db
+
+    row = db.charge_tokens(user_id, amount, action, bot_id, category_id, reserve=True)
+    if not row:
+        return None
+    return TokenReservation(user_id, amount, row['expense_id'], row['balance'])
+
+
+def find_reservation(user_id, action, category_id=None):
+    """Неподтверждённый резерв, созданный в предыдущем callback (например, до выбора топика)"""
+    from database.database import db
+
+    row = db.get_token_reservation(user_id, action, category_id)
+    if not row:
+        return None
+    return TokenReservation(user_id, row['amount'], row['id'], None)
+
+
+# Резервы, на которые в процессе есть ссылки: фоновая проверка продлевает
+# им updated_at. Неудавшиеся commit держатся сильной ссылкой до повтора.
+_registry_lock = threading.Lock()
+_live = weakref.WeakSet()
+_unconfirmed = set()
+
+
+def _forget(reservation):
+    with _registry_lock:
+        _live.discard(reservation)
+        _unconfirmed.discard(reservation)
+
+
+def _sweep_reservations(db):
+    """Повторить неудавшиеся commit, продлить живые резервы, вернуть брошенные"""
+    with _registry_lock:
+        unconfirmed = list(_unconfirmed)
+    for reservation in unconfirmed:
+        if reservation.commit():
+            logger.info(f"💰 Резерв #{reservation.expense_id} подтверждён повторно")
+
+    with _registry_lock:
+        live = {reservation.expense_id: reservation for reservation in _live}
+    if live:
+        alive = db.update_token_reservations_heartbeat(list(live))
+        if alive is not False:
+            # Строки уже не reserved (завершены другим процессом) — не держим
+            for expense_id in set(live) - set(alive):
+                _forget(live[expense_id])
+
+    return db.refund_stale_token_reservations(TOKEN_RESERVATION_TTL)
+
+
+_sweeper_thread = None
+
+
+def start_reservation_sweeper():
+    """Фоновый возврат брошенных резервов (при запуске бота и раз в TOKEN_SWEEP_INTERVAL)"""
+    global _sweeper_thread
+    if _sweeper_thread is not None:
+        return
+
+    def loop():
+        from database.database import db
+
+        while True:
+            try:
+                refunded = _sweep_reservations(db)
+                if refunded:
+                    logger.info(f"💰 Возвращены брошенные резервы токенов: {refunded} польз.")
+            except Exception as e:
+                logger.error(f"❌ Ошибка возврата резервов токенов: {e}")
+            time.sleep(TOKEN_SWEEP_INTERVAL)
+
+    _sweeper_thread = threading.Thread(target=loop, name='token-sweeper', daemon=True)
+    _sweeper_thread.start()
+
+
+print("✅ utils/token_ledger.py загружен")
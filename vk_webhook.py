@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 """
 Flask Webhook для обработки VK OAuth callback
+
+Запуск:
+    gunicorn -c gunicorn.conf.py vk_webhook:app
 """
 from flask import Flask, request, redirect, render_template_string
 import os
@@ -11,9 +14,10 @@ import json
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from handlers.vk_integration.vk_oauth import VKOAuth
-# БД будет создаваться локально в каждом callback
+from database.flask_db import init_app, get_db
 
 app = Flask(__name__)
+init_app(app)
 
 
 # HTML страница для успешной авторизации
@@ -212,9 +216,8 @@ def vk_callback():
     # СОХРАНЯЕМ ВРЕМЕННЫЕ ДАННЫЕ ДЛЯ ВЫБОРА
     # ============================================
     
-    # Создаём свежее подключение к БД для сохранения временных данных
-    from database.database import Database
-    db_temp = Database()
+    # Общий пул соединений (database/flask_db.py)
+    db = get_db()
     
     try:
         # Сохраняем токен и группы во временное хранилище для выбора
@@ -229,31 +232,17 @@ def vk_callback():
         }
         
         # Получаем пользователя и сохраняем временные данные
-        user = db_temp.get_user(telegram_user_id)
+        user = db.get_user(telegram_user_id)
         connections = user.get('platform_connections', {})
         if isinstance(connections, str):
             connections = json.loads(connections)
         
         connections['_vk_selection_pending'] = vk_selection_data
         
-        db_temp.cursor.execute("""
-            UPDATE users
-            SET platform_connections = %s::jsonb
-            WHERE id = %s
-        """, (json.dumps(connections), telegram_user_id))
-        db_temp.conn.commit()
-        
-        # Закрываем БД
-        db_temp.cursor.close()
-        db_temp.conn.close()
+        db.update_user(telegram_user_id, {'platform_connections': connections})
         
     except Exception as e:
         print(f"⚠️ Ошибка сохранения временных данных: {e}")
-        try:
-            db_temp.cursor.close()
-            db_temp.conn.close()
-        except:
-            pass
     
     # ============================================
     # ОТПРАВЛЯЕМ TELEGRAM СООБЩЕНИЕ С ВЫБОРОМ
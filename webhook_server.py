@@ -1,12 +1,12 @@
 """
 Flask Webhook Server для Pinterest OAuth callback
-Запускается отдельно от Telegram бота
+Запускается отдельно от Telegram бота:
+    gunicorn -c gunicorn.conf.py webhook_server:app
 """
 from flask import Flask, request, render_template_string
 import requests
-import json
 import os
-from database.database import Database
+from database.flask_db import init_app, get_db
 from config import (
     PINTEREST_APP_ID, 
     PINTEREST_APP_SECRET, 
@@ -15,7 +15,7 @@ from config import (
 )
 
 app = Flask(__name__)
-db = Database()
+init_app(app)
 
 # HTML шаблон для страницы успеха
 SUCCESS_PAGE = """
@@ -236,6 +236,9 @@ def pinterest_callback():
             bot_username=os.getenv('BOT_USERNAME', 'yourbot')
         )
     
+    # Общий пул соединений (database/flask_db.py)
+    db = get_db()
+    
     try:
         # State содержит user_id
         user_id = int(state)
@@ -327,12 +330,8 @@ def pinterest_callback():
         })
         
         # Обновляем в БД
-        db.cursor.execute("""
-            UPDATE users 
-            SET platform_connections = %s::jsonb
-            WHERE id = %s
-        """, (json.dumps(connections), user_id))
-        db.conn.commit()
+        if not db.update_user(user_id, {'platform_connections': connections}):
+            raise Exception("Не удалось сохранить подключение")
         
         print("✅ Pinterest connected successfully!")
         print("=" * 60)